@@ -1,8 +1,11 @@
 import streamlit as st
+import os
 import pandas as pd
-import google.generativeai as genai
 import time
 
+# Tempo de cada rerun do script (registrado no fim, em 'menu_rerun')
+_inicio_rerun = time.perf_counter()
+
 # --- [ETAPA 1: IMPORTAR NOSSOS MÓDULOS] ---
 # (Sem alterações)
 try:
@@ -11,17 +14,42 @@ try:
         SEU_NOME_DE_USUARIO, 
         SUA_SENHA
     )
-    from mongodb_utils import (
-        init_connection, 
-        save_posts_to_mongodb,
-        fetch_instagram_data, 
-        update_post_classification
+    import metricas
+    import modelos_gemini
+    import perfilador
+    import datasets_compartilhados
+    import chatbot
+    from features_legenda import (
+        COLUNAS_FEATURES,
+        DIAS_DA_SEMANA,
+        engajamento_por_feature,
+        resumo_features_md
+    )
+    from storage_backend import obter_backend
+    from busca_legendas import TAMANHO_PAGINA_BUSCA, IndiceInvertido
+    from grade_posts import (
+        ORDENACOES_GRADE,
+        TAMANHO_PAGINA_GRADE,
+        TAMANHOS_PAGINA_GRADE,
+        janelas_da_analise,
+        pagina_local,
+        total_de_paginas,
+        truncar_legendas
+    )
+    from estatisticas_perfil import EstatisticasPerfis
+    from comparativo_perfis import comparar, obter_seguidores
+    from importar_csv import carregar_csv_tipado
+    from parquet_utils import (
+        DIRETORIO_PARQUET,
+        carregar_historico_parquet,
+        exportar_perfis_do_banco,
+        listar_perfis_parquet
     )
-    from teste_coletar import login_instagram, coletar_posts_instagram
-    from classificador_post import classificar_posts_gemini
+    from contas_instagram import PoolInstagram
+    import pipeline
 except ImportError as e:
     st.error(f"Erro ao importar módulos: {e}")
-    st.error("Verifique se os arquivos 'app_config.py', 'mongodb_utils.py', 'coletor_insta.py', e 'classificar.py' estão na mesma pasta.")
+    st.error("Verifique se os arquivos 'config.py', 'storage_backend.py', 'teste_coletar.py', 'classificador_post.py' e 'pipeline.py' estão na mesma pasta.")
     st.stop()
 
 # --- Configuração da Página ---
@@ -32,74 +60,67 @@ st.set_page_config(
     page_icon="📊"
 )
 
+# --- Perfilamento sob demanda ('?profile=1' na URL, ver perfilador.py) ---
+# Cada rerun perfilado gera um arquivo do speedscope. Um rerun interrompido por
+# st.rerun()/st.stop() não chega ao fim do script: a sessão dele é fechada aqui.
+_sessao_interrompida = st.session_state.pop('sessao_perfil', None)
+if _sessao_interrompida is not None:
+    _sessao_interrompida.finalizar()
+    st.session_state.ultimo_perfil = _sessao_interrompida
+PERFILAR = str(st.query_params.get("profile", "")).lower() in ("1", "true", "sim")
+if PERFILAR:
+    st.session_state.sessao_perfil = perfilador.iniciar(rotulo="menu")
+    if st.session_state.sessao_perfil is None:
+        st.toast("Outro perfilamento está rodando no servidor; este rerun não será perfilado.")
+
 # --- [NOVO - ETAPA 1.5: FUNÇÃO DE PROCESSAMENTO REUTILIZÁVEL] ---
 
-def processar_perfil(mongo_client, insta_client, nome_perfil, qtd_posts):
+# Fontes que gravam no banco (e por isso têm o resumo pronto em profile_stats)
+ROTAS_COM_BANCO = (
+    "Analisar perfil (Coleta + Banco de Dados)",
+    "Análise de Concorrência (Coleta + Banco de Dados)",
+)
+
+@st.cache_resource(show_spinner=False)
+def _backend_em_cache():
+    return obter_backend("mongodb")
+
+def backend_do_app():
     """
-    Executa o pipeline completo de coleta, salvamento, classificação e 
-    busca de dados para um único perfil de Instagram.
-    Retorna um DataFrame classificado ou None em caso de falha.
+    Backend do dashboard, criado uma vez por processo e dividido por todas as
+    sessões e reruns. Sem conexão com o banco, o backend devolvido (que grava no
+    spool) não fica no cache: o próximo rerun tenta conectar de novo.
     """
-    try:
-        perfil_alvo = nome_perfil.replace('@', '')
-        
-        # 1. Coletar do Instagram
-        with st.spinner(f"Coletando {qtd_posts} posts de @{perfil_alvo}..."):
-            df_novos_posts = coletar_posts_instagram(insta_client, perfil_alvo, qtd_posts)
-        
-        # 2. Salvar no Mongo
-        with st.spinner(f"Salvando {len(df_novos_posts)} posts de @{perfil_alvo} no banco..."):
-            if df_novos_posts is not None and not df_novos_posts.empty:
-                save_posts_to_mongodb(mongo_client, df_novos_posts, perfil_alvo)
-            else:
-                st.info(f"Nenhum post novo encontrado para @{perfil_alvo} na coleta.")
-
-        # 3. Buscar TODOS os dados (incluindo os novos)
-        with st.spinner(f"Buscando histórico completo de @{perfil_alvo} no banco..."):
-            df_todos_posts = fetch_instagram_data(mongo_client, perfil_alvo, limit=qtd_posts)
-            if df_todos_posts is None:
-                st.error(f"Nenhum dado encontrado para @{perfil_alvo} no banco.")
-                return None
-        
-        # 4. Classificar o que for necessário
-        with st.spinner(f"Verificando posts de @{perfil_alvo} para classificar com IA..."):
-            df_todos_posts['tipo'] = df_todos_posts['tipo'].fillna('')
-            df_para_classificar = df_todos_posts[
-                (df_todos_posts['tipo'].str.strip() == '') | 
-                (df_todos_posts['tipo'] == 'Erro na Classificação')
-            ]
-            
-            if not df_para_classificar.empty:
-                st.write(f"Enviando {len(df_para_classificar)} posts de @{perfil_alvo} para classificação...")
-                classificacoes = classificar_posts_gemini(df_para_classificar, GEMINI_API_KEY)
-                update_post_classification(mongo_client, classificacoes)
-            else:
-                st.info(f"Todos os posts de @{perfil_alvo} já estavam classificados.")
-        limit_analise_final = qtd_posts if st.session_state.get('fonte_dados') != "Analisar perfil (Coleta + Banco de Dados)" else 0        
-
-        # 5. Buscar os dados finais e prontos para análise
-        with st.spinner(f"Buscando dados finais de @{perfil_alvo} classificados..."):
-            df_final = fetch_instagram_data(mongo_client, perfil_alvo, limit=limit_analise_final)
-            # Garante que a coluna se chame 'categoria'
-            if 'tipo' in df_final.columns:
-                df_final = df_final.rename(columns={'tipo': 'categoria'})
-            
-            # [NOVO] Adiciona o nome do perfil ao DF para referência futura
-            df_final['perfil'] = perfil_alvo
-            
-            return df_final
+    backend = _backend_em_cache()
+    if backend.client is None:
+        _backend_em_cache.clear()
+    return backend
 
-    except Exception as e:
-        st.error(f"Ocorreu um erro ao processar o perfil @{perfil_alvo}: {e}")
-        return None
+def processar_perfil(backend, insta_client, nome_perfil, qtd_posts, df_coletado=None):
+    """
+    Roda o pipeline de um perfil (pipeline.py) mostrando o progresso no Streamlit.
+    'df_coletado' traz os posts já coletados (coleta em paralelo pelo pool de contas).
+    Cada chamada ganha um run_id (metricas.py), guardado em st.session_state.execucoes.
+    Retorna um DataFrame classificado ou None em caso de falha.
+    """
+    # Na coleta simples analisa o histórico inteiro do banco; nos outros modos, só os posts coletados
+    limit_analise_final = qtd_posts if st.session_state.get('fonte_dados') != "Analisar perfil (Coleta + Banco de Dados)" else 0
+    with metricas.execucao(funcao="processar_perfil", perfil=nome_perfil.replace('@', '')) as run_id:
+        st.session_state.setdefault('execucoes', []).append(run_id)
+        return pipeline.processar_perfil(
+            backend, insta_client, nome_perfil, qtd_posts,
+            api_key=GEMINI_API_KEY, limit_final=limit_analise_final, ui=st, df_coletado=df_coletado
+        )
 
 # --- [ETAPA 2: FUNÇÕES DE ANÁLISE (INSIGHTS)] ---
 # (Sem alterações, apenas corrigi nomes de modelos que não existem para um que funciona)
-def gerar_insights_com_gemini(df_posts):
-    """Usa a IA para gerar um relatório completo com base nos dados."""
+# Os modelos de cada tarefa (e a troca de modelo) ficam em modelos_gemini.py.
+# O SDK do Gemini só é importado na primeira chamada à IA.
+
+def gerar_insights_com_gemini(df_posts, estatisticas=None):
+    """Usa a IA para gerar um relatório completo com base nos dados e no resumo pronto do perfil."""
     try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel('gemini-2.5-flash') 
+        model = modelos_gemini.obter_modelo("insights", GEMINI_API_KEY)
         
         # (Restante da função sem alterações)
         if 'categoria' not in df_posts.columns and 'tipo' in df_posts.columns:
@@ -107,12 +128,27 @@ def gerar_insights_com_gemini(df_posts):
         elif 'categoria' not in df_posts.columns:
             st.error("O DataFrame precisa ter uma coluna 'categoria' ou 'tipo'.")
             return None
-        dados_posts_md = df_posts.to_markdown(index=False)
+        # Os atributos da legenda vão resumidos (tabela abaixo), não coluna a coluna
+        dados_posts_md = df_posts.drop(columns=COLUNAS_FEATURES, errors='ignore').to_markdown(index=False)
+        atributos_md = resumo_features_md(df_posts)
+        estatisticas = estatisticas or EstatisticasPerfis.de_posts(df_posts)
+        categorias_md = estatisticas.por_categoria().to_markdown(floatfmt=".1f")
+        colunas_destaque = ['data', 'categoria', 'curtidas', 'comentarios', 'legenda']
+        destaques_md = "\n".join(
+            f"Top 3 por {metrica}:\n{estatisticas.top_posts(metrica, 3).reindex(columns=colunas_destaque).to_markdown(index=False)}"
+            for metrica in ('curtidas', 'comentarios')
+        )
         prompt = f"""
         **Você é um especialista em análise de marketing digital e redes sociais.**
         Sua tarefa é analisar os dados de um perfil do Instagram e fornecer um relatório estratégico. Baseie TODA a sua análise exclusivamente nos dados do arquivo fo
         **Dados dos Posts Analisados:**
         {dados_posts_md}
+        **Atributos das Legendas e Horários (calculados localmente, use-os em vez de contar no texto):**
+        {atributos_md}
+        **Médias por Categoria (já calculadas sobre todo o histórico, use-as em vez de recalcular):**
+        {categorias_md}
+        **Posts de Maior Destaque (já ordenados):**
+        {destaques_md}
         **Por favor, elabore um relatório claro e objetivo com a seguinte estrutura:**
         ### 1. Análise de Performance por Categoria
         - Qual categoria de conteúdo (`categoria`) teve a melhor média de **curtidas**?
@@ -126,111 +162,129 @@ def gerar_insights_com_gemini(df_posts):
         Formate sua resposta usando Markdown para uma boa apresentação.
         """
         response = model.generate_content(prompt)
-        print("REQUISIÇÃO DO INSIGHT")
         return response.text
     except Exception as e:
         st.error(f"Ocorreu um erro ao chamar a API do Gemini (Insights): {e}")
         return None
 
 def chatbot_analise_instagram(df_posts, pergunta_usuario):
-    """Função do chatbot para responder perguntas sobre os dados."""
+    """
+    Responde no chat da análise atual (chatbot.py). A sessão guarda o histórico
+    e o contexto dos dados, então as perguntas seguintes só enviam o que é novo.
+    """
     try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel('gemini-2.5-flash') 
-        
-        if 'categoria' not in df_posts.columns and 'tipo' in df_posts.columns:
-             df_posts = df_posts.rename(columns={'tipo': 'categoria'})
-        elif 'categoria' not in df_posts.columns:
-            return "❌ Erro: Não foi encontrada coluna de categoria nos dados."
-        dados_resumo = {
-            'total_posts': len(df_posts),
-            'periodo': f"{df_posts['data'].min()} a {df_posts['data'].max()}",
-            'categoria_conteudo': df_posts['categoria'].value_counts().to_dict(),
-            'media_curtidas': df_posts['curtidas'].mean(),
-            'media_comentarios': df_posts['comentarios'].mean(),
-        }
-        prompt = f"""
-        Você é um especialista em análise de mídias sociais e marketing digital. 
-        Analise os dados do Instagram fornecidos e responda à pergunta do usuário.
-        **DADOS DO PERFIL ANALISADO:**
-        - Total de posts: {dados_resumo['total_posts']}
-        - Período: {dados_resumo['periodo']}
-        - Tipos de conteúdo: {dados_resumo['categoria_conteudo']}
-        - Média de curtidas: {dados_resumo['media_curtidas']:.1f}
-        - Média de comentários: {dados_resumo['media_comentarios']:.1f}
-        **PERGUNTA ATUAL:**
-        {pergunta_usuario}
-        **INSTRUÇÕES:**
-        - Baseie sua resposta NOS DADOS FORNECIDOS
-        - Seja prático e objetivo
-        - Use markdown para formatação
-        - Mantenha em português
-        **RESPONDA:**
-        """
-        response = model.generate_content(prompt)
-        print("REQUISIÇÃO DO CHATBOT")
-        return response.text
+        if st.session_state.get('chat') is None:
+            st.session_state.chat = chatbot.SessaoChat(df_posts, st.session_state.get('estatisticas'))
+        return st.session_state.chat.perguntar(pergunta_usuario, GEMINI_API_KEY)
+    except ValueError as e:
+        return f"❌ Erro: {e}"
     except Exception as e:
         return f"❌ Erro ao processar: {str(e)}"
 
+def buscar_nas_legendas(dataset, termo, perfis, pagina):
+    """
+    Uma página da busca nas legendas (busca_legendas.py). Nas rotas com banco a
+    busca roda no índice de texto do banco; em CSV/Parquet, no índice invertido
+    montado uma vez por dataset (datasets_compartilhados.py) e usado por todas as
+    sessões. Traz 1 linha a mais para saber se há próxima página.
+    """
+    offset = pagina * TAMANHO_PAGINA_BUSCA
+    limite = TAMANHO_PAGINA_BUSCA + 1
+    usa_banco = st.session_state.get('fonte_dados') in ROTAS_COM_BANCO
+    with metricas.cronometro("busca_legendas", origem="banco" if usa_banco else "indice_local"):
+        if usa_banco:
+            resultado = backend_do_app().buscar_legendas(termo, perfis, limite, offset)
+        else:
+            indice = dataset.derivado('indice_legendas', IndiceInvertido)
+            resultado = indice.buscar(termo, perfis, limite, offset)
+    return resultado.head(TAMANHO_PAGINA_BUSCA), len(resultado) > TAMANHO_PAGINA_BUSCA
+
+def pagina_da_grade(df_posts, filtros, ordenar_por, decrescente, pagina, tamanho_pagina):
+    """
+    Uma página da grade da Visão Geral (grade_posts.py) e o total do filtro. Nas
+    rotas com banco os filtros e a ordenação rodam no próprio banco; em
+    CSV/Parquet, sobre o DataFrame da análise. Só a página vai para o navegador.
+    """
+    offset = pagina * tamanho_pagina
+    fonte = st.session_state.get('fonte_dados')
+    usa_banco = fonte in ROTAS_COM_BANCO
+    # Na concorrência a análise usa só os últimos posts de cada perfil: a grade mostra os mesmos
+    janelas = janelas_da_analise(df_posts) if fonte == "Análise de Concorrência (Coleta + Banco de Dados)" else None
+    with metricas.cronometro("grade_posts", origem="banco" if usa_banco else "local"):
+        if usa_banco:
+            return backend_do_app().fetch_pagina_grade(
+                ordenar_por=ordenar_por, decrescente=decrescente, limit=tamanho_pagina, offset=offset,
+                janelas=janelas, **filtros
+            )
+        return pagina_local(df_posts, ordenar_por=ordenar_por, decrescente=decrescente,
+                            limit=tamanho_pagina, offset=offset, janelas=janelas, **filtros)
+
 
 
 
 # --- [FUNÇÃO DE ANÁLISE DE CONCORRÊNCIA - COM PROMPT ATUALIZADO] ---
-def gerar_insights_concorrencia(df_posts_comparativo):
-    """Usa a IA para gerar um relatório de comparação entre perfis, focando nas diferenças de conteúdo."""
+def gerar_insights_concorrencia(df_posts_comparativo, comparativo=None, perfil_principal=None):
+    """
+    Usa a IA para gerar um relatório de comparação entre N perfis, focando nas diferenças de conteúdo.
+    'comparativo' é a matriz de benchmarking (comparativo_perfis.py): engajamento por seguidor,
+    cadência, participação das categorias e percentis. Em vez de todos os posts, o prompt leva só
+    os mais engajados de cada perfil, então o tamanho dele não cresce com o histórico.
+    """
     try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel('gemini-2.5-flash')
+        model = modelos_gemini.obter_modelo("concorrencia", GEMINI_API_KEY)
         
         if 'categoria' not in df_posts_comparativo.columns or 'perfil' not in df_posts_comparativo.columns:
             st.error("O DataFrame de comparação precisa ter as colunas 'categoria' e 'perfil'.")
             return None
-            
-        dados_comparacao_md = df_posts_comparativo.to_markdown(index=False)
-        
-        # Geração de resumos estatísticos básicos para incluir no prompt
-        resumo_perfis = df_posts_comparativo.groupby('perfil').agg(
-            total_posts=('link', 'count'),
-            media_curtidas=('curtidas', 'mean'),
-            media_comentarios=('comentarios', 'mean')
-        ).reset_index()
-        
-        # Análise das categorias mais usadas
-        analise_categorias = df_posts_comparativo.groupby(['perfil', 'categoria']).size().reset_index(name='Contagem')
-        
-        resumo_md = resumo_perfis.to_markdown(index=False, floatfmt=".1f")
-        categorias_md = analise_categorias.to_markdown(index=False)
+
+        if comparativo is None:
+            comparativo = comparar(datasets_compartilhados.publicar(df_posts_comparativo))
+        textos = comparativo.para_prompt()
+        atributos_md = "\n".join(
+            f"**@{perfil}:**\n{resumo_features_md(df_perfil, top_hashtags=5)}"
+            for perfil, df_perfil in df_posts_comparativo.groupby('perfil')
+        )
+        principal = perfil_principal.replace('@', '') if perfil_principal else None
+        contexto_principal = (f"O perfil principal (o cliente) é **@{principal}**; os demais são concorrentes."
+                              if principal in comparativo.perfis else
+                              "Não há um perfil principal definido: compare todos entre si.")
 
         prompt = f"""
         **Você é um Estrategista de Marketing Digital especializado em Benchmarking de Mídias Sociais.**
-        Sua tarefa é analisar os dados fornecidos dos perfis do Instagram e fornecer um relatório estratégico de Análise de Concorrência. O foco deve ser na **estraté
+        Sua tarefa é analisar os dados fornecidos de {len(comparativo.perfis)} perfis do Instagram e fornecer um relatório estratégico de Análise de Concorrência. O foco deve ser na **estratégia de conteúdo**.
+        {contexto_principal}
+        A `taxa_engajamento` é a média de (curtidas + comentários) por post dividida pelos seguidores, em %: é a métrica justa entre perfis de tamanhos diferentes. As colunas `pct_*` são o percentil do perfil entre os comparados (100 = o melhor).
 
-        **1. ESTATÍSTICAS GERAIS:**
-        {resumo_md}
+        **1. MATRIZ DE BENCHMARKING (ordenada pela taxa de engajamento):**
+        {textos['matriz']}
         
-        **2. DISTRIBUIÇÃO DE CONTEÚDO POR CATEGORIA:**
-        {categorias_md}
+        **2. PARTICIPAÇÃO DE CADA CATEGORIA NO CONTEÚDO (% dos posts do perfil):**
+        {textos['participacao']}
+
+        **3. TAXA DE ENGAJAMENTO POR CATEGORIA:**
+        {textos['taxa_categoria']}
         
-        **3. DADOS DETALHADOS (Para análise de legenda):**
-        {dados_comparacao_md}
+        **4. ATRIBUTOS DAS LEGENDAS E HORÁRIOS POR PERFIL (calculados localmente):**
+        {atributos_md}
+
+        **5. POSTS MAIS ENGAJADOS DE CADA PERFIL (Para análise de legenda):**
+        {textos['exemplos']}
 
         **Por favor, elabore um relatório claro e objetivo com a seguinte estrutura:**
         ### 1. Ponto Forte da Concorrência
-        - Qual perfil (o principal ou o concorrente) demonstrou o **melhor engajamento médio** e qual é o seu **PONTO FORTE** primário (ex: alta média de comentários 
+        - Quais perfis demonstraram a **melhor taxa de engajamento** e qual é o **PONTO FORTE** primário de cada um (ex: alta média de comentários, cadência alta, foco em uma categoria).
         
         ### 2. Análise Estratégica de Conteúdo
-        - Compare a **diferença** dos conteúdos dos dois perfis com base na coluna `categoria` e nas legendas.
-        - Com base nas legendas, identifique as **maiores diferenças** no **tipo de conteúdo** que cada perfil utiliza. (Ex: um foca em 'Dicas', outro em 'Bastidores'
+        - Compare a **diferença** dos conteúdos dos perfis com base na participação das categorias e nas legendas.
+        - Com base nas legendas, identifique as **maiores diferenças** no **tipo de conteúdo** que cada perfil utiliza. (Ex: um foca em 'Dicas', outro em 'Bastidores').
         
         ### 3. Oportunidades e Plano de Ação
-        - Pensando nos resultados da concorrência, quais **possíveis acertos e erros** você consegue inferir na estratégia do concorrente?
-        - Forneça **3 recomendações práticas e acionáveis** para o perfil principal aprender com o concorrente ou se diferenciar. As dicas devem ser focadas em replic
+        - Pensando nos resultados da concorrência, quais **possíveis acertos e erros** você consegue inferir na estratégia dos concorrentes?
+        - Forneça **3 recomendações práticas e acionáveis** para o perfil principal aprender com os concorrentes ou se diferenciar, usando os percentis para mostrar onde ele está atrás.
         
         Formate sua resposta usando Markdown para uma boa apresentação.
         """
         response = model.generate_content(prompt)
-        print("REQUISIÇÃO DA CONCORRENCIA")
         return response.text
     except Exception as e:
         st.error(f"Ocorreu um erro ao chamar a API do Gemini (Concorrência): {e}")
@@ -256,7 +310,7 @@ with st.sidebar:
     st.header("⚙️ Fonte dos Dados")
     fonte_dados = st.radio(
         "Selecione como obter os dados:",
-        ("Analisar perfil (Coleta + Banco de Dados)", "Análise de Concorrência (Coleta + Banco de Dados)", "Carregar arquivo CSV"),
+        ("Analisar perfil (Coleta + Banco de Dados)", "Análise de Concorrência (Coleta + Banco de Dados)", "Carregar arquivo CSV", "Carregar histórico Parquet"),
         key="fonte_dados"
     )
     st.markdown("---")
@@ -271,10 +325,19 @@ with st.sidebar:
     elif fonte_dados == "Análise de Concorrência (Coleta + Banco de Dados)":
         st.subheader("Análise de Concorrência (Opcional)")
         perfil_principal = st.text_input("Seu Perfil Principal", "@orbia.ag")
-        perfil_concorrente = st.text_input("Perfil do Concorrente (Opcional)", "") # Campo opcional
+        perfis_concorrentes = st.text_area(
+            "Perfis dos Concorrentes (Opcional)", "",
+            help="Um ou mais perfis, separados por vírgula ou por linha. Todos entram na matriz de comparação."
+        )
+        # Sem repetições e sem o próprio perfil principal
+        concorrentes = [
+            p for p in dict.fromkeys(c.strip().replace('@', '') for c in perfis_concorrentes.replace('\n', ',').split(','))
+            if p and p != perfil_principal.replace('@', '')
+        ]
         
-        if perfil_concorrente:
-            st.info(f"Serão coletados e comparados os dados de {perfil_principal} e {perfil_concorrente}.")
+        if concorrentes:
+            st.info(f"Serão coletados e comparados os dados de {perfil_principal} e {len(concorrentes)} concorrente(s): "
+                    f"{', '.join('@' + c for c in concorrentes)}.")
             texto_botao = "Coletar e Comparar Perfis"
         else:
             st.info(f"O campo do concorrente está vazio. Será realizada uma **análise de perfil único** de @{perfil_principal}.")
@@ -287,6 +350,26 @@ with st.sidebar:
         perfil_instagram = None
     
     
+    elif fonte_dados == "Carregar histórico Parquet":
+        st.subheader("Análise via Parquet (offline)")
+        diretorio_parquet = st.text_input("Pasta do histórico", DIRETORIO_PARQUET)
+        perfis_disponiveis = listar_perfis_parquet(diretorio_parquet)
+        perfis_parquet = st.multiselect("Perfis", perfis_disponiveis, default=perfis_disponiveis[:1])
+        periodo_parquet = st.date_input("Período (opcional)", value=())
+        st.info("Lê o histórico exportado em Parquet sem acessar o banco. Com 2+ perfis, ativa a análise de concorrência.")
+        botao_analisar = st.button("Analisar Histórico Parquet", type="primary", use_container_width=True)
+
+        with st.expander("Exportar perfis do banco para Parquet"):
+            perfis_exportar = st.text_input("Perfis (separados por vírgula)", "@orbia.ag")
+            if st.button("Exportar", use_container_width=True):
+                with st.spinner("Exportando histórico do banco para Parquet..."):
+                    total_exportado = exportar_perfis_do_banco(
+                        backend_do_app(),
+                        [p.strip() for p in perfis_exportar.split(',') if p.strip()],
+                        diretorio_parquet
+                    )
+                st.success(f"{total_exportado} posts exportados para '{diretorio_parquet}'.")
+
     else: 
         st.subheader("Análise via CSV")
         arquivo_dados = st.file_uploader(
@@ -294,6 +377,10 @@ with st.sidebar:
             type=['csv']
         )
         st.info("O CSV deve ter as colunas: `data`, `tipo` (ou `categoria`), `curtidas`, `comentarios`, `legenda`.")
+        classificar_csv = st.checkbox(
+            "Classificar com IA as linhas sem categoria",
+            help="Usa o mesmo classificador do pipeline. Com esta opção, a coluna `tipo`/`categoria` passa a ser opcional."
+        )
         botao_analisar = st.button("Analisar Arquivo CSV", type="primary", use_container_width=True)
 
 # --- [ALTERADO - ETAPA 4: LÓGICA PRINCIPAL] ---
@@ -304,6 +391,14 @@ if botao_analisar:
     st.session_state.df_posts = None
     st.session_state.insights = None
     st.session_state.insights_concorrencia = None
+    st.session_state.chat = None
+    st.session_state.dataset = None
+    st.session_state.pagina_busca = 0
+    st.session_state.pagina_grade = 0
+    st.session_state.estatisticas = None
+    st.session_state.seguidores = None
+    st.session_state.comparativo = None
+    st.session_state.perfil_principal = None
     
     # --- ROTA 1: Análise via Coleta + Banco ---
     if fonte_dados == "Analisar perfil (Coleta + Banco de Dados)":
@@ -313,21 +408,22 @@ if botao_analisar:
             
         # [ALTERADO] Todo o bloco try/except antigo foi substituído por isto:
         try:
-            # 1. Conectar ao Supabase
-            with st.spinner("Conectando ao Supabase..."):
-                mongo = init_connection()
+            # 1. Conectar ao banco de dados
+            with st.spinner("Conectando ao banco de dados..."):
+                backend = backend_do_app()
             
-            # 2. Conectar ao Instagram
+            # 2. Conectar ao Instagram (conta do pool responsável pelo perfil)
             with st.spinner(f"Conectando ao Instagram..."):
-                cl_insta = login_instagram()
-                if not cl_insta:
+                cl_insta = PoolInstagram()
+                conta, _ = cl_insta.cliente_para(perfil_instagram)
+                if conta is None:
                     st.error("Falha no login do Instagram. Verifique as credenciais em 'app_config.py'")
                     st.stop()
             
             # 3. [NOVO] Chamar a função de processamento
             st.markdown("---")
             st.subheader(f"Processando Perfil: {perfil_instagram}")
-            df_pronto = processar_perfil(mongo, cl_insta, perfil_instagram, QUANTIDADE_DE_POSTS)
+            df_pronto = processar_perfil(backend, cl_insta, perfil_instagram, QUANTIDADE_DE_POSTS)
 
         except Exception as e:
             st.error(f"Ocorreu um erro durante o processo: {e}")
@@ -339,25 +435,32 @@ if botao_analisar:
             st.error("Por favor, insira o nome do Perfil Principal.")
             st.stop()
         
-        # 1. Definir os perfis a processar
-        perfis_a_analisar = [perfil_principal]
-        # Adiciona o concorrente apenas se ele foi preenchido e é diferente do principal
-        if perfil_concorrente and perfil_concorrente.replace('@', '') != perfil_principal.replace('@', ''):
-            perfis_a_analisar.append(perfil_concorrente)
+        # 1. Definir os perfis a processar (o principal e os concorrentes preenchidos)
+        perfis_a_analisar = [perfil_principal] + concorrentes
+        st.session_state.perfil_principal = perfil_principal
         
         try:
-            with st.spinner("Conectando aos serviços (Mongo e Instagram)..."):
-                mongo = init_connection()
-                cl_insta = login_instagram()
-                if not cl_insta:
+            with st.spinner("Conectando aos serviços (banco de dados e Instagram)..."):
+                backend = backend_do_app()
+                cl_insta = PoolInstagram()
+                if all(cl_insta.cliente_para(perfil)[0] is None for perfil in perfis_a_analisar):
                     st.error("Falha no login do Instagram.")
                     st.stop()
 
+            # Coleta todos os perfis de uma vez: cada conta do pool coleta os seus em paralelo
+            with st.spinner(f"Coletando {len(perfis_a_analisar)} perfis com {len(cl_insta.contas)} conta(s)..."):
+                coletas = cl_insta.coletar_varios(perfis_a_analisar, QUANTIDADE_DE_POSTS)
+            if len(perfis_a_analisar) > 1:
+                # Seguidores para normalizar o engajamento (cache local de 24h, ver comparativo_perfis.py)
+                with st.spinner("Buscando o número de seguidores dos perfis..."):
+                    st.session_state.seguidores = obter_seguidores(perfis_a_analisar, cl_insta)
+
             todos_dfs = []
             for i, perfil in enumerate(perfis_a_analisar):
                 st.markdown("---")
                 st.subheader(f"Processando Perfil {i+1}/{len(perfis_a_analisar)}: {perfil}")
-                df_perfil = processar_perfil(mongo, cl_insta, perfil, QUANTIDADE_DE_POSTS)
+                df_perfil = processar_perfil(backend, cl_insta, perfil, QUANTIDADE_DE_POSTS,
+                                             df_coletado=coletas[perfil.replace('@', '')])
                 if df_perfil is not None:
                     todos_dfs.append(df_perfil)
             
@@ -374,6 +477,16 @@ if botao_analisar:
 
 
 
+    # --- ROTA 3: Análise via histórico Parquet (sem banco) ---
+    elif fonte_dados == "Carregar histórico Parquet":
+        if not perfis_parquet:
+            st.error("Selecione ao menos um perfil do histórico Parquet.")
+            st.stop()
+
+        with st.spinner('Lendo o histórico Parquet...'):
+            data_inicio, data_fim = (periodo_parquet + (None, None))[:2] if periodo_parquet else (None, None)
+            df_pronto = carregar_historico_parquet(diretorio_parquet, perfis_parquet, data_inicio, data_fim)
+
     # --- ROTA 2: Análise via CSV ---
     else: 
         if not arquivo_dados:
@@ -381,11 +494,11 @@ if botao_analisar:
             st.stop()
         
         with st.spinner('Lendo os dados e preparando a análise...'):
-            df_pronto = pd.read_csv(arquivo_dados)
-            if 'tipo' in df_pronto.columns:
-                df_pronto = df_pronto.rename(columns={'tipo': 'categoria'})
-            elif 'categoria' not in df_pronto.columns:
-                st.error("O CSV deve ter uma coluna 'tipo' ou 'categoria'.")
+            # Valida o cabeçalho antes de ler o arquivo inteiro e lê com tipos explícitos
+            try:
+                df_pronto = carregar_csv_tipado(arquivo_dados, classificar_csv, GEMINI_API_KEY)
+            except ValueError as e:
+                st.error(str(e))
                 st.stop()
             
             # [NOVO] Adiciona coluna de perfil para consistência com a Rota 1
@@ -394,28 +507,53 @@ if botao_analisar:
     # --- [ETAPA 5: GERAR INSIGHTS E MOSTRAR RESULTADOS] ---
     # (Sem alterações)
     if df_pronto is not None and not df_pronto.empty:
+        # Dataset compartilhado entre as sessões (datasets_compartilhados.py): normalizado
+        # uma vez (categoria, atributos da legenda) e somente leitura daqui em diante
+        dataset = datasets_compartilhados.publicar(df_pronto)
+        df_pronto = dataset.visao()
+
+        # Resumo por perfil/categoria/mês: pronto no banco (profile_stats) nas rotas
+        # com banco; em CSV/Parquet é calculado dos posts uma vez por análise
+        estatisticas = None
+        if fonte_dados in ROTAS_COM_BANCO:
+            try:
+                estatisticas = backend.fetch_estatisticas([str(p) for p in df_pronto['perfil'].unique()])
+            except Exception as e:
+                st.warning(f"Resumo pronto indisponível, calculando dos posts: {e}")
+        if estatisticas is None or estatisticas.vazio:
+            estatisticas = dataset.derivado('estatisticas', EstatisticasPerfis.de_posts)
+        st.session_state.estatisticas = estatisticas
         
         # 1. Determina o modo de análise (Perfil Único ou Concorrência)
         num_perfis = len(df_pronto['perfil'].unique())
         
         if num_perfis > 1:
-            # Modo Concorrência: Ativa o prompt de comparação
-            with st.spinner('A IA está gerando o relatório de **COMPARAÇÃO**... 🧠'):
-                insights_concorrencia = gerar_insights_concorrencia(df_pronto.copy())
+            # Modo Concorrência: matriz de benchmarking (uma vez por versão dos dados) + prompt de comparação.
+            # Nas rotas sem coleta os seguidores vêm só do cache local.
+            if st.session_state.get('seguidores') is None:
+                st.session_state.seguidores = obter_seguidores(df_pronto['perfil'].unique())
+            comparativo = comparar(dataset, st.session_state.seguidores)
+            st.session_state.comparativo = comparativo
+            with st.spinner('A IA está gerando o relatório de **COMPARAÇÃO**... 🧠'), perfilador.etapa("insights"):
+                insights_concorrencia = gerar_insights_concorrencia(
+                    df_pronto, comparativo, st.session_state.get('perfil_principal')
+                )
             
             if insights_concorrencia:
                 st.session_state.df_posts = df_pronto
+                st.session_state.dataset = dataset
                 st.session_state.insights_concorrencia = insights_concorrencia
                 st.success("Análise de concorrência concluída!")
             else:
                 st.error("Não foi possível gerar os insights de concorrência.")
         else: 
             # Modo Perfil Único (Rota 1, Rota 2 sem concorrente, ou CSV)
-            with st.spinner('A IA está gerando o relatório completo... Isso pode levar um momento. 🧠'):
-                insights = gerar_insights_com_gemini(df_pronto.copy())
+            with st.spinner('A IA está gerando o relatório completo... Isso pode levar um momento. 🧠'), perfilador.etapa("insights"):
+                insights = gerar_insights_com_gemini(df_pronto, estatisticas)
 
             if insights:
                 st.session_state.df_posts = df_pronto
+                st.session_state.dataset = dataset
                 st.session_state.insights = insights
                 st.success("Análise de perfil único concluída!")
             else:
@@ -428,14 +566,21 @@ if botao_analisar:
 
 if st.session_state.df_posts is not None:
     
-    # 1. Ajuste e detecção do modo de análise
-    if 'categoria' not in st.session_state.df_posts.columns and 'tipo' in st.session_state.df_posts.columns:
-        st.session_state.df_posts = st.session_state.df_posts.rename(columns={'tipo': 'categoria'})
-    
+    # 1. Detecção do modo de análise ('categoria' já vem do dataset compartilhado)
+    dataset = st.session_state.get('dataset')
+    if dataset is None:
+        dataset = st.session_state.dataset = datasets_compartilhados.publicar(st.session_state.df_posts)
+        st.session_state.df_posts = dataset.visao()
+
     # Verifica se há mais de um perfil no DataFrame para ativar o modo Concorrência
     perfis_analisados = st.session_state.df_posts['perfil'].unique()
     modo_concorrencia = len(perfis_analisados) > 1
 
+    # Médias por categoria/perfil lidas do resumo pronto (guardado na análise)
+    if st.session_state.get('estatisticas') is None:
+        st.session_state.estatisticas = dataset.derivado('estatisticas', EstatisticasPerfis.de_posts)
+    estatisticas = st.session_state.estatisticas
+
     # 2. Definição das Abas
     if modo_concorrencia:
         # Modo Concorrência: Foco na comparação
@@ -460,7 +605,133 @@ if st.session_state.df_posts is not None:
             nome_perfil = perfis_analisados[0]
             st.subheader(f"Dados dos Posts Analisados: @{nome_perfil}")
         
-        st.dataframe(st.session_state.df_posts, use_container_width=True)
+        # Grade paginada: filtros e ordenação vão para o banco, só a página é desenhada
+        voltar_ao_inicio = lambda: st.session_state.update(pagina_grade=0)
+        col_perfis, col_categorias, col_periodo = st.columns([2, 2, 2])
+        with col_perfis:
+            perfis_grade = st.multiselect(
+                "Perfis", [str(p) for p in perfis_analisados], key="perfis_grade",
+                placeholder="Todos", disabled=not modo_concorrencia, on_change=voltar_ao_inicio
+            )
+        with col_categorias:
+            categorias_grade = st.multiselect(
+                "Categorias", list(estatisticas.por_categoria(incluir_sem_categoria=True).index),
+                key="categorias_grade", placeholder="Todas", on_change=voltar_ao_inicio
+            )
+        with col_periodo:
+            periodo_grade = st.date_input("Período", value=(), key="periodo_grade", on_change=voltar_ao_inicio)
+        col_ordem, col_sentido, col_tamanho = st.columns([2, 2, 2])
+        with col_ordem:
+            ordenar_por = st.selectbox(
+                "Ordenar por", list(ORDENACOES_GRADE), key="ordenar_grade",
+                format_func=lambda c: {'data': 'Data', 'curtidas': 'Curtidas', 'comentarios': 'Comentários'}.get(c, c),
+                on_change=voltar_ao_inicio
+            )
+        with col_sentido:
+            decrescente = st.radio(
+                "Ordem", ("Maior primeiro", "Menor primeiro"), key="sentido_grade", horizontal=True,
+                on_change=voltar_ao_inicio
+            ) == "Maior primeiro"
+        with col_tamanho:
+            tamanho_pagina = st.selectbox(
+                "Posts por página", TAMANHOS_PAGINA_GRADE, key="tamanho_grade",
+                index=TAMANHOS_PAGINA_GRADE.index(TAMANHO_PAGINA_GRADE) if TAMANHO_PAGINA_GRADE in TAMANHOS_PAGINA_GRADE else 0,
+                on_change=voltar_ao_inicio
+            )
+
+        filtros_grade = {
+            # Nas rotas com banco, "todos" são os perfis da análise (não o banco inteiro)
+            'perfis': perfis_grade or [str(p) for p in perfis_analisados],
+            'categorias': categorias_grade or None,
+            'data_inicio': periodo_grade[0] if len(periodo_grade) > 0 else None,
+            'data_fim': periodo_grade[1] if len(periodo_grade) > 1 else None,
+        }
+        pagina_grade = st.session_state.get('pagina_grade', 0)
+        try:
+            df_grade, total_grade = pagina_da_grade(
+                st.session_state.df_posts, filtros_grade, ordenar_por, decrescente, pagina_grade, tamanho_pagina
+            )
+        except Exception as e:
+            st.error(f"Erro ao carregar os posts: {e}")
+            df_grade, total_grade = None, 0
+
+        if df_grade is not None:
+            paginas_grade = total_de_paginas(total_grade, tamanho_pagina)
+            if df_grade.empty:
+                st.info("Nenhum post com esses filtros.")
+            else:
+                st.caption(f"{total_grade} posts · página {pagina_grade + 1} de {paginas_grade}")
+                st.dataframe(
+                    truncar_legendas(df_grade), use_container_width=True, hide_index=True,
+                    column_config={'link': st.column_config.LinkColumn("link")}
+                )
+                # Legenda inteira só do post escolhido (a grade leva o texto cortado)
+                posicao = st.selectbox(
+                    "Ver legenda completa", range(len(df_grade)), index=None, key="legenda_grade",
+                    placeholder="Escolha um post da página",
+                    format_func=lambda i: f"@{df_grade.at[i, 'perfil']} · {df_grade.at[i, 'data']} · "
+                                          f"{str(df_grade.at[i, 'legenda'] or '')[:50]}"
+                )
+                if posicao is not None:
+                    st.text(df_grade.at[posicao, 'legenda'] or "")
+
+            col_anterior, col_proxima = st.columns(2)
+            with col_anterior:
+                if st.button("⬅️ Anterior", key="grade_anterior", disabled=pagina_grade == 0, use_container_width=True):
+                    st.session_state.pagina_grade = pagina_grade - 1
+                    st.rerun()
+            with col_proxima:
+                if st.button("Próxima ➡️", key="grade_proxima", disabled=pagina_grade + 1 >= paginas_grade,
+                             use_container_width=True):
+                    st.session_state.pagina_grade = pagina_grade + 1
+                    st.rerun()
+
+        st.markdown("---")
+        st.subheader("🔎 Buscar nas legendas")
+        col_termo, col_todos = st.columns([3, 1])
+        with col_termo:
+            termo_busca = st.text_input(
+                "Palavras ou hashtags", "", key="termo_busca",
+                placeholder="ex: #agro colheita",
+                on_change=lambda: st.session_state.update(pagina_busca=0)
+            )
+        with col_todos:
+            st.write("")
+            st.write("")
+            todos_os_perfis = st.checkbox(
+                "Todos os perfis do banco",
+                help="Nas análises com banco, busca também nos perfis que não estão na tela."
+            )
+
+        if termo_busca.strip():
+            pagina_busca = st.session_state.get('pagina_busca', 0)
+            perfis_busca = None if todos_os_perfis else [str(p) for p in perfis_analisados]
+            try:
+                df_busca, tem_mais = buscar_nas_legendas(
+                    dataset, termo_busca, perfis_busca, pagina_busca
+                )
+            except Exception as e:
+                st.error(f"Erro na busca: {e}")
+                df_busca, tem_mais = None, False
+
+            if df_busca is not None:
+                if df_busca.empty:
+                    st.info("Nenhum post encontrado com esses termos.")
+                else:
+                    colunas_busca = [c for c in ['perfil', 'data', 'categoria', 'tipo', 'curtidas', 'comentarios',
+                                                 'engajamento', 'legenda', 'link'] if c in df_busca.columns]
+                    st.caption(f"Página {pagina_busca + 1} · ordenado por engajamento (curtidas + comentários)")
+                    st.dataframe(df_busca[colunas_busca], use_container_width=True, hide_index=True)
+
+                col_anterior, col_proxima = st.columns(2)
+                with col_anterior:
+                    if st.button("⬅️ Anterior", disabled=pagina_busca == 0, use_container_width=True):
+                        st.session_state.pagina_busca = pagina_busca - 1
+                        st.rerun()
+                with col_proxima:
+                    if st.button("Próxima ➡️", disabled=not tem_mais, use_container_width=True):
+                        st.session_state.pagina_busca = pagina_busca + 1
+                        st.rerun()
         
     # 3. Conteúdo da Nova Aba de Concorrência
     if modo_concorrencia:
@@ -470,32 +741,63 @@ if st.session_state.df_posts is not None:
             else:
                 st.info("Aguardando a análise da IA de concorrência. Clique no botão na barra lateral para iniciar.")
         
-        # [OPCIONAL] Mostrar análise por categoria agrupada, mesmo no modo concorrência
+        # Matriz de benchmarking dos N perfis (comparativo_perfis.py): calculada uma vez por
+        # versão dos dados; aqui só é desenhada
+        comparativo = st.session_state.get('comparativo')
+        if comparativo is None:
+            comparativo = st.session_state.comparativo = comparar(dataset, st.session_state.get('seguidores'))
+        tem_seguidores = comparativo.seguidores.notna().any()
+        metrica_ranking = 'taxa_engajamento' if tem_seguidores else 'engajamento_medio'
+
+        st.subheader("Matriz de Comparação dos Perfis")
+        if not tem_seguidores:
+            st.warning("Seguidores indisponíveis: o ranking usa o engajamento médio bruto, sem normalizar pelo tamanho do perfil.")
+        ranking = comparativo.ranking(metrica_ranking)
+        st.dataframe(
+            ranking, use_container_width=True, hide_index=True,
+            column_config={
+                'taxa_engajamento': st.column_config.NumberColumn("Taxa de engajamento (%)", format="%.2f"),
+                'posts_por_semana': st.column_config.NumberColumn("Posts/semana", format="%.1f"),
+                'intervalo_mediano_dias': st.column_config.NumberColumn("Intervalo mediano (dias)", format="%.1f"),
+                **{f'pct_{m}': st.column_config.ProgressColumn(f"Percentil · {m}", min_value=0, max_value=100, format="%.0f")
+                   for m in ('seguidores', 'engajamento_medio', 'taxa_engajamento', 'posts_por_semana')},
+            }
+        )
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown("##### Taxa de Engajamento (%)" if tem_seguidores else "##### Engajamento Médio por Post")
+            st.bar_chart(ranking.set_index('perfil')[metrica_ranking])
+        with col2:
+            st.markdown("##### Posts por Semana")
+            st.bar_chart(ranking.set_index('perfil')['posts_por_semana'])
+
+        st.subheader("Participação de Cada Categoria (% dos posts)")
+        st.dataframe(comparativo.participacao.round(1), use_container_width=True)
+        st.markdown("##### Taxa de Engajamento por Categoria (%)" if tem_seguidores
+                    else "##### Engajamento Médio por Categoria")
+        st.dataframe((comparativo.taxa_por_categoria() if tem_seguidores else comparativo.engajamento_categoria).round(2),
+                     use_container_width=True)
+
+        # Médias por categoria de um perfil por vez (resumo pronto, sem agrupar os posts):
+        # com muitos concorrentes, desenhar os gráficos de todos deixaria a página lenta
         st.subheader("Desempenho Médio por Perfil e Categoria")
-        if 'categoria' in st.session_state.df_posts.columns:
-            df_analise = st.session_state.df_posts.copy()
-            df_analise['curtidas'] = pd.to_numeric(df_analise['curtidas'], errors='coerce').fillna(0)
-            df_analise['comentarios'] = pd.to_numeric(df_analise['comentarios'], errors='coerce').fillna(0)
-            
-            # Agrupa por PERFIL e depois por CATEGORIA
-            analise_combinada = df_analise.groupby(['perfil', 'categoria'])[['curtidas', 'comentarios']].mean().reset_index()
+        perfil_detalhe = st.selectbox("Perfil", sorted(perfis_analisados), format_func=lambda p: f"@{p}",
+                                      key="perfil_detalhe_concorrencia")
+        analise_combinada = estatisticas.por_perfil_categoria()[['perfil', 'categoria', 'curtidas', 'comentarios']]
+        df_perfil = analise_combinada[analise_combinada['perfil'] == perfil_detalhe]
+        if not df_perfil.empty:
+            df_perfil = df_perfil.set_index('categoria').drop(columns=['perfil']).sort_values(by='curtidas', ascending=False)
             
-            for perfil in sorted(perfis_analisados):
-                st.markdown(f"#### @{perfil}")
-                df_perfil = analise_combinada[analise_combinada['perfil'] == perfil]
-                if not df_perfil.empty:
-                    df_perfil = df_perfil.set_index('categoria').drop(columns=['perfil']).sort_values(by='curtidas', ascending=False)
-                    
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.markdown("##### Média de Curtidas")
-                        st.bar_chart(df_perfil['curtidas'])
-                    with col2:
-                        st.markdown("##### Média de Comentários")
-                        st.bar_chart(df_perfil['comentarios'])
-                    st.dataframe(df_perfil, use_container_width=True)
-                else:
-                    st.warning(f"Nenhum dado classificado para @{perfil} para mostrar a análise detalhada.")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.markdown("##### Média de Curtidas")
+                st.bar_chart(df_perfil['curtidas'])
+            with col2:
+                st.markdown("##### Média de Comentários")
+                st.bar_chart(df_perfil['comentarios'])
+            st.dataframe(df_perfil, use_container_width=True)
+        else:
+            st.warning(f"Nenhum dado classificado para @{perfil_detalhe} para mostrar a análise detalhada.")
 
 
     # 4. Conteúdo das Abas Antigas (Apenas se não for modo concorrência)
@@ -505,10 +807,7 @@ if st.session_state.df_posts is not None:
             st.subheader(f"Desempenho Médio por Categoria: @{nome_perfil}")
             
             if 'categoria' in st.session_state.df_posts.columns:
-                df_analise = st.session_state.df_posts.copy()
-                df_analise['curtidas'] = pd.to_numeric(df_analise['curtidas'], errors='coerce').fillna(0)
-                df_analise['comentarios'] = pd.to_numeric(df_analise['comentarios'], errors='coerce').fillna(0)
-                analise_categoria = df_analise.groupby('categoria')[['curtidas', 'comentarios']].mean().sort_values(by='curtidas', ascending=False)
+                analise_categoria = estatisticas.por_categoria(str(nome_perfil))[['curtidas', 'comentarios']]
                 analise_categoria['curtidas'] = analise_categoria['curtidas'].astype(int)
                 analise_categoria['comentarios'] = analise_categoria['comentarios'].astype(int)
                 col1, col2 = st.columns(2)
@@ -519,21 +818,112 @@ if st.session_state.df_posts is not None:
                     st.markdown("#### Média de Comentários")
                     st.bar_chart(analise_categoria['comentarios'])
                 st.dataframe(analise_categoria, use_container_width=True)
+
+                st.markdown("#### Posts de Maior Destaque")
+                colunas_top = ['data', 'categoria', 'curtidas', 'comentarios', 'legenda', 'link']
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.caption("Mais curtidos")
+                    st.dataframe(estatisticas.top_posts('curtidas', 5, str(nome_perfil)).reindex(columns=colunas_top),
+                                 use_container_width=True, hide_index=True)
+                with col2:
+                    st.caption("Mais comentados")
+                    st.dataframe(estatisticas.top_posts('comentarios', 5, str(nome_perfil)).reindex(columns=colunas_top),
+                                 use_container_width=True, hide_index=True)
             else:
                 st.error("Coluna 'categoria' não encontrada para análise.")
+
+            # Atributos locais da legenda e do horário (features_legenda.py)
+            st.subheader("Legendas e Horários")
+            df_atributos = st.session_state.df_posts
+            medias_atributos = dataset.derivado('medias_atributos', engajamento_por_feature)
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Hashtags por post", f"{df_atributos['n_hashtags'].mean():.1f}")
+            col2.metric("Posts com chamada para ação", f"{df_atributos['tem_cta'].mean():.0%}")
+            col3.metric("Posts com pergunta", f"{df_atributos['tem_pergunta'].mean():.0%}")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.markdown("#### Média de Curtidas por Dia da Semana")
+                st.bar_chart(medias_atributos['dia_semana']['media_curtidas'].reindex(DIAS_DA_SEMANA).dropna(), sort=False)
+            with col2:
+                st.markdown("#### Média de Curtidas por Hora")
+                st.bar_chart(medias_atributos['hora']['media_curtidas'])
+            col1, col2 = st.columns(2)
+            with col1:
+                st.markdown("#### Com x Sem Chamada para Ação")
+                st.dataframe(medias_atributos['cta'], use_container_width=True)
+            with col2:
+                st.markdown("#### Hashtags Mais Usadas")
+                st.dataframe(medias_atributos['hashtags'].head(15), use_container_width=True)
         
         with tab_insights_ia:
             st.markdown(st.session_state.insights)
 
         with tab_chatbot:
             st.subheader("💬 Converse com o Chatbot Especialista")
+            # Reexibe a conversa desta análise
+            if st.session_state.get('chat') is not None:
+                for mensagem in st.session_state.chat.mensagens:
+                    with st.chat_message("user" if mensagem['papel'] == 'user' else "assistant"):
+                        st.markdown(mensagem['texto'])
             pergunta_usuario = st.chat_input("Faça uma pergunta sobre seus dados do Instagram...")
             if pergunta_usuario:
                 with st.chat_message("user"):
                     st.markdown(pergunta_usuario)
-                with st.spinner("Analisando seus dados..."):
+                with st.spinner("Analisando seus dados..."), perfilador.etapa("chatbot"):
                     resposta = chatbot_analise_instagram(st.session_state.df_posts, pergunta_usuario)
                 with st.chat_message("assistant"):
                     st.markdown(resposta)
 else:
     st.info("👈 Configure a fonte dos dados na barra lateral e clique em 'Analisar'.")
+
+# --- [ETAPA 7: PAINEL DE MÉTRICAS DA EXECUÇÃO] ---
+# Tempo por etapa, requisições ao Instagram, round trips ao banco e uso do Gemini
+if st.session_state.get('execucoes'):
+    with st.expander("⏱️ Métricas das execuções"):
+        run_id_escolhido = st.selectbox(
+            "Execução (run id)",
+            list(reversed(st.session_state.execucoes)),
+            format_func=lambda rid: f"{rid} — @{metricas.resumo_execucao(rid)[0].get('perfil', '?')}"
+        )
+        info_execucao, linhas_execucao = metricas.resumo_execucao(run_id_escolhido)
+        if info_execucao:
+            st.caption(f"Início: {info_execucao.get('inicio')} · Duração total: {info_execucao.get('duracao_s', '—')} s")
+            st.dataframe(pd.DataFrame(linhas_execucao), use_container_width=True)
+        else:
+            st.info("Esta execução já saiu do histórico de métricas do servidor.")
+        latencias_gemini = modelos_gemini.estatisticas_latencia()
+        if latencias_gemini:
+            st.markdown("**Latência do Gemini por modelo (chamadas recentes)**")
+            st.dataframe(pd.DataFrame(latencias_gemini), use_container_width=True, hide_index=True)
+        st.markdown("**Datasets em memória (compartilhados entre as sessões)**")
+        st.dataframe(datasets_compartilhados.resumo(), use_container_width=True, hide_index=True)
+        col_json, col_prom = st.columns(2)
+        with col_json:
+            st.download_button("Baixar JSON da execução", metricas.exportar_json(run_id_escolhido),
+                               file_name=f"metricas_{run_id_escolhido}.json", mime="application/json")
+        with col_prom:
+            st.download_button("Baixar métricas (Prometheus)", metricas.exportar_prometheus(),
+                               file_name="metricas.prom", mime="text/plain")
+
+# --- [ETAPA 8: PERFILAMENTO] ---
+# Pilhas amostradas (speedscope) e picos de memória por etapa do rerun perfilado
+_sessao_perfil = st.session_state.pop('sessao_perfil', None)
+if _sessao_perfil is not None:
+    _sessao_perfil.finalizar()
+    st.session_state.ultimo_perfil = _sessao_perfil
+if PERFILAR and st.session_state.get('ultimo_perfil') is not None:
+    ultimo_perfil = st.session_state.ultimo_perfil
+    with st.expander("🔥 Perfilamento do último rerun"):
+        resumo_memoria = ultimo_perfil.resumo_memoria()
+        st.caption(f"Run id {resumo_memoria['run_id']} · {resumo_memoria['duracao_s']} s · "
+                   f"pico de memória {resumo_memoria['pico_total_mb']} MB · arquivo: {ultimo_perfil.caminhos['speedscope']}")
+        if resumo_memoria['etapas']:
+            st.dataframe(pd.DataFrame(resumo_memoria['etapas']), use_container_width=True, hide_index=True)
+        with open(ultimo_perfil.caminhos['speedscope'], 'rb') as arquivo_perfil:
+            st.download_button("Baixar perfil (speedscope)", arquivo_perfil.read(),
+                               file_name=os.path.basename(ultimo_perfil.caminhos['speedscope']),
+                               mime="application/json")
+        st.caption("Abra o arquivo em https://www.speedscope.app")
+
+metricas.registrar_tempo("menu_rerun", time.perf_counter() - _inicio_rerun)
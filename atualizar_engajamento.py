@@ -0,0 +1,223 @@
+# atualizar_engajamento.py
+# Atualização de curtidas/comentários de posts que já estão no banco, sem
+# recoletar o feed inteiro.
+#
+# 1. Prioridade: o engajamento de um post chega quase todo nos primeiros
+#    dias. Supondo que a parcela já recebida com t horas de vida seja
+#    1 - 2^(-t / MEIA_VIDA_ENGAJAMENTO_H), o que falta chegar desde a última
+#    conferência (refreshed_at) é 2^(-t_conferido / H) - 2^(-t_agora / H).
+#    Os posts com maior valor vão primeiro; abaixo de PRIORIDADE_MINIMA
+#    não vale a requisição.
+# 2. Busca: media_info de cada post, em paralelo (no máximo
+#    CONCORRENCIA_ATUALIZACAO ao mesmo tempo), pelo governador da conta (ou
+#    pela conta dona do perfil, com o PoolInstagram).
+# 3. Gravação: só os posts com número diferente passam pelo upsert em lote
+#    (que já grava snapshots e o resumo do perfil). Os que não mudaram só
+#    ganham o refreshed_at, num update único.
+#
+# Uso:
+#     python atualizar_engajamento.py perfil1 perfil2 [--limite 200]
+
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+import metricas
+from governador_instagram import ColetaPausada
+from snapshots_utils import valores_diferentes
+
+try:
+    from config import MEIA_VIDA_ENGAJAMENTO_H
+except ImportError:
+    MEIA_VIDA_ENGAJAMENTO_H = 72
+
+# Parcela mínima de engajamento ainda "a chegar" para conferir o post
+PRIORIDADE_MINIMA = 0.02
+
+# Posts conferidos por rodada e requisições simultâneas
+LIMITE_ATUALIZACAO = 200
+CONCORRENCIA_ATUALIZACAO = 4
+
+COLUNAS_SELECAO = ['id', 'data', 'curtidas', 'comentarios', 'atualizado_em']
+
+# DDL para rodar uma vez no SQL Editor do Supabase (o SQLite cria a coluna
+# sozinho e o MongoDB não tem schema)
+SQL_ATUALIZACAO_ENGAJAMENTO = """
+alter table posts add column if not exists refreshed_at timestamptz;
+"""
+
+
+def _agora():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+def calcular_prioridades(df: pd.DataFrame, agora=None, meia_vida_h: float = MEIA_VIDA_ENGAJAMENTO_H):
+    """
+    Parcela do engajamento que ainda deve ter chegado desde a última conferência.
+
+    Args:
+        df (pd.DataFrame): Posts no formato do app ('data' e 'atualizado_em').
+        agora (pd.Timestamp, opcional): Momento de referência (UTC).
+    Returns:
+        pd.Series: Prioridade entre 0 e 1, com o mesmo índice do df.
+    """
+    agora = pd.Timestamp(agora or datetime.now(timezone.utc))
+    publicado = pd.to_datetime(df['data'], errors='coerce', utc=True, format='ISO8601')
+    conferido = pd.to_datetime(df.get('atualizado_em'), errors='coerce', utc=True, format='ISO8601') \
+        if 'atualizado_em' in df.columns else pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns, UTC]')
+
+    horas_agora = ((agora - publicado).dt.total_seconds() / 3600).clip(lower=0)
+    # Nunca conferido: as métricas guardadas podem ser de logo depois da publicação
+    horas_conferido = ((conferido - publicado).dt.total_seconds() / 3600).clip(lower=0).fillna(0)
+    horas_conferido = np.minimum(horas_conferido, horas_agora)
+    prioridade = np.exp2(-horas_conferido / meia_vida_h) - np.exp2(-horas_agora / meia_vida_h)
+    return prioridade.fillna(0)
+
+
+def selecionar_para_atualizar(backend, perfis: list, limite: int = LIMITE_ATUALIZACAO, agora=None):
+    """
+    Posts dos perfis com mais engajamento provavelmente pendente.
+    Lê só as colunas usadas na prioridade (ver COLUNAS_SELECAO).
+    Returns:
+        pd.DataFrame: 'id', 'perfil', 'curtidas', 'comentarios', 'prioridade', do mais urgente ao menos.
+    """
+    partes = []
+    for perfil in perfis:
+        perfil = perfil.replace('@', '')
+        df = backend.fetch_posts(perfil, colunas=COLUNAS_SELECAO)
+        if not df.empty:
+            partes.append(df.assign(perfil=perfil))
+    if not partes:
+        return pd.DataFrame(columns=['id', 'perfil', 'curtidas', 'comentarios', 'prioridade'])
+
+    df = pd.concat(partes, ignore_index=True)
+    df['prioridade'] = calcular_prioridades(df, agora)
+    df = df[df['prioridade'] >= PRIORIDADE_MINIMA]
+    return df.nlargest(limite, 'prioridade')[['id', 'perfil', 'curtidas', 'comentarios', 'prioridade']]
+
+
+def _cliente_do_perfil(insta_client, perfil: str):
+    # Com o pool de contas, cada post vai pela conta dona do perfil
+    if hasattr(insta_client, 'cliente_para'):
+        return insta_client.cliente_para(perfil)[1]
+    return insta_client
+
+
+def buscar_metricas_instagram(insta_client, df_alvos: pd.DataFrame, concorrencia: int = CONCORRENCIA_ATUALIZACAO):
+    """
+    Lê curtidas/comentários atuais de cada post (media_info) com no máximo
+    'concorrencia' requisições ao mesmo tempo. Para tudo se a conta for
+    suspensa ou o orçamento acabar; o que faltou fica para a próxima rodada.
+    Returns:
+        tuple: (pd.DataFrame com 'id', 'perfil', 'curtidas', 'comentarios', lista de ids não encontrados, pausada)
+    """
+    parar = threading.Event()
+    nao_encontrados = []
+
+    def buscar(alvo):
+        post_pk, perfil = alvo
+        if parar.is_set():
+            return None
+        cl = _cliente_do_perfil(insta_client, perfil)
+        if cl is None:
+            return None
+        try:
+            media = cl.media_info(post_pk)
+        except ColetaPausada as e:
+            if not parar.is_set():
+                print(f"⏸️ Atualização pausada: {e}")
+            parar.set()
+            return None
+        except Exception as e:
+            if type(e).__name__ == 'MediaNotFound':
+                # Post apagado: sai da fila (marcado como conferido)
+                nao_encontrados.append(post_pk)
+            else:
+                metricas.incrementar("atualizacao_engajamento_erros", erro=type(e).__name__)
+            return None
+        return {'id': post_pk, 'perfil': perfil, 'curtidas': media.like_count, 'comentarios': media.comment_count}
+
+    alvos = list(df_alvos[['id', 'perfil']].itertuples(index=False, name=None))
+    with metricas.cronometro("atualizacao_engajamento_busca"), \
+            ThreadPoolExecutor(max_workers=max(1, concorrencia)) as executor:
+        # As requisições das threads contam no run_id de quem chamou
+        resultados = [r for r in executor.map(metricas.no_contexto_atual(buscar), alvos) if r is not None]
+    metricas.incrementar("atualizacao_engajamento_consultados", len(resultados))
+    return (
+        pd.DataFrame(resultados, columns=['id', 'perfil', 'curtidas', 'comentarios']),
+        nao_encontrados,
+        parar.is_set(),
+    )
+
+
+def atualizar_engajamento(backend, insta_client, perfis: list, limite: int = LIMITE_ATUALIZACAO,
+                          concorrencia: int = CONCORRENCIA_ATUALIZACAO):
+    """
+    Uma rodada de atualização: seleciona, busca no Instagram e grava só o que mudou.
+
+    Args:
+        backend: Qualquer StorageBackend (ver storage_backend.py).
+        insta_client: Client do instagrapi logado ou PoolInstagram (contas_instagram.py).
+        perfis (list[str]): Perfis cujos posts entram na fila.
+        limite (int): Máximo de posts conferidos nesta rodada.
+        concorrencia (int): Requisições simultâneas ao Instagram.
+    Returns:
+        dict: selecionados, consultados, alterados, sem_mudanca, nao_encontrados, pausada.
+    """
+    df_alvos = selecionar_para_atualizar(backend, perfis, limite)
+    resumo = {'selecionados': len(df_alvos), 'consultados': 0, 'alterados': 0,
+              'sem_mudanca': 0, 'nao_encontrados': 0, 'pausada': False}
+    if df_alvos.empty:
+        print("✅ Nenhum post precisa de atualização agora.")
+        return resumo
+
+    print(f"🔄 Conferindo as métricas de {len(df_alvos)} posts...")
+    df_atuais, nao_encontrados, pausada = buscar_metricas_instagram(insta_client, df_alvos, concorrencia)
+    agora = _agora()
+
+    comparacao = df_atuais.merge(
+        df_alvos[['id', 'curtidas', 'comentarios']], on='id', how='left', suffixes=('', '_banco')
+    )
+    mudou = valores_diferentes(comparacao['curtidas'], comparacao['curtidas_banco']) \
+        | valores_diferentes(comparacao['comentarios'], comparacao['comentarios_banco'])
+    df_alterados = comparacao.loc[mudou, ['id', 'perfil', 'curtidas', 'comentarios']].assign(atualizado_em=agora)
+    sem_mudanca = comparacao.loc[~mudou, 'id'].tolist()
+
+    # Só os números novos passam pelo upsert (um lote por perfil)
+    for perfil, df_perfil in df_alterados.groupby('perfil', sort=False):
+        backend.upsert_posts(df_perfil.drop(columns=['perfil']), perfil)
+    backend.marcar_atualizados(sem_mudanca + nao_encontrados, agora)
+
+    resumo.update(consultados=len(df_atuais), alterados=len(df_alterados), sem_mudanca=len(sem_mudanca),
+                  nao_encontrados=len(nao_encontrados), pausada=pausada)
+    metricas.incrementar("atualizacao_engajamento_alterados", len(df_alterados))
+    print(f"✅ {len(df_alterados)} posts com métricas novas, {len(sem_mudanca)} sem mudança.")
+    return resumo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Atualiza curtidas/comentários dos posts já salvos.")
+    parser.add_argument('perfis', nargs='+')
+    parser.add_argument('--limite', type=int, default=LIMITE_ATUALIZACAO)
+    parser.add_argument('--concorrencia', type=int, default=CONCORRENCIA_ATUALIZACAO)
+    parser.add_argument('--backend', default="supabase")
+    args = parser.parse_args()
+
+    from contas_instagram import PoolInstagram
+    from storage_backend import obter_backend
+
+    backend = obter_backend(args.backend)
+    if backend.client is None:
+        print("❌ Sem conexão com o banco; nada para atualizar.")
+        return
+    with metricas.execucao(script="atualizar_engajamento") as run_id:
+        atualizar_engajamento(backend, PoolInstagram(), args.perfis, args.limite, args.concorrencia)
+    print(metricas.exportar_json(run_id))
+
+
+if __name__ == "__main__":
+    main()
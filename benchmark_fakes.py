@@ -0,0 +1,149 @@
+# benchmark_fakes.py
+# Dublês determinísticos do Instagram e do Gemini para rodar o pipeline
+# sem rede (benchmark_pipeline.py).
+#
+# Os dois têm a mesma interface que o pipeline usa dos originais:
+#   ClienteInstagramFalso  -> instagrapi.Client (user_id_from_username, user_info_by_username,
+#                             user_medias, user_medias_paginated_v1, media_info,
+#                             media_comments_chunk)
+#   ModeloGeminiFalso      -> genai.GenerativeModel (generate_content)
+# A mesma semente gera sempre os mesmos posts, categorias e erros.
+
+import random
+import time
+import zlib
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+CATEGORIAS_FALSAS = ['Institucional', 'Conteúdo técnico', 'Engajamento', 'Data comemorativa']
+
+_PALAVRAS = (
+    "agro semente safra dica campo produtor tecnologia evento feira clique link "
+    "bio comenta marca parceiro colheita solo clima manejo novidade lançamento"
+).split()
+
+
+class ClienteInstagramFalso:
+    """
+    Simula o Client do instagrapi já logado.
+
+    Args:
+        latencia_s (float): Espera por requisição HTTP simulada.
+        tamanho_pagina (int): Posts por página do feed (o instagrapi usa ~33).
+        semente (int): Semente dos dados gerados.
+    """
+
+    def __init__(self, latencia_s: float = 0.0, tamanho_pagina: int = 33, semente: int = 42):
+        self.latencia_s = latencia_s
+        self.tamanho_pagina = tamanho_pagina
+        self.semente = semente
+        self.delay_range = [0, 0]
+
+    def private_request(self, endpoint, *args, **kwargs):
+        # Ponto único de "rede": o metricas.instrumentar_cliente_instagram conta aqui
+        if self.latencia_s:
+            time.sleep(self.latencia_s)
+        return {'status': 'ok'}
+
+    def user_id_from_username(self, username: str):
+        self.private_request(f"users/{username}/usernameinfo/")
+        return str(zlib.crc32(username.encode()))
+
+    def user_info_by_username(self, username: str):
+        self.private_request(f"users/{username}/usernameinfo/")
+        rng = random.Random(f"{self.semente}-{username}-perfil")
+        return SimpleNamespace(pk=str(zlib.crc32(username.encode())), username=username,
+                               follower_count=int(rng.paretovariate(1.2) * 2000))
+
+    def _media(self, rng, user_id, i: int):
+        legenda = " ".join(rng.choices(_PALAVRAS, k=rng.randint(0, 40)))
+        return SimpleNamespace(
+            pk=f"{user_id}{i:06d}",
+            code=f"F{user_id[-4:]}{i:06d}",
+            taken_at=datetime(2025, 1, 1) - timedelta(hours=7 * i + rng.randint(0, 6)),
+            media_type=rng.choice([1, 2, 8]),
+            like_count=int(rng.paretovariate(1.5) * 40),
+            comment_count=int(rng.paretovariate(2.0) * 3),
+            caption_text=legenda,
+            thumbnail_url=f"https://fake.cdninstagram.com/{user_id}/{i:06d}.jpg",
+        )
+
+    def user_medias_paginated_v1(self, user_id, amount: int = 0, end_cursor: str = ""):
+        """Uma página do feed; o cursor é a posição da próxima mídia."""
+        self.private_request(f"feed/user/{user_id}/")
+        inicio = int(end_cursor or 0)
+        fim = inicio + min(self.tamanho_pagina, amount or self.tamanho_pagina)
+        # Cada página depende só da semente, do perfil e da posição no feed
+        rng = random.Random(f"{self.semente}-{user_id}-{inicio}")
+        return [self._media(rng, user_id, i) for i in range(inicio, fim)], str(fim)
+
+    def media_info(self, media_pk):
+        # pk = user_id + posição no feed (6 dígitos), como em _media
+        self.private_request(f"media/{media_pk}/info/")
+        user_id, i = str(media_pk)[:-6], int(str(media_pk)[-6:])
+        inicio = i - i % self.tamanho_pagina
+        rng = random.Random(f"{self.semente}-{user_id}-{inicio}")
+        for j in range(inicio, i):
+            self._media(rng, user_id, j)
+        return self._media(rng, user_id, i)
+
+    def media_comments_chunk(self, media_id, max_amount: int, min_id: str = None):
+        """Comentários do mais novo para o mais antigo; o cursor é a posição do próximo."""
+        self.private_request(f"media/{media_id}/comments/")
+        rng = random.Random(f"{self.semente}-{media_id}-comentarios")
+        total = rng.randint(0, 60)
+        inicio = int(min_id or 0)
+        fim = min(total, inicio + max_amount)
+        comentarios = [
+            SimpleNamespace(
+                pk=int(media_id) * 1000 + (total - 1 - i),
+                text=" ".join(rng.choices(_PALAVRAS, k=rng.randint(1, 12))),
+                user=SimpleNamespace(username=f"seguidor{rng.randint(1, 500)}"),
+                like_count=rng.randint(0, 20),
+                created_at_utc=datetime(2025, 1, 1) - timedelta(minutes=i),
+            )
+            for i in range(inicio, fim)
+        ]
+        return comentarios, (str(fim) if fim < total else None)
+
+    def user_medias(self, user_id, amount: int = 0):
+        medias, cursor = [], ""
+        while len(medias) < amount:
+            pagina, cursor = self.user_medias_paginated_v1(user_id, amount - len(medias), cursor)
+            medias.extend(pagina)
+        return medias
+
+
+class ModeloGeminiFalso:
+    """
+    Simula o genai.GenerativeModel.
+
+    Args:
+        latencia_s (float): Espera por chamada.
+        tokens_saida (int): Tokens informados na resposta (usage_metadata).
+        taxa_erro (float): Fração das chamadas que levantam exceção (0 a 1).
+        semente (int): Semente das respostas e dos erros.
+    """
+
+    def __init__(self, latencia_s: float = 0.0, tokens_saida: int = 4, taxa_erro: float = 0.0,
+                 semente: int = 42, model_name: str = "gemini-falso"):
+        self.latencia_s = latencia_s
+        self.tokens_saida = tokens_saida
+        self.taxa_erro = taxa_erro
+        self.model_name = model_name
+        self._rng = random.Random(semente)
+
+    def generate_content(self, prompt, *args, **kwargs):
+        if self.latencia_s:
+            time.sleep(self.latencia_s)
+        if self.taxa_erro and self._rng.random() < self.taxa_erro:
+            raise RuntimeError("429 Resource has been exhausted (erro simulado)")
+        texto = str(prompt)
+        categoria = CATEGORIAS_FALSAS[zlib.crc32(texto.encode()) % len(CATEGORIAS_FALSAS)]
+        return SimpleNamespace(
+            text=categoria,
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=len(texto) // 4,
+                candidates_token_count=self.tokens_saida,
+            ),
+        )
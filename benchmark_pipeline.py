@@ -0,0 +1,278 @@
+# benchmark_pipeline.py
+# Benchmark offline do pipeline (pipeline.processar_perfil) com os dublês do
+# benchmark_fakes.py e um SQLite em memória: não precisa de Instagram,
+# Gemini, Supabase nem MongoDB.
+#
+# Mede o tempo total e o de cada etapa (1_coleta ... 5_dados_finais) para
+# cada combinação de quantidade de posts x quantidade de perfis, mais o tempo
+# de importação a frio dos módulos que o Menu.py e os scripts carregam, e
+# compara com o baseline salvo (benchmark_baseline.json).
+#
+# Uso:
+#     python benchmark_pipeline.py                       # matriz padrão, compara com o baseline
+#     python benchmark_pipeline.py --posts 10,100 --perfis 1
+#     python benchmark_pipeline.py --salvar-baseline     # grava o resultado como novo baseline
+#     python benchmark_pipeline.py --latencia-gemini 0.2 --taxa-erro-gemini 0.05
+#
+# Sai com código 1 se algum caso ficou mais lento que o baseline além da tolerância.
+# Os tempos dependem da máquina: gere o baseline na mesma máquina que compara.
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import metricas
+import classificador_post
+import pipeline
+from benchmark_fakes import ClienteInstagramFalso, ModeloGeminiFalso
+from storage_backend import BackendMedido, SQLiteBackend
+
+ARQUIVO_BASELINE = "benchmark_baseline.json"
+POSTS_PADRAO = [10, 100, 1_000, 10_000]
+PERFIS_PADRAO = [1, 10]
+
+# Módulos cuja importação a frio é medida (num processo Python novo cada)
+MODULOS_IMPORTACAO = [
+    'metricas', 'storage_backend', 'pipeline', 'importar_csv',
+    'parquet_utils', 'supabase_utils', 'mongodb_utils',
+]
+
+# Regressão = mais lento que o baseline em mais de TOLERANCIA (relativo)
+# e em mais de LIMIAR_ABSOLUTO_S (evita alarme por ruído em casos de milissegundos)
+TOLERANCIA = 0.25
+LIMIAR_ABSOLUTO_S = 0.05
+# A importação a frio é dominada pelo pandas e oscila bastante entre rodadas;
+# o que interessa pegar é um SDK pesado voltando a ser importado no topo
+LIMIAR_ABSOLUTO_IMPORTACAO_S = 0.15
+
+
+def _lista_de_inteiros(texto: str):
+    return [int(parte) for parte in texto.replace('_', '').split(',') if parte.strip()]
+
+
+def _nome_caso(posts: int, perfis: int):
+    return f"posts={posts},perfis={perfis}"
+
+
+def rodar_caso(posts: int, perfis: int, args):
+    """Roda 'perfis' perfis com 'posts' posts cada num banco novo e devolve os tempos."""
+    backend = BackendMedido(SQLiteBackend(caminho=":memory:"))
+    cliente = metricas.instrumentar_cliente_instagram(
+        ClienteInstagramFalso(args.latencia_instagram, args.tamanho_pagina, args.semente)
+    )
+    modelo = ModeloGeminiFalso(args.latencia_gemini, taxa_erro=args.taxa_erro_gemini, semente=args.semente)
+    ui = pipeline.UIConsole(silenciosa=True)
+
+    falhas = 0
+    with metricas.execucao(funcao="benchmark", posts=posts, perfis=perfis) as run_id:
+        inicio = time.perf_counter()
+        # O classificador e os *_utils imprimem progresso por post; fora da medição
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(perfis):
+                df = pipeline.processar_perfil(
+                    backend, cliente, f"perfil_bench_{i}", posts,
+                    ui=ui, modelo_gemini=modelo
+                )
+                if df is None or len(df) != posts:
+                    falhas += 1
+        total_s = time.perf_counter() - inicio
+    backend.client.close()
+
+    _, linhas = metricas.resumo_execucao(run_id)
+    etapas = {
+        linha['rotulos']['etapa']: round(linha['soma_s'], 4)
+        for linha in linhas if linha['metrica'] == 'etapa'
+    }
+    contadores = {}
+    for linha in linhas:
+        if linha['tipo'] == 'contador':
+            contadores[linha['metrica']] = contadores.get(linha['metrica'], 0) + linha['valor']
+
+    return {
+        'total_s': round(total_s, 4),
+        'posts_por_s': round(posts * perfis / total_s, 1) if total_s else None,
+        'etapas': dict(sorted(etapas.items())),
+        'requisicoes_instagram': contadores.get('instagram_requisicoes', 0),
+        'chamadas_gemini': contadores.get('gemini_chamadas', 0),
+        'erros_gemini': contadores.get('gemini_chamada_erros', 0),
+        'perfis_com_falha': falhas,
+    }
+
+
+def rodar_matriz(args):
+    resultados = {}
+    for perfis in args.perfis:
+        for posts in args.posts:
+            melhor = None
+            # Fica com a repetição mais rápida (menos ruído da máquina)
+            for _ in range(args.repeticoes):
+                resultado = rodar_caso(posts, perfis, args)
+                if melhor is None or resultado['total_s'] < melhor['total_s']:
+                    melhor = resultado
+            resultados[_nome_caso(posts, perfis)] = melhor
+            print(f"  {_nome_caso(posts, perfis):<24} {melhor['total_s']:>9.3f}s  "
+                  f"({melhor['posts_por_s']} posts/s)")
+    return resultados
+
+
+def medir_importacoes(modulos: list = MODULOS_IMPORTACAO, repeticoes: int = 5):
+    """
+    Tempo de 'import <modulo>' num processo novo (python -X importtime), em
+    segundos, com tudo o que ele puxa junto. None se o import falhar aqui
+    (ex: dependência não instalada).
+    """
+    pasta = os.path.dirname(os.path.abspath(__file__))
+    tempos = {}
+    for modulo in modulos:
+        medidas = []
+        for _ in range(repeticoes):
+            processo = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+                cwd=pasta, capture_output=True, text=True
+            )
+            if processo.returncode != 0:
+                break
+            # Linha: "import time:   self [us] | cumulative | pacote"
+            for linha in processo.stderr.splitlines():
+                partes = [p.strip() for p in linha.split('|')]
+                if len(partes) == 3 and partes[2] == modulo:
+                    medidas.append(int(partes[1]) / 1e6)
+        tempos[modulo] = round(min(medidas), 4) if medidas else None
+        descricao = f"{tempos[modulo]:.3f}s" if medidas else "falhou (dependência ausente?)"
+        print(f"  import {modulo:<22} {descricao}")
+    return tempos
+
+
+def comparar_com_baseline(resultados: dict, baseline: dict, tolerancia: float = TOLERANCIA,
+                          importacoes: dict = None):
+    """
+    Compara o total, cada etapa e os tempos de importação com o baseline.
+    Returns:
+        list[dict]: Uma linha por medida comparada, com 'regressao' True/False.
+    """
+    comparacoes = []
+    for caso, atual in resultados.items():
+        base = baseline.get('casos', {}).get(caso)
+        if base is None:
+            continue
+        medidas = [('total', base['total_s'], atual['total_s'])]
+        medidas += [
+            (f"etapa {etapa}", base['etapas'][etapa], segundos)
+            for etapa, segundos in atual['etapas'].items() if etapa in base.get('etapas', {})
+        ]
+        comparacoes.extend(_comparar(caso, medidas, tolerancia))
+
+    importacoes_base = baseline.get('importacoes', {})
+    medidas = [
+        (f"import {modulo}", importacoes_base[modulo], segundos)
+        for modulo, segundos in (importacoes or {}).items()
+        if segundos is not None and importacoes_base.get(modulo) is not None
+    ]
+    comparacoes.extend(_comparar('importacoes', medidas, tolerancia, LIMIAR_ABSOLUTO_IMPORTACAO_S))
+    return comparacoes
+
+
+def _comparar(caso: str, medidas: list, tolerancia: float, limiar_absoluto: float = LIMIAR_ABSOLUTO_S):
+    """medidas: [(nome, baseline_s, atual_s)] -> linhas de comparação."""
+    comparacoes = []
+    for medida, antes, depois in medidas:
+        variacao = (depois - antes) / antes if antes else 0.0
+        comparacoes.append({
+            'caso': caso,
+            'medida': medida,
+            'baseline_s': antes,
+            'atual_s': depois,
+            'variacao': round(variacao, 3),
+            'regressao': variacao > tolerancia and (depois - antes) > limiar_absoluto,
+        })
+    return comparacoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline do pipeline de perfis.")
+    parser.add_argument('--posts', type=_lista_de_inteiros, default=POSTS_PADRAO,
+                        help="Quantidades de posts por perfil, separadas por vírgula.")
+    parser.add_argument('--perfis', type=_lista_de_inteiros, default=PERFIS_PADRAO,
+                        help="Quantidades de perfis por caso (1 a 10), separadas por vírgula.")
+    parser.add_argument('--repeticoes', type=int, default=1)
+    parser.add_argument('--latencia-instagram', type=float, default=0.0, help="Segundos por requisição.")
+    parser.add_argument('--tamanho-pagina', type=int, default=33, help="Posts por página do feed.")
+    parser.add_argument('--latencia-gemini', type=float, default=0.0, help="Segundos por chamada.")
+    parser.add_argument('--taxa-erro-gemini', type=float, default=0.0, help="Fração das chamadas com erro.")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--baseline', default=ARQUIVO_BASELINE)
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA)
+    parser.add_argument('--salvar-baseline', action='store_true')
+    parser.add_argument('--saida', help="Grava o resultado completo neste JSON.")
+    args = parser.parse_args(argv)
+
+    if any(not 1 <= p <= 10 for p in args.perfis):
+        parser.error("--perfis aceita valores de 1 a 10.")
+
+    # Sem pausa entre chamadas (a latência do Gemini é a do dublê) e sem log por evento
+    classificador_post.PAUSA_ENTRE_CHAMADAS = 0
+    metricas.logger.setLevel(logging.WARNING)
+
+    print("🏁 Benchmark do pipeline (Instagram/Gemini falsos, SQLite em memória)")
+    resultados = rodar_matriz(args)
+    print("📦 Importação a frio dos módulos")
+    importacoes = medir_importacoes()
+
+    relatorio = {
+        'gerado_em': datetime.now(timezone.utc).isoformat(),
+        'maquina': {'python': platform.python_version(), 'sistema': platform.platform()},
+        'parametros': {
+            'latencia_instagram': args.latencia_instagram,
+            'tamanho_pagina': args.tamanho_pagina,
+            'latencia_gemini': args.latencia_gemini,
+            'taxa_erro_gemini': args.taxa_erro_gemini,
+            'semente': args.semente,
+            'repeticoes': args.repeticoes,
+        },
+        'casos': resultados,
+        'importacoes': importacoes,
+    }
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+
+    if args.salvar_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+        print(f"💾 Baseline salvo em '{args.baseline}'.")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"ℹ️ Sem baseline em '{args.baseline}'. Rode com --salvar-baseline para criar.")
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('parametros') != relatorio['parametros']:
+        print("⚠️ Parâmetros diferentes dos do baseline; a comparação pode não fazer sentido.")
+
+    comparacoes = comparar_com_baseline(resultados, baseline, args.tolerancia, importacoes)
+    regressoes = [c for c in comparacoes if c['regressao']]
+    print(f"\n📊 Comparação com o baseline ({baseline.get('gerado_em', '?')}), tolerância {args.tolerancia:.0%}:")
+    for c in comparacoes:
+        marcador = "❌" if c['regressao'] else "  "
+        print(f"{marcador} {c['caso']:<24} {c['medida']:<20} {c['baseline_s']:>9.3f}s -> "
+              f"{c['atual_s']:>9.3f}s ({c['variacao']:+.0%})")
+
+    if regressoes:
+        print(f"\n❌ {len(regressoes)} regressão(ões) acima da tolerância.")
+        return 1
+    print("\n✅ Nenhuma regressão acima da tolerância.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+# busca_legendas.py
+# Busca de palavras e hashtags nas legendas, com resultados paginados e
+# ordenados por engajamento (curtidas + comentários).
+#
+# Nos bancos a busca usa o índice de texto de cada um (tsvector + GIN no
+# Supabase, índice "text" no MongoDB, FTS5 no SQLite). Para os dados que
+# vêm de CSV/Parquet (sem banco), o IndiceInvertido abaixo é montado uma vez
+# por análise e responde sem varrer as legendas a cada busca.
+
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+TAMANHO_PAGINA_BUSCA = 20
+
+# Mesmos tokens para o índice e para a consulta ('#Agro' e 'agro' batem)
+PADRAO_TERMO = r'\w+'
+# Acentos separados pelo NFKD (sem raw string: caracteres literais, vale no re e no RE2)
+PADRAO_ACENTOS = '[\u0300-\u036f]'
+
+# DDL para rodar uma vez no SQL Editor do Supabase.
+# A coluna gerada mantém o tsvector sempre em dia com a legenda (sem gatilho)
+# e a função faz busca + ordenação + paginação em um round trip.
+SQL_BUSCA_LEGENDAS = """
+alter table posts
+    add column if not exists caption_tsv tsvector
+    generated always as (to_tsvector('portuguese', coalesce(caption, ''))) stored;
+create index if not exists posts_caption_tsv_gin on posts using gin (caption_tsv);
+
+create or replace function buscar_legendas(consulta text, perfis text[], limite integer, deslocamento integer)
+returns setof posts language sql stable as $$
+    select *
+    from posts
+    where caption_tsv @@ websearch_to_tsquery('portuguese', consulta)
+      and (perfis is null or username = any(perfis))
+    order by coalesce(like_count, 0) + coalesce(comment_count, 0) desc, post_pk
+    limit limite offset deslocamento;
+$$;
+"""
+
+
+def _sem_acentos(texto: str):
+    return re.sub(PADRAO_ACENTOS, '', unicodedata.normalize('NFKD', texto))
+
+
+def termos_da_consulta(consulta: str):
+    """Quebra a consulta em termos normalizados (minúsculas, sem acento, sem '#'/'@')."""
+    return re.findall(PADRAO_TERMO, _sem_acentos(consulta or '').lower())
+
+
+def ordenar_por_engajamento(df: pd.DataFrame):
+    """Acrescenta 'engajamento' (curtidas + comentários) e ordena do maior para o menor."""
+    engajamento = (
+        pd.to_numeric(df.get('curtidas'), errors='coerce').fillna(0)
+        + pd.to_numeric(df.get('comentarios'), errors='coerce').fillna(0)
+    ) if not df.empty else pd.Series(dtype='float64')
+    return df.assign(engajamento=engajamento).sort_values('engajamento', ascending=False, kind='stable')
+
+
+class IndiceInvertido:
+    """
+    Índice termo -> posições das linhas, montado em bloco com o pandas.
+
+    Args:
+        df (pd.DataFrame): Posts no formato do app ('legenda', 'curtidas', 'comentarios').
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df.reset_index(drop=True)
+        legendas = self.df['legenda'].astype('string').fillna('') if 'legenda' in self.df.columns \
+            else pd.Series('', index=self.df.index, dtype='string')
+
+        # Normaliza acentos e quebra em termos, tudo em bloco
+        termos = (
+            legendas.str.normalize('NFKD').str.replace(PADRAO_ACENTOS, '', regex=True).str.lower()
+            .str.findall(PADRAO_TERMO)
+            .explode()
+            .dropna()
+        )
+        termos = termos[termos != '']
+        # Cada termo conta uma vez por post
+        pares = pd.DataFrame({'termo': termos.values, 'linha': termos.index.values}).drop_duplicates()
+        self._postings = {
+            termo: grupo.to_numpy(dtype=np.int64)
+            for termo, grupo in pares.groupby('termo', sort=False)['linha']
+        }
+
+        engajamento = (
+            pd.to_numeric(self.df.get('curtidas'), errors='coerce').fillna(0)
+            + pd.to_numeric(self.df.get('comentarios'), errors='coerce').fillna(0)
+        ) if not self.df.empty else pd.Series(dtype='float64')
+        self._engajamento = engajamento.to_numpy(dtype=np.float64)
+
+    def __len__(self):
+        return len(self._postings)
+
+    def buscar(self, consulta: str, perfis: list = None, limit: int = TAMANHO_PAGINA_BUSCA, offset: int = 0):
+        """
+        Posts que têm TODOS os termos da consulta, do mais engajado para o menos.
+        Returns:
+            pd.DataFrame: A página pedida, com a coluna 'engajamento'.
+        """
+        termos = termos_da_consulta(consulta)
+        if not termos:
+            return self.df.iloc[0:0].assign(engajamento=pd.Series(dtype='float64'))
+
+        # Interseção começando pela lista mais curta
+        listas = sorted((self._postings.get(termo, np.empty(0, dtype=np.int64)) for termo in termos), key=len)
+        linhas = listas[0]
+        for lista in listas[1:]:
+            if len(linhas) == 0:
+                break
+            linhas = np.intersect1d(linhas, lista, assume_unique=True)
+
+        if perfis and 'perfil' in self.df.columns:
+            perfis = [p.replace('@', '') for p in perfis]
+            linhas = linhas[np.isin(self.df['perfil'].to_numpy()[linhas].astype(str), perfis)]
+
+        ordem = np.argsort(-self._engajamento[linhas], kind='stable')
+        pagina = linhas[ordem][offset:offset + limit]
+        return self.df.iloc[pagina].assign(engajamento=self._engajamento[pagina])
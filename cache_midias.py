@@ -0,0 +1,243 @@
+# cache_midias.py
+# Cache local das miniaturas dos posts, endereçado pelo conteúdo.
+#
+# - Cada imagem é baixada uma vez e guardada como <sha256>.jpg; posts com o
+#   mesmo arquivo (repostagens, o mesmo criativo em perfis diferentes)
+#   apontam para a mesma cópia.
+# - O tamanho total é limitado (TAMANHO_MAX_CACHE_MB): quando passa, saem
+#   os arquivos usados há mais tempo (LRU). O índice (post -> arquivo, hash
+#   perceptual, categoria) fica num SQLite dentro do diretório e sobrevive à
+#   remoção dos arquivos, então uma imagem removida não é reclassificada.
+# - Hash perceptual (dHash de 64 bits): imagens quase iguais (recorte,
+#   compressão, selo diferente) ficam a poucos bits de distância e recebem a
+#   mesma categoria sem nova chamada ao modelo.
+#
+# O Pillow só é importado quando o caminho multimodal é usado.
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+
+import numpy as np
+
+import metricas
+
+try:
+    from config import DIRETORIO_CACHE_MIDIAS
+except ImportError:
+    DIRETORIO_CACHE_MIDIAS = "cache_midias"
+
+try:
+    from config import TAMANHO_MAX_CACHE_MB
+except ImportError:
+    TAMANHO_MAX_CACHE_MB = 500
+
+# Bits diferentes no dHash até onde duas imagens contam como "a mesma"
+DISTANCIA_MAXIMA_HASH = 6
+
+TEMPO_LIMITE_DOWNLOAD_S = 20
+
+# DDL para rodar uma vez no SQL Editor do Supabase (o SQLite cria a coluna
+# sozinho e o MongoDB não tem schema)
+SQL_MINIATURAS = """
+alter table posts add column if not exists thumbnail_url text;
+"""
+
+
+def url_miniatura(media):
+    """URL da miniatura de uma Media do instagrapi (carrossel: a do primeiro item)."""
+    url = getattr(media, 'thumbnail_url', None)
+    if not url and getattr(media, 'resources', None):
+        url = getattr(media.resources[0], 'thumbnail_url', None)
+    return str(url) if url else None
+
+
+def hash_perceptual(dados: bytes):
+    """dHash de 64 bits: compara cada pixel com o vizinho numa miniatura 9x8 em tons de cinza."""
+    Image = metricas.importar("PIL.Image")
+    import io
+    with Image.open(io.BytesIO(dados)) as imagem:
+        pixels = np.asarray(imagem.convert('L').resize((9, 8), Image.LANCZOS), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def distancias(hash_: int, hashes):
+    """Distância de Hamming entre um hash e uma lista de hashes (vetorizado)."""
+    if len(hashes) == 0:
+        return np.empty(0, dtype=np.int64)
+    xor = np.asarray(hashes, dtype=np.uint64) ^ np.uint64(hash_)
+    # Contagem de bits pelos 8 bytes de cada hash (np.bitwise_count só existe no numpy 2)
+    return np.unpackbits(xor.view(np.uint8)).reshape(-1, 64).sum(axis=1, dtype=np.int64)
+
+
+def _com_sinal(hash_: int):
+    # O SQLite só guarda inteiros de 64 bits com sinal
+    return hash_ - (1 << 64) if hash_ >= (1 << 63) else hash_
+
+
+def _sem_sinal(valor: int):
+    return valor + (1 << 64) if valor < 0 else valor
+
+
+class CacheMidias:
+    """
+    Args:
+        diretorio (str): Onde ficam as imagens e o índice.
+        tamanho_max_mb (float): Limite do total de imagens guardadas.
+        baixar (callable): url -> bytes (troca o download, ex: nos testes).
+    """
+
+    def __init__(self, diretorio: str = None, tamanho_max_mb: float = None, baixar=None):
+        self.diretorio = diretorio or DIRETORIO_CACHE_MIDIAS
+        self.tamanho_max = int((tamanho_max_mb if tamanho_max_mb is not None else TAMANHO_MAX_CACHE_MB) * 1024 * 1024)
+        self._baixar = baixar or self._baixar_url
+        self._trava = threading.Lock()
+        os.makedirs(self.diretorio, exist_ok=True)
+        with self._conectar() as conn:
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS posts (post_pk TEXT PRIMARY KEY, sha TEXT NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS arquivos ("
+                " sha TEXT PRIMARY KEY, tamanho INTEGER NOT NULL, ultimo_acesso REAL NOT NULL,"
+                " presente INTEGER NOT NULL DEFAULT 1, phash INTEGER, categoria TEXT);"
+                "CREATE INDEX IF NOT EXISTS arquivos_lru ON arquivos (presente, ultimo_acesso);"
+            )
+            # Índices criados antes de a categoria guardar a versão do prompt/modelo
+            if 'versao' not in {linha[1] for linha in conn.execute("PRAGMA table_info(arquivos)")}:
+                conn.execute("ALTER TABLE arquivos ADD COLUMN versao TEXT")
+
+    @contextmanager
+    def _conectar(self):
+        """Conexão com o índice: confirma ao sair do bloco (desfaz em erro) e fecha o arquivo."""
+        conn = sqlite3.connect(os.path.join(self.diretorio, "indice.sqlite3"), timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _caminho(self, sha: str):
+        return os.path.join(self.diretorio, sha[:2], f"{sha}.jpg")
+
+    @staticmethod
+    def _baixar_url(url: str):
+        with urllib.request.urlopen(url, timeout=TEMPO_LIMITE_DOWNLOAD_S) as resposta:
+            return resposta.read()
+
+    def obter(self, post_pk: str, url: str):
+        """
+        Bytes da miniatura do post: do disco se já foi baixada, senão da URL.
+        Returns:
+            tuple: (sha, bytes); sem URL, (sha, None) se o arquivo já saiu do cache
+            ou (None, None) se o post nunca foi baixado.
+        """
+        post_pk = str(post_pk)
+        with self._conectar() as conn:
+            linha = conn.execute(
+                "SELECT a.sha, a.presente FROM posts p JOIN arquivos a USING (sha) WHERE p.post_pk = ?", (post_pk,)
+            ).fetchone()
+            if linha and linha[1]:
+                try:
+                    with open(self._caminho(linha[0]), 'rb') as arquivo:
+                        dados = arquivo.read()
+                except FileNotFoundError:
+                    # Arquivo apagado por fora do cache: vale como ausente (baixa de novo se houver URL)
+                    conn.execute("UPDATE arquivos SET presente = 0 WHERE sha = ?", (linha[0],))
+                else:
+                    conn.execute("UPDATE arquivos SET ultimo_acesso = ? WHERE sha = ?", (time.time(), linha[0]))
+                    metricas.registrar_cache("miniaturas", acerto=True)
+                    return linha[0], dados
+            if not url:
+                return (linha[0] if linha else None), None
+
+        metricas.registrar_cache("miniaturas", acerto=False)
+        with metricas.cronometro("miniatura_download"):
+            dados = self._baixar(url)
+        sha = hashlib.sha256(dados).hexdigest()
+        caminho = self._caminho(sha)
+        if not os.path.exists(caminho):
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            with open(caminho, 'wb') as arquivo:
+                arquivo.write(dados)
+
+        with self._trava, self._conectar() as conn:
+            conn.execute(
+                "INSERT INTO arquivos (sha, tamanho, ultimo_acesso) VALUES (?, ?, ?) "
+                "ON CONFLICT(sha) DO UPDATE SET presente = 1, ultimo_acesso = excluded.ultimo_acesso",
+                (sha, len(dados), time.time())
+            )
+            conn.execute("INSERT OR REPLACE INTO posts (post_pk, sha) VALUES (?, ?)", (post_pk, sha))
+            self._limitar_tamanho(conn)
+        return sha, dados
+
+    def _limitar_tamanho(self, conn):
+        """Remove os arquivos menos usados até o total caber no limite (o índice fica)."""
+        total = conn.execute("SELECT COALESCE(SUM(tamanho), 0) FROM arquivos WHERE presente = 1").fetchone()[0]
+        if total <= self.tamanho_max:
+            return
+        for sha, tamanho in conn.execute(
+            "SELECT sha, tamanho FROM arquivos WHERE presente = 1 ORDER BY ultimo_acesso"
+        ).fetchall():
+            if total <= self.tamanho_max:
+                break
+            try:
+                os.remove(self._caminho(sha))
+            except FileNotFoundError:
+                pass
+            conn.execute("UPDATE arquivos SET presente = 0 WHERE sha = ?", (sha,))
+            total -= tamanho
+            metricas.incrementar("miniaturas_removidas_lru")
+
+    def phash(self, sha: str, dados: bytes = None):
+        """Hash perceptual do arquivo (calculado uma vez e guardado no índice)."""
+        with self._conectar() as conn:
+            linha = conn.execute("SELECT phash FROM arquivos WHERE sha = ?", (sha,)).fetchone()
+            if linha and linha[0] is not None:
+                return _sem_sinal(linha[0])
+            if dados is None:
+                return None
+            valor = hash_perceptual(dados)
+            conn.execute("UPDATE arquivos SET phash = ? WHERE sha = ?", (_com_sinal(valor), sha))
+            return valor
+
+    def associar(self, post_pk: str, sha: str):
+        """Liga um post a um arquivo já no cache."""
+        with self._conectar() as conn:
+            conn.execute("INSERT OR REPLACE INTO posts (post_pk, sha) VALUES (?, ?)", (str(post_pk), sha))
+
+    def sha_do_post(self, post_pk: str):
+        with self._conectar() as conn:
+            linha = conn.execute("SELECT sha FROM posts WHERE post_pk = ?", (str(post_pk),)).fetchone()
+        return linha[0] if linha else None
+
+    def categoria(self, sha: str, versao: str):
+        """Categoria já dada a este mesmo arquivo pela mesma versão de prompt/modelo (ou None)."""
+        with self._conectar() as conn:
+            linha = conn.execute(
+                "SELECT categoria FROM arquivos WHERE sha = ? AND versao = ?", (sha, versao)
+            ).fetchone()
+        return linha[0] if linha else None
+
+    def categoria_parecida(self, phash: int, versao: str, distancia_maxima: int = DISTANCIA_MAXIMA_HASH):
+        """Categoria já dada a uma imagem quase igual pela mesma versão (ou None)."""
+        with self._conectar() as conn:
+            linhas = conn.execute(
+                "SELECT phash, categoria FROM arquivos WHERE categoria IS NOT NULL AND phash IS NOT NULL AND versao = ?",
+                (versao,)
+            ).fetchall()
+        if not linhas:
+            return None
+        d = distancias(phash, [_sem_sinal(h) for h, _ in linhas])
+        melhor = int(np.argmin(d))
+        return linhas[melhor][1] if d[melhor] <= distancia_maxima else None
+
+    def guardar_categoria(self, shas: list, categoria: str, versao: str):
+        with self._conectar() as conn:
+            conn.executemany(
+                "UPDATE arquivos SET categoria = ?, versao = ? WHERE sha = ?",
+                [(categoria, versao, sha) for sha in shas]
+            )
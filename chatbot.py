@@ -0,0 +1,178 @@
+# chatbot.py
+# Chat de várias rodadas sobre os dados analisados.
+#
+# - O contexto dos dados (totais, período, médias por categoria, atributos
+#   das legendas) é calculado uma vez por "impressão digital" do DataFrame e
+#   do resumo usado, e reaproveitado. Totais e médias vêm do resumo pronto do
+#   banco (estatisticas_perfil.py) quando ele é passado; os mesmos posts com
+#   o resumo do banco ou calculado localmente são contextos diferentes.
+# - O histórico da conversa é guardado e reenviado a cada pergunta; quando
+#   passa de ORCAMENTO_HISTORICO_TOKENS, as rodadas mais antigas viram um
+#   resumo curto, então o prompt não cresce sem limite.
+# - O contexto vai sempre no começo da conversa, igual em todas as rodadas:
+#   o prefixo repetido aproveita o cache implícito dos modelos Gemini 2.5. O
+#   resumo da conversa, que muda, vai numa mensagem própria depois dele.
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+import modelos_gemini
+from estatisticas_perfil import EstatisticasPerfis
+from features_legenda import resumo_features_md
+
+# Tokens (estimados) do histórico literal antes de resumir as rodadas antigas
+ORCAMENTO_HISTORICO_TOKENS = 2000
+
+# Mensagens mais recentes que nunca entram no resumo (2 perguntas + 2 respostas)
+MENSAGENS_RECENTES = 4
+
+# Contextos de datasets guardados no processo
+MAX_CONTEXTOS = 16
+
+COLUNAS_FINGERPRINT = ['id', 'data', 'curtidas', 'comentarios', 'categoria', 'perfil', 'legenda']
+
+_contextos = OrderedDict()
+_trava = threading.Lock()
+
+
+def estimar_tokens(texto: str):
+    """Estimativa barata (~4 caracteres por token), sem chamar a API."""
+    return len(texto) // 4 + 1
+
+
+def fingerprint_dataset(df: pd.DataFrame):
+    """Hash do conteúdo do DataFrame (mesmos dados -> mesma impressão digital)."""
+    colunas = [c for c in COLUNAS_FINGERPRINT if c in df.columns]
+    hashes = pd.util.hash_pandas_object(df[colunas].astype('string'), index=False)
+    return hashlib.sha1(hashes.values.tobytes()).hexdigest()[:16]
+
+
+def fingerprint_estatisticas(estatisticas: EstatisticasPerfis = None):
+    """Impressão digital do resumo usado no contexto ('posts' = calculado dos próprios posts)."""
+    if estatisticas is None:
+        return "posts"
+    hashes = pd.util.hash_pandas_object(estatisticas.grupos.astype('string'), index=False)
+    return hashlib.sha1(hashes.values.tobytes()).hexdigest()[:16]
+
+
+def _montar_contexto(df: pd.DataFrame, estatisticas: EstatisticasPerfis = None):
+    # Números do resumo pronto (profile_stats) quando vier do banco; senão, dos próprios posts
+    estatisticas = estatisticas or EstatisticasPerfis.de_posts(df)
+    totais = estatisticas.totais()
+    inicio, fim = estatisticas.periodo()
+    por_categoria = estatisticas.por_categoria().rename(
+        columns={'curtidas': 'media_curtidas', 'comentarios': 'media_comentarios'}
+    )
+    return f"""**DADOS DO PERFIL ANALISADO:**
+- Total de posts: {totais['posts']}
+- Período: {inicio} a {fim}
+- Média de curtidas: {totais['media_curtidas']:.1f}
+- Média de comentários: {totais['media_comentarios']:.1f}
+
+**DESEMPENHO POR CATEGORIA:**
+{por_categoria.to_markdown(floatfmt=".1f")}
+
+**ATRIBUTOS DAS LEGENDAS E HORÁRIOS:**
+{resumo_features_md(df, top_hashtags=5)}
+"""
+
+
+def contexto_dos_dados(df: pd.DataFrame, fingerprint: str = None, estatisticas: EstatisticasPerfis = None):
+    """Texto com o resumo dos dados, calculado uma vez por impressão digital dos posts e do resumo usado."""
+    chave = (fingerprint or fingerprint_dataset(df), fingerprint_estatisticas(estatisticas))
+    with _trava:
+        if chave in _contextos:
+            _contextos.move_to_end(chave)
+            return _contextos[chave]
+
+    contexto = _montar_contexto(df, estatisticas)
+    with _trava:
+        _contextos[chave] = contexto
+        while len(_contextos) > MAX_CONTEXTOS:
+            _contextos.popitem(last=False)
+    return contexto
+
+
+class SessaoChat:
+    """
+    Uma conversa sobre um dataset.
+
+    Args:
+        df_posts (pd.DataFrame): Dados analisados (com 'categoria' ou 'tipo').
+        estatisticas (EstatisticasPerfis, opcional): Resumo pronto do banco (profile_stats).
+    Raises:
+        ValueError: Se os dados não tiverem coluna de categoria.
+    """
+
+    def __init__(self, df_posts: pd.DataFrame, estatisticas: EstatisticasPerfis = None):
+        if 'categoria' not in df_posts.columns and 'tipo' in df_posts.columns:
+            df_posts = df_posts.rename(columns={'tipo': 'categoria'})
+        elif 'categoria' not in df_posts.columns:
+            raise ValueError("Não foi encontrada coluna de categoria nos dados.")
+
+        self.fingerprint = fingerprint_dataset(df_posts)
+        self.contexto = contexto_dos_dados(df_posts, self.fingerprint, estatisticas)
+        self.resumo = ""
+        # [{'papel': 'user' | 'model', 'texto': str}] — só as rodadas ainda não resumidas
+        self.historico = []
+        # Tudo o que foi dito, para reexibir na tela
+        self.mensagens = []
+
+    def _conteudos(self, pergunta: str):
+        # Prefixo fixo (igual em todas as rodadas); o resumo, que muda, vem depois dele
+        conteudos = [
+            {'role': 'user', 'parts': [self.contexto]},
+            {'role': 'model', 'parts': ["Entendido. Vou responder com base nesses dados."]},
+        ]
+        if self.resumo:
+            conteudos += [
+                {'role': 'user', 'parts': [f"**RESUMO DA CONVERSA ATÉ AQUI:**\n{self.resumo}"]},
+                {'role': 'model', 'parts': ["Certo, vou considerar a conversa até aqui."]},
+            ]
+        conteudos += [{'role': m['papel'], 'parts': [m['texto']]} for m in self.historico]
+        conteudos.append({'role': 'user', 'parts': [pergunta]})
+        return conteudos
+
+    def tokens_historico(self):
+        return sum(estimar_tokens(m['texto']) for m in self.historico) + estimar_tokens(self.resumo)
+
+    def perguntar(self, pergunta: str, api_key: str, modelo=None, modelo_resumo=None):
+        """Envia a pergunta com o contexto e o histórico; devolve o texto da resposta."""
+        modelo = modelo or modelos_gemini.obter_modelo("chatbot", api_key)
+        resposta = modelo.generate_content(self._conteudos(pergunta)).text
+
+        for papel, texto in (('user', pergunta), ('model', resposta)):
+            self.historico.append({'papel': papel, 'texto': texto})
+            self.mensagens.append({'papel': papel, 'texto': texto})
+        self._compactar_historico(api_key, modelo_resumo)
+        return resposta
+
+    def _compactar_historico(self, api_key: str, modelo_resumo=None):
+        """Resume as rodadas antigas quando o histórico passa do orçamento de tokens."""
+        if self.tokens_historico() <= ORCAMENTO_HISTORICO_TOKENS or len(self.historico) <= MENSAGENS_RECENTES:
+            return
+
+        antigas = self.historico[:-MENSAGENS_RECENTES]
+        recentes = self.historico[-MENSAGENS_RECENTES:]
+        conversa = "\n".join(
+            f"{'Usuário' if m['papel'] == 'user' else 'Assistente'}: {m['texto']}" for m in antigas
+        )
+        prompt = f"""
+        Resuma a conversa abaixo entre um usuário e um analista de Instagram em no máximo
+        150 palavras, em português. Mantenha números, conclusões e pedidos do usuário.
+
+        Resumo anterior: {self.resumo or '(nenhum)'}
+
+        Conversa:
+        {conversa}
+        """
+        try:
+            modelo_resumo = modelo_resumo or modelos_gemini.obter_modelo("resumo_chat", api_key)
+            self.resumo = modelo_resumo.generate_content(prompt).text.strip()
+        except Exception as e:
+            # Sem resumo, descarta as rodadas antigas para manter o prompt limitado
+            print(f"⚠️ Não foi possível resumir o histórico do chat: {e}")
+        self.historico = recentes
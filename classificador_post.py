@@ -1,19 +1,235 @@
 # classificar.py
 
 import pandas as pd
-import google.generativeai as genai
 import time
+from datetime import datetime, timezone
 
-def classificar_posts_gemini(df_posts_para_classificar, api_key):
+import metricas
+import modelos_gemini
+from regras_classificacao import VERSAO_REGRAS, pre_classificar
+
+# Pausa entre chamadas para não estourar a cota da API (o benchmark zera)
+PAUSA_ENTRE_CHAMADAS = 1
+
+# Posts sem legenda classificados pela miniatura (baixa as imagens; ver cache_midias.py)
+try:
+    from config import CLASSIFICAR_IMAGENS
+except ImportError:
+    CLASSIFICAR_IMAGENS = False
+
+# Regras locais antes do Gemini (ver regras_classificacao.py)
+try:
+    from config import USAR_REGRAS_CLASSIFICACAO
+except ImportError:
+    USAR_REGRAS_CLASSIFICACAO = True
+
+# Versão dos prompts: mude ao alterar o texto de um deles, e o reclassificar.py
+# refaz em segundo plano só os posts classificados pela versão antiga
+VERSAO_PROMPT = "legenda-v1"
+VERSAO_PROMPT_IMAGEM = "imagem-v1"
+# 'Sem legenda' sem chamar modelo nenhum
+VERSAO_SEM_LEGENDA = "sem-legenda"
+
+PROMPT_IMAGEM = """
+Analise esta imagem de um post do Instagram e classifique em UMA destas categorias:
+- Institucional: Quando promove ou mostra produtos, serviços, vendas, a marca
+- Conteúdo técnico: Quando ensina, explica, dá dicas ou informações educativas
+- Engajamento: Quando faz perguntas, pede opiniões, incentiva interação
+- Data comemorativa: Quando menciona datas especiais, feriados, celebrações
+
+Responda APENAS com o nome da categoria, sem explicações, sem pontuação.
+"""
+
+
+def procedencia_atual(tem_legenda: bool, tem_miniatura: bool = False):
+    """(versão, modelo) que uma classificação feita agora teria; modelo None = sem modelo."""
+    if tem_legenda:
+        return VERSAO_PROMPT, modelos_gemini.TAREFAS['classificacao']['modelo']
+    if CLASSIFICAR_IMAGENS and tem_miniatura:
+        return VERSAO_PROMPT_IMAGEM, modelos_gemini.TAREFAS['classificacao_imagem']['modelo']
+    return VERSAO_SEM_LEGENDA, None
+
+
+def _resultado(post_id, categoria, versao, modelo=None):
+    return {
+        'id': post_id,
+        'categoria': categoria,
+        'modelo': modelo,
+        'versao': versao,
+        'classificado_em': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+
+
+def classificar_por_regras(df_posts):
+    """
+    Aplica as regras locais (regras_classificacao.py) antes do modelo.
+    Returns:
+        tuple: (resultados dos posts resolvidos, máscara dos que seguem para o modelo)
+    """
+    df_resolvidos, para_modelo = pre_classificar(df_posts)
+    resultados = [
+        _resultado(post_id, categoria, VERSAO_REGRAS)
+        for post_id, categoria in zip(df_resolvidos['id'], df_resolvidos['categoria'])
+    ]
+    if len(df_posts):
+        print(f"  {len(resultados)} de {len(df_posts)} posts ({len(resultados) / len(df_posts):.0%}) "
+              "resolvidos pelas regras locais.")
+    return resultados, para_modelo
+
+
+def _normalizar_categoria(categoria):
+    # Sua lógica de validação (exatamente como estava)
+    categorias_validas = ['Institucional', 'Conteúdo técnico', 'Engajamento', 'Data comemorativa']
+    if categoria not in categorias_validas:
+        if 'institucional' in categoria.lower() or 'venda' in categoria.lower():
+            categoria = 'Institucional'
+        elif 'técnico' in categoria.lower() or 'educati' in categoria.lower() or 'dica' in categoria.lower():
+            categoria = 'Conteúdo técnico'
+        elif 'engajament' in categoria.lower() or 'interaç' in categoria.lower() or 'pergunta' in categoria.lower():
+            categoria = 'Engajamento'
+        elif 'data' in categoria.lower() or 'comemorati' in categoria.lower():
+            categoria = 'Data comemorativa'
+        else:
+            categoria = 'Outros' # Categoria padrão
+    return categoria
+
+
+def classificar_por_imagem(df_sem_legenda, api_key, modelo=None, cache=None):
+    """
+    Classifica posts sem legenda pela miniatura ('miniatura' = URL).
+
+    Cada imagem é baixada uma vez para o cache local (cache_midias.py). Posts
+    com o mesmo arquivo ou com imagens quase iguais (hash perceptual) formam um
+    grupo, e só um representante de cada grupo vai para o modelo; grupos
+    parecidos com imagens já classificadas em rodadas anteriores nem vão.
+    Sem imagem, o post fica como 'Sem legenda'; sem o Pillow, só arquivos
+    idênticos são agrupados.
+    Returns:
+        list[dict]: {'id', 'categoria', 'modelo', 'versao', 'classificado_em'} de cada post, na mesma ordem.
+    """
+    from cache_midias import DISTANCIA_MAXIMA_HASH, CacheMidias, distancias
+
+    cache = cache or CacheMidias()
+    if modelo is None:
+        nome_modelo = modelos_gemini.TAREFAS['classificacao_imagem']['modelo']
+    else:
+        nome_modelo = getattr(modelo, 'model_name', 'externo')
+    # Categoria guardada no cache só vale para o mesmo prompt e modelo
+    versao = f"{VERSAO_PROMPT_IMAGEM}@{nome_modelo}"
+    categorias = {}
+    # sha -> ids dos posts com aquele arquivo
+    por_arquivo = {}
+    baixadas = {}
+    for _, row in df_sem_legenda.iterrows():
+        # Imagem já classificada em outra rodada: nem precisa estar no disco
+        ja = cache.categoria(cache.sha_do_post(row['id']) or '', versao)
+        if ja is not None:
+            categorias[row['id']] = ja
+            continue
+        url = row.get('miniatura')
+        url = url if isinstance(url, str) and url else None
+        if url is not None and url in baixadas:
+            # Mesma URL em outro post do lote (repostagem): usa o download feito
+            sha, dados = baixadas[url]
+            cache.associar(row['id'], sha)
+        else:
+            try:
+                sha, dados = cache.obter(row['id'], url)
+            except Exception as e:
+                metricas.incrementar("miniaturas_erros", erro=type(e).__name__)
+                sha, dados = None, None
+            if url is not None and sha is not None:
+                baixadas[url] = (sha, dados)
+        if sha is None:
+            categorias[row['id']] = 'Sem legenda'
+            continue
+        ja = cache.categoria(sha, versao)
+        if ja is not None:
+            categorias[row['id']] = ja
+            continue
+        por_arquivo.setdefault(sha, {'ids': [], 'dados': dados})['ids'].append(row['id'])
+
+    # Agrupa os arquivos novos por imagem parecida; o primeiro de cada grupo representa os demais
+    grupos = []  # [phash, [shas], dados]
+    sem_pillow = False
+    for sha, item in por_arquivo.items():
+        hash_ = None
+        if not sem_pillow:
+            try:
+                hash_ = cache.phash(sha, item['dados'])
+            except ImportError:
+                print("    Pillow não instalado: só imagens idênticas serão agrupadas.")
+                sem_pillow = True
+            except Exception as e:
+                print(f"    Sem hash perceptual para a imagem {sha[:12]}: {str(e)[:100]}")
+        if hash_ is not None:
+            parecida = cache.categoria_parecida(hash_, versao)
+            if parecida is not None:
+                cache.guardar_categoria([sha], parecida, versao)
+                categorias.update({post_id: parecida for post_id in item['ids']})
+                metricas.incrementar("miniaturas_reaproveitadas")
+                continue
+            representantes = [g[0] for g in grupos if g[0] is not None]
+            if representantes:
+                d = distancias(hash_, representantes)
+                if d.min() <= DISTANCIA_MAXIMA_HASH:
+                    alvo = [g for g in grupos if g[0] is not None][int(d.argmin())]
+                    alvo[1].append(sha)
+                    continue
+        grupos.append([hash_, [sha], item['dados']])
+
+    if grupos:
+        if modelo is None:
+            model = modelos_gemini.obter_modelo("classificacao_imagem", api_key)
+        else:
+            model = modelos_gemini.ModeloGemini(modelo, nome_modelo, "classificacao_imagem")
+        print(f"  Classificando {len(grupos)} imagens únicas de {len(df_sem_legenda)} posts sem legenda...")
+
+    for _, shas, dados in grupos:
+        ids = [post_id for sha in shas for post_id in por_arquivo[sha]['ids']]
+        if dados is None:
+            categorias.update({post_id: 'Sem legenda' for post_id in ids})
+            continue
+        try:
+            response = model.generate_content([PROMPT_IMAGEM, {'mime_type': 'image/jpeg', 'data': dados}])
+            categoria = _normalizar_categoria(response.text.strip().replace("*", ""))
+            cache.guardar_categoria(shas, categoria, versao)
+            metricas.incrementar("miniaturas_classificadas")
+            time.sleep(PAUSA_ENTRE_CHAMADAS)
+        except Exception as e:
+            print(f"    Erro ao classificar a imagem dos posts {ids[:3]}: {str(e)[:100]}...")
+            categoria = 'Erro na Classificação'
+        categorias.update({post_id: categoria for post_id in ids})
+
+    return [
+        _resultado(row_id, categorias[row_id], VERSAO_SEM_LEGENDA) if categorias[row_id] == 'Sem legenda'
+        else _resultado(row_id, categorias[row_id], VERSAO_PROMPT_IMAGEM, nome_modelo)
+        for row_id in df_sem_legenda['id']
+    ]
+
+def classificar_posts_gemini(df_posts_para_classificar, api_key, modelo=None):
+    """
+    'modelo' permite passar um GenerativeModel já criado (ou um dublê, no benchmark).
+    Cada resultado leva a procedência: {'id', 'categoria', 'modelo', 'versao', 'classificado_em'}.
+    """
     try:
-        genai.configure(api_key=api_key)
-        # Recomendo usar o modelo mais recente
-        model = genai.GenerativeModel('gemini-2.0-flash') 
+        if modelo is None:
+            # Modelo configurado uma vez e reaproveitado (ver modelos_gemini.py)
+            model = modelos_gemini.obter_modelo("classificacao", api_key)
+        else:
+            model = modelos_gemini.ModeloGemini(modelo, getattr(modelo, 'model_name', 'externo'), "classificacao")
         
         # O DataFrame já vem filtrado, pegamos as colunas 'id' e 'legenda'
         # que a função fetch_instagram_data nos deu.
         legendas = df_posts_para_classificar[['id', 'legenda']]
         resultados = []
+        if USAR_REGRAS_CLASSIFICACAO and not df_posts_para_classificar.empty:
+            # Posts óbvios (saudação de data, preço/link na bio, pergunta) nem vão para o modelo
+            resultados, para_modelo = classificar_por_regras(df_posts_para_classificar)
+            legendas = legendas[para_modelo]
+        # Sem legenda e com miniatura: vão juntos para a classificação por imagem no fim
+        usar_imagens = CLASSIFICAR_IMAGENS and 'miniatura' in df_posts_para_classificar.columns
+        sem_legenda = []
         
         print(f"Iniciando classificação de {len(legendas)} posts...")
         
@@ -24,7 +240,10 @@ def classificar_posts_gemini(df_posts_para_classificar, api_key):
             print(f"  Classificando... {i + 1}/{len(legendas)} (Post ID: {row['id']})")
 
             if pd.isna(legenda) or legenda.strip() == "":
-                resultados.append({'id': row['id'], 'categoria': 'Sem legenda'})
+                if usar_imagens:
+                    sem_legenda.append(row['id'])
+                else:
+                    resultados.append(_resultado(row['id'], 'Sem legenda', VERSAO_SEM_LEGENDA))
                 continue
                 
             # O seu prompt de classificação (exatamente como estava)
@@ -45,31 +264,21 @@ def classificar_posts_gemini(df_posts_para_classificar, api_key):
                 # Limpa a resposta da IA (remove espaços, *, etc.)
                 categoria = response.text.strip().replace("*", "") 
 
-                # Sua lógica de validação (exatamente como estava)
-                categorias_validas = ['Institucional', 'Conteúdo técnico', 'Engajamento', 'Data comemorativa']
-                if categoria not in categorias_validas:
-                    if 'institucional' in categoria.lower() or 'venda' in categoria.lower():
-                        categoria = 'Institucional'
-                    elif 'técnico' in categoria.lower() or 'educati' in categoria.lower() or 'dica' in categoria.lower():
-                        categoria = 'Conteúdo técnico'
-                    elif 'engajament' in categoria.lower() or 'interaç' in categoria.lower() or 'pergunta' in categoria.lower():
-                        categoria = 'Engajamento'
-                    elif 'data' in categoria.lower() or 'comemorati' in categoria.lower():
-                        categoria = 'Data comemorativa'
-                    else:
-                        categoria = 'Outros' # Categoria padrão
+                categoria = _normalizar_categoria(categoria)
                 
-                resultados.append({'id': row['id'], 'categoria': categoria})
+                resultados.append(_resultado(row['id'], categoria, VERSAO_PROMPT, model.nome))
                 
                 # Pausa de 1 segundo para não sobrecarregar a API
-                time.sleep(1) 
-                print("REQUISIÇÃO DA CLASSIFICAÇÃO")
+                time.sleep(PAUSA_ENTRE_CHAMADAS)
                 
             except Exception as e:
                 print(f"    Erro ao classificar post ID {row['id']}: {str(e)[:100]}...")
-                print("REQUISIÇÃO QUE TEVE ERRO")
-                resultados.append({'id': row['id'], 'categoria': 'Erro na Classificação'})
+                resultados.append(_resultado(row['id'], 'Erro na Classificação', VERSAO_PROMPT, model.nome))
         
+        if sem_legenda:
+            df_sem_legenda = df_posts_para_classificar[df_posts_para_classificar['id'].isin(sem_legenda)]
+            resultados.extend(classificar_por_imagem(df_sem_legenda[['id', 'miniatura']], api_key, modelo))
+
         print("Classificação concluída.")
         return resultados
         
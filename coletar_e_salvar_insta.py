@@ -1,15 +1,19 @@
 # coletar_e_salvar_insta.py
 
-import pandas as pd
 from instagrapi import Client
 from instagrapi.exceptions import LoginRequired
 import os
 import sys 
 
+import metricas
+import perfilador
+from governador_instagram import governar_cliente
+from teste_coletar import coletar_posts_instagram
+
 # --- [ETAPA 1] IMPORTAR AS FERRAMENTAS ---
 
-# Importa as funções do Supabase que você criou e testou
-from supabase_utils import init_connection, save_posts_to_supabase
+# Importa a interface de armazenamento (Supabase por padrão, ver storage_backend.py)
+from storage_backend import obter_backend
 
 # Importa suas credenciais e configurações
 # Lembre-se: este arquivo DEVE estar na pasta raiz, NÃO dentro de .github
@@ -34,87 +38,70 @@ def main():
     print("--- INICIANDO PROCESSO DE COLETA E SALVAMENTO ---")
     if len(sys.argv) < 2:
         print("❌ ERRO: Você esqueceu de passar o nome do usuário.")
-        print(f"Uso correto: python {sys.argv[0]} nome_do_usuario")
+        print(f"Uso correto: python {sys.argv[0]} nome_do_usuario [--profile]")
         return
     USUARIO_ALVO = sys.argv[1].replace('@', '')
     print(f"🎯 Usuário alvo definido: @{USUARIO_ALVO}")
     
-    # --- [ETAPA 2] CONECTAR AO SUPABASE ---
-    print("\n[ETAPA 2/4] Conectando ao Supabase...")
-    try:
-        supabase_client = init_connection()
-        print("✅ Conexão com o Supabase bem-sucedida!")
-    except Exception as e:
-        print(f"❌ FALHA AO CONECTAR AO SUPABASE: {e}")
-        return
+    # --- [ETAPA 2] CONECTAR AO BANCO ---
+    print("\n[ETAPA 2/4] Conectando ao banco de dados...")
+    backend = obter_backend("supabase")
+    if backend.client is not None:
+        print(f"✅ Conexão com o banco ({backend.nome}) bem-sucedida!")
+        backend.reenviar_spool()
+    else:
+        # Segue com a coleta: os posts vão para o spool local e são
+        # reenviados na próxima execução com o banco disponível.
+        print("ℹ️ Os posts coletados serão guardados no spool local.")
 
     # --- [ETAPA 3] CONECTAR E EXTRAIR DO INSTAGRAM ---
     print("\n[ETAPA 3/4] Conectando ao Instagram...")
     cl = Client()
+    metricas.instrumentar_cliente_instagram(cl)
+    governar_cliente(cl, SEU_NOME_DE_USUARIO)
     
-    try:
-        if os.path.exists(ARQUIVO_SESSAO):
-            cl.load_settings(ARQUIVO_SESSAO)
-            print("Sessão do Instagram carregada.")
+    with metricas.cronometro("instagram_login"):
+        try:
+            if os.path.exists(ARQUIVO_SESSAO):
+                cl.load_settings(ARQUIVO_SESSAO)
+                print("Sessão do Instagram carregada.")
+                cl.login(SEU_NOME_DE_USUARIO, SUA_SENHA)
+                cl.get_timeline_feed() # Verifica se a sessão é válida
+                print("Login via sessão bem-sucedido.")
+            else:
+                raise FileNotFoundError # Força o login padrão
+
+        except (FileNotFoundError, LoginRequired):
+            print("Sessão não encontrada ou expirada. Fazendo login com usuário e senha...")
             cl.login(SEU_NOME_DE_USUARIO, SUA_SENHA)
-            cl.get_timeline_feed() # Verifica se a sessão é válida
-            print("Login via sessão bem-sucedido.")
-        else:
-            raise FileNotFoundError # Força o login padrão
-
-    except (FileNotFoundError, LoginRequired):
-        print("Sessão não encontrada ou expirada. Fazendo login com usuário e senha...")
-        cl.login(SEU_NOME_DE_USUARIO, SUA_SENHA)
-        cl.dump_settings(ARQUIVO_SESSAO)
-        print("Nova sessão salva.")
-
-    print(f"\nBuscando os últimos {QUANTIDADE_DE_POSTS} posts de @{USUARIO_ALVO}...")
-    
-    lista_de_posts = [] # Lista para guardar os dicionários de posts
+            cl.dump_settings(ARQUIVO_SESSAO)
+            print("Nova sessão salva.")
 
-    try:
-        user_id = cl.user_id_from_username(USUARIO_ALVO)
-        medias = cl.user_medias(user_id, QUANTIDADE_DE_POSTS)
-        
-        print(f"--- DADOS EXTRAÍDOS ({len(medias)} posts encontrados) ---")
+    # Mesma coleta do dashboard: paginada, com retomada do cursor se o Instagram pedir pausa
+    with perfilador.etapa("1_coleta"):
+        df_para_salvar = coletar_posts_instagram(cl, USUARIO_ALVO, QUANTIDADE_DE_POSTS)
 
-        for media in medias:
-            # CORREÇÃO DA LEGENDA: Salva a legenda completa
-            legenda_completa = media.caption_text or "" # Pega o texto completo ou uma string vazia
-
-            # Criar um dicionário com os nomes de coluna exatos
-            # que a sua função 'save_posts_to_supabase' espera
-            post_data = {
-                'data': media.taken_at.strftime("%Y-%m-%d %H:%M:%S"),
-                'id': media.pk, # 'id' no seu teste era o 'post_pk'
-                'num': media.media_type, # 'num' no seu teste era o 'media_type_id'
-                'curtidas': media.like_count,
-                'comentarios': media.comment_count,
-                'legenda': legenda_completa,
-                'link': f"https://www.instagram.com/p/{media.code}/"
-            }
-            lista_de_posts.append(post_data)
-
-    except Exception as e:
-        print(f"Ocorreu um erro ao buscar os posts: {e}")
-        return
-
-    # --- [ETAPA 4] SALVAR NO SUPABASE ---
-    print("\n[ETAPA 4/4] Salvando dados no Supabase...")
+    # --- [ETAPA 4] SALVAR NO BANCO ---
+    print("\n[ETAPA 4/4] Salvando dados no banco...")
     
-    if not lista_de_posts:
+    if df_para_salvar.empty:
         print("Nenhum post foi encontrado para salvar.")
         return
 
-    # Converter a lista de dicionários em um DataFrame
-    df_para_salvar = pd.DataFrame(lista_de_posts)
-    
     # Chamar sua função de salvamento testada!
-    save_posts_to_supabase(supabase_client, df_para_salvar, USUARIO_ALVO)
+    with perfilador.etapa("2_salvar"):
+        backend.upsert_posts(df_para_salvar, USUARIO_ALVO)
     
     print("\n--- PROCESSO CONCLUÍDO ---")
 
 
 # Executa a função principal
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # --profile: amostra as pilhas e os picos de memória da execução (perfilador.py)
+    perfilar = "--profile" in sys.argv
+    if perfilar:
+        sys.argv.remove("--profile")
+    with metricas.execucao(script="coletar_e_salvar_insta") as run_id, \
+            perfilador.perfilar(run_id, ativo=perfilar, rotulo="coletar_e_salvar_insta"):
+        main()
+    print(metricas.exportar_json(run_id))
\ No newline at end of file
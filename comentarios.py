@@ -0,0 +1,222 @@
+# comentarios.py
+# Comentários dos posts, coletados aos poucos e guardados numa tabela/coleção
+# 'comments' (um registro por comentário).
+#
+# A coleta de cada post começa pelos comentários mais novos e para no último
+# já guardado (os ids dos comentários só crescem), com um teto por post. Assim
+# cada rodada baixa só o que chegou desde a anterior. A busca no Instagram fica
+# em teste_coletar.coletar_comentarios_instagram; aqui ficam o schema, a
+# gravação em lote no Supabase/MongoDB e a rodada completa de um perfil.
+#
+# Como a retomada parte do comentário mais novo guardado, um lote que falhou
+# não seria buscado de novo depois que um lote mais novo do mesmo post
+# entrasse: os comentários que não entraram vão para o spool local
+# (spool_local.py) e são reenviados junto com os posts.
+#
+# Uso:
+#     python comentarios.py perfil [--posts 20] [--limite-por-post 100]
+
+import argparse
+
+import pandas as pd
+
+import metricas
+from lotes_supabase import registros_com_falha, resumir, upsert_em_lotes
+
+TABELA_COMENTARIOS = "comments"    # Supabase
+COLECAO_COMENTARIOS = "comments"   # MongoDB
+
+COLUNAS_COMENTARIOS = ['comment_pk', 'post_pk', 'username', 'author_username', 'text', 'like_count', 'created_at']
+
+# Padrões de uma rodada
+POSTS_POR_RODADA = 20
+LIMITE_POR_POST = 100
+CONCORRENCIA_COMENTARIOS = 4
+
+# Linhas por insert em lote
+TAMANHO_LOTE_COMENTARIOS = 500
+
+# DDL para rodar uma vez no SQL Editor do Supabase.
+# A função devolve o último comentário guardado de cada post em 1 round trip.
+SQL_COMENTARIOS = """
+create table if not exists comments (
+    comment_pk      text primary key,
+    post_pk         text not null,
+    username        text not null,
+    author_username text,
+    text            text,
+    like_count      integer,
+    created_at      timestamptz
+);
+create index if not exists comments_post_pk on comments (post_pk);
+
+create or replace function ultimos_comentarios(pks text[])
+returns table (post_pk text, comment_pk text) language sql stable as $$
+    select post_pk, max(comment_pk::numeric)::text
+    from comments
+    where post_pk = any(pks)
+    group by post_pk;
+$$;
+"""
+
+
+def registros_comentarios(df: pd.DataFrame):
+    df = df.reindex(columns=COLUNAS_COMENTARIOS)
+    return df.astype(object).where(df.notna(), None).to_dict(orient='records')
+
+
+# -----------------------------------------------------------------------------
+# SUPABASE
+# -----------------------------------------------------------------------------
+def salvar_comentarios_supabase(supabase_client, df: pd.DataFrame):
+    """
+    Insere os comentários em lotes; os que já existem são ignorados (ON CONFLICT DO NOTHING).
+    Returns:
+        tuple: (comentários gravados, registros que não foram gravados)
+    """
+    registros = registros_comentarios(df)
+    resultados = upsert_em_lotes(supabase_client, TABELA_COMENTARIOS, registros, on_conflict="comment_pk",
+                                 ignore_duplicates=True, max_linhas=TAMANHO_LOTE_COMENTARIOS)
+    falhas = registros_com_falha(resultados)
+    if falhas:
+        print(f"⚠️ Comentários gravados em parte: {resumir(resultados)}")
+    return len(registros) - len(falhas), falhas
+
+
+def ultimos_comentarios_supabase(supabase_client, post_pks: list):
+    dados = supabase_client.rpc('ultimos_comentarios', {'pks': [str(pk) for pk in post_pks]}).execute().data or []
+    return {linha['post_pk']: linha['comment_pk'] for linha in dados}
+
+
+def fetch_comentarios_supabase(supabase_client, post_pks: list):
+    dados = []
+    pks = [str(pk) for pk in post_pks]
+    for inicio in range(0, len(pks), TAMANHO_LOTE_COMENTARIOS):
+        dados.extend(
+            supabase_client.table(TABELA_COMENTARIOS).select("*")
+            .in_("post_pk", pks[inicio:inicio + TAMANHO_LOTE_COMENTARIOS]).execute().data or []
+        )
+    return pd.DataFrame(dados, columns=COLUNAS_COMENTARIOS)
+
+
+# -----------------------------------------------------------------------------
+# MONGODB
+# -----------------------------------------------------------------------------
+_indice_comentarios_criado = False
+
+
+def _colecao_comentarios(client):
+    global _indice_comentarios_criado
+    colecao = client["agente_macfor"][COLECAO_COMENTARIOS]
+    if not _indice_comentarios_criado:
+        colecao.create_index("comment_pk", unique=True)
+        colecao.create_index("post_pk")
+        _indice_comentarios_criado = True
+    return colecao
+
+
+def salvar_comentarios_mongodb(client, df: pd.DataFrame):
+    """
+    insert_many sem ordem: os duplicados (índice único) são ignorados e o resto entra.
+    Returns:
+        tuple: (comentários gravados, registros que não foram gravados)
+    """
+    pymongo_erros = metricas.importar("pymongo.errors")
+    registros = registros_comentarios(df)
+    if not registros:
+        return 0, []
+    try:
+        resultado = _colecao_comentarios(client).insert_many(registros, ordered=False)
+        return len(resultado.inserted_ids), []
+    except pymongo_erros.BulkWriteError as e:
+        # Duplicado (11000) já está guardado; os outros erros não entraram
+        falhas = [registros[erro['index']] for erro in e.details.get('writeErrors', []) if erro.get('code') != 11000]
+        return e.details.get('nInserted', 0), falhas
+
+
+def ultimos_comentarios_mongodb(client, post_pks: list):
+    cursor = _colecao_comentarios(client).aggregate([
+        {"$match": {"post_pk": {"$in": [str(pk) for pk in post_pks]}}},
+        {"$group": {"_id": "$post_pk", "ultimo": {"$max": {"$toDecimal": "$comment_pk"}}}},
+    ])
+    return {linha['_id']: str(linha['ultimo']) for linha in cursor}
+
+
+def fetch_comentarios_mongodb(client, post_pks: list):
+    cursor = _colecao_comentarios(client).find({"post_pk": {"$in": [str(pk) for pk in post_pks]}}, {"_id": 0})
+    return pd.DataFrame(list(cursor), columns=COLUNAS_COMENTARIOS)
+
+
+# -----------------------------------------------------------------------------
+# RODADA DE UM PERFIL
+# -----------------------------------------------------------------------------
+def coletar_comentarios_perfil(backend, insta_client, perfil: str, qtd_posts: int = POSTS_POR_RODADA,
+                               limite_por_post: int = LIMITE_POR_POST, concorrencia: int = CONCORRENCIA_COMENTARIOS):
+    """
+    Baixa os comentários novos dos posts mais recentes do perfil e grava em lote.
+
+    Args:
+        backend: Qualquer StorageBackend (ver storage_backend.py).
+        insta_client: Client do instagrapi logado ou PoolInstagram (usa a conta dona do perfil).
+        perfil (str): Perfil, com ou sem '@'.
+        qtd_posts (int): Posts mais recentes que entram na rodada.
+        limite_por_post (int): Máximo de comentários novos por post.
+        concorrencia (int): Posts buscados ao mesmo tempo.
+    Returns:
+        int: Comentários novos gravados (os que falharam ficam no spool local).
+    """
+    from teste_coletar import coletar_comentarios_instagram
+
+    perfil = perfil.replace('@', '')
+    df_posts = backend.fetch_posts(perfil, limit=qtd_posts, colunas=['id', 'comentarios'])
+    if df_posts.empty:
+        print(f"ℹ️ Nenhum post de @{perfil} no banco.")
+        return 0
+    # Post sem comentário nenhum não gasta requisição
+    comentarios = pd.to_numeric(df_posts['comentarios'], errors='coerce')
+    post_pks = df_posts.loc[comentarios.isna() | (comentarios > 0), 'id'].astype(str).tolist()
+    if not post_pks:
+        return 0
+
+    cl = insta_client.cliente_para(perfil)[1] if hasattr(insta_client, 'cliente_para') else insta_client
+    if cl is None:
+        print(f"❌ Nenhuma conta coletora disponível para @{perfil}.")
+        return 0
+
+    ultimos = backend.ultimos_comentarios(post_pks)
+    df_novos = coletar_comentarios_instagram(cl, post_pks, ultimos, limite_por_post, concorrencia)
+    if df_novos.empty:
+        print(f"✅ Nenhum comentário novo nos posts de @{perfil}.")
+        return 0
+    gravados = backend.salvar_comentarios(df_novos.assign(username=perfil))
+    if gravados < len(df_novos):
+        print(f"⚠️ Só {gravados} de {len(df_novos)} comentários novos de @{perfil} gravados.")
+    else:
+        print(f"✅ {gravados} comentários novos de @{perfil} gravados.")
+    return gravados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coleta os comentários novos dos posts de um perfil.")
+    parser.add_argument('perfil')
+    parser.add_argument('--posts', type=int, default=POSTS_POR_RODADA)
+    parser.add_argument('--limite-por-post', type=int, default=LIMITE_POR_POST)
+    parser.add_argument('--concorrencia', type=int, default=CONCORRENCIA_COMENTARIOS)
+    parser.add_argument('--backend', default="supabase")
+    args = parser.parse_args()
+
+    from contas_instagram import PoolInstagram
+    from storage_backend import obter_backend
+
+    backend = obter_backend(args.backend)
+    if backend.client is None:
+        print("❌ Sem conexão com o banco.")
+        return
+    with metricas.execucao(script="comentarios", perfil=args.perfil.replace('@', '')) as run_id:
+        coletar_comentarios_perfil(backend, PoolInstagram(), args.perfil, args.posts,
+                                   args.limite_por_post, args.concorrencia)
+    print(metricas.exportar_json(run_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+# comparativo_perfis.py
+# Benchmarking de N perfis para a Análise de Concorrência.
+#
+# Antes a comparação era de no máximo dois perfis, com as médias brutas de
+# curtidas e comentários: um perfil com 10x mais seguidores "ganhava" sempre.
+# Aqui cada perfil ganha uma linha na matriz de comparação:
+# - engajamento normalizado: (curtidas + comentários) por post / seguidores;
+# - cadência: posts por semana no período coletado e intervalo mediano;
+# - participação de cada categoria no conteúdo do perfil (e a taxa de
+#   engajamento de cada categoria);
+# - percentil de cada métrica entre os perfis comparados.
+#
+# Tudo é calculado com groupby/crosstab sobre o dataset inteiro, numa
+# passada. A parte que depende só dos posts é derivada do dataset
+# compartilhado (datasets_compartilhados.py), ou seja, calculada uma vez por
+# versão dos dados; juntar os seguidores e os percentis é uma conta de
+# poucas linhas por rerun.
+#
+# Os seguidores vêm do Instagram (user_info_by_username, pela conta do pool
+# responsável pelo perfil) e ficam no SQLite de estado do Instagram
+# (governador_instagram.ARQUIVO_ESTADO_INSTAGRAM) por VALIDADE_SEGUIDORES_S.
+
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+import metricas
+from estatisticas_perfil import SEM_CATEGORIA
+from governador_instagram import ARQUIVO_ESTADO_INSTAGRAM
+
+try:
+    from config import VALIDADE_SEGUIDORES_S
+except ImportError:
+    VALIDADE_SEGUIDORES_S = 24 * 3600
+
+COLUNAS_COMPARATIVO = ['perfil', 'seguidores', 'posts', 'media_curtidas', 'media_comentarios',
+                       'engajamento_medio', 'taxa_engajamento', 'posts_por_semana',
+                       'intervalo_mediano_dias', 'categoria_principal']
+
+# Métricas com percentil entre os perfis (quanto maior, melhor)
+METRICAS_PERCENTIL = ['seguidores', 'engajamento_medio', 'taxa_engajamento', 'posts_por_semana']
+
+# Posts por perfil enviados ao prompt como exemplo de legenda
+POSTS_POR_PERFIL_PROMPT = 3
+
+
+# -----------------------------------------------------------------------------
+# SEGUIDORES (cache local)
+# -----------------------------------------------------------------------------
+@contextmanager
+def _conectar(caminho=None):
+    """Conexão com o cache: confirma ao sair do bloco (desfaz em erro) e fecha o arquivo."""
+    conn = sqlite3.connect(caminho or ARQUIVO_ESTADO_INSTAGRAM, timeout=30)
+    try:
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS seguidores ("
+                " perfil TEXT PRIMARY KEY, seguidores INTEGER NOT NULL, atualizado_em REAL NOT NULL)"
+            )
+            yield conn
+    finally:
+        conn.close()
+
+
+def _buscar_seguidores(pool, perfil: str):
+    # Aceita o PoolInstagram (conta responsável pelo perfil) ou um Client já logado
+    cl = pool.cliente_para(perfil)[1] if hasattr(pool, 'cliente_para') else pool
+    if cl is None:
+        return None
+    with metricas.cronometro("instagram_seguidores"):
+        return int(cl.user_info_by_username(perfil).follower_count)
+
+
+def obter_seguidores(perfis: list, pool=None, caminho: str = None, validade_s: float = VALIDADE_SEGUIDORES_S):
+    """
+    Seguidores de cada perfil: do cache local e, para os que faltam ou
+    venceram, do Instagram (se houver 'pool').
+
+    Args:
+        perfis (list[str]): Perfis, com ou sem '@'.
+        pool: PoolInstagram ou Client do instagrapi. None = só o cache (rotas CSV/Parquet).
+        caminho (str): SQLite de estado (padrão: ARQUIVO_ESTADO_INSTAGRAM).
+        validade_s (float): Idade máxima de um valor do cache.
+    Returns:
+        dict: perfil -> seguidores (None se nunca foi obtido). Um valor vencido
+            continua valendo se a consulta ao Instagram falhar.
+    """
+    perfis = list(dict.fromkeys(str(p).replace('@', '') for p in perfis))
+    if not perfis:
+        return {}
+    with _conectar(caminho) as conn:
+        salvos = {perfil: (seguidores, atualizado_em) for perfil, seguidores, atualizado_em in conn.execute(
+            f"SELECT perfil, seguidores, atualizado_em FROM seguidores WHERE perfil IN ({','.join('?' * len(perfis))})",
+            perfis
+        )}
+    resultado = {perfil: salvos[perfil][0] if perfil in salvos else None for perfil in perfis}
+
+    agora = time.time()
+    vencidos = [p for p in perfis if p not in salvos or agora - salvos[p][1] > validade_s]
+    for perfil in perfis:
+        metricas.registrar_cache("seguidores", acerto=perfil not in vencidos)
+    if pool is None or not vencidos:
+        return resultado
+
+    def buscar(perfil):
+        try:
+            return perfil, _buscar_seguidores(pool, perfil)
+        except Exception as e:
+            print(f"⚠️ Não foi possível obter os seguidores de @{perfil}: {e}")
+            metricas.incrementar("instagram_seguidores_erro", perfil=perfil)
+            return perfil, None
+
+    # Uma thread por conta do pool: cada conta continua no ritmo do seu governador
+    with ThreadPoolExecutor(max_workers=max(1, len(getattr(pool, 'contas', ())))) as executor:
+        novos = {perfil: valor for perfil, valor in executor.map(metricas.no_contexto_atual(buscar), vencidos)
+                 if valor is not None}
+    if novos:
+        with _conectar(caminho) as conn:
+            conn.executemany(
+                "INSERT INTO seguidores (perfil, seguidores, atualizado_em) VALUES (?, ?, ?) "
+                "ON CONFLICT(perfil) DO UPDATE SET seguidores = excluded.seguidores, atualizado_em = excluded.atualizado_em",
+                [(perfil, valor, agora) for perfil, valor in novos.items()]
+            )
+        resultado.update(novos)
+    return resultado
+
+
+# -----------------------------------------------------------------------------
+# MATRIZ DE COMPARAÇÃO
+# -----------------------------------------------------------------------------
+class ComparativoPerfis:
+    """
+    Matriz de benchmarking dos perfis.
+
+    Args:
+        tabela (pd.DataFrame): Uma linha por perfil (índice 'perfil'), COLUNAS_COMPARATIVO
+            e, depois de com_seguidores, 'pct_<métrica>' para METRICAS_PERCENTIL.
+        participacao (pd.DataFrame): % dos posts de cada perfil (linhas) em cada categoria (colunas).
+        engajamento_categoria (pd.DataFrame): Engajamento médio por post de cada perfil em cada categoria.
+        exemplos (pd.DataFrame): Os POSTS_POR_PERFIL_PROMPT posts mais engajados de cada perfil.
+        seguidores (pd.Series): Seguidores por perfil (NaN = desconhecido).
+    """
+
+    def __init__(self, tabela: pd.DataFrame, participacao: pd.DataFrame, engajamento_categoria: pd.DataFrame,
+                 exemplos: pd.DataFrame, seguidores: pd.Series = None):
+        self.tabela = tabela
+        self.participacao = participacao
+        self.engajamento_categoria = engajamento_categoria
+        self.exemplos = exemplos
+        self.seguidores = seguidores if seguidores is not None else pd.Series(np.nan, index=tabela.index)
+
+    @classmethod
+    def de_posts(cls, df_posts: pd.DataFrame):
+        """
+        Parte que depende só dos posts (formato do app: 'perfil', 'data',
+        'categoria', 'curtidas', 'comentarios', 'legenda'). Sem seguidores.
+        """
+        indice = df_posts.index
+        base = pd.DataFrame({
+            'perfil': df_posts['perfil'].astype(str),
+            'data': pd.to_datetime(df_posts['data'], errors='coerce', utc=True, format='ISO8601'),
+            'categoria': (df_posts['categoria'] if 'categoria' in df_posts.columns else pd.Series('', index=indice))
+            .astype('string').fillna('').str.strip().replace('', SEM_CATEGORIA),
+            'curtidas': pd.to_numeric(df_posts['curtidas'], errors='coerce').fillna(0),
+            'comentarios': pd.to_numeric(df_posts['comentarios'], errors='coerce').fillna(0),
+        })
+        base['engajamento'] = base['curtidas'] + base['comentarios']
+
+        tabela = base.groupby('perfil').agg(
+            posts=('engajamento', 'size'),
+            media_curtidas=('curtidas', 'mean'),
+            media_comentarios=('comentarios', 'mean'),
+            engajamento_medio=('engajamento', 'mean'),
+            primeira=('data', 'min'),
+            ultima=('data', 'max'),
+        )
+        # Cadência: posts por semana no período coletado (pelo menos uma semana)
+        semanas = ((tabela['ultima'] - tabela['primeira']).dt.total_seconds() / (7 * 86400)).clip(lower=1).fillna(1)
+        tabela['posts_por_semana'] = tabela['posts'] / semanas
+        ordenado = base.sort_values(['perfil', 'data'], kind='stable')
+        intervalos = ordenado.groupby('perfil')['data'].diff().dt.total_seconds() / 86400
+        tabela['intervalo_mediano_dias'] = intervalos.groupby(ordenado['perfil']).median()
+
+        participacao = pd.crosstab(base['perfil'], base['categoria'], normalize='index') * 100
+        tabela['categoria_principal'] = participacao.idxmax(axis=1)
+        engajamento_categoria = base.pivot_table(index='perfil', columns='categoria', values='engajamento',
+                                                 aggfunc='mean', observed=True)
+
+        colunas_exemplo = [c for c in ('perfil', 'data', 'categoria', 'curtidas', 'comentarios', 'legenda')
+                           if c in df_posts.columns]
+        ordem = base['engajamento'].to_numpy().argsort(kind='stable')[::-1]
+        exemplos = df_posts.iloc[ordem].groupby(base['perfil'].iloc[ordem]).head(POSTS_POR_PERFIL_PROMPT)[colunas_exemplo]
+
+        tabela = tabela.drop(columns=['primeira', 'ultima'])
+        return cls(tabela, participacao, engajamento_categoria, exemplos.reset_index(drop=True))
+
+    def com_seguidores(self, seguidores: dict):
+        """
+        Nova matriz com os seguidores, a taxa de engajamento e os percentis
+        (a original, compartilhada pelo dataset, não muda).
+        """
+        serie = pd.to_numeric(pd.Series(seguidores or {}, dtype=object), errors='coerce')
+        serie = serie.reindex(self.tabela.index).astype(float)
+        validos = serie.where(serie > 0)
+
+        tabela = self.tabela.assign(
+            seguidores=serie,
+            taxa_engajamento=self.tabela['engajamento_medio'] / validos * 100,
+        )
+        # Percentil entre os perfis comparados (100 = o maior); NaN fica sem percentil
+        percentis = tabela[METRICAS_PERCENTIL].rank(pct=True, method='max') * 100
+        tabela = tabela.reindex(columns=COLUNAS_COMPARATIVO[1:]).join(percentis.add_prefix('pct_'))
+        return ComparativoPerfis(tabela, self.participacao, self.engajamento_categoria, self.exemplos, serie)
+
+    @property
+    def perfis(self):
+        return list(self.tabela.index)
+
+    def taxa_por_categoria(self):
+        """Taxa de engajamento (% dos seguidores) de cada perfil em cada categoria."""
+        return self.engajamento_categoria.div(self.seguidores.where(self.seguidores > 0), axis=0) * 100
+
+    def ranking(self, metrica: str = 'taxa_engajamento'):
+        """Tabela ordenada pela métrica (maior primeiro), com 'perfil' como coluna."""
+        return self.tabela.sort_values(metrica, ascending=False, na_position='last').reset_index()
+
+    def para_prompt(self, tamanho_legenda: int = 300):
+        """
+        Textos em Markdown para o prompt da concorrência.
+        Returns:
+            dict: 'matriz', 'participacao', 'taxa_categoria' e 'exemplos'.
+        """
+        metrica = 'taxa_engajamento' if self.seguidores.notna().any() else 'engajamento_medio'
+        exemplos = self.exemplos
+        if 'legenda' in exemplos.columns:
+            exemplos = exemplos.assign(legenda=exemplos['legenda'].astype('string').fillna('').str.slice(0, tamanho_legenda))
+        return {
+            'matriz': self.ranking(metrica).to_markdown(index=False, floatfmt=".2f"),
+            'participacao': self.participacao.round(1).to_markdown(floatfmt=".1f"),
+            'taxa_categoria': (self.taxa_por_categoria() if metrica == 'taxa_engajamento'
+                               else self.engajamento_categoria).to_markdown(floatfmt=".2f"),
+            'exemplos': exemplos.to_markdown(index=False),
+        }
+
+
+def comparar(dataset, seguidores: dict = None):
+    """
+    Matriz de comparação de um DatasetCompartilhado: a parte dos posts é
+    calculada uma vez por versão dos dados; os seguidores entram por cima.
+    """
+    base = dataset.derivado('comparativo', ComparativoPerfis.de_posts)
+    return base.com_seguidores(seguidores)
@@ -0,0 +1,199 @@
+# contas_instagram.py
+# Pool de contas coletoras do Instagram.
+#
+# Cada conta tem sua sessão (arquivo do instagrapi), seu proxy e seu próprio
+# governador (governador_instagram.py). Os perfis-alvo são distribuídos entre
+# as contas por hash consistente: o mesmo perfil cai sempre na mesma conta, e
+# incluir/retirar uma conta só remaneja os perfis dela. Se a conta do perfil
+# estiver suspensa (desafio, feedback) ou não conseguir logar, a coleta passa
+# para a próxima conta do anel, continuando do cursor guardado.
+#
+# Configuração (config.py):
+#     CONTAS_INSTAGRAM = [
+#         {'usuario': 'coletor1', 'senha': '...', 'sessao': 'sessao_coletor1.json', 'proxy': 'http://...'},
+#         {'usuario': 'coletor2', 'senha': '...'},
+#     ]
+# Sem CONTAS_INSTAGRAM, o pool tem só a conta SEU_NOME_DE_USUARIO/SUA_SENHA.
+
+import bisect
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import metricas
+from governador_instagram import PAUSA_CIRCUITO_S, obter_governador
+from teste_coletar import ARQUIVO_SESSAO, SEU_NOME_DE_USUARIO, SUA_SENHA, coletar_posts_instagram, login_instagram
+
+try:
+    from config import CONTAS_INSTAGRAM
+except ImportError:
+    CONTAS_INSTAGRAM = []
+
+# Pontos de cada conta no anel (mais pontos = divisão mais uniforme)
+REPLICAS_POR_CONTA = 64
+
+
+def _hash(texto: str):
+    return int.from_bytes(hashlib.md5(texto.encode()).digest()[:8], 'big')
+
+
+def contas_do_config():
+    """Contas do config.py, cada uma com 'usuario', 'senha', 'sessao' e 'proxy'."""
+    contas = CONTAS_INSTAGRAM or [{'usuario': SEU_NOME_DE_USUARIO, 'senha': SUA_SENHA, 'sessao': ARQUIVO_SESSAO}]
+    return [
+        {
+            'usuario': conta['usuario'],
+            'senha': conta['senha'],
+            'sessao': conta.get('sessao') or f"sessao_{conta['usuario']}.json",
+            'proxy': conta.get('proxy'),
+        }
+        for conta in contas
+    ]
+
+
+class AnelConsistente:
+    """
+    Hash consistente de perfis para contas.
+
+    Args:
+        nomes (list[str]): Nomes das contas.
+        replicas (int): Pontos de cada conta no anel.
+    """
+
+    def __init__(self, nomes: list, replicas: int = REPLICAS_POR_CONTA):
+        pontos = sorted((_hash(f"{nome}#{i}"), nome) for nome in nomes for i in range(replicas))
+        self._chaves = [chave for chave, _ in pontos]
+        self._nomes = [nome for _, nome in pontos]
+        self.total = len(set(nomes))
+
+    def preferencia(self, perfil: str):
+        """Contas na ordem em que o perfil deve tentar (dona primeiro, depois as substitutas)."""
+        ordem = []
+        if not self._chaves:
+            return ordem
+        inicio = bisect.bisect(self._chaves, _hash(perfil.replace('@', '').lower()))
+        for i in range(len(self._chaves)):
+            nome = self._nomes[(inicio + i) % len(self._chaves)]
+            if nome not in ordem:
+                ordem.append(nome)
+                if len(ordem) == self.total:
+                    break
+        return ordem
+
+
+class PoolInstagram:
+    """
+    Contas coletoras com login sob demanda e failover.
+    Pode ser passado no lugar do Client para o coletar_posts_instagram e para o
+    pipeline.processar_perfil.
+
+    Args:
+        contas (list[dict]): Ver contas_do_config().
+        login (callable): (usuario, senha, arquivo_sessao, proxy) -> Client ou None.
+    """
+
+    def __init__(self, contas: list = None, login=login_instagram):
+        self.contas = {conta['usuario']: conta for conta in (contas if contas is not None else contas_do_config())}
+        self.anel = AnelConsistente(list(self.contas))
+        self._login = login
+        self._clientes = {}
+        # usuario -> horário até quando a conta fica fora (falha de login)
+        self._fora_ate = {}
+        self._travas = {usuario: threading.Lock() for usuario in self.contas}
+
+    def _disponivel(self, usuario: str):
+        if self._fora_ate.get(usuario, 0) > time.time():
+            return False
+        return not obter_governador(usuario).suspensa_ate()
+
+    def _cliente(self, usuario: str):
+        with self._travas[usuario]:
+            if usuario not in self._clientes:
+                conta = self.contas[usuario]
+                cl = self._login(conta['usuario'], conta['senha'], conta['sessao'], conta.get('proxy'))
+                if cl is None:
+                    self._fora_ate[usuario] = time.time() + PAUSA_CIRCUITO_S
+                    metricas.incrementar("instagram_conta_indisponivel", conta=usuario, motivo="login")
+                    return None
+                self._clientes[usuario] = cl
+            return self._clientes[usuario]
+
+    def cliente_para(self, perfil: str):
+        """
+        Cliente logado da conta responsável pelo perfil (ou da próxima disponível).
+        Returns:
+            tuple: (usuario, Client) ou (None, None) se nenhuma conta estiver disponível.
+        """
+        for usuario in self.anel.preferencia(perfil):
+            if not self._disponivel(usuario):
+                continue
+            cl = self._cliente(usuario)
+            if cl is not None:
+                return usuario, cl
+        return None, None
+
+    def coletar_posts(self, perfil: str, quantidade: int):
+        """
+        Coleta pela conta do perfil; se ela for suspensa no meio, continua
+        pela próxima do anel até completar a quantidade ou acabarem as contas.
+        Returns:
+            pd.DataFrame: Posts no formato do app (ver coletar_posts_instagram).
+        """
+        perfil = perfil.replace('@', '')
+        partes = []
+        tentadas = set()
+        while True:
+            usuario, cl = self.cliente_para(perfil)
+            if cl is None or usuario in tentadas:
+                if not partes:
+                    print(f"❌ Nenhuma conta coletora disponível para @{perfil}.")
+                break
+            tentadas.add(usuario)
+            if len(tentadas) > 1:
+                print(f"🔀 Coleta de @{perfil} passando para a conta @{usuario}.")
+                metricas.incrementar("instagram_failover", perfil=perfil, conta=usuario)
+
+            df = coletar_posts_instagram(cl, perfil, quantidade)
+            partes.append(df)
+            # Terminou sem a conta ser suspensa: a coleta está completa
+            if self._disponivel(usuario):
+                break
+
+        partes = [df for df in partes if not df.empty]
+        if not partes:
+            return pd.DataFrame()
+        return pd.concat(partes, ignore_index=True).drop_duplicates(subset='id', keep='first')
+
+    def coletar_varios(self, perfis: list, quantidade: int):
+        """
+        Coleta vários perfis em paralelo: uma fila por conta, contas em paralelo.
+        A vazão total cresce com o número de contas sem acelerar nenhuma delas.
+        Returns:
+            dict: perfil -> pd.DataFrame
+        """
+        perfis = [p.replace('@', '') for p in perfis]
+        filas = {}
+        for perfil in perfis:
+            dona = (self.anel.preferencia(perfil) or [None])[0]
+            filas.setdefault(dona, []).append(perfil)
+
+        def coletar_fila(fila):
+            return {perfil: self.coletar_posts(perfil, quantidade) for perfil in fila}
+
+        resultados = {}
+        with ThreadPoolExecutor(max_workers=max(1, len(filas))) as executor:
+            # Failover e falhas de login das filas contam no run_id de quem chamou
+            for parcial in executor.map(metricas.no_contexto_atual(coletar_fila), filas.values()):
+                resultados.update(parcial)
+        return {perfil: resultados[perfil] for perfil in perfis}
+
+    def estado(self):
+        """Situação de cada conta para o painel (governador + falhas de login)."""
+        return [
+            {**obter_governador(usuario).estado(), 'logada': usuario in self._clientes,
+             'fora_por_login': self._fora_ate.get(usuario, 0) > time.time()}
+            for usuario in self.contas
+        ]
@@ -0,0 +1,152 @@
+# datasets_compartilhados.py
+# Datasets da análise compartilhados por todas as sessões do dashboard.
+#
+# O Streamlit roda todas as sessões no mesmo processo. Antes cada sessão
+# guardava o seu df_posts, e o Menu ainda fazia cópias inteiras dele a cada
+# rerun (antes dos insights, no rename tipo -> categoria, nas abas). Aqui
+# cada dataset distinto (perfis + versão dos dados) fica uma vez só na
+# memória do processo:
+# - a chave é (perfis, versão), e a versão é um hash do conteúdo: duas
+#   sessões que carregam os mesmos posts caem no mesmo dataset, e um post
+#   novo ou uma métrica atualizada gera outra versão;
+# - o DataFrame é normalizado uma vez ao publicar ('categoria', 'perfil',
+#   atributos da legenda) e tratado como somente leitura;
+# - as sessões recebem uma visão rasa (copy(deep=False)): com o copy-on-write
+#   do pandas ela não copia os dados, e uma coluna alterada por engano numa
+#   sessão é copiada só naquela visão, sem tocar no dataset compartilhado;
+# - o que é derivado dele (índice de busca, estatísticas, médias por
+#   atributo) é calculado uma vez por dataset, não por sessão.
+#
+# Os datasets menos usados saem quando passam de MAX_DATASETS_COMPARTILHADOS
+# (sessões que ainda os usam continuam com a sua referência).
+
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import metricas
+from features_legenda import garantir_features_legenda
+
+try:
+    from config import MAX_DATASETS_COMPARTILHADOS
+except ImportError:
+    MAX_DATASETS_COMPARTILHADOS = 8
+
+_trava = threading.Lock()
+_datasets = OrderedDict()  # chave -> DatasetCompartilhado, do menos para o mais usado
+
+
+def _hash_coluna(serie: pd.Series):
+    try:
+        return pd.util.hash_pandas_object(serie, index=False).to_numpy()
+    except TypeError:
+        # Valores não hasheáveis (listas, dicts): hash do texto
+        return pd.util.hash_pandas_object(serie.astype(str), index=False).to_numpy()
+
+
+def versao_dos_dados(df: pd.DataFrame):
+    """
+    Hash do conteúdo (colunas, linhas e valores), independente da ordem das
+    linhas. Vetorizado: uma passada por coluna, sem copiar o DataFrame.
+    Returns:
+        str: 16 dígitos hexadecimais.
+    """
+    colunas = sorted(map(str, df.columns))
+    acumulado = np.zeros(len(df), dtype=np.uint64)
+    for posicao, coluna in enumerate(colunas):
+        # Multiplicador por coluna: trocar valores entre colunas muda o hash
+        acumulado ^= _hash_coluna(df[coluna]) * np.uint64(2 * posicao + 1)
+    cabecalho = pd.util.hash_pandas_object(pd.Series(colunas + [str(len(df))]), index=False).to_numpy()
+    total = int(np.bitwise_xor.reduce(cabecalho)) ^ int(acumulado.sum(dtype=np.uint64))
+    return f"{total:016x}"
+
+
+def normalizar(df: pd.DataFrame):
+    """O que o Menu fazia a cada rerun, feito uma vez: 'categoria' no lugar de 'tipo' e os atributos da legenda."""
+    if 'categoria' not in df.columns and 'tipo' in df.columns:
+        df = df.rename(columns={'tipo': 'categoria'})
+    return garantir_features_legenda(df)
+
+
+class DatasetCompartilhado:
+    """
+    Um dataset somente leitura e o que foi derivado dele.
+
+    Args:
+        chave (tuple): (perfis ordenados, versão).
+        df (pd.DataFrame): Posts já normalizados. Não deve ser alterado.
+    """
+
+    def __init__(self, chave: tuple, df: pd.DataFrame):
+        self.chave = chave
+        self.perfis, self.versao = chave
+        self._df = df
+        self._derivados = {}
+        self._trava = threading.Lock()
+        self.criado_em = time.time()
+        self.bytes = int(df.memory_usage(deep=True).sum())
+
+    def visao(self):
+        """DataFrame para a sessão: visão rasa, sem copiar os dados (copy-on-write)."""
+        return self._df.copy(deep=False)
+
+    def derivado(self, nome: str, calcular):
+        """
+        Resultado de calcular(df), feito uma vez por dataset e compartilhado.
+        O resultado também deve ser tratado como somente leitura.
+        """
+        with self._trava:
+            if nome in self._derivados:
+                metricas.registrar_cache(f"dataset_{nome}", acerto=True)
+                return self._derivados[nome]
+        metricas.registrar_cache(f"dataset_{nome}", acerto=False)
+        with metricas.cronometro("dataset_derivado", derivado=nome):
+            valor = calcular(self.visao())
+        with self._trava:
+            # Duas sessões podem ter calculado ao mesmo tempo: fica o primeiro
+            return self._derivados.setdefault(nome, valor)
+
+
+def publicar(df: pd.DataFrame, perfis: list = None):
+    """
+    Registra o dataset da análise (ou devolve o que já existe com o mesmo
+    conteúdo).
+
+    Args:
+        df (pd.DataFrame): Posts no formato do app, com 'perfil'.
+        perfis (list[str]): Perfis do dataset (padrão: os da coluna 'perfil').
+    Returns:
+        DatasetCompartilhado
+    """
+    df = normalizar(df)
+    if perfis is None:
+        perfis = df['perfil'].astype(str).unique().tolist() if 'perfil' in df.columns else []
+    with metricas.cronometro("dataset_versao"):
+        chave = (tuple(sorted(str(p) for p in perfis)), versao_dos_dados(df))
+
+    with _trava:
+        dataset = _datasets.get(chave)
+        ja_existia = dataset is not None
+        if ja_existia:
+            _datasets.move_to_end(chave)
+        else:
+            # Visão rasa: quem chamou pode mexer no seu df sem afetar o compartilhado
+            dataset = _datasets[chave] = DatasetCompartilhado(chave, df.copy(deep=False))
+            while len(_datasets) > MAX_DATASETS_COMPARTILHADOS:
+                _datasets.popitem(last=False)
+                metricas.incrementar("datasets_removidos_lru")
+    metricas.registrar_cache("datasets", acerto=ja_existia)
+    return dataset
+
+
+def resumo():
+    """Datasets em memória, para o painel de métricas."""
+    with _trava:
+        datasets = list(_datasets.values())
+    return pd.DataFrame([{
+        'perfis': ", ".join(d.perfis), 'versao': d.versao, 'posts': len(d._df),
+        'mb': round(d.bytes / 1024 / 1024, 2), 'derivados': ", ".join(sorted(d._derivados)),
+    } for d in datasets], columns=['perfis', 'versao', 'posts', 'mb', 'derivados'])
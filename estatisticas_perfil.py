@@ -0,0 +1,505 @@
+# estatisticas_perfil.py
+# Resumo de engajamento por perfil mantido de forma incremental.
+#
+# 'profile_stats' guarda somas e contagens por (username, categoria, mês) e
+# 'profile_top' os TOP_K posts de cada perfil por curtidas e por comentários.
+# Cada gravação em 'posts' (upsert de métricas ou nova classificação) aplica
+# só a diferença entre o estado antigo e o novo dos posts tocados, então o
+# dashboard, o chatbot e os prompts leem o resumo pronto, do mesmo tamanho
+# qualquer que seja o histórico do perfil.
+#
+# Na primeira gravação de um perfil sem resumo, ele é montado a partir dos
+# posts que já estão no banco (uma vez só).
+#
+# O ranking é aproximado só num caso: se um post do topo perder curtidas, um
+# post de fora que passou a ser maior só entra quando for gravado de novo.
+
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from storage_backend import traduzir_para_app
+
+# Posts guardados em cada ranking (curtidas / comentários) por perfil
+TOP_K = 10
+
+# Legendas no ranking ficam cortadas (o texto completo continua em 'posts')
+TAMANHO_LEGENDA_TOP = 280
+
+# Posts ainda não classificados (ou com 'tipo' vazio) entram nesta categoria
+SEM_CATEGORIA = 'Sem categoria'
+
+CHAVES_ESTATISTICAS = ['username', 'categoria', 'mes']
+SOMAS_ESTATISTICAS = ['posts', 'soma_curtidas', 'soma_comentarios']
+COLUNAS_ESTATISTICAS = CHAVES_ESTATISTICAS + SOMAS_ESTATISTICAS + ['primeira_data', 'ultima_data']
+
+# Colunas de 'posts' que definem a contribuição de um post para o resumo
+COLUNAS_ESTADO = ['post_pk', 'username', 'published_at', 'tipo', 'like_count', 'comment_count']
+
+METRICAS_TOP = {'curtidas': 'like_count', 'comentarios': 'comment_count'}
+COLUNAS_TOP = ['username', 'metrica', 'posicao', 'post_pk', 'published_at', 'tipo',
+               'like_count', 'comment_count', 'caption', 'media_url']
+
+TABELA_ESTATISTICAS = "profile_stats"   # Supabase e SQLite
+TABELA_TOP = "profile_top"              # Supabase e SQLite
+COLECAO_ESTATISTICAS = "profile_stats"  # MongoDB
+COLECAO_TOP = "profile_top"             # MongoDB
+
+# DDL para rodar uma vez no SQL Editor do Supabase.
+# A função soma os deltas no próprio banco (insert ... on conflict), então
+# duas gravações simultâneas não se sobrescrevem.
+SQL_ESTATISTICAS_PERFIL = """
+create table if not exists profile_stats (
+    username         text    not null,
+    categoria        text    not null,
+    mes              text    not null,
+    posts            integer not null default 0,
+    soma_curtidas    bigint  not null default 0,
+    soma_comentarios bigint  not null default 0,
+    primeira_data    text,
+    ultima_data      text,
+    primary key (username, categoria, mes)
+);
+create table if not exists profile_top (
+    username      text    not null,
+    metrica       text    not null,
+    posicao       integer not null,
+    post_pk       text,
+    published_at  text,
+    tipo          text,
+    like_count    integer,
+    comment_count integer,
+    caption       text,
+    media_url     text,
+    primary key (username, metrica, posicao)
+);
+
+create or replace function aplicar_deltas_profile_stats(deltas jsonb)
+returns void language sql as $$
+    insert into profile_stats as s
+        (username, categoria, mes, posts, soma_curtidas, soma_comentarios, primeira_data, ultima_data)
+    select username, categoria, mes, posts, soma_curtidas, soma_comentarios, primeira_data, ultima_data
+    from jsonb_to_recordset(deltas) as d(
+        username text, categoria text, mes text, posts integer, soma_curtidas bigint,
+        soma_comentarios bigint, primeira_data text, ultima_data text
+    )
+    on conflict (username, categoria, mes) do update set
+        posts            = s.posts + excluded.posts,
+        soma_curtidas    = s.soma_curtidas + excluded.soma_curtidas,
+        soma_comentarios = s.soma_comentarios + excluded.soma_comentarios,
+        primeira_data    = least(s.primeira_data, excluded.primeira_data),
+        ultima_data      = greatest(s.ultima_data, excluded.ultima_data);
+$$;
+"""
+
+
+# -----------------------------------------------------------------------------
+# CÁLCULO (vetorizado, igual para todos os bancos)
+# -----------------------------------------------------------------------------
+def _vazio(colunas):
+    return pd.DataFrame(columns=colunas)
+
+
+def estado_final(df_novos: pd.DataFrame, df_atuais: pd.DataFrame):
+    """
+    Estado dos posts depois da gravação. Colunas que não vieram em df_novos
+    (ex: 'tipo' num upsert só de métricas) continuam com o valor do banco.
+
+    Args:
+        df_novos (pd.DataFrame): O que vai ser gravado (nomes do banco, com 'post_pk').
+        df_atuais (pd.DataFrame): COLUNAS_ESTADO atuais desses posts (pode ser vazio).
+    Returns:
+        pd.DataFrame: COLUNAS_ESTADO (+ 'caption'/'media_url' se vierem), um post por linha.
+    """
+    novos = df_novos.assign(post_pk=df_novos['post_pk'].astype(str)).drop_duplicates('post_pk', keep='last')
+    atuais = (df_atuais if df_atuais is not None else _vazio(COLUNAS_ESTADO)).reindex(columns=COLUNAS_ESTADO)
+    atuais = atuais.assign(post_pk=atuais['post_pk'].astype(str)).drop_duplicates('post_pk').set_index('post_pk')
+    for coluna in COLUNAS_ESTADO[1:]:
+        if coluna not in novos.columns:
+            novos[coluna] = novos['post_pk'].map(atuais[coluna])
+    extras = [c for c in ('caption', 'media_url') if c in novos.columns]
+    return novos.loc[novos['username'].notna(), COLUNAS_ESTADO + extras].reset_index(drop=True)
+
+
+def _base_grupos(df_estado: pd.DataFrame, sinal: int = 1):
+    # Uma linha por post com a contribuição dele (sinal -1 para subtrair o estado antigo)
+    # datetime_as_string é ~15x mais rápido que .dt.strftime para o mesmo texto ISO
+    data = pd.to_datetime(df_estado['published_at'], errors='coerce', utc=True).dt.tz_localize(None)
+    data = pd.Series(np.datetime_as_string(data.to_numpy(), unit='s'), index=df_estado.index).replace('NaT', None)
+    return pd.DataFrame({
+        'username': df_estado['username'].astype(str),
+        'categoria': df_estado['tipo'].astype('string').replace('', pd.NA).fillna(SEM_CATEGORIA),
+        'mes': data.str.slice(0, 7).fillna(''),
+        'posts': sinal,
+        'soma_curtidas': pd.to_numeric(df_estado['like_count'], errors='coerce').fillna(0).astype('int64') * sinal,
+        'soma_comentarios': pd.to_numeric(df_estado['comment_count'], errors='coerce').fillna(0).astype('int64') * sinal,
+        # Só o estado novo pode estender o período do grupo
+        'data': data if sinal > 0 else None,
+    })
+
+
+def _agrupar(base: pd.DataFrame):
+    # As gravações trazem de dezenas a poucos milhares de posts: acumular num
+    # dict custa bem menos que o groupby do pandas com três chaves
+    acumulado = {}
+    colunas = CHAVES_ESTATISTICAS + SOMAS_ESTATISTICAS + ['data']
+    for username, categoria, mes, posts, curtidas, comentarios, data in zip(*(base[c].tolist() for c in colunas)):
+        data = data if isinstance(data, str) else None
+        grupo = acumulado.get((username, categoria, mes))
+        if grupo is None:
+            acumulado[(username, categoria, mes)] = [posts, curtidas, comentarios, data, data]
+            continue
+        grupo[0] += posts
+        grupo[1] += curtidas
+        grupo[2] += comentarios
+        if data is not None:
+            grupo[3] = data if grupo[3] is None else min(grupo[3], data)
+            grupo[4] = data if grupo[4] is None else max(grupo[4], data)
+    return pd.DataFrame(
+        [chave + tuple(valores) for chave, valores in sorted(acumulado.items())],
+        columns=COLUNAS_ESTATISTICAS
+    )
+
+
+def calcular_grupos(df_estado: pd.DataFrame):
+    """
+    Somas e contagens por (username, categoria, mês) a partir dos posts.
+    Returns:
+        pd.DataFrame: COLUNAS_ESTATISTICAS. Datas como texto 'AAAA-MM-DDTHH:MM:SS' (UTC).
+    """
+    if df_estado is None or df_estado.empty:
+        return _vazio(COLUNAS_ESTATISTICAS)
+    return _agrupar(_base_grupos(df_estado))
+
+
+def deltas_estatisticas(df_final: pd.DataFrame, df_atuais: pd.DataFrame):
+    """
+    Diferença que a gravação provoca no resumo: soma o estado novo dos posts e
+    subtrai o antigo (um único groupby). Só voltam os grupos que mudaram de fato.
+
+    Args:
+        df_final (pd.DataFrame): Saída de estado_final.
+        df_atuais (pd.DataFrame): COLUNAS_ESTADO antes da gravação.
+    Returns:
+        pd.DataFrame: COLUNAS_ESTATISTICAS com valores (positivos ou negativos) a somar.
+    """
+    if df_final is None or df_final.empty:
+        return _vazio(COLUNAS_ESTATISTICAS)
+    antes = df_atuais if df_atuais is not None else _vazio(COLUNAS_ESTADO)
+    antes = antes[antes['post_pk'].astype(str).isin(df_final['post_pk'])]
+
+    partes = [_base_grupos(df_final)] + ([_base_grupos(antes, sinal=-1)] if not antes.empty else [])
+    deltas = _agrupar(pd.concat(partes, ignore_index=True))
+    mudou = (deltas[SOMAS_ESTATISTICAS] != 0).any(axis=1)
+    return deltas.loc[mudou].reset_index(drop=True)
+
+
+def mesclar_top(top_atual: pd.DataFrame, candidatos: pd.DataFrame, k: int = TOP_K):
+    """
+    Junta o ranking salvo com os posts recém-gravados e refaz os TOP_K de cada perfil.
+    Um post que já estava no ranking é substituído pela versão nova.
+
+    Args:
+        top_atual (pd.DataFrame): COLUNAS_TOP salvas (pode ser vazio).
+        candidatos (pd.DataFrame): Posts gravados (estado_final, com 'caption'/'media_url' se houver).
+    Returns:
+        pd.DataFrame: COLUNAS_TOP.
+    """
+    candidatos = candidatos.reindex(columns=['username'] + COLUNAS_TOP[3:])
+    salvos = top_atual.to_dict(orient='records') if top_atual is not None else []
+
+    # Poucas dezenas de linhas por perfil: heapq é mais barato que ordenar DataFrames
+    linhas = []
+    for metrica, coluna in METRICAS_TOP.items():
+        # Dos candidatos, só os k maiores de cada perfil podem entrar no ranking
+        valores = pd.to_numeric(candidatos[coluna], errors='coerce').fillna(-1).to_numpy()
+        melhores_candidatos = candidatos.iloc[np.argsort(-valores, kind='stable')].groupby('username').head(k)
+        melhores_candidatos = melhores_candidatos.assign(
+            caption=melhores_candidatos['caption'].astype('string').str.slice(0, TAMANHO_LEGENDA_TOP)
+        )
+        por_post = {r['post_pk']: r for r in salvos if r['metrica'] == metrica}
+        por_post.update((r['post_pk'], r) for r in melhores_candidatos.to_dict(orient='records'))
+        por_perfil = {}
+        for registro in por_post.values():
+            por_perfil.setdefault(registro['username'], []).append(registro)
+        for username, registros in sorted(por_perfil.items()):
+            melhores = heapq.nsmallest(k, registros, key=lambda r: (-_valor(r[coluna]), str(r['post_pk'])))
+            linhas += [{**r, 'metrica': metrica, 'posicao': posicao} for posicao, r in enumerate(melhores)]
+    return pd.DataFrame(linhas, columns=COLUNAS_TOP)
+
+
+def _valor(valor):
+    # None/NaN/NA ficam no fim do ranking
+    return -1 if pd.isna(valor) else valor
+
+
+def reclassificar_top(top_atual: pd.DataFrame, classificacoes: list):
+    """Atualiza o 'tipo' dos posts que estão no ranking (classificações no formato do app)."""
+    if top_atual is None or top_atual.empty:
+        return top_atual
+    mapa = {str(item['id']): item['categoria'] for item in classificacoes}
+    novo_tipo = top_atual['post_pk'].astype(str).map(mapa)
+    return top_atual.assign(tipo=novo_tipo.fillna(top_atual['tipo']))
+
+
+def top_mudou(top_atual: pd.DataFrame, top_novo: pd.DataFrame):
+    """True se o ranking precisa ser regravado."""
+    if top_atual is None or len(top_atual) != len(top_novo):
+        return True
+    colunas = ['username', 'metrica', 'posicao', 'post_pk', 'tipo', 'like_count', 'comment_count']
+    linhas = lambda df: sorted(tuple(map(str, linha)) for linha in df[colunas].to_numpy().tolist())
+    return linhas(top_atual) != linhas(top_novo)
+
+
+# -----------------------------------------------------------------------------
+# LEITURA (o que o dashboard, o chatbot e os prompts usam)
+# -----------------------------------------------------------------------------
+class EstatisticasPerfis:
+    """
+    Resumo pronto de um ou mais perfis.
+
+    Args:
+        grupos (pd.DataFrame): Linhas de 'profile_stats' (COLUNAS_ESTATISTICAS).
+        top (pd.DataFrame): Linhas de 'profile_top' (COLUNAS_TOP).
+    """
+
+    def __init__(self, grupos: pd.DataFrame, top: pd.DataFrame = None):
+        self.grupos = (grupos if grupos is not None else _vazio(COLUNAS_ESTATISTICAS)).reindex(columns=COLUNAS_ESTATISTICAS)
+        for coluna in SOMAS_ESTATISTICAS:
+            self.grupos[coluna] = pd.to_numeric(self.grupos[coluna], errors='coerce').fillna(0)
+        self.grupos = self.grupos[self.grupos['posts'] > 0]
+        self.top = (top if top is not None else _vazio(COLUNAS_TOP)).reindex(columns=COLUNAS_TOP)
+
+    @classmethod
+    def de_posts(cls, df_posts: pd.DataFrame):
+        """Resumo calculado direto dos posts (CSV/Parquet, sem banco). Aceita o formato do app."""
+        if 'perfil' in df_posts.columns:
+            df_posts = df_posts.drop(columns=['username'], errors='ignore')
+        df = df_posts.rename(columns={'id': 'post_pk', 'data': 'published_at', 'categoria': 'tipo',
+                                      'curtidas': 'like_count', 'comentarios': 'comment_count',
+                                      'legenda': 'caption', 'link': 'media_url', 'perfil': 'username'})
+        df = df.reindex(columns=COLUNAS_ESTADO + ['caption', 'media_url'])
+        df['post_pk'] = df['post_pk'].astype(str)
+        df['username'] = df['username'].fillna('').astype(str)
+        return cls(calcular_grupos(df), mesclar_top(None, df))
+
+    @property
+    def vazio(self):
+        return self.grupos.empty
+
+    def _filtrar(self, username: str = None):
+        return self.grupos if username is None else self.grupos[self.grupos['username'] == username]
+
+    def totais(self, username: str = None):
+        """dict com 'posts', 'media_curtidas' e 'media_comentarios'."""
+        grupos = self._filtrar(username)
+        posts = grupos['posts'].sum()
+        return {
+            'posts': int(posts),
+            'media_curtidas': grupos['soma_curtidas'].sum() / posts if posts else 0.0,
+            'media_comentarios': grupos['soma_comentarios'].sum() / posts if posts else 0.0,
+        }
+
+    def periodo(self, username: str = None):
+        """(primeira, última) data de publicação, como texto."""
+        grupos = self._filtrar(username)
+        return grupos['primeira_data'].dropna().min(), grupos['ultima_data'].dropna().max()
+
+    def por_categoria(self, username: str = None, incluir_sem_categoria: bool = False):
+        """
+        Médias por categoria, da maior média de curtidas para a menor.
+        Returns:
+            pd.DataFrame: Índice 'categoria'; colunas 'posts', 'curtidas', 'comentarios' (médias).
+        """
+        grupos = self._filtrar(username)
+        if not incluir_sem_categoria:
+            grupos = grupos[grupos['categoria'] != SEM_CATEGORIA]
+        somas = grupos.groupby('categoria')[SOMAS_ESTATISTICAS].sum()
+        return pd.DataFrame({
+            'posts': somas['posts'].astype(int),
+            'curtidas': somas['soma_curtidas'] / somas['posts'],
+            'comentarios': somas['soma_comentarios'] / somas['posts'],
+        }).sort_values('curtidas', ascending=False)
+
+    def por_perfil(self):
+        """Colunas 'perfil', 'total_posts', 'media_curtidas', 'media_comentarios'."""
+        somas = self.grupos.groupby('username')[SOMAS_ESTATISTICAS].sum()
+        return pd.DataFrame({
+            'perfil': somas.index,
+            'total_posts': somas['posts'].astype(int).values,
+            'media_curtidas': (somas['soma_curtidas'] / somas['posts']).values,
+            'media_comentarios': (somas['soma_comentarios'] / somas['posts']).values,
+        })
+
+    def por_perfil_categoria(self, incluir_sem_categoria: bool = False):
+        """Colunas 'perfil', 'categoria', 'posts', 'curtidas', 'comentarios' (médias)."""
+        grupos = self.grupos if incluir_sem_categoria else self.grupos[self.grupos['categoria'] != SEM_CATEGORIA]
+        somas = grupos.groupby(['username', 'categoria'])[SOMAS_ESTATISTICAS].sum().reset_index()
+        return pd.DataFrame({
+            'perfil': somas['username'],
+            'categoria': somas['categoria'],
+            'posts': somas['posts'].astype(int),
+            'curtidas': somas['soma_curtidas'] / somas['posts'],
+            'comentarios': somas['soma_comentarios'] / somas['posts'],
+        })
+
+    def top_posts(self, metrica: str = 'curtidas', n: int = 5, username: str = None):
+        """Os n posts de maior 'curtidas' ou 'comentarios', no formato do app."""
+        top = self.top[self.top['metrica'] == metrica]
+        if username is not None:
+            top = top[top['username'] == username]
+        top = top.sort_values(['username', 'posicao']).groupby('username', sort=False).head(n)
+        return traduzir_para_app(top.drop(columns=['metrica'])).rename(
+            columns={'tipo': 'categoria', 'username': 'perfil'}
+        ).reset_index(drop=True)
+
+
+# -----------------------------------------------------------------------------
+# SUPABASE
+# -----------------------------------------------------------------------------
+def aplicar_estatisticas_supabase(supabase_client, df_final: pd.DataFrame, df_atuais: pd.DataFrame,
+                                  classificacoes: list = None):
+    """
+    Aplica no resumo a gravação que acabou de ser feita em 'posts'.
+    Perfis ainda sem resumo são montados do zero a partir dos posts.
+    """
+    for username in df_final['username'].dropna().unique():
+        if not _tem_resumo_supabase(supabase_client, username):
+            # Perfil sem resumo: montado do zero, já com esta gravação
+            reconstruir_estatisticas_supabase(supabase_client, username)
+            df_final = df_final[df_final['username'] != username]
+
+    deltas = deltas_estatisticas(df_final, df_atuais)
+    if not deltas.empty:
+        supabase_client.rpc(
+            "aplicar_deltas_profile_stats",
+            {"deltas": deltas.astype(object).where(deltas.notna(), None).to_dict(orient='records')}
+        ).execute()
+
+    usernames = list(df_final['username'].dropna().unique())
+    if not usernames:
+        return len(deltas)
+    top_atual = pd.DataFrame(
+        supabase_client.table(TABELA_TOP).select("*").in_("username", usernames).execute().data or [],
+        columns=COLUNAS_TOP
+    )
+    top_novo = reclassificar_top(top_atual, classificacoes) if classificacoes else mesclar_top(top_atual, df_final)
+    if top_mudou(top_atual, top_novo):
+        supabase_client.table(TABELA_TOP).upsert(
+            top_novo.astype(object).where(top_novo.notna(), None).to_dict(orient='records'),
+            on_conflict="username,metrica,posicao"
+        ).execute()
+    return len(deltas)
+
+
+def _tem_resumo_supabase(supabase_client, username: str):
+    resposta = supabase_client.table(TABELA_ESTATISTICAS).select("username").eq("username", username).limit(1).execute()
+    return bool(resposta.data)
+
+
+def reconstruir_estatisticas_supabase(supabase_client, username: str):
+    """Monta o resumo do perfil a partir de todos os posts dele (usado uma vez por perfil)."""
+    from supabase_utils import _buscar_em_paginas
+    dados = _buscar_em_paginas(
+        lambda: (
+            supabase_client.table("posts")
+            .select(",".join(COLUNAS_ESTADO + ['caption', 'media_url']))
+            .eq("username", username)
+            .order("post_pk")
+        )
+    )
+    df = pd.DataFrame(dados, columns=COLUNAS_ESTADO + ['caption', 'media_url'])
+    grupos, top = calcular_grupos(df), mesclar_top(None, df)
+    supabase_client.table(TABELA_ESTATISTICAS).delete().eq("username", username).execute()
+    supabase_client.table(TABELA_TOP).delete().eq("username", username).execute()
+    if not grupos.empty:
+        supabase_client.table(TABELA_ESTATISTICAS).insert(
+            grupos.astype(object).where(grupos.notna(), None).to_dict(orient='records')
+        ).execute()
+    if not top.empty:
+        supabase_client.table(TABELA_TOP).insert(
+            top.astype(object).where(top.notna(), None).to_dict(orient='records')
+        ).execute()
+    print(f"📊 Resumo de @{username} montado a partir de {len(df)} posts.")
+    return grupos
+
+
+def fetch_estatisticas_supabase(supabase_client, usernames: list):
+    """Lê o resumo pronto dos perfis (dezenas de linhas, qualquer que seja o histórico)."""
+    grupos = supabase_client.table(TABELA_ESTATISTICAS).select("*").in_("username", list(usernames)).execute().data or []
+    top = supabase_client.table(TABELA_TOP).select("*").in_("username", list(usernames)).execute().data or []
+    return EstatisticasPerfis(pd.DataFrame(grupos, columns=COLUNAS_ESTATISTICAS), pd.DataFrame(top, columns=COLUNAS_TOP))
+
+
+# -----------------------------------------------------------------------------
+# MONGODB
+# -----------------------------------------------------------------------------
+def aplicar_estatisticas_mongodb(client, df_final: pd.DataFrame, df_atuais: pd.DataFrame,
+                                 classificacoes: list = None):
+    """
+    Aplica no resumo a gravação que acabou de ser feita em 'posts' ($inc no
+    servidor, um bulk_write). Perfis ainda sem resumo são montados do zero.
+    """
+    from pymongo import UpdateOne
+
+    db = client["agente_macfor"]
+    for username in df_final['username'].dropna().unique():
+        if db[COLECAO_ESTATISTICAS].find_one({"username": username}, {"_id": 1}) is None:
+            # Perfil sem resumo: montado do zero, já com esta gravação
+            reconstruir_estatisticas_mongodb(client, username)
+            df_final = df_final[df_final['username'] != username]
+
+    deltas = deltas_estatisticas(df_final, df_atuais)
+    operacoes = []
+    for linha in deltas.to_dict(orient='records'):
+        atualizacao = {"$inc": {c: int(linha[c]) for c in SOMAS_ESTATISTICAS}}
+        # $min/$max com None gravariam None (null é menor que qualquer texto no BSON)
+        if pd.notna(linha['primeira_data']):
+            atualizacao["$min"] = {"primeira_data": linha['primeira_data']}
+        if pd.notna(linha['ultima_data']):
+            atualizacao["$max"] = {"ultima_data": linha['ultima_data']}
+        operacoes.append(UpdateOne({c: linha[c] for c in CHAVES_ESTATISTICAS}, atualizacao, upsert=True))
+    if operacoes:
+        db[COLECAO_ESTATISTICAS].bulk_write(operacoes, ordered=False)
+
+    usernames = list(df_final['username'].dropna().unique())
+    if not usernames:
+        return len(operacoes)
+    top_atual = pd.DataFrame(
+        list(db[COLECAO_TOP].find({"username": {"$in": usernames}}, {"_id": 0})), columns=COLUNAS_TOP
+    )
+    top_novo = reclassificar_top(top_atual, classificacoes) if classificacoes else mesclar_top(top_atual, df_final)
+    if top_mudou(top_atual, top_novo):
+        _gravar_top_mongodb(db, usernames, top_novo)
+    return len(operacoes)
+
+
+def _gravar_top_mongodb(db, usernames: list, top: pd.DataFrame):
+    db[COLECAO_TOP].delete_many({"username": {"$in": list(usernames)}})
+    if not top.empty:
+        db[COLECAO_TOP].insert_many(top.astype(object).where(top.notna(), None).to_dict(orient='records'))
+
+
+def reconstruir_estatisticas_mongodb(client, username: str):
+    """Monta o resumo do perfil a partir de todos os posts dele (usado uma vez por perfil)."""
+    db = client["agente_macfor"]
+    projecao = {"_id": 0, **{c: 1 for c in COLUNAS_ESTADO + ['caption', 'media_url']}}
+    df = pd.DataFrame(list(db["posts"].find({"username": username}, projecao)),
+                      columns=COLUNAS_ESTADO + ['caption', 'media_url'])
+    grupos = calcular_grupos(df)
+    db[COLECAO_ESTATISTICAS].delete_many({"username": username})
+    if not grupos.empty:
+        db[COLECAO_ESTATISTICAS].insert_many(grupos.astype(object).where(grupos.notna(), None).to_dict(orient='records'))
+    _gravar_top_mongodb(db, [username], mesclar_top(None, df))
+    print(f"📊 Resumo de @{username} montado a partir de {len(df)} posts.")
+    return grupos
+
+
+def fetch_estatisticas_mongodb(client, usernames: list):
+    """Lê o resumo pronto dos perfis (dezenas de documentos, qualquer que seja o histórico)."""
+    db = client["agente_macfor"]
+    filtro = {"username": {"$in": list(usernames)}}
+    grupos = pd.DataFrame(list(db[COLECAO_ESTATISTICAS].find(filtro, {"_id": 0})), columns=COLUNAS_ESTATISTICAS)
+    top = pd.DataFrame(list(db[COLECAO_TOP].find(filtro, {"_id": 0})), columns=COLUNAS_TOP)
+    return EstatisticasPerfis(grupos, top)
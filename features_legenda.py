@@ -0,0 +1,186 @@
+# features_legenda.py
+# Atributos locais da legenda e do horário de cada post, calculados em bloco
+# com as operações de texto do pandas (sem chamar o Gemini).
+#
+# Os atributos são gravados junto com cada post (mesma linha/documento), então
+# as abas de análise e os prompts de insights leem os números prontos em vez
+# de pedir para a IA inferir tudo a partir do texto cru.
+
+import pandas as pd
+
+try:
+    from config import FUSO_HORARIO
+except ImportError:
+    FUSO_HORARIO = "America/Sao_Paulo"
+
+# Colunas geradas (mesmos nomes no app e no banco)
+COLUNAS_FEATURES = [
+    'hashtags', 'mencoes', 'n_hashtags', 'n_mencoes', 'n_emojis',
+    'tamanho_legenda', 'n_palavras', 'tem_cta', 'tem_pergunta', 'tem_link',
+    'hora', 'dia_semana',
+]
+
+DIAS_DA_SEMANA = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
+
+PADRAO_HASHTAG = r'#(\w+)'
+PADRAO_MENCAO = r'(?:^|[^\w.])@([\w.]*\w)'
+PADRAO_LINK = r'(?i)(?:https?://|www\.)\S+'
+# Sem raw string: os caracteres vão literais no padrão, o que funciona tanto
+# no 're' do Python quanto no RE2 das colunas string do pyarrow (pandas 3)
+PADRAO_EMOJI = (
+    '[\U0001F300-\U0001FAFF\U00002600-\U000027BF\U0001F1E6-\U0001F1FF'
+    '\U00002B00-\U00002BFF\U0001F000-\U0001F2FF]'
+)
+# Fronteiras de palavra explícitas: no RE2 o \b e o \w só conhecem letras
+# ASCII ("comenta aí" não fecha um \b depois do "í")
+CARACTERES_PALAVRA = '0-9A-Za-zÀ-ÿ_'
+INICIO_PALAVRA = rf'(?:^|[^{CARACTERES_PALAVRA}])'
+FIM_PALAVRA = rf'(?:[^{CARACTERES_PALAVRA}]|$)'
+
+# Chamadas para ação comuns nas legendas em português
+PADRAO_CTA = (
+    r'(?i)' + INICIO_PALAVRA + r'(?:link na bio|clique|comente|comenta|compartilhe|salve|marque|acesse|'
+    r'saiba mais|garanta|inscreva|participe|confira|chama no|fale com|'
+    r'manda (?:uma )?mensagem|whatsapp|direct|dm)' + FIM_PALAVRA
+)
+
+# DDL para rodar uma vez no SQL Editor do Supabase (o SQLite local e o
+# MongoDB criam as colunas sozinhos)
+SQL_FEATURES_LEGENDA = """
+alter table posts
+    add column if not exists hashtags        text,
+    add column if not exists mencoes         text,
+    add column if not exists n_hashtags      smallint,
+    add column if not exists n_mencoes       smallint,
+    add column if not exists n_emojis        smallint,
+    add column if not exists tamanho_legenda integer,
+    add column if not exists n_palavras      integer,
+    add column if not exists tem_cta         boolean,
+    add column if not exists tem_pergunta    boolean,
+    add column if not exists tem_link        boolean,
+    add column if not exists hora            smallint,
+    add column if not exists dia_semana      smallint;
+"""
+
+
+def horario_local(datas: pd.Series):
+    """
+    Datas em qualquer formato ISO (com ou sem fuso, misturados) no FUSO_HORARIO.
+    Sem fuso conta como UTC, como o coletor grava. Inválidas viram NaT.
+    """
+    return pd.to_datetime(datas, errors='coerce', format='ISO8601', utc=True).dt.tz_convert(FUSO_HORARIO)
+
+
+def extrair_features_legenda(df: pd.DataFrame):
+    """
+    Calcula os atributos de todas as linhas de uma vez.
+
+    Args:
+        df (pd.DataFrame): Posts no formato do app ('legenda' e 'data').
+    Returns:
+        pd.DataFrame: Só as COLUNAS_FEATURES, com o mesmo índice do df.
+        'hashtags' e 'mencoes' são textos separados por espaço (em minúsculas).
+    """
+    legenda = df['legenda'].astype('string').fillna('') if 'legenda' in df.columns \
+        else pd.Series('', index=df.index, dtype='string')
+    # Hora e dia da semana no horário de Brasília, não em UTC
+    data = horario_local(df['data']) if 'data' in df.columns \
+        else horario_local(pd.Series(pd.NaT, index=df.index))
+
+    hashtags = legenda.str.lower().str.findall(PADRAO_HASHTAG)
+    mencoes = legenda.str.lower().str.findall(PADRAO_MENCAO)
+
+    return pd.DataFrame({
+        'hashtags': hashtags.str.join(' ').astype('string'),
+        'mencoes': mencoes.str.join(' ').astype('string'),
+        'n_hashtags': hashtags.str.len().astype('Int16'),
+        'n_mencoes': mencoes.str.len().astype('Int16'),
+        'n_emojis': legenda.str.count(PADRAO_EMOJI).astype('Int16'),
+        'tamanho_legenda': legenda.str.len().astype('Int32'),
+        'n_palavras': legenda.str.split().str.len().fillna(0).astype('Int32'),
+        'tem_cta': legenda.str.contains(PADRAO_CTA, regex=True).astype('boolean'),
+        'tem_pergunta': legenda.str.contains('?', regex=False).astype('boolean'),
+        'tem_link': legenda.str.contains(PADRAO_LINK, regex=True).astype('boolean'),
+        'hora': data.dt.hour.astype('Int8'),
+        'dia_semana': data.dt.dayofweek.astype('Int8'),
+    }, index=df.index)
+
+
+def adicionar_features_legenda(df: pd.DataFrame):
+    """Devolve o df com as COLUNAS_FEATURES (recalculadas)."""
+    if df is None or df.empty:
+        return df
+    return df.drop(columns=COLUNAS_FEATURES, errors='ignore').join(extrair_features_legenda(df))
+
+
+def garantir_features_legenda(df: pd.DataFrame):
+    """
+    Calcula os atributos só das linhas que ainda não têm (ex: posts salvos
+    antes desta versão, CSVs e Parquets antigos).
+    """
+    if df is None or df.empty:
+        return df
+    if not set(COLUNAS_FEATURES).issubset(df.columns):
+        return adicionar_features_legenda(df)
+    faltando = df['tamanho_legenda'].isna()
+    if faltando.any():
+        df = df.copy()
+        novas = extrair_features_legenda(df.loc[faltando])
+        for coluna in COLUNAS_FEATURES:
+            df[coluna] = df[coluna].astype(novas[coluna].dtype)
+            df.loc[faltando, coluna] = novas[coluna]
+    return df
+
+
+def engajamento_por_feature(df: pd.DataFrame):
+    """
+    Tabelas de média de curtidas/comentários por atributo para as abas de análise.
+    Returns:
+        dict[str, pd.DataFrame]: 'hora', 'dia_semana', 'cta', 'pergunta', 'hashtags'.
+    """
+    base = pd.DataFrame({
+        'curtidas': pd.to_numeric(df['curtidas'], errors='coerce'),
+        'comentarios': pd.to_numeric(df['comentarios'], errors='coerce'),
+    })
+    medias = {}
+    for nome, coluna in (('hora', 'hora'), ('dia_semana', 'dia_semana'), ('cta', 'tem_cta'), ('pergunta', 'tem_pergunta')):
+        agrupado = base.groupby(df[coluna].rename(nome), observed=True).agg(
+            posts=('curtidas', 'size'), media_curtidas=('curtidas', 'mean'), media_comentarios=('comentarios', 'mean')
+        )
+        medias[nome] = agrupado
+    medias['dia_semana'].index = [DIAS_DA_SEMANA[int(d)] for d in medias['dia_semana'].index]
+    for nome in ('cta', 'pergunta'):
+        medias[nome].index = ['Sim' if valor else 'Não' for valor in medias[nome].index]
+
+    # Uma linha por (post, hashtag) para a média por hashtag
+    por_hashtag = base.assign(hashtag=df['hashtags'].fillna('').str.split()).explode('hashtag')
+    por_hashtag = por_hashtag[por_hashtag['hashtag'].notna() & (por_hashtag['hashtag'] != '')]
+    medias['hashtags'] = (
+        por_hashtag.groupby('hashtag')
+        .agg(posts=('curtidas', 'size'), media_curtidas=('curtidas', 'mean'), media_comentarios=('comentarios', 'mean'))
+        .sort_values(['posts', 'media_curtidas'], ascending=False)
+    )
+    return medias
+
+
+def resumo_features_md(df: pd.DataFrame, top_hashtags: int = 10):
+    """Resumo curto em markdown dos atributos, para colocar nos prompts do Gemini."""
+    df = garantir_features_legenda(df)
+    medias = engajamento_por_feature(df)
+    formato = {'floatfmt': '.1f'}
+    return f"""
+- Legenda média: {df['tamanho_legenda'].mean():.0f} caracteres, {df['n_hashtags'].mean():.1f} hashtags, {df['n_emojis'].mean():.1f} emojis
+- Posts com chamada para ação: {df['tem_cta'].mean():.0%} · com pergunta: {df['tem_pergunta'].mean():.0%} · com link: {df['tem_link'].mean():.0%}
+
+Engajamento com/sem chamada para ação:
+{medias['cta'].to_markdown(**formato)}
+
+Engajamento por dia da semana:
+{medias['dia_semana'].to_markdown(**formato)}
+
+Engajamento por hora de publicação:
+{medias['hora'].to_markdown(**formato)}
+
+Hashtags mais usadas:
+{medias['hashtags'].head(top_hashtags).to_markdown(**formato)}
+"""
@@ -0,0 +1,396 @@
+# governador_instagram.py
+# Controle de ritmo das requisições ao Instagram, compartilhado por todos os
+# coletores (dashboard, rodar_processo_completo, coletar_e_salvar_insta).
+#
+# - Orçamento por conta: no máximo N requisições por janela (hora e dia). O
+#   histórico fica num SQLite local, então processos diferentes usando a
+#   mesma conta "bot" dividem o mesmo orçamento.
+# - Atraso adaptativo: a pausa entre requisições dobra a cada resposta de
+#   limite (429, PleaseWaitFewMinutes...) e encolhe 10% a cada sucesso, sem
+#   nunca ficar abaixo do mínimo.
+# - Disjuntor: um erro de bloqueio (FeedbackRequired, ChallengeRequired...)
+#   suspende a conta por PAUSA_CIRCUITO_S, dobrando a cada reincidência.
+#   Enquanto estiver aberto, nenhuma requisição sai.
+# - Retomada: se a coleta de um perfil é interrompida, o cursor da próxima
+#   página fica guardado e a próxima coleta continua dali.
+
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import metricas
+
+try:
+    from config import ARQUIVO_ESTADO_INSTAGRAM
+except ImportError:
+    ARQUIVO_ESTADO_INSTAGRAM = "estado_instagram.sqlite3"
+
+try:
+    from config import ORCAMENTO_INSTAGRAM
+except ImportError:
+    # janela em segundos -> requisições permitidas por conta
+    ORCAMENTO_INSTAGRAM = {3600: 180, 86400: 1500}
+
+try:
+    from config import ATRASO_INSTAGRAM_S
+except ImportError:
+    # (mínimo, máximo) da pausa entre requisições da mesma conta
+    ATRASO_INSTAGRAM_S = (2.0, 60.0)
+
+# Disjuntor: primeira pausa e teto (a pausa dobra a cada nova abertura)
+PAUSA_CIRCUITO_S = 15 * 60
+PAUSA_CIRCUITO_MAX_S = 6 * 3600
+
+# Espera aceitável por orçamento antes de desistir e guardar o cursor
+ESPERA_MAXIMA_S = 120
+
+# Cursores mais velhos que isso são descartados (o feed já mudou muito)
+VALIDADE_CURSOR_S = 24 * 3600
+
+# Exceções do instagrapi, pelo nome da classe (o módulo só é importado no login)
+ERROS_BLOQUEIO = {
+    'FeedbackRequired', 'ChallengeRequired', 'ChallengeUnknownStep', 'SelectContactPointRecoveryForm',
+    'RecaptchaChallengeForm', 'SentryBlock', 'PleaseWaitFewMinutes',
+}
+ERROS_LIMITE = {'RateLimitError', 'ClientThrottledError'}
+
+
+class ColetaPausada(Exception):
+    """A conta não pode fazer requisições agora (a coleta deve parar e ser retomada depois)."""
+
+    def __init__(self, mensagem: str, retomar_em: float):
+        super().__init__(mensagem)
+        self.retomar_em = retomar_em
+
+
+class CircuitoAberto(ColetaPausada):
+    pass
+
+
+class OrcamentoEsgotado(ColetaPausada):
+    pass
+
+
+@contextmanager
+def _conectar(caminho=None):
+    """Conexão com o estado: confirma ao sair do bloco (desfaz em erro) e fecha o arquivo."""
+    conn = sqlite3.connect(caminho or ARQUIVO_ESTADO_INSTAGRAM, timeout=30)
+    try:
+        with conn:
+            _preparar(conn)
+            yield conn
+    finally:
+        conn.close()
+
+
+def _preparar(conn):
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(
+        "CREATE TABLE IF NOT EXISTS requisicoes (conta TEXT NOT NULL, ts REAL NOT NULL);"
+        "CREATE INDEX IF NOT EXISTS requisicoes_conta_ts ON requisicoes (conta, ts);"
+        "CREATE TABLE IF NOT EXISTS circuitos ("
+        " conta TEXT PRIMARY KEY, aberto_ate REAL NOT NULL, aberturas INTEGER NOT NULL, motivo TEXT);"
+        "CREATE TABLE IF NOT EXISTS cursores ("
+        " perfil TEXT PRIMARY KEY, cursor TEXT NOT NULL, coletados INTEGER NOT NULL,"
+        " alvo INTEGER NOT NULL, atualizado_em REAL NOT NULL, parar_antes_de TEXT);"
+    )
+    # Arquivos de estado anteriores à coluna parar_antes_de
+    if 'parar_antes_de' not in {linha[1] for linha in conn.execute("PRAGMA table_info(cursores)")}:
+        conn.execute("ALTER TABLE cursores ADD COLUMN parar_antes_de TEXT")
+
+
+def classificar_erro(erro: Exception):
+    """'bloqueio', 'limite' ou None (erro que não tem a ver com o ritmo)."""
+    nome = type(erro).__name__
+    if nome in ERROS_BLOQUEIO:
+        return 'bloqueio'
+    status = getattr(getattr(erro, 'response', None), 'status_code', None)
+    if nome in ERROS_LIMITE or status == 429:
+        return 'limite'
+    return None
+
+
+class GovernadorInstagram:
+    """
+    Ritmo de uma conta do Instagram. Use obter_governador(conta) para que
+    todos os clientes da mesma conta no processo dividam o mesmo objeto.
+
+    Args:
+        conta (str): Usuário da conta que faz as requisições.
+        orcamento (dict): {janela_s: requisições}.
+        atraso_s (tuple): (mínimo, máximo) da pausa entre requisições.
+        caminho (str): Arquivo SQLite do estado compartilhado.
+    """
+
+    def __init__(self, conta: str, orcamento: dict = None, atraso_s: tuple = None, caminho: str = None):
+        self.conta = conta
+        self.orcamento = dict(orcamento or ORCAMENTO_INSTAGRAM)
+        self.atraso_min, self.atraso_max = atraso_s or ATRASO_INSTAGRAM_S
+        self.atraso = self.atraso_min
+        self.caminho = caminho
+        self._ultima = 0.0
+        self._trava = threading.Lock()
+        # Última pausa levantada (o instagrapi engole algumas exceções no meio da paginação)
+        self.pausa = None
+
+    # --- Disjuntor -----------------------------------------------------------
+    def _circuito(self, conn):
+        linha = conn.execute(
+            "SELECT aberto_ate, aberturas FROM circuitos WHERE conta = ?", (self.conta,)
+        ).fetchone()
+        return linha or (0.0, 0)
+
+    def _abrir_circuito(self, conn, motivo: str):
+        _, aberturas = self._circuito(conn)
+        pausa = min(PAUSA_CIRCUITO_S * 2 ** aberturas, PAUSA_CIRCUITO_MAX_S)
+        aberto_ate = time.time() + pausa
+        conn.execute(
+            "INSERT INTO circuitos (conta, aberto_ate, aberturas, motivo) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(conta) DO UPDATE SET aberto_ate = excluded.aberto_ate, "
+            "aberturas = excluded.aberturas, motivo = excluded.motivo",
+            (self.conta, aberto_ate, aberturas + 1, motivo)
+        )
+        metricas.incrementar("instagram_circuito_aberto", conta=self.conta, motivo=motivo)
+        metricas.registrar_evento("instagram_circuito_aberto", conta=self.conta, motivo=motivo, pausa_s=pausa)
+        print(f"⛔ Instagram pediu pausa ({motivo}). Conta @{self.conta} suspensa por {pausa / 60:.0f} min.")
+
+    # --- Orçamento -----------------------------------------------------------
+    def _espera_orcamento(self, conn, agora: float):
+        espera = 0.0
+        for janela, limite in self.orcamento.items():
+            usadas = conn.execute(
+                "SELECT ts FROM requisicoes WHERE conta = ? AND ts > ? ORDER BY ts DESC LIMIT 1 OFFSET ?",
+                (self.conta, agora - janela, limite - 1)
+            ).fetchone()
+            # A 'limite'-ésima mais recente precisa sair da janela para liberar uma vaga
+            if usadas is not None:
+                espera = max(espera, usadas[0] + janela - agora)
+        return espera
+
+    def antes_da_requisicao(self):
+        """
+        Espera a vez da conta: disjuntor fechado, orçamento disponível e
+        pausa adaptativa desde a última requisição.
+        Raises:
+            CircuitoAberto: Se a conta está suspensa.
+            OrcamentoEsgotado: Se a próxima vaga demora mais que ESPERA_MAXIMA_S.
+        """
+        with self._trava:
+            with _conectar(self.caminho) as conn:
+                agora = time.time()
+                aberto_ate, _ = self._circuito(conn)
+                if aberto_ate > agora:
+                    self.pausa = CircuitoAberto(
+                        f"Conta @{self.conta} suspensa até {datetime.fromtimestamp(aberto_ate):%H:%M}.", aberto_ate
+                    )
+                    raise self.pausa
+                espera = self._espera_orcamento(conn, agora)
+                if espera > ESPERA_MAXIMA_S:
+                    metricas.incrementar("instagram_orcamento_esgotado", conta=self.conta)
+                    self.pausa = OrcamentoEsgotado(
+                        f"Orçamento de requisições da conta @{self.conta} esgotado.", agora + espera
+                    )
+                    raise self.pausa
+
+            # Pausa com variação aleatória (±25%) para não ter ritmo fixo
+            pausa = self.atraso * random.uniform(0.75, 1.25)
+            espera = max(espera, self._ultima + pausa - time.monotonic())
+            if espera > 0:
+                metricas.registrar_tempo("instagram_espera_governador", espera, conta=self.conta)
+                time.sleep(espera)
+
+            self._ultima = time.monotonic()
+            with _conectar(self.caminho) as conn:
+                agora = time.time()
+                conn.execute("INSERT INTO requisicoes (conta, ts) VALUES (?, ?)", (self.conta, agora))
+                conn.execute(
+                    "DELETE FROM requisicoes WHERE conta = ? AND ts < ?",
+                    (self.conta, agora - max(self.orcamento, default=0))
+                )
+
+    def depois_da_requisicao(self, erro: Exception = None):
+        """Ajusta o atraso (e o disjuntor) conforme o resultado da requisição."""
+        tipo = classificar_erro(erro) if erro is not None else None
+        with self._trava:
+            if erro is None:
+                self.atraso = max(self.atraso_min, self.atraso * 0.9)
+                with _conectar(self.caminho) as conn:
+                    # Sucesso depois de uma pausa: zera a contagem de reincidências
+                    conn.execute("DELETE FROM circuitos WHERE conta = ? AND aberto_ate <= ?", (self.conta, time.time()))
+            elif tipo == 'limite':
+                self.atraso = min(self.atraso_max, self.atraso * 2)
+                metricas.incrementar("instagram_limite", conta=self.conta, erro=type(erro).__name__)
+            elif tipo == 'bloqueio':
+                self.atraso = min(self.atraso_max, self.atraso * 2)
+                with _conectar(self.caminho) as conn:
+                    self._abrir_circuito(conn, type(erro).__name__)
+
+    def suspensa_ate(self):
+        """Horário (epoch) até quando o disjuntor da conta fica aberto, ou 0 se está liberada."""
+        with _conectar(self.caminho) as conn:
+            aberto_ate, _ = self._circuito(conn)
+        return aberto_ate if aberto_ate > time.time() else 0
+
+    def estado(self):
+        """Resumo para o painel: atraso atual, requisições por janela e disjuntor."""
+        with _conectar(self.caminho) as conn:
+            agora = time.time()
+            aberto_ate, aberturas = self._circuito(conn)
+            usadas = {
+                janela: conn.execute(
+                    "SELECT COUNT(*) FROM requisicoes WHERE conta = ? AND ts > ?", (self.conta, agora - janela)
+                ).fetchone()[0]
+                for janela in self.orcamento
+            }
+        return {
+            'conta': self.conta,
+            'atraso_s': round(self.atraso, 2),
+            'requisicoes': {janela: f"{usadas[janela]}/{limite}" for janela, limite in self.orcamento.items()},
+            'circuito_aberto_ate': datetime.fromtimestamp(aberto_ate, timezone.utc).isoformat() if aberto_ate > agora else None,
+            'aberturas': aberturas,
+        }
+
+
+_governadores = {}
+_trava_registro = threading.Lock()
+
+
+def obter_governador(conta: str, caminho: str = None):
+    """Governador único por conta (e arquivo de estado) no processo."""
+    with _trava_registro:
+        chave = (conta, caminho)
+        if chave not in _governadores:
+            _governadores[chave] = GovernadorInstagram(conta, caminho=caminho)
+        return _governadores[chave]
+
+
+def governar_cliente(cl, conta: str, caminho: str = None):
+    """
+    Faz toda requisição do cliente instagrapi (inclusive as do login) passar
+    pelo governador da conta. Desliga o delay_range do instagrapi, que
+    passa a ser papel do governador.
+    """
+    if getattr(cl, '_governador', None) is not None:
+        return cl
+    governador = obter_governador(conta, caminho)
+
+    for metodo in ('private_request', 'public_request'):
+        original = getattr(cl, metodo, None)
+        if original is None:
+            continue
+
+        def governada(*args, _original=original, **kwargs):
+            governador.antes_da_requisicao()
+            try:
+                resposta = _original(*args, **kwargs)
+            except Exception as e:
+                governador.depois_da_requisicao(e)
+                raise
+            governador.depois_da_requisicao()
+            return resposta
+
+        setattr(cl, metodo, governada)
+    cl.delay_range = [0, 0]
+    cl._governador = governador
+    return cl
+
+
+# -----------------------------------------------------------------------------
+# COLETA PAGINADA COM RETOMADA
+# -----------------------------------------------------------------------------
+def _ler_cursor(conn, perfil: str, quantidade: int, limite: str):
+    linha = conn.execute(
+        "SELECT cursor, coletados, alvo, parar_antes_de, atualizado_em FROM cursores WHERE perfil = ?", (perfil,)
+    ).fetchone()
+    if linha is None or time.time() - linha[4] > VALIDADE_CURSOR_S:
+        return None
+    # Só retoma o mesmo pedido. Um pedido diferente começa do topo do feed:
+    # continuar do cursor antigo devolveria posts velhos e pularia os novos.
+    if linha[2] != quantidade or linha[3] != limite:
+        return None
+    return {'cursor': linha[0], 'coletados': linha[1]}
+
+
+def coletar_midias(cl, user_id, perfil: str, quantidade: int, parar_antes_de: datetime = None):
+    """
+    Busca as mídias do perfil página a página.
+
+    Com um cliente governado (governar_cliente), uma interrupção por
+    bloqueio, orçamento ou erro guarda o cursor da próxima página, e a
+    próxima chamada com o mesmo pedido (perfil, 'quantidade' e
+    'parar_antes_de') continua dali até completar a 'quantidade'. Um pedido
+    diferente começa do topo e substitui o cursor guardado.
+
+    Args:
+        cl: Client do instagrapi (ou dublê com user_medias_paginated_v1/user_medias).
+        user_id: Id do perfil.
+        perfil (str): Nome do perfil (chave do cursor guardado).
+        quantidade (int): Mídias desejadas.
+        parar_antes_de (datetime, opcional): Para de paginar ao encontrar mídia mais antiga.
+    Returns:
+        tuple: (lista de mídias, interrompida: bool)
+    """
+    governador = getattr(cl, '_governador', None)
+    if not hasattr(cl, 'user_medias_paginated_v1'):
+        return cl.user_medias(user_id, quantidade), False
+
+    cursor, coletados_antes = "", 0
+    limite = parar_antes_de.isoformat() if parar_antes_de is not None else None
+    if governador is not None:
+        with _conectar(governador.caminho) as conn:
+            guardado = _ler_cursor(conn, perfil, quantidade, limite)
+        if guardado:
+            cursor, coletados_antes = guardado['cursor'], guardado['coletados']
+            print(f"↪️ Retomando a coleta de @{perfil} de onde parou ({coletados_antes}/{quantidade} posts).")
+            metricas.incrementar("instagram_coleta_retomada", perfil=perfil)
+
+    medias = []
+    interrompida = False
+    try:
+        while coletados_antes + len(medias) < quantidade:
+            if governador is not None:
+                governador.pausa = None
+            pagina, proximo = cl.user_medias_paginated_v1(
+                user_id, quantidade - coletados_antes - len(medias), end_cursor=cursor
+            )
+            # O instagrapi devolve página vazia em vez de repassar algumas exceções
+            if governador is not None and governador.pausa is not None:
+                raise governador.pausa
+            medias.extend(pagina)
+            cursor = proximo
+            if not pagina or not cursor:
+                break
+            if parar_antes_de is not None and any(m.taken_at < parar_antes_de for m in pagina):
+                break
+    except ColetaPausada as e:
+        interrompida = True
+        print(f"⏸️ Coleta de @{perfil} pausada: {e}")
+    except Exception as e:
+        if governador is None:
+            raise
+        interrompida = True
+        print(f"⏸️ Coleta de @{perfil} interrompida: {e}")
+
+    if governador is not None:
+        with _conectar(governador.caminho) as conn:
+            if interrompida and cursor:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cursores (perfil, cursor, coletados, alvo, atualizado_em, parar_antes_de) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (perfil, cursor, coletados_antes + len(medias), quantidade, time.time(), limite)
+                )
+            elif not interrompida:
+                conn.execute("DELETE FROM cursores WHERE perfil = ?", (perfil,))
+    return medias, interrompida
+
+
+def limpar_estado(caminho: str = None):
+    """Apaga o arquivo de estado (orçamentos, disjuntores e cursores)."""
+    caminho = caminho or ARQUIVO_ESTADO_INSTAGRAM
+    for sufixo in ('', '-wal', '-shm'):
+        if os.path.exists(caminho + sufixo):
+            os.remove(caminho + sufixo)
@@ -0,0 +1,178 @@
+# grade_posts.py
+# Grade paginada da "Visão Geral": filtros (perfil, categoria, período) e
+# ordenação rodam no banco e só a página visível vai para o navegador, com
+# as legendas cortadas (a legenda inteira abre sob demanda, post a post).
+# Assim o tempo de desenho do dashboard não cresce com o histórico.
+#
+# Cada banco tem a sua consulta (fetch_pagina_grade nos "*_utils"); para os
+# dados que vêm de CSV/Parquet (sem banco), pagina_local faz o mesmo sobre o
+# DataFrame da análise.
+#
+# Quando a análise usa só os últimos N posts de cada perfil (concorrência), a
+# grade recebe 'janelas': o published_at do post mais antigo analisado de cada
+# perfil, para mostrar os mesmos posts e não o histórico inteiro.
+
+from datetime import timedelta
+
+import pandas as pd
+
+from estatisticas_perfil import SEM_CATEGORIA
+
+try:
+    from config import TAMANHO_PAGINA_GRADE
+except ImportError:
+    TAMANHO_PAGINA_GRADE = 50
+
+TAMANHOS_PAGINA_GRADE = (25, 50, 100, 200)
+
+# Caracteres da legenda mostrados na grade
+TAMANHO_LEGENDA_GRADE = 120
+
+COLUNAS_GRADE = ['perfil', 'data', 'categoria', 'curtidas', 'comentarios', 'legenda', 'link', 'id']
+# Colunas do banco lidas para montar a grade
+COLUNAS_BANCO_GRADE = ['username', 'published_at', 'tipo', 'like_count', 'comment_count',
+                       'caption', 'media_url', 'post_pk']
+
+# Colunas que podem ordenar a grade (app -> banco). Lista fechada: o nome
+# vai direto no ORDER BY / sort.
+ORDENACOES_GRADE = {
+    'data': 'published_at',
+    'curtidas': 'like_count',
+    'comentarios': 'comment_count',
+}
+
+# DDL para rodar uma vez no SQL Editor do Supabase (o SQLite cria os índices
+# sozinho e o MongoDB na primeira consulta)
+SQL_GRADE_POSTS = """
+create index if not exists posts_username_published on posts (username, published_at desc);
+create index if not exists posts_username_likes on posts (username, like_count desc);
+create index if not exists posts_username_comments on posts (username, comment_count desc);
+"""
+
+
+def coluna_ordenacao(ordenar_por: str):
+    """Coluna do banco para a ordenação pedida (ValueError se não estiver em ORDENACOES_GRADE)."""
+    if ordenar_por not in ORDENACOES_GRADE:
+        raise ValueError(f"Ordenação inválida: {ordenar_por!r} (use {', '.join(ORDENACOES_GRADE)})")
+    return ORDENACOES_GRADE[ordenar_por]
+
+
+def separar_categorias(categorias: list):
+    """
+    Separa o filtro de categorias entre os valores de 'tipo' e o "Sem categoria"
+    (que no banco é 'tipo' nulo ou vazio).
+    Returns:
+        tuple: (list[str] de categorias, bool incluir sem categoria)
+    """
+    categorias = list(categorias or [])
+    incluir_vazias = SEM_CATEGORIA in categorias
+    return [c for c in categorias if c != SEM_CATEGORIA], incluir_vazias
+
+
+def intervalo_datas(data_inicio=None, data_fim=None):
+    """
+    Período como texto 'AAAA-MM-DD' para comparar com published_at: início
+    incluído e fim exclusivo (o dia seguinte a data_fim, que entra inteiro).
+    Returns:
+        tuple: (inicio ou None, fim_exclusivo ou None)
+    """
+    inicio = pd.Timestamp(data_inicio).date().isoformat() if data_inicio is not None else None
+    fim = (pd.Timestamp(data_fim).date() + timedelta(days=1)).isoformat() if data_fim is not None else None
+    return inicio, fim
+
+
+def janelas_da_analise(df: pd.DataFrame):
+    """
+    Início da janela de cada perfil: a 'data' do post mais antigo dele no
+    DataFrame da análise, no texto original (o mesmo formato guardado no banco).
+    Returns:
+        dict: perfil -> data do post mais antigo (perfis sem data válida ficam de fora).
+    """
+    if df is None or df.empty or not {'perfil', 'data'} <= set(df.columns):
+        return {}
+    publicado = pd.to_datetime(df['data'], errors='coerce', utc=True, format='ISO8601')
+    validos = publicado.notna()
+    if not validos.any():
+        return {}
+    mais_antigos = publicado[validos].groupby(df.loc[validos, 'perfil'].astype(str)).idxmin()
+    return {perfil: df.at[indice, 'data'] for perfil, indice in mais_antigos.items()}
+
+
+def para_grade(df: pd.DataFrame):
+    """Página do banco (já traduzida para o app) nas colunas da grade, na ordem."""
+    if 'perfil' in df.columns:
+        # DataFrame da análise (pipeline): 'perfil' já é o username
+        df = df.drop(columns=['username'], errors='ignore')
+    df = df.rename(columns={'username': 'perfil', 'tipo': 'categoria'})
+    return df.reindex(columns=COLUNAS_GRADE).reset_index(drop=True)
+
+
+def truncar_legendas(df: pd.DataFrame, tamanho: int = TAMANHO_LEGENDA_GRADE):
+    """Cópia da página com as legendas cortadas em 'tamanho' caracteres (com '…')."""
+    if 'legenda' not in df.columns or df.empty:
+        return df
+    legendas = df['legenda'].astype('string').fillna('')
+    longas = legendas.str.len() > tamanho
+    cortadas = legendas.str.slice(0, tamanho).str.rstrip() + '…'
+    return df.assign(legenda=legendas.where(~longas, cortadas))
+
+
+def pagina_local(df: pd.DataFrame, perfis: list = None, categorias: list = None, data_inicio=None, data_fim=None,
+                 ordenar_por: str = 'data', decrescente: bool = True, limit: int = TAMANHO_PAGINA_GRADE,
+                 offset: int = 0, janelas: dict = None):
+    """
+    Mesma página que os bancos devolvem, calculada sobre o DataFrame da análise
+    (rotas CSV/Parquet).
+
+    Args:
+        df (pd.DataFrame): Posts no formato do app ('perfil', 'data', 'categoria' ou 'tipo', ...).
+        perfis (list[str]): Só esses perfis (None = todos).
+        categorias (list[str]): Só essas categorias; SEM_CATEGORIA pega os não classificados.
+        data_inicio, data_fim (date): Período de publicação, os dois dias incluídos.
+        ordenar_por (str): Chave de ORDENACOES_GRADE.
+        decrescente (bool): Maior primeiro.
+        limit, offset (int): Página.
+        janelas (dict): perfil -> início (ver janelas_da_analise). Só esses perfis, cada um a partir da sua data.
+    Returns:
+        tuple: (pd.DataFrame com COLUNAS_GRADE, int total de posts no filtro)
+    """
+    coluna_ordenacao(ordenar_por)
+    df = df.rename(columns={'tipo': 'categoria'}) if 'categoria' not in df.columns else df
+    df = df.reset_index(drop=True)
+    mascara = pd.Series(True, index=df.index)
+
+    if perfis and 'perfil' in df.columns:
+        mascara &= df['perfil'].astype(str).isin([str(p) for p in perfis])
+    if categorias and 'categoria' in df.columns:
+        valores, incluir_vazias = separar_categorias(categorias)
+        categoria = df['categoria'].astype('string').fillna('')
+        filtro = categoria.isin(valores)
+        if incluir_vazias:
+            filtro |= categoria.str.strip() == ''
+        mascara &= filtro
+    inicio, fim = intervalo_datas(data_inicio, data_fim)
+    if (inicio or fim or janelas) and 'data' in df.columns:
+        publicado = pd.to_datetime(df['data'], errors='coerce', utc=True, format='ISO8601')
+        if inicio:
+            mascara &= publicado >= pd.Timestamp(inicio, tz='UTC')
+        if fim:
+            mascara &= publicado < pd.Timestamp(fim, tz='UTC')
+        if janelas and 'perfil' in df.columns:
+            desde = pd.to_datetime(pd.Series(janelas, dtype=object), errors='coerce', utc=True, format='ISO8601')
+            mascara &= publicado >= df['perfil'].astype(str).map(desde)
+
+    filtrado = df[mascara]
+    if ordenar_por in filtrado.columns:
+        chave = (pd.to_datetime(filtrado[ordenar_por], errors='coerce', utc=True, format='ISO8601') if ordenar_por == 'data'
+                 else pd.to_numeric(filtrado[ordenar_por], errors='coerce'))
+        # Empate desempata pelo id, como o "ORDER BY ..., post_pk" dos bancos
+        desempate = filtrado['id'].astype(str) if 'id' in filtrado.columns else pd.Series('', index=filtrado.index)
+        ordem = pd.DataFrame({'chave': chave, 'id': desempate}).sort_values(
+            ['chave', 'id'], ascending=[not decrescente, True], kind='stable', na_position='last'
+        ).index
+        filtrado = filtrado.loc[ordem]
+    return para_grade(filtrado.iloc[offset:offset + limit]), int(mascara.sum())
+
+
+def total_de_paginas(total: int, tamanho_pagina: int):
+    return max(1, -(-int(total) // max(1, tamanho_pagina)))
@@ -0,0 +1,155 @@
+# importar_csv.py
+# Leitura validada e tipada do CSV da rota "Carregar arquivo CSV".
+#
+# 1. Lê só o começo do arquivo para descobrir o separador e o cabeçalho e
+#    falha rápido se faltar coluna obrigatória (antes de ler o resto).
+# 2. Lê o arquivo em blocos com tipos explícitos (categoria, inteiros
+#    anuláveis, datas já convertidas), sem o pandas ter que adivinhar.
+# 3. Opcionalmente classifica as linhas sem categoria com o mesmo classificador
+#    do pipeline (classificador_post.py).
+
+import csv
+import io
+
+import pandas as pd
+
+# Linhas por bloco na leitura
+TAMANHO_BLOCO = 50_000
+
+# Bytes lidos para descobrir o separador e o cabeçalho
+TAMANHO_AMOSTRA = 64 * 1024
+
+COLUNAS_OBRIGATORIAS = ['data', 'curtidas', 'comentarios']
+
+TIPOS_CSV = {
+    'id': 'string',
+    'num': 'Int8',
+    'curtidas': 'Int64',
+    'comentarios': 'Int64',
+    'legenda': 'string',
+    'link': 'string',
+    'categoria': 'category',
+    'tipo': 'category',
+    'perfil': 'category',
+}
+
+
+def _ler_amostra(arquivo):
+    """Lê o começo do arquivo (caminho ou upload do Streamlit) e volta para o início."""
+    if isinstance(arquivo, (str, bytes)) or hasattr(arquivo, '__fspath__'):
+        with open(arquivo, 'rb') as f:
+            amostra = f.read(TAMANHO_AMOSTRA)
+    else:
+        arquivo.seek(0)
+        amostra = arquivo.read(TAMANHO_AMOSTRA)
+        arquivo.seek(0)
+    if isinstance(amostra, bytes):
+        amostra = amostra.decode('utf-8-sig', errors='replace')
+    return amostra
+
+
+def ler_cabecalho_csv(arquivo):
+    """
+    Descobre separador e colunas lendo apenas a amostra inicial.
+    Returns:
+        tuple: (separador, lista_de_colunas)
+    """
+    amostra = _ler_amostra(arquivo)
+    try:
+        separador = csv.Sniffer().sniff(amostra.splitlines()[0], delimiters=',;\t|').delimiter
+    except (csv.Error, IndexError):
+        separador = ','
+    colunas = pd.read_csv(io.StringIO(amostra), sep=separador, nrows=0).columns
+    return separador, [c.strip() for c in colunas]
+
+
+def validar_cabecalho(colunas: list, classificar_sem_categoria: bool = False):
+    """Levanta ValueError com uma mensagem clara se o CSV não servir para a análise."""
+    faltando = [c for c in COLUNAS_OBRIGATORIAS if c not in colunas]
+    tem_categoria = 'tipo' in colunas or 'categoria' in colunas
+
+    if not tem_categoria and not classificar_sem_categoria:
+        faltando.append("'tipo' ou 'categoria'")
+    if classificar_sem_categoria and 'legenda' not in colunas:
+        faltando.append('legenda (necessária para classificar com IA)')
+    if faltando:
+        raise ValueError(f"O CSV não tem as colunas obrigatórias: {', '.join(faltando)}.")
+
+
+def carregar_csv_tipado(arquivo, classificar_sem_categoria: bool = False, api_key: str = None,
+                        tamanho_bloco: int = TAMANHO_BLOCO):
+    """
+    Lê o CSV validado, em blocos e com tipos compactos.
+
+    Args:
+        arquivo: Caminho ou arquivo do st.file_uploader.
+        classificar_sem_categoria (bool): Classifica com IA as linhas sem 'categoria'.
+        api_key (str): Chave do Gemini (obrigatória se classificar_sem_categoria).
+        tamanho_bloco (int): Linhas por bloco.
+    Returns:
+        pd.DataFrame: Com a coluna 'categoria' (nunca 'tipo').
+    Raises:
+        ValueError: Cabeçalho inválido ou valores que não batem com os tipos esperados.
+    """
+    separador, colunas = ler_cabecalho_csv(arquivo)
+    validar_cabecalho(colunas, classificar_sem_categoria)
+
+    if hasattr(arquivo, 'seek'):
+        arquivo.seek(0)
+
+    tipos = {col: tipo for col, tipo in TIPOS_CSV.items() if col in colunas}
+    blocos = []
+    try:
+        leitor = pd.read_csv(
+            arquivo,
+            sep=separador,
+            dtype=tipos,
+            parse_dates=['data'],
+            chunksize=tamanho_bloco,
+            encoding='utf-8-sig',
+            skipinitialspace=True,
+        )
+        for bloco in leitor:
+            blocos.append(bloco)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Valor inválido no CSV (verifique 'curtidas', 'comentarios' e 'data'): {e}") from e
+
+    if not blocos:
+        raise ValueError("O CSV não tem linhas de dados.")
+
+    df = pd.concat(blocos, ignore_index=True)
+    df.columns = [c.strip() for c in df.columns]
+    if 'tipo' in df.columns and 'categoria' not in df.columns:
+        df = df.rename(columns={'tipo': 'categoria'})
+    if 'categoria' not in df.columns:
+        df['categoria'] = pd.NA
+
+    # Os blocos podem ter conjuntos de categorias diferentes; unifica no final
+    df['categoria'] = df['categoria'].astype('category')
+
+    if classificar_sem_categoria:
+        df = classificar_linhas_sem_categoria(df, api_key)
+
+    print(f"✅ CSV carregado: {len(df)} linhas, {df.memory_usage(deep=True).sum() / 1e6:.1f} MB em memória.")
+    return df
+
+
+def classificar_linhas_sem_categoria(df: pd.DataFrame, api_key: str):
+    """Envia ao classificador só as linhas sem categoria e preenche o resultado."""
+    from classificador_post import classificar_posts_gemini
+
+    sem_categoria = df['categoria'].isna() | (df['categoria'].astype('string').str.strip() == '')
+    if not sem_categoria.any():
+        return df
+
+    if 'id' not in df.columns:
+        df['id'] = df.index.astype('string')
+
+    print(f"🤖 Classificando {int(sem_categoria.sum())} linhas do CSV sem categoria...")
+    classificacoes = classificar_posts_gemini(df.loc[sem_categoria, ['id', 'legenda']], api_key)
+    mapa = {str(item['id']): item['categoria'] for item in classificacoes}
+
+    categorias = df['categoria'].astype('string')
+    categorias[sem_categoria] = df.loc[sem_categoria, 'id'].astype('string').map(mapa)
+    df['categoria'] = categorias.astype('category')
+    return df
@@ -0,0 +1,167 @@
+# lotes_supabase.py
+# Upsert em lotes no Supabase (PostgREST).
+#
+# Uma lista grande de registros num único upsert esbarra no limite de tamanho
+# da requisição e no statement_timeout, e uma falha derruba tudo. Aqui:
+# - os registros são divididos por número de linhas E por bytes do JSON;
+# - os lotes vão em paralelo, no máximo CONCORRENCIA_SUPABASE ao mesmo tempo,
+#   todos pelo mesmo client (o SDK guarda uma sessão HTTP só, com keep-alive);
+# - só o lote que falhou é repetido, com espera exponencial + jitter; erro de
+#   dado (violação de constraint, coluna inexistente) não é repetido;
+# - lote recusado por tamanho ou tempo (413, statement timeout) é partido ao
+#   meio e cada metade tenta de novo;
+# - cada lote devolve seu resultado, para quem chamou gravar/guardar no spool
+#   só o que falhou.
+
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metricas
+
+try:
+    from config import LOTE_SUPABASE_LINHAS
+except ImportError:
+    LOTE_SUPABASE_LINHAS = 500
+
+try:
+    from config import LOTE_SUPABASE_BYTES
+except ImportError:
+    LOTE_SUPABASE_BYTES = 1_000_000
+
+try:
+    from config import CONCORRENCIA_SUPABASE
+except ImportError:
+    CONCORRENCIA_SUPABASE = 4
+
+TENTATIVAS_POR_LOTE = 4
+ESPERA_BASE_S = 1.0
+ESPERA_MAXIMA_S = 30.0
+
+# SQLSTATE de erro no dado ou no schema: repetir não adianta
+# (22 = dado inválido, 23 = constraint, 42 = coluna/tabela inexistente)
+CLASSES_SQLSTATE_PERMANENTES = ('22', '23', '42')
+# Lote grande demais para a requisição ou para o statement_timeout
+CODIGOS_LOTE_GRANDE = ('413', '57014')
+
+
+def dividir_em_lotes(registros: list, max_linhas: int = LOTE_SUPABASE_LINHAS, max_bytes: int = LOTE_SUPABASE_BYTES):
+    """
+    Divide os registros em lotes de até max_linhas linhas e max_bytes de JSON.
+    Um registro maior que max_bytes vai sozinho num lote.
+    Returns:
+        list[list[dict]]
+    """
+    lotes = []
+    atual, bytes_atual = [], 2  # '[' + ']'
+    for registro in registros:
+        tamanho = len(json.dumps(registro, default=str, ensure_ascii=False).encode()) + 1
+        if atual and (len(atual) >= max_linhas or bytes_atual + tamanho > max_bytes):
+            lotes.append(atual)
+            atual, bytes_atual = [], 2
+        atual.append(registro)
+        bytes_atual += tamanho
+    if atual:
+        lotes.append(atual)
+    return lotes
+
+
+def _codigo(erro: Exception):
+    codigo = getattr(erro, 'code', None)
+    if codigo is None:
+        resposta = getattr(erro, 'response', None)
+        codigo = getattr(resposta, 'status_code', None)
+    return str(codigo) if codigo is not None else ''
+
+
+def lote_grande_demais(erro: Exception):
+    codigo = _codigo(erro)
+    return codigo in CODIGOS_LOTE_GRANDE or 'payload too large' in str(erro).lower()
+
+
+def erro_permanente(erro: Exception):
+    codigo = _codigo(erro)
+    return len(codigo) == 5 and codigo[:2] in CLASSES_SQLSTATE_PERMANENTES
+
+
+def _espera(tentativa: int):
+    return min(ESPERA_MAXIMA_S, ESPERA_BASE_S * 2 ** tentativa) * random.uniform(0.5, 1.0)
+
+
+def upsert_em_lotes(supabase_client, tabela: str, registros: list, on_conflict: str, ignore_duplicates: bool = False,
+                    max_linhas: int = LOTE_SUPABASE_LINHAS, max_bytes: int = LOTE_SUPABASE_BYTES,
+                    concorrencia: int = CONCORRENCIA_SUPABASE, tentativas: int = TENTATIVAS_POR_LOTE):
+    """
+    Upsert dos registros em lotes paralelos, repetindo só os lotes que falharem.
+
+    Args:
+        supabase_client: Client do Supabase.
+        tabela (str): Tabela de destino.
+        registros (list[dict]): Linhas já no formato do banco (ver registros_para_banco).
+        on_conflict (str): Colunas da chave do upsert.
+        ignore_duplicates (bool): ON CONFLICT DO NOTHING em vez de atualizar.
+        max_linhas, max_bytes (int): Limites de cada lote.
+        concorrencia (int): Lotes enviados ao mesmo tempo.
+        tentativas (int): Envios de cada lote antes de desistir.
+    Returns:
+        list[dict]: Um resultado por lote, na ordem dos registros: 'lote', 'linhas',
+        'gravadas', 'ok', 'tentativas', 'divisoes', 'erro' e 'falhas' (registros não
+        gravados; um lote partido ao meio pode ter gravado só uma das metades).
+    """
+    lotes = dividir_em_lotes(registros, max_linhas, max_bytes)
+
+    def enviar(lote, tentativas_restantes):
+        # Devolve (registros não gravados, último erro, tentativas usadas, divisões feitas)
+        usadas = 0
+        while True:
+            usadas += 1
+            try:
+                with metricas.cronometro("supabase_lote", tabela=tabela):
+                    supabase_client.table(tabela).upsert(
+                        lote, on_conflict=on_conflict, ignore_duplicates=ignore_duplicates
+                    ).execute()
+                return [], None, usadas, 0
+            except Exception as e:
+                metricas.incrementar("supabase_lote_erros", tabela=tabela, erro=type(e).__name__)
+                if lote_grande_demais(e) and len(lote) > 1:
+                    meio = len(lote) // 2
+                    falhas_a, erro_a, usadas_a, div_a = enviar(lote[:meio], tentativas_restantes - usadas + 1)
+                    falhas_b, erro_b, usadas_b, div_b = enviar(lote[meio:], tentativas_restantes - usadas + 1)
+                    return falhas_a + falhas_b, erro_a or erro_b, usadas + usadas_a + usadas_b, 1 + div_a + div_b
+                if erro_permanente(e) or usadas >= tentativas_restantes:
+                    return lote, e, usadas, 0
+                metricas.incrementar("supabase_lote_repeticoes", tabela=tabela)
+                time.sleep(_espera(usadas - 1))
+
+    def processar(indice_lote):
+        indice, lote = indice_lote
+        falhas, erro, usadas, divisoes = enviar(lote, tentativas)
+        return {
+            'lote': indice, 'linhas': len(lote), 'gravadas': len(lote) - len(falhas), 'ok': not falhas,
+            'tentativas': usadas, 'divisoes': divisoes, 'erro': None if erro is None else str(erro)[:300],
+            'falhas': falhas,
+        }
+
+    if not lotes:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(concorrencia, len(lotes)))) as executor:
+        # Os lotes entram nas métricas do run_id de quem chamou
+        resultados = list(executor.map(metricas.no_contexto_atual(processar), enumerate(lotes)))
+    metricas.incrementar("supabase_linhas_gravadas", sum(r['gravadas'] for r in resultados), tabela=tabela)
+    return resultados
+
+
+def registros_com_falha(resultados: list):
+    """Registros dos lotes que não foram gravados."""
+    return [registro for r in resultados for registro in r['falhas']]
+
+
+def resumir(resultados: list):
+    """Texto curto para o terminal: lotes/linhas gravados e o primeiro erro."""
+    ok = [r for r in resultados if r['ok']]
+    texto = f"{len(ok)}/{len(resultados)} lotes ({sum(r['gravadas'] for r in resultados)} linhas)"
+    falhas = [r for r in resultados if not r['ok']]
+    if falhas:
+        texto += f"; {len(falhas)} lotes falharam: {falhas[0]['erro']}"
+    return texto
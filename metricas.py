@@ -0,0 +1,313 @@
+# metricas.py
+# Cronômetros, contadores e log estruturado do pipeline.
+#
+# Cada execução de processar_perfil (ou de um script de coleta) ganha um
+# run_id; tudo o que é medido dentro dela é somado no total do processo e
+# também no resumo daquela execução. Os eventos saem como JSON, uma linha
+# por evento, no logger "agente_macfor".
+#
+# Uso:
+#     with metricas.execucao(perfil="orbia.ag") as run_id:
+#         with metricas.cronometro("instagram_login"):
+#             ...
+#         metricas.incrementar("gemini_chamadas", funcao="classificacao")
+
+import contextvars
+import importlib
+import json
+import logging
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    from config import NIVEL_LOG_METRICAS
+except ImportError:
+    NIVEL_LOG_METRICAS = "INFO"
+
+# Quantas execuções recentes ficam guardadas para o painel do dashboard
+MAX_EXECUCOES_GUARDADAS = 50
+
+_run_id_atual = contextvars.ContextVar("run_id", default=None)
+_trava = threading.Lock()
+
+# (nome, rótulos ordenados) -> valor / estatísticas
+_contadores = {}
+_cronometros = {}
+# run_id -> {'info': {...}, 'contadores': {...}, 'cronometros': {...}}
+_execucoes = {}
+
+
+class _FormatadorJSON(logging.Formatter):
+    def format(self, record):
+        evento = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'nivel': record.levelname,
+            'evento': record.getMessage(),
+            'run_id': getattr(record, 'run_id', None),
+        }
+        evento.update(getattr(record, 'campos', {}))
+        return json.dumps(evento, ensure_ascii=False, default=str)
+
+
+logger = logging.getLogger("agente_macfor")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(_FormatadorJSON())
+    logger.addHandler(_handler)
+    logger.setLevel(NIVEL_LOG_METRICAS)
+    logger.propagate = False
+
+
+def _chave(nome: str, rotulos: dict):
+    return nome, tuple(sorted((k, str(v)) for k, v in rotulos.items()))
+
+
+def run_id_atual():
+    """run_id da execução em andamento (ou None fora de uma execução)."""
+    return _run_id_atual.get()
+
+
+def no_contexto_atual(funcao):
+    """
+    Prepara 'funcao' para rodar em outra thread (ThreadPoolExecutor) com o
+    run_id de quem chamou: threads do executor não herdam os ContextVar.
+    Cada chamada roda numa cópia do contexto (um Context não pode estar
+    ativo em duas threads ao mesmo tempo).
+
+    Uso:
+        executor.map(metricas.no_contexto_atual(processar), itens)
+    """
+    contexto = contextvars.copy_context()
+
+    def rodar(*args, **kwargs):
+        return contexto.copy().run(funcao, *args, **kwargs)
+    rodar.__name__ = funcao.__name__
+    return rodar
+
+
+def registrar_evento(evento: str, nivel: int = logging.INFO, **campos):
+    """Escreve uma linha de log estruturado com o run_id atual."""
+    logger.log(nivel, evento, extra={'run_id': run_id_atual(), 'campos': campos})
+
+
+def incrementar(nome: str, valor: float = 1, **rotulos):
+    """Soma 'valor' no contador 'nome' (global e da execução atual)."""
+    chave = _chave(nome, rotulos)
+    run_id = run_id_atual()
+    with _trava:
+        _contadores[chave] = _contadores.get(chave, 0) + valor
+        if run_id in _execucoes:
+            contadores = _execucoes[run_id]['contadores']
+            contadores[chave] = contadores.get(chave, 0) + valor
+
+
+def registrar_tempo(nome: str, segundos: float, **rotulos):
+    """Registra uma duração já medida no cronômetro 'nome'."""
+    chave = _chave(nome, rotulos)
+    run_id = run_id_atual()
+    with _trava:
+        alvos = [_cronometros]
+        if run_id in _execucoes:
+            alvos.append(_execucoes[run_id]['cronometros'])
+        for alvo in alvos:
+            estatistica = alvo.setdefault(chave, {'contagem': 0, 'soma_s': 0.0, 'max_s': 0.0})
+            estatistica['contagem'] += 1
+            estatistica['soma_s'] += segundos
+            estatistica['max_s'] = max(estatistica['max_s'], segundos)
+
+
+@contextmanager
+def cronometro(nome: str, **rotulos):
+    """Mede o bloco. Exceções são contadas em '<nome>_erros' e repassadas."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        incrementar(f"{nome}_erros", **rotulos)
+        registrar_evento(f"{nome}_erro", logging.WARNING, erro=str(e)[:200], **rotulos)
+        raise
+    finally:
+        duracao = time.perf_counter() - inicio
+        registrar_tempo(nome, duracao, **rotulos)
+        registrar_evento(nome, duracao_s=round(duracao, 4), **rotulos)
+
+
+def medir(nome: str, **rotulos):
+    """Versão decorador do cronometro()."""
+    def decorador(funcao):
+        def envolvida(*args, **kwargs):
+            with cronometro(nome, **rotulos):
+                return funcao(*args, **kwargs)
+        envolvida.__name__ = funcao.__name__
+        envolvida.__doc__ = funcao.__doc__
+        return envolvida
+    return decorador
+
+
+@contextmanager
+def execucao(**info):
+    """
+    Abre uma execução com run_id próprio (ex: um processar_perfil).
+    Execuções aninhadas reaproveitam o run_id de fora.
+    """
+    if run_id_atual() is not None:
+        yield run_id_atual()
+        return
+
+    run_id = uuid.uuid4().hex[:12]
+    with _trava:
+        _execucoes[run_id] = {
+            'info': {**info, 'inicio': datetime.now(timezone.utc).isoformat()},
+            'contadores': {},
+            'cronometros': {},
+        }
+        while len(_execucoes) > MAX_EXECUCOES_GUARDADAS:
+            _execucoes.pop(next(iter(_execucoes)))
+
+    token = _run_id_atual.set(run_id)
+    inicio = time.perf_counter()
+    registrar_evento("execucao_inicio", **info)
+    try:
+        yield run_id
+    finally:
+        duracao = time.perf_counter() - inicio
+        with _trava:
+            if run_id in _execucoes:
+                _execucoes[run_id]['info']['duracao_s'] = round(duracao, 3)
+        registrar_evento("execucao_fim", duracao_s=round(duracao, 3), **info)
+        _run_id_atual.reset(token)
+
+
+def registrar_uso_gemini(response, modelo: str, funcao: str):
+    """Conta chamadas e tokens (entrada/saída) de uma resposta do Gemini."""
+    incrementar("gemini_chamadas", modelo=modelo, funcao=funcao)
+    uso = getattr(response, 'usage_metadata', None)
+    if uso is not None:
+        incrementar("gemini_tokens_entrada", getattr(uso, 'prompt_token_count', 0) or 0, modelo=modelo, funcao=funcao)
+        incrementar("gemini_tokens_saida", getattr(uso, 'candidates_token_count', 0) or 0, modelo=modelo, funcao=funcao)
+
+
+def registrar_cache(nome: str, acerto: bool):
+    """Conta acertos/faltas de um cache."""
+    incrementar("cache_acertos" if acerto else "cache_faltas", cache=nome)
+
+
+def importar(nome_modulo: str):
+    """
+    Importa um módulo pesado (SDKs do Gemini, Instagram, bancos) só quando
+    o caminho que precisa dele roda. A primeira carga fica no cronômetro
+    'importacao'; as seguintes vêm direto do sys.modules.
+    """
+    modulo = sys.modules.get(nome_modulo)
+    if modulo is not None:
+        return modulo
+    with cronometro("importacao", modulo=nome_modulo):
+        return importlib.import_module(nome_modulo)
+
+
+def instrumentar_cliente_instagram(cl):
+    """
+    Conta e cronometra cada requisição HTTP do cliente instagrapi
+    (private_request/public_request), inclusive as páginas de mídia
+    que o user_medias busca por dentro.
+    """
+    if getattr(cl, '_instrumentado', False):
+        return cl
+
+    for metodo in ('private_request', 'public_request'):
+        original = getattr(cl, metodo, None)
+        if original is None:
+            continue
+
+        def envolvida(endpoint, *args, _original=original, _metodo=metodo, **kwargs):
+            caminho = str(endpoint).split('?')[0].strip('/').split('/')[0] or 'raiz'
+            incrementar("instagram_requisicoes", metodo=_metodo, endpoint=caminho)
+            with cronometro("instagram_requisicao", metodo=_metodo, endpoint=caminho):
+                return _original(endpoint, *args, **kwargs)
+
+        setattr(cl, metodo, envolvida)
+    cl._instrumentado = True
+    return cl
+
+
+# -----------------------------------------------------------------------------
+# EXPORTAÇÃO
+# -----------------------------------------------------------------------------
+def _linhas(contadores: dict, cronometros: dict):
+    linhas = []
+    for (nome, rotulos), valor in contadores.items():
+        linhas.append({'metrica': nome, 'tipo': 'contador', 'rotulos': dict(rotulos), 'valor': valor})
+    for (nome, rotulos), est in cronometros.items():
+        linhas.append({'metrica': nome, 'tipo': 'cronometro', 'rotulos': dict(rotulos),
+                       'contagem': est['contagem'], 'soma_s': round(est['soma_s'], 4),
+                       'max_s': round(est['max_s'], 4)})
+    return linhas
+
+
+def exportar_json(run_id: str = None):
+    """Métricas do processo inteiro (ou de um run_id) como texto JSON."""
+    with _trava:
+        if run_id is None:
+            dados = {'metricas': _linhas(dict(_contadores), dict(_cronometros))}
+        else:
+            execucao_dados = _execucoes.get(run_id, {'info': {}, 'contadores': {}, 'cronometros': {}})
+            dados = {
+                'run_id': run_id,
+                'info': dict(execucao_dados['info']),
+                'metricas': _linhas(dict(execucao_dados['contadores']), dict(execucao_dados['cronometros'])),
+            }
+    return json.dumps(dados, ensure_ascii=False, indent=2, default=str)
+
+
+def _rotulos_prometheus(rotulos):
+    if not rotulos:
+        return ""
+    partes = ",".join('{}="{}"'.format(k, v.replace('\\', '\\\\').replace('"', '\\"')) for k, v in rotulos)
+    return "{" + partes + "}"
+
+
+def exportar_prometheus():
+    """Métricas do processo no formato texto do Prometheus."""
+    linhas = []
+    with _trava:
+        contadores = dict(_contadores)
+        cronometros = dict(_cronometros)
+
+    for nome in sorted({n for n, _ in contadores}):
+        linhas.append(f"# TYPE agente_{nome}_total counter")
+        for (n, rotulos), valor in contadores.items():
+            if n == nome:
+                linhas.append(f"agente_{nome}_total{_rotulos_prometheus(rotulos)} {valor}")
+
+    for nome in sorted({n for n, _ in cronometros}):
+        linhas.append(f"# TYPE agente_{nome}_segundos summary")
+        for (n, rotulos), est in cronometros.items():
+            if n == nome:
+                r = _rotulos_prometheus(rotulos)
+                linhas.append(f"agente_{nome}_segundos_count{r} {est['contagem']}")
+                linhas.append(f"agente_{nome}_segundos_sum{r} {est['soma_s']:.6f}")
+        linhas.append(f"# TYPE agente_{nome}_segundos_max gauge")
+        for (n, rotulos), est in cronometros.items():
+            if n == nome:
+                linhas.append(f"agente_{nome}_segundos_max{_rotulos_prometheus(rotulos)} {est['max_s']:.6f}")
+    return "\n".join(linhas) + "\n"
+
+
+def resumo_execucao(run_id: str):
+    """
+    Resumo de uma execução para o painel do dashboard.
+    Returns:
+        tuple: (info: dict, linhas: list[dict]) — linhas ordenadas pelo tempo total.
+    """
+    with _trava:
+        execucao_dados = _execucoes.get(run_id)
+        if execucao_dados is None:
+            return {}, []
+        info = dict(execucao_dados['info'])
+        linhas = _linhas(dict(execucao_dados['contadores']), dict(execucao_dados['cronometros']))
+    linhas.sort(key=lambda linha: linha.get('soma_s', -1), reverse=True)
+    return info, linhas
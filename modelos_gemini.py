@@ -0,0 +1,177 @@
+# modelos_gemini.py
+# Registro dos modelos do Gemini usados pelo projeto.
+#
+# Cada tarefa (classificação, insights, chatbot, concorrência) aponta para um
+# modelo + configuração de geração + instrução de sistema + filtros de
+# segurança. O GenerativeModel é criado uma vez por combinação e reaproveitado
+# (st.cache_resource no dashboard, cache do processo nos scripts), e o
+# genai.configure roda uma vez por chave.
+#
+# Para trocar o modelo de uma tarefa, basta sobrescrever no config.py:
+#     MODELOS_GEMINI = {'chatbot': {'modelo': 'gemini-2.5-flash-lite'}}
+
+import json
+import threading
+import time
+from collections import deque
+
+import metricas
+from streamlit_opcional import cache_recurso
+
+try:
+    from config import MODELOS_GEMINI
+except ImportError:
+    MODELOS_GEMINI = {}
+
+# Filtros de segurança padrão: só bloqueia conteúdo de risco alto, para que
+# falsos positivos em legendas comuns não virem respostas sem texto
+SEGURANCA_PADRAO = {
+    'HARM_CATEGORY_HARASSMENT': 'BLOCK_ONLY_HIGH',
+    'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_ONLY_HIGH',
+    'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_ONLY_HIGH',
+    'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_ONLY_HIGH',
+}
+
+TAREFAS = {
+    'classificacao': {
+        'modelo': 'gemini-2.0-flash',
+        # Resposta curta e estável: só o nome da categoria
+        'configuracao': {'temperature': 0.0, 'max_output_tokens': 16},
+        'instrucao_sistema': None,
+    },
+    # Posts sem legenda: categoria pela miniatura (cache_midias.py)
+    'classificacao_imagem': {
+        'modelo': 'gemini-2.0-flash',
+        'configuracao': {'temperature': 0.0, 'max_output_tokens': 16},
+        'instrucao_sistema': None,
+    },
+    'insights': {
+        'modelo': 'gemini-2.5-flash',
+        'configuracao': {},
+        'instrucao_sistema': None,
+    },
+    'chatbot': {
+        'modelo': 'gemini-2.5-flash',
+        'configuracao': {},
+        'instrucao_sistema': (
+            "Você é um especialista em análise de mídias sociais e marketing digital. "
+            "Responda às perguntas do usuário sobre os dados do Instagram fornecidos na conversa. "
+            "Baseie suas respostas NOS DADOS FORNECIDOS, seja prático e objetivo, "
+            "use markdown para formatação e responda em português."
+        ),
+    },
+    # Resumo das rodadas antigas do chat (chatbot.py): modelo mais barato
+    'resumo_chat': {
+        'modelo': 'gemini-2.0-flash',
+        'configuracao': {'temperature': 0.2, 'max_output_tokens': 400},
+        'instrucao_sistema': None,
+    },
+    'concorrencia': {
+        'modelo': 'gemini-2.5-flash',
+        'configuracao': {},
+        'instrucao_sistema': None,
+    },
+}
+for _tarefa, _ajustes in MODELOS_GEMINI.items():
+    TAREFAS[_tarefa] = {**TAREFAS.get(_tarefa, TAREFAS['insights']), **_ajustes}
+
+# Latências recentes por modelo (para p50/p95 no painel)
+AMOSTRAS_LATENCIA = 500
+_latencias = {}
+_trava = threading.Lock()
+
+
+class ModeloGemini:
+    """
+    Envolve um GenerativeModel (ou o dublê do benchmark) e mede cada
+    generate_content: tempo, erros e tokens (metricas.py) e latência por modelo.
+    O resto (start_chat, count_tokens, ...) passa direto para o modelo.
+    """
+
+    def __init__(self, modelo, nome: str, tarefa: str):
+        self._modelo = modelo
+        self.nome = nome
+        self.tarefa = tarefa
+
+    def generate_content(self, *args, **kwargs):
+        with metricas.cronometro("gemini_chamada", modelo=self.nome, funcao=self.tarefa):
+            inicio = time.perf_counter()
+            response = self._modelo.generate_content(*args, **kwargs)
+            registrar_latencia(self.nome, time.perf_counter() - inicio)
+        metricas.registrar_uso_gemini(response, self.nome, self.tarefa)
+        return response
+
+    def __getattr__(self, nome):
+        return getattr(self._modelo, nome)
+
+
+def registrar_latencia(modelo: str, segundos: float):
+    with _trava:
+        _latencias.setdefault(modelo, deque(maxlen=AMOSTRAS_LATENCIA)).append(segundos)
+
+
+def estatisticas_latencia():
+    """
+    Latência das chamadas recentes de cada modelo.
+    Returns:
+        list[dict]: modelo, chamadas, media_s, p50_s, p95_s, max_s.
+    """
+    with _trava:
+        amostras = {modelo: sorted(valores) for modelo, valores in _latencias.items()}
+
+    linhas = []
+    for modelo, valores in sorted(amostras.items()):
+        if not valores:
+            continue
+        n = len(valores)
+        linhas.append({
+            'modelo': modelo,
+            'chamadas': n,
+            'media_s': round(sum(valores) / n, 3),
+            'p50_s': round(valores[(n - 1) // 2], 3),
+            'p95_s': round(valores[min(n - 1, int(0.95 * n))], 3),
+            'max_s': round(valores[-1], 3),
+        })
+    return linhas
+
+
+@cache_recurso
+def _configurar(api_key: str):
+    genai = metricas.importar("google.generativeai")
+    genai.configure(api_key=api_key)
+    return genai
+
+
+@cache_recurso
+def _criar_modelo(api_key: str, nome: str, configuracao_json: str, instrucao_sistema: str, seguranca_json: str):
+    # Os dicionários chegam como JSON para servirem de chave do cache
+    genai = _configurar(api_key)
+    return genai.GenerativeModel(
+        nome,
+        generation_config=json.loads(configuracao_json) or None,
+        system_instruction=instrucao_sistema,
+        safety_settings=json.loads(seguranca_json) or None,
+    )
+
+
+def obter_modelo(tarefa: str, api_key: str):
+    """
+    Modelo configurado para a tarefa ('classificacao', 'insights', 'chatbot',
+    'resumo_chat', 'concorrencia'), reaproveitado entre chamadas.
+    """
+    if tarefa not in TAREFAS:
+        raise ValueError(f"Tarefa do Gemini desconhecida: '{tarefa}'. Opções: {', '.join(TAREFAS)}")
+    definicao = TAREFAS[tarefa]
+    modelo = _criar_modelo(
+        api_key,
+        definicao['modelo'],
+        json.dumps(definicao.get('configuracao') or {}, sort_keys=True),
+        definicao.get('instrucao_sistema'),
+        json.dumps(definicao.get('seguranca', SEGURANCA_PADRAO) or {}, sort_keys=True),
+    )
+    return ModeloGemini(modelo, definicao['modelo'], tarefa)
+
+
+def nome_do_modelo(tarefa: str):
+    """Nome do modelo configurado para a tarefa (para rótulos e relatórios)."""
+    return TAREFAS[tarefa]['modelo']
@@ -0,0 +1,146 @@
+# parquet_utils.py
+# Exportação/importação do histórico de posts em Parquet.
+#
+# Layout no disco (particionamento "hive"):
+#   <diretorio>/username=<perfil>/mes=<AAAA-MM>/<arquivo>.parquet
+# Na leitura, os filtros de perfil/mês eliminam pastas inteiras sem abrir os
+# arquivos, e só as colunas pedidas são lidas. Não precisa do banco.
+
+import os
+
+import pandas as pd
+
+try:
+    from config import DIRETORIO_PARQUET
+except ImportError:
+    DIRETORIO_PARQUET = "historico_parquet"
+
+# Colunas do app com tipos compactos (categoria vira dicionário no Parquet)
+TIPOS_COLUNAS = {
+    'id': 'string',
+    'num': 'Int8',
+    'curtidas': 'Int64',
+    'comentarios': 'Int64',
+    'legenda': 'string',
+    'link': 'string',
+    'categoria': 'category',
+}
+
+
+def _preparar_para_parquet(df: pd.DataFrame, username: str = None):
+    """Padroniza nomes/tipos e cria as colunas de partição ('username' e 'mes')."""
+    df = df.rename(columns={'tipo': 'categoria'})
+    if 'username' not in df.columns:
+        df = df.assign(username=username if username else df.get('perfil'))
+    df = df.drop(columns=['perfil', 'postgres_id', '_id'], errors='ignore')
+
+    tipos = {col: tipo for col, tipo in TIPOS_COLUNAS.items() if col in df.columns}
+    df = df.astype(tipos)
+    df['data'] = pd.to_datetime(df['data'])
+    df['mes'] = df['data'].dt.strftime('%Y-%m')
+    return df
+
+
+def exportar_historico_parquet(df: pd.DataFrame, diretorio: str = None, username: str = None):
+    """
+    Grava o DataFrame (formato do app) particionado por perfil e mês.
+    Reexportar o mesmo perfil/mês substitui só aquelas partições.
+
+    Args:
+        df (pd.DataFrame): Posts com 'data', 'id', ... e 'categoria'/'tipo'.
+        diretorio (str): Pasta raiz do dataset. Padrão: DIRETORIO_PARQUET.
+        username (str, opcional): Perfil, se o DF não tiver 'username'/'perfil'.
+    Returns:
+        int: Quantidade de posts gravados.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    if df is None or df.empty:
+        print("ℹ️ DataFrame vazio, nada para exportar.")
+        return 0
+
+    diretorio = diretorio or DIRETORIO_PARQUET
+    tabela = pa.Table.from_pandas(_preparar_para_parquet(df, username), preserve_index=False)
+
+    ds.write_dataset(
+        tabela,
+        diretorio,
+        format="parquet",
+        partitioning=["username", "mes"],
+        partitioning_flavor="hive",
+        existing_data_behavior="delete_matching",
+        basename_template="posts-{i}.parquet",
+    )
+    print(f"📦 {tabela.num_rows} posts exportados para '{diretorio}' em Parquet.")
+    return tabela.num_rows
+
+
+def exportar_perfis_do_banco(backend, perfis: list, diretorio: str = None):
+    """Exporta o histórico completo de cada perfil direto do StorageBackend."""
+    total = 0
+    for perfil in perfis:
+        perfil = perfil.replace('@', '')
+        df = backend.fetch_posts(perfil)
+        total += exportar_historico_parquet(df, diretorio, username=perfil)
+    return total
+
+
+def listar_perfis_parquet(diretorio: str = None):
+    """Lista os perfis disponíveis só pelos nomes das pastas (sem abrir arquivos)."""
+    diretorio = diretorio or DIRETORIO_PARQUET
+    if not os.path.isdir(diretorio):
+        return []
+    return sorted(
+        nome.split('=', 1)[1] for nome in os.listdir(diretorio)
+        if nome.startswith('username=')
+    )
+
+
+def carregar_historico_parquet(diretorio: str = None, perfis: list = None, data_inicio=None,
+                               data_fim=None, colunas: list = None):
+    """
+    Lê o histórico com leitura preguiçosa: filtros de perfil e período descem
+    para o leitor do Parquet (partições e row groups fora do filtro nem são lidos)
+    e só as colunas pedidas são carregadas.
+
+    Args:
+        diretorio (str): Pasta raiz do dataset. Padrão: DIRETORIO_PARQUET.
+        perfis (list, opcional): Perfis a carregar. Padrão: todos.
+        data_inicio / data_fim (str ou datetime, opcional): Período (inclusive).
+        colunas (list, opcional): Colunas do app a carregar. Padrão: todas.
+    Returns:
+        pd.DataFrame: No formato do app, com as colunas 'perfil' e 'categoria'.
+    """
+    import pyarrow.dataset as ds
+
+    diretorio = diretorio or DIRETORIO_PARQUET
+    dataset = ds.dataset(diretorio, format="parquet", partitioning="hive")
+
+    filtro = None
+    def _e(condicao):
+        return condicao if filtro is None else filtro & condicao
+
+    if perfis:
+        filtro = _e(ds.field('username').isin([p.replace('@', '') for p in perfis]))
+    if data_inicio is not None:
+        inicio = pd.Timestamp(data_inicio)
+        filtro = _e(ds.field('mes') >= inicio.strftime('%Y-%m'))
+        filtro = _e(ds.field('data') >= inicio)
+    if data_fim is not None:
+        # Fim inclusivo: até o último instante do dia informado
+        fim = pd.Timestamp(data_fim).normalize() + pd.Timedelta(days=1)
+        filtro = _e(ds.field('mes') <= pd.Timestamp(data_fim).strftime('%Y-%m'))
+        filtro = _e(ds.field('data') < fim)
+
+    if colunas:
+        colunas = list(dict.fromkeys([c for c in colunas if c != 'perfil'] + ['username']))
+
+    tabela = dataset.to_table(columns=colunas, filter=filtro)
+    df = tabela.to_pandas().drop(columns=['mes'], errors='ignore').rename(columns={'username': 'perfil'})
+    if 'perfil' in df.columns:
+        df['perfil'] = df['perfil'].astype(str)
+    if 'data' in df.columns:
+        df = df.sort_values(['perfil', 'data'], ascending=[True, False], ignore_index=True)
+    print(f"✅ {len(df)} posts carregados do Parquet.")
+    return df
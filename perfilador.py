@@ -0,0 +1,283 @@
+# perfilador.py
+# Modo de perfilamento sob demanda, para descobrir por que uma execução
+# ficou lenta sem mexer no código.
+#
+# Ligado por '?profile=1' na URL do dashboard (Menu.py) ou por '--profile'
+# nos scripts (rodar_processo_completo.py, coletar_e_salvar_insta.py). Com
+# ele ligado:
+# - uma thread amostra as pilhas de todas as threads a cada
+#   INTERVALO_AMOSTRAGEM_S (só a biblioteca padrão: sys._current_frames);
+# - o tracemalloc guarda o pico de memória de cada etapa marcada com
+#   etapa() (processar_perfil 1-5, insights, chatbot);
+# - no fim sai um arquivo do speedscope (https://www.speedscope.app) por
+#   run id, com um perfil por thread, e um JSON com os picos por etapa.
+#
+# Desligado, etapa() é só o cronômetro de sempre (metricas.cronometro).
+# Os picos são do processo inteiro: com duas análises ao mesmo tempo no
+# dashboard, uma entra na conta da outra. Por isso só uma sessão de
+# perfilamento roda por vez.
+
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+import metricas
+
+try:
+    from config import DIRETORIO_PERFIS
+except ImportError:
+    DIRETORIO_PERFIS = "perfis_execucao"
+
+# 200 amostras por segundo
+INTERVALO_AMOSTRAGEM_S = 0.005
+
+# Quadros guardados por pilha (o resto, mais perto da raiz, é cortado)
+PROFUNDIDADE_MAXIMA = 200
+
+_MB = 1024 * 1024
+
+_trava = threading.Lock()
+_sessao_ativa = None
+
+
+class SessaoPerfil:
+    """
+    Uma sessão de perfilamento: amostragem das pilhas + picos de memória.
+
+    Args:
+        run_id (str): Nome dos arquivos gerados (padrão: o run_id atual do metricas ou um novo).
+        diretorio (str): Onde salvar os arquivos.
+        intervalo_s (float): Tempo entre duas amostras.
+        rotulo (str): Nome do perfil no speedscope (ex: "menu", o nome do script).
+    """
+
+    def __init__(self, run_id: str = None, diretorio: str = None, intervalo_s: float = INTERVALO_AMOSTRAGEM_S,
+                 rotulo: str = None):
+        self.run_id = run_id or metricas.run_id_atual() or uuid.uuid4().hex[:12]
+        self.diretorio = diretorio or DIRETORIO_PERFIS
+        self.intervalo_s = intervalo_s
+        self.rotulo = rotulo or self.run_id
+        self.memoria = {}
+        self.caminhos = None
+
+        self._quadros = {}      # (nome, arquivo, linha) -> índice em shared.frames
+        self._amostras = {}     # ident da thread -> [[pilha, peso], ...]
+        self._nomes_threads = {}
+        self._thread_principal = threading.get_ident()
+        self._parar = threading.Event()
+        self._amostrador = None
+        self._iniciou_tracemalloc = False
+        self._trava_memoria = threading.Lock()
+        self._pilha_memoria = []
+        self._pico_total = 0
+        self._inicio = None
+        self._duracao = 0.0
+
+    # --- amostragem ---------------------------------------------------------
+    def _indice_quadro(self, codigo):
+        chave = (codigo.co_qualname, codigo.co_filename, codigo.co_firstlineno)
+        indice = self._quadros.get(chave)
+        if indice is None:
+            indice = self._quadros[chave] = len(self._quadros)
+        return indice
+
+    def _pilha(self, quadro):
+        pilha = []
+        while quadro is not None and len(pilha) < PROFUNDIDADE_MAXIMA:
+            pilha.append(self._indice_quadro(quadro.f_code))
+            quadro = quadro.f_back
+        pilha.reverse()  # o speedscope quer da raiz para a folha
+        return tuple(pilha)
+
+    def _amostrar(self):
+        proprio = threading.get_ident()
+        anterior = time.perf_counter()
+        while not self._parar.wait(self.intervalo_s):
+            agora = time.perf_counter()
+            peso, anterior = agora - anterior, agora
+            for ident, quadro in sys._current_frames().items():
+                if ident == proprio:
+                    continue
+                if ident not in self._nomes_threads:
+                    self._nomes_threads.update({t.ident: t.name for t in threading.enumerate()})
+                amostras = self._amostras.setdefault(ident, [])
+                pilha = self._pilha(quadro)
+                # Mesma pilha da amostra anterior: só soma o tempo
+                if amostras and amostras[-1][0] == pilha:
+                    amostras[-1][1] += peso
+                else:
+                    amostras.append([pilha, peso])
+
+    # --- memória ------------------------------------------------------------
+    def _acumular_pico(self, pico: int):
+        if self._pilha_memoria:
+            self._pilha_memoria[-1] = max(self._pilha_memoria[-1], pico)
+        else:
+            self._pico_total = max(self._pico_total, pico)
+
+    @contextmanager
+    def medir_memoria(self, nome: str):
+        """
+        Pico de memória alocada (tracemalloc) durante o bloco. Etapas aninhadas
+        funcionam: o pico de dentro também conta para a de fora.
+        """
+        with self._trava_memoria:
+            atual_inicio, pico = tracemalloc.get_traced_memory()
+            self._acumular_pico(pico)
+            tracemalloc.reset_peak()
+            self._pilha_memoria.append(0)
+        try:
+            yield
+        finally:
+            with self._trava_memoria:
+                atual_fim, pico = tracemalloc.get_traced_memory()
+                pico = max(pico, self._pilha_memoria.pop())
+                self._acumular_pico(pico)
+                registro = self.memoria.setdefault(nome, {'etapa': nome, 'vezes': 0, 'pico_mb': 0.0, 'liquido_mb': 0.0})
+                registro['vezes'] += 1
+                registro['pico_mb'] = round(max(registro['pico_mb'], pico / _MB), 3)
+                registro['liquido_mb'] = round(registro['liquido_mb'] + (atual_fim - atual_inicio) / _MB, 3)
+            metricas.registrar_evento("memoria_etapa", etapa=nome, pico_mb=round(pico / _MB, 3))
+
+    # --- ciclo de vida ------------------------------------------------------
+    def iniciar(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._iniciou_tracemalloc = True
+        tracemalloc.reset_peak()
+        self._inicio = time.perf_counter()
+        self._amostrador = threading.Thread(target=self._amostrar, name="perfilador", daemon=True)
+        self._amostrador.start()
+        metricas.registrar_evento("perfilamento_inicio", arquivo_id=self.run_id)
+        return self
+
+    def finalizar(self):
+        """
+        Para a amostragem e grava os arquivos (só na primeira chamada).
+        Returns:
+            dict: {'speedscope': caminho, 'memoria': caminho}
+        """
+        global _sessao_ativa
+        if self.caminhos is not None:
+            return self.caminhos
+        self._parar.set()
+        if self._amostrador is not None:
+            self._amostrador.join()
+        self._duracao = time.perf_counter() - self._inicio
+        with self._trava_memoria:
+            self._acumular_pico(tracemalloc.get_traced_memory()[1])
+        if self._iniciou_tracemalloc:
+            tracemalloc.stop()
+        with _trava:
+            if _sessao_ativa is self:
+                _sessao_ativa = None
+
+        os.makedirs(self.diretorio, exist_ok=True)
+        self.caminhos = {
+            'speedscope': os.path.join(self.diretorio, f"{self.run_id}.speedscope.json"),
+            'memoria': os.path.join(self.diretorio, f"{self.run_id}.memoria.json"),
+        }
+        with open(self.caminhos['speedscope'], 'w', encoding='utf-8') as arquivo:
+            json.dump(self.speedscope(), arquivo, ensure_ascii=False)
+        with open(self.caminhos['memoria'], 'w', encoding='utf-8') as arquivo:
+            json.dump(self.resumo_memoria(), arquivo, ensure_ascii=False, indent=2)
+        # As amostras já estão no arquivo; a sessão pode ficar guardada (ex: no session_state) sem elas
+        self._amostras, self._quadros = {}, {}
+        metricas.registrar_evento("perfilamento_fim", arquivo_id=self.run_id, duracao_s=round(self._duracao, 3),
+                                  pico_mb=round(self._pico_total / _MB, 3), arquivo=self.caminhos['speedscope'])
+        return self.caminhos
+
+    # --- saída --------------------------------------------------------------
+    def speedscope(self):
+        """Arquivo no formato do speedscope ("sampled", um perfil por thread; o da thread que iniciou primeiro)."""
+        quadros = [None] * len(self._quadros)
+        for (nome, arquivo, linha), indice in self._quadros.items():
+            quadros[indice] = {'name': nome, 'file': arquivo, 'line': linha}
+
+        idents = sorted(self._amostras, key=lambda ident: ident != self._thread_principal)
+        perfis = []
+        for ident in idents:
+            amostras = self._amostras[ident]
+            pesos = [round(peso, 6) for _, peso in amostras]
+            perfis.append({
+                'type': 'sampled',
+                'name': f"{self.rotulo} · {self._nomes_threads.get(ident, ident)}",
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': round(sum(pesos), 6),
+                'samples': [list(pilha) for pilha, _ in amostras],
+                'weights': pesos,
+            })
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'shared': {'frames': quadros},
+            'profiles': perfis,
+            'name': f"{self.rotulo} ({self.run_id})",
+            'activeProfileIndex': 0,
+            'exporter': 'agente_macfor/perfilador',
+        }
+
+    def resumo_memoria(self):
+        """Picos por etapa, na ordem em que as etapas rodaram, e o pico da sessão inteira."""
+        return {
+            'run_id': self.run_id,
+            'duracao_s': round(self._duracao, 3),
+            'pico_total_mb': round(self._pico_total / _MB, 3),
+            'etapas': list(self.memoria.values()),
+        }
+
+
+def iniciar(run_id: str = None, diretorio: str = None, rotulo: str = None):
+    """
+    Abre uma sessão de perfilamento para o processo.
+    Returns:
+        SessaoPerfil, ou None se já houver outra sessão rodando.
+    """
+    global _sessao_ativa
+    with _trava:
+        if _sessao_ativa is not None:
+            return None
+        _sessao_ativa = SessaoPerfil(run_id, diretorio, rotulo=rotulo)
+    return _sessao_ativa.iniciar()
+
+
+@contextmanager
+def perfilar(run_id: str = None, ativo: bool = True, diretorio: str = None, rotulo: str = None):
+    """
+    Perfila o bloco (sem efeito com ativo=False) e avisa no terminal onde
+    ficaram os arquivos.
+
+    Uso:
+        with metricas.execucao(script="x") as run_id, perfilador.perfilar(run_id, ativo=args.profile):
+            main()
+    """
+    sessao = iniciar(run_id, diretorio, rotulo) if ativo else None
+    if ativo and sessao is None:
+        print("⚠️ Já há um perfilamento em andamento neste processo; seguindo sem perfilar.")
+    try:
+        yield sessao
+    finally:
+        if sessao is not None:
+            caminhos = sessao.finalizar()
+            print(f"🔥 Perfil salvo em {caminhos['speedscope']} (abra em https://www.speedscope.app)")
+            print(f"🧠 Picos de memória por etapa em {caminhos['memoria']}")
+
+
+@contextmanager
+def etapa(nome: str):
+    """
+    Uma etapa medida: sempre no cronômetro 'etapa' do metricas e, com o
+    perfilamento ligado, também no pico de memória da sessão.
+    """
+    with metricas.cronometro("etapa", etapa=nome):
+        sessao = _sessao_ativa
+        if sessao is None:
+            yield
+        else:
+            with sessao.medir_memoria(nome):
+                yield
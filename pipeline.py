@@ -0,0 +1,152 @@
+# pipeline.py
+# Pipeline de um perfil: coleta -> salva -> busca pendentes -> classifica ->
+# busca os dados finais.
+#
+# Antes ficava dentro do Menu.py e só rodava com o Streamlit. Aqui ele recebe
+# tudo de fora (backend, cliente do Instagram, modelo do Gemini e a "ui" que
+# mostra o progresso), então roda igual no dashboard, nos scripts e no
+# benchmark com os dublês do benchmark_fakes.py.
+
+from contextlib import contextmanager
+
+import metricas
+import perfilador
+from teste_coletar import coletar_posts_instagram
+from classificador_post import classificar_posts_gemini
+from storage_backend import ResultadoGravacao
+
+
+class UIConsole:
+    """Mesma interface do 'st' usada pelo pipeline, escrevendo no terminal."""
+
+    def __init__(self, silenciosa: bool = False):
+        self.silenciosa = silenciosa
+
+    def _escrever(self, prefixo, mensagem):
+        if not self.silenciosa:
+            print(f"{prefixo}{mensagem}")
+
+    @contextmanager
+    def spinner(self, mensagem):
+        self._escrever("⏳ ", mensagem)
+        yield
+
+    def write(self, mensagem):
+        self._escrever("", mensagem)
+
+    def info(self, mensagem):
+        self._escrever("ℹ️ ", mensagem)
+
+    def warning(self, mensagem):
+        self._escrever("⚠️ ", mensagem)
+
+    def error(self, mensagem):
+        self._escrever("❌ ", mensagem)
+
+
+def processar_perfil(backend, insta_client, nome_perfil, qtd_posts, api_key=None,
+                     limit_final=0, ui=None, modelo_gemini=None, df_coletado=None):
+    """
+    Executa o pipeline completo de coleta, salvamento, classificação e
+    busca de dados para um único perfil de Instagram.
+    Cada chamada ganha um run_id (metricas.py), a não ser que já esteja dentro
+    de uma execução aberta por quem chamou.
+
+    Args:
+        backend: Qualquer StorageBackend (ver storage_backend.py).
+        insta_client: Cliente do instagrapi já logado, um PoolInstagram (contas_instagram.py)
+            ou um dublê com a mesma interface.
+        nome_perfil (str): Perfil, com ou sem '@'.
+        qtd_posts (int): Quantidade de posts a coletar.
+        api_key (str): Chave do Gemini.
+        limit_final (int): Máximo de posts nos dados finais (0 = histórico inteiro).
+        ui: Objeto com spinner/write/info/warning/error (o módulo 'st' ou UIConsole).
+        modelo_gemini: Modelo já criado, repassado ao classificador (opcional).
+        df_coletado (pd.DataFrame): Posts já coletados (ex: PoolInstagram.coletar_varios);
+            pula a etapa de coleta.
+    Returns:
+        pd.DataFrame: Classificado, ou None em caso de falha.
+    """
+    ui = ui or UIConsole()
+    with metricas.execucao(funcao="processar_perfil", perfil=nome_perfil.replace('@', '')):
+        return _processar_perfil(backend, insta_client, nome_perfil, qtd_posts, api_key,
+                                 limit_final, ui, modelo_gemini, df_coletado)
+
+
+def _processar_perfil(backend, insta_client, nome_perfil, qtd_posts, api_key, limit_final, ui, modelo_gemini,
+                      df_coletado):
+    perfil_alvo = nome_perfil.replace('@', '')
+    try:
+        # 0. Reenvia o que ficou no spool local numa falha anterior do banco
+        if backend.client is not None:
+            backend.reenviar_spool()
+
+        # 1. Coletar do Instagram (a não ser que já venha coletado)
+        if df_coletado is not None:
+            df_novos_posts = df_coletado
+        else:
+            with ui.spinner(f"Coletando {qtd_posts} posts de @{perfil_alvo}..."), perfilador.etapa("1_coleta"):
+                df_novos_posts = coletar_posts_instagram(insta_client, perfil_alvo, qtd_posts)
+
+        # 2. Salvar no banco
+        with ui.spinner(f"Salvando {len(df_novos_posts)} posts de @{perfil_alvo} no banco..."), perfilador.etapa("2_salvar"):
+            if df_novos_posts is not None and not df_novos_posts.empty:
+                gravacao = backend.upsert_posts(df_novos_posts, perfil_alvo)
+            else:
+                gravacao = ResultadoGravacao()
+                ui.info(f"Nenhum post novo encontrado para @{perfil_alvo} na coleta.")
+
+        # 2.1 Banco indisponível (nada foi gravado): os posts já estão no spool
+        # local. Classifica o que foi coletado (também vai para o spool) e segue
+        # com a análise.
+        if gravacao.nada_gravado:
+            ui.warning(f"Banco indisponível. Os posts de @{perfil_alvo} foram guardados no spool local e serão reenviados depois.")
+            if df_novos_posts is None or df_novos_posts.empty:
+                return None
+            with ui.spinner(f"Classificando {len(df_novos_posts)} posts de @{perfil_alvo} com IA..."):
+                classificacoes = classificar_posts_gemini(df_novos_posts, api_key, modelo=modelo_gemini)
+                backend.update_classificacoes(classificacoes)
+            mapa_categorias = {item['id']: item['categoria'] for item in classificacoes}
+            df_final = df_novos_posts.drop(columns=['username'], errors='ignore').copy()
+            df_final['categoria'] = df_final['id'].map(mapa_categorias)
+            df_final['perfil'] = perfil_alvo
+            return df_final
+
+        # 2.2 Falha parcial: o que foi gravado segue o caminho normal (só os
+        # pendentes vão para o Gemini); o resto volta com o próximo reenvio do spool
+        if not gravacao:
+            ui.warning(f"{gravacao.gravados} de {len(df_novos_posts)} posts de @{perfil_alvo} foram gravados; "
+                       f"{gravacao.no_spool} ficaram no spool local e serão reenviados depois.")
+            metricas.incrementar("gravacao_parcial", perfil=perfil_alvo)
+
+        # 3. Buscar só os posts pendentes de classificação (filtro feito no banco)
+        with ui.spinner(f"Buscando posts de @{perfil_alvo} pendentes de classificação..."), perfilador.etapa("3_pendentes"):
+            df_para_classificar = backend.fetch_pendentes(perfil_alvo, limit=qtd_posts)
+
+        # 4. Classificar o que for necessário
+        with ui.spinner(f"Verificando posts de @{perfil_alvo} para classificar com IA..."), perfilador.etapa("4_classificar"):
+            if not df_para_classificar.empty:
+                ui.write(f"Enviando {len(df_para_classificar)} posts de @{perfil_alvo} para classificação...")
+                classificacoes = classificar_posts_gemini(df_para_classificar, api_key, modelo=modelo_gemini)
+                backend.update_classificacoes(classificacoes)
+            else:
+                ui.info(f"Todos os posts de @{perfil_alvo} já estavam classificados.")
+
+        # 5. Buscar os dados finais e prontos para análise
+        with ui.spinner(f"Buscando dados finais de @{perfil_alvo} classificados..."), perfilador.etapa("5_dados_finais"):
+            df_final = backend.fetch_posts(perfil_alvo, limit=limit_final)
+            if df_final.empty:
+                ui.error(f"Nenhum dado encontrado para @{perfil_alvo} no banco.")
+                return None
+            # Garante que a coluna se chame 'categoria'
+            if 'tipo' in df_final.columns:
+                df_final = df_final.rename(columns={'tipo': 'categoria'})
+
+            # Adiciona o nome do perfil ao DF para referência futura
+            df_final['perfil'] = perfil_alvo
+
+            return df_final
+
+    except Exception as e:
+        ui.error(f"Ocorreu um erro ao processar o perfil @{perfil_alvo}: {e}")
+        return None
@@ -0,0 +1,217 @@
+# reclassificar.py
+# Reclassificação em segundo plano dos posts classificados por um prompt ou
+# modelo antigo.
+#
+# Cada classificação grava junto o modelo (tipo_modelo), a versão do prompt
+# (tipo_versao) e quando foi feita (classificado_em). Ao mudar o prompt
+# (classificador_post.VERSAO_PROMPT) ou o modelo da tarefa (MODELOS_GEMINI),
+# os posts antigos ficam "desatualizados", mas continuam com a categoria
+# antiga no dashboard até a nova chegar: esta rodada nunca apaga 'tipo', e
+# um erro do modelo não sobrescreve a categoria que já existia.
+#
+# Os posts que as regras locais (regras_classificacao.py) resolvem são
+# gravados primeiro, sem custo (com USAR_REGRAS_CLASSIFICACAO ligado). O resto
+# vai dos mais recentes e mais engajados para os demais, em lotes, até acabar
+# o orçamento de chamadas ao Gemini da rodada. Pode rodar pelo
+# cron/agendador ou numa thread (iniciar_em_segundo_plano).
+#
+# Uso:
+#     python reclassificar.py perfil1 perfil2 [--orcamento 200]
+
+import argparse
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+import classificador_post
+import metricas
+from classificador_post import classificar_por_regras, classificar_posts_gemini, procedencia_atual
+from regras_classificacao import VERSAO_REGRAS
+from storage_backend import CATEGORIA_ERRO
+
+try:
+    from config import ORCAMENTO_RECLASSIFICACAO
+except ImportError:
+    ORCAMENTO_RECLASSIFICACAO = 200
+
+# Posts por lote (cada lote é gravado assim que termina)
+TAMANHO_LOTE_RECLASSIFICACAO = 25
+
+# Peso da recência na fila: um post perde metade da prioridade a cada N dias
+MEIA_VIDA_RECLASSIFICACAO_DIAS = 30
+
+COLUNAS_RECLASSIFICACAO = ['id', 'data', 'curtidas', 'comentarios', 'legenda', 'miniatura',
+                           'tipo', 'tipo_modelo', 'tipo_versao']
+
+# DDL para rodar uma vez no SQL Editor do Supabase (o SQLite cria as colunas
+# sozinho e o MongoDB não tem schema)
+SQL_VERSOES_CLASSIFICACAO = """
+alter table posts add column if not exists tipo_modelo text;
+alter table posts add column if not exists tipo_versao text;
+alter table posts add column if not exists classificado_em timestamptz;
+create index if not exists posts_tipo_versao on posts (username, tipo_versao);
+"""
+
+
+def _texto(serie: pd.Series):
+    return serie.astype('string').fillna('').str.strip()
+
+
+def desatualizadas(df: pd.DataFrame):
+    """
+    Posts já classificados cuja procedência difere da que teriam agora.
+    (Posts sem categoria ou com erro ficam com a fila normal do pipeline.)
+    Returns:
+        pd.Series: bool, com o mesmo índice do df.
+    """
+    tipo = _texto(df['tipo']) if 'tipo' in df.columns else pd.Series('', index=df.index, dtype='string')
+    classificado = (tipo != '') & (tipo != CATEGORIA_ERRO)
+
+    tem_legenda = _texto(df['legenda']) != '' if 'legenda' in df.columns else pd.Series(False, index=df.index)
+    tem_miniatura = _texto(df['miniatura']) != '' if 'miniatura' in df.columns else pd.Series(False, index=df.index)
+    versao = _texto(df['tipo_versao']) if 'tipo_versao' in df.columns else pd.Series('', index=df.index, dtype='string')
+    modelo = _texto(df['tipo_modelo']) if 'tipo_modelo' in df.columns else pd.Series('', index=df.index, dtype='string')
+
+    # Só há três procedências possíveis: compara cada grupo de uma vez.
+    # Resolvido pelas regras atuais continua valendo (as regras rodam antes do
+    # modelo), a não ser que elas estejam desligadas (USAR_REGRAS_CLASSIFICACAO).
+    if classificador_post.USAR_REGRAS_CLASSIFICACAO:
+        classificado &= versao != VERSAO_REGRAS
+    resultado = pd.Series(False, index=df.index)
+    for legenda, miniatura in ((True, False), (True, True), (False, True), (False, False)):
+        grupo = classificado & (tem_legenda == legenda) & (tem_miniatura == miniatura)
+        if not grupo.any():
+            continue
+        versao_atual, modelo_atual = procedencia_atual(legenda, miniatura)
+        antiga = versao != versao_atual
+        if modelo_atual is not None:
+            antiga |= modelo != modelo_atual
+        resultado |= grupo & antiga
+    return resultado
+
+
+def calcular_prioridades(df: pd.DataFrame, agora=None, meia_vida_dias: float = MEIA_VIDA_RECLASSIFICACAO_DIAS):
+    """Engajamento (em log) descontado pela idade: recentes e muito vistos primeiro."""
+    agora = pd.Timestamp(agora or datetime.now(timezone.utc))
+    publicado = pd.to_datetime(df['data'], errors='coerce', utc=True, format='ISO8601')
+    idade_dias = ((agora - publicado).dt.total_seconds() / 86400).clip(lower=0).fillna(365 * 10)
+    engajamento = pd.to_numeric(df['curtidas'], errors='coerce').fillna(0) \
+        + pd.to_numeric(df['comentarios'], errors='coerce').fillna(0)
+    return (1 + np.log1p(engajamento)) * np.exp2(-idade_dias / meia_vida_dias)
+
+
+def selecionar_desatualizadas(backend, perfis: list, agora=None):
+    """
+    Posts desatualizados dos perfis, do mais prioritário ao menos.
+    Returns:
+        pd.DataFrame: COLUNAS_RECLASSIFICACAO + 'perfil' e 'prioridade'.
+    """
+    partes = []
+    for perfil in perfis:
+        perfil = perfil.replace('@', '')
+        df = backend.fetch_posts(perfil, colunas=COLUNAS_RECLASSIFICACAO)
+        if not df.empty:
+            partes.append(df.assign(perfil=perfil))
+    if not partes:
+        return pd.DataFrame(columns=COLUNAS_RECLASSIFICACAO + ['perfil', 'prioridade'])
+
+    df = pd.concat(partes, ignore_index=True)
+    df = df[desatualizadas(df)]
+    df = df.assign(prioridade=calcular_prioridades(df, agora))
+    return df.sort_values('prioridade', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def reclassificar(backend, perfis: list, api_key: str, orcamento: int = ORCAMENTO_RECLASSIFICACAO,
+                  tamanho_lote: int = TAMANHO_LOTE_RECLASSIFICACAO, modelo=None, parar: threading.Event = None):
+    """
+    Uma rodada de reclassificação: os lotes mais prioritários até acabar o orçamento.
+
+    Args:
+        backend: Qualquer StorageBackend (ver storage_backend.py).
+        perfis (list[str]): Perfis cujos posts entram na fila.
+        api_key (str): Chave do Gemini.
+        orcamento (int): Máximo de chamadas ao modelo nesta rodada. Conta uma
+            chamada por post enviado (teto: imagens repetidas saem mais baratas).
+        tamanho_lote (int): Posts classificados e gravados de cada vez.
+        modelo: GenerativeModel já criado (ou dublê), como em classificar_posts_gemini.
+        parar (threading.Event): Interrompe entre um lote e outro.
+    Returns:
+        dict: desatualizadas, enviadas, atualizadas, erros, restantes.
+    """
+    df_fila = selecionar_desatualizadas(backend, perfis)
+    resumo = {'desatualizadas': len(df_fila), 'enviadas': 0, 'atualizadas': 0, 'erros': 0, 'restantes': len(df_fila)}
+    if df_fila.empty:
+        print("✅ Nenhuma classificação desatualizada.")
+        return resumo
+
+    print(f"🏷️ {len(df_fila)} posts com classificação desatualizada; orçamento de {orcamento} chamadas.")
+    # O que as regras locais resolvem não gasta orçamento: grava já e tira da fila
+    if classificador_post.USAR_REGRAS_CLASSIFICACAO:
+        resolvidas, para_modelo = classificar_por_regras(df_fila)
+        if resolvidas:
+            backend.update_classificacoes(resolvidas)
+            resumo['atualizadas'] += len(resolvidas)
+            df_fila = df_fila[para_modelo].reset_index(drop=True)
+
+    for inicio in range(0, len(df_fila), max(1, tamanho_lote)):
+        restante = orcamento - resumo['enviadas']
+        if restante <= 0 or (parar is not None and parar.is_set()):
+            break
+        lote = df_fila.iloc[inicio:inicio + min(tamanho_lote, restante)]
+
+        with metricas.cronometro("reclassificacao_lote"):
+            classificacoes = classificar_posts_gemini(lote, api_key, modelo)
+        # Erro do modelo não apaga a categoria antiga: o post volta na próxima rodada
+        novas = [item for item in classificacoes if item['categoria'] != CATEGORIA_ERRO]
+        if novas:
+            backend.update_classificacoes(novas)
+
+        resumo['enviadas'] += len(lote)
+        resumo['atualizadas'] += len(novas)
+        resumo['erros'] += len(classificacoes) - len(novas)
+
+    resumo['restantes'] = resumo['desatualizadas'] - resumo['atualizadas']
+    metricas.incrementar("reclassificacao_atualizadas", resumo['atualizadas'])
+    print(f"✅ {resumo['atualizadas']} posts reclassificados; {resumo['restantes']} ficam para as próximas rodadas.")
+    return resumo
+
+
+def iniciar_em_segundo_plano(backend, perfis: list, api_key: str, orcamento: int = ORCAMENTO_RECLASSIFICACAO):
+    """
+    Roda reclassificar numa thread daemon (ex: a partir do dashboard).
+    Returns:
+        tuple: (Thread, Event para pedir a parada)
+    """
+    parar = threading.Event()
+    thread = threading.Thread(
+        target=reclassificar, args=(backend, perfis, api_key, orcamento),
+        kwargs={'parar': parar}, name="reclassificacao", daemon=True
+    )
+    thread.start()
+    return thread, parar
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reclassifica os posts classificados por um prompt/modelo antigo.")
+    parser.add_argument('perfis', nargs='+')
+    parser.add_argument('--orcamento', type=int, default=ORCAMENTO_RECLASSIFICACAO)
+    parser.add_argument('--lote', type=int, default=TAMANHO_LOTE_RECLASSIFICACAO)
+    parser.add_argument('--backend', default="supabase")
+    args = parser.parse_args()
+
+    from config import GEMINI_API_KEY
+    from storage_backend import obter_backend
+
+    backend = obter_backend(args.backend)
+    if backend.client is None:
+        print("❌ Sem conexão com o banco.")
+        return
+    with metricas.execucao(script="reclassificar") as run_id:
+        reclassificar(backend, args.perfis, GEMINI_API_KEY, args.orcamento, args.lote)
+    print(metricas.exportar_json(run_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+# regras_classificacao.py
+# Pré-classificação local, antes do Gemini.
+#
+# Boa parte dos posts se classifica sozinha: "Feliz Natal", "link na bio",
+# preço/cupom, legenda que termina em pergunta. As regras rodam como
+# operações de texto do pandas sobre a coluna 'legenda' inteira (uma passada
+# por regra, sem loop por post) e o calendário de datas comemorativas do
+# Brasil é comparado com a coluna 'data'. Cada post sai com uma categoria e
+# uma confiança; só os que passam de CONFIANCA_MINIMA_REGRAS deixam de ir
+# para o modelo.
+#
+# Para trocar as regras, basta definir no config.py:
+#     REGRAS_CLASSIFICACAO = [
+#         {'categoria': 'Institucional', 'confianca': 0.85,
+#          'padrao': r'(?i)(?:^|[^0-9A-Za-zÀ-ÿ_])cat[aá]logo(?:[^0-9A-Za-zÀ-ÿ_]|$)'},
+#     ]
+# (substitui REGRAS_PADRAO; os padrões precisam valer no 're' do Python e no
+# RE2 do pyarrow: sem lookaround nem referência a grupo. No RE2 o \b e o \w
+# só conhecem letras ASCII: "comenta aí" não fecha um \b depois do "í". Use a
+# fronteira explícita de features_legenda.INICIO_PALAVRA/FIM_PALAVRA.)
+
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+import metricas
+from features_legenda import CARACTERES_PALAVRA, FIM_PALAVRA, INICIO_PALAVRA, horario_local
+
+try:
+    from config import REGRAS_CLASSIFICACAO
+except ImportError:
+    REGRAS_CLASSIFICACAO = None
+
+try:
+    from config import CONFIANCA_MINIMA_REGRAS
+except ImportError:
+    CONFIANCA_MINIMA_REGRAS = 0.8
+
+# Vai para a procedência (tipo_versao): mude ao alterar as regras ou o calendário
+VERSAO_REGRAS = "regras-v2"
+
+REGRAS_PADRAO = [
+    # Saudação explícita de data comemorativa
+    {'categoria': 'Data comemorativa', 'confianca': 0.95, 'padrao': (
+        r'(?i)' + INICIO_PALAVRA + r'(?:feliz (?:natal|ano novo|p[áa]scoa|dia d[aoe]s?)|boas festas|'
+        r'dia d[aoe]s? (?:m[ãa]es|pais|mulher(?:es)?|crian[çc]as?|namorados|professor(?:es)?|trabalhador(?:es)?))' + FIM_PALAVRA
+    )},
+    # Só o nome da data ("natal" também é cidade): decide junto com o calendário
+    {'categoria': 'Data comemorativa', 'confianca': 0.7, 'padrao': (
+        r'(?i)' + INICIO_PALAVRA + r'(?:natal|r[ée]veillon|p[áa]scoa|carnaval|black friday|'
+        r'consci[êe]ncia negra|independ[êe]ncia|tiradentes|finados|corpus christi)' + FIM_PALAVRA
+    )},
+    # Venda: preço, cupom, promoção, link para comprar
+    {'categoria': 'Institucional', 'confianca': 0.9, 'padrao': (
+        r'(?i)(?:r\$ ?\d|' + INICIO_PALAVRA + r'(?:cupom|frete gr[áa]tis)' + FIM_PALAVRA + ')'
+    )},
+    {'categoria': 'Institucional', 'confianca': 0.85, 'padrao': (
+        r'(?i)' + INICIO_PALAVRA + r'(?:link na bio|promo[çc][ãa]o|promo|desconto|oferta|compre|garanta o seu|garanta j[áa]|'
+        r'loja|pe[çc]a j[áa]|encomende|lan[çc]amento|dispon[íi]vel)' + FIM_PALAVRA
+    )},
+    # Pede interação
+    {'categoria': 'Engajamento', 'confianca': 0.85, 'padrao': (
+        r'(?i)' + INICIO_PALAVRA + r'(?:comente|comenta a[íi]|conta pra gente|conta para a gente|marque (?:um|uma|aquel[ea]|quem)|'
+        r'deixe (?:nos|aqui|sua opini[ãa]o)|qual (?:[ée]|seu|sua) (?:o |a )?(?:seu|sua|favorit[oa]s?)|'
+        r'vote|enquete|responda)' + FIM_PALAVRA
+    )},
+    # Legenda que termina em pergunta (ignorando hashtags, emojis e espaços no fim)
+    {'categoria': 'Engajamento', 'confianca': 0.8, 'padrao': rf'\?[^{CARACTERES_PALAVRA}?#]*(?:#\S+[^{CARACTERES_PALAVRA}#]*)*$'},
+]
+
+# Datas fixas (mês, dia, nome) e móveis (ver _datas_moveis) do calendário brasileiro
+DATAS_FIXAS = [
+    (1, 1, "Ano Novo"), (3, 8, "Dia da Mulher"), (4, 21, "Tiradentes"), (5, 1, "Dia do Trabalho"),
+    (6, 12, "Dia dos Namorados"), (9, 7, "Independência"), (10, 12, "Dia das Crianças"),
+    (10, 15, "Dia do Professor"), (11, 2, "Finados"), (11, 15, "Proclamação da República"),
+    (11, 20, "Consciência Negra"), (12, 24, "Véspera de Natal"), (12, 25, "Natal"), (12, 31, "Réveillon"),
+]
+
+# Post publicado até N dias antes/depois da data conta como "na data"
+JANELA_DATA_DIAS = 1
+
+# Palavras de celebração que, na data, confirmam o tema
+PADRAO_CELEBRACAO = r'(?i)' + INICIO_PALAVRA + r'(?:feliz|parab[ée]ns|homenag|celebr|comemor|hoje [ée] dia|nosso dia|seu dia)'
+
+# Confiança do calendário: na data e com palavra de celebração; só na data
+CONFIANCA_CALENDARIO = 0.9
+CONFIANCA_SO_DATA = 0.5
+
+
+def _pascoa(ano: int):
+    # Algoritmo de Meeus/Jones/Butcher (calendário gregoriano)
+    a, b, c = ano % 19, ano // 100, ano % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes = (h + l - 7 * m + 114) // 31
+    dia = (h + l - 7 * m + 114) % 31 + 1
+    return date(ano, mes, dia)
+
+
+def _segundo_domingo(ano: int, mes: int):
+    primeiro = date(ano, mes, 1)
+    return primeiro + timedelta(days=(6 - primeiro.weekday()) % 7 + 7)
+
+
+def _datas_moveis(ano: int):
+    pascoa = _pascoa(ano)
+    return [
+        (pascoa - timedelta(days=47), "Carnaval"),
+        (pascoa - timedelta(days=2), "Sexta-feira Santa"),
+        (pascoa, "Páscoa"),
+        (pascoa + timedelta(days=60), "Corpus Christi"),
+        (_segundo_domingo(ano, 5), "Dia das Mães"),
+        (_segundo_domingo(ano, 8), "Dia dos Pais"),
+    ]
+
+
+def calendario(anos):
+    """
+    Datas comemorativas dos anos informados.
+    Returns:
+        pd.DataFrame: 'data' (datetime64, meia-noite) e 'nome', ordenado por data.
+    """
+    linhas = []
+    for ano in sorted({int(a) for a in anos}):
+        linhas += [(date(ano, mes, dia), nome) for mes, dia, nome in DATAS_FIXAS]
+        linhas += _datas_moveis(ano)
+    df = pd.DataFrame(linhas, columns=['data', 'nome'])
+    df['data'] = pd.to_datetime(df['data'])
+    return df.sort_values('data', kind='stable').reset_index(drop=True)
+
+
+def data_comemorativa_proxima(datas: pd.Series, janela_dias: int = JANELA_DATA_DIAS):
+    """
+    Nome da data comemorativa a até 'janela_dias' de cada post (ou NA), via busca ordenada.
+    Returns:
+        pd.Series: string, com o mesmo índice de 'datas'.
+    """
+    # Dia no horário de Brasília (datas com e sem fuso podem vir misturadas)
+    dias = horario_local(datas).dt.tz_localize(None).dt.normalize()
+    resultado = pd.Series(pd.NA, index=datas.index, dtype='string')
+    validos = dias.notna().to_numpy()
+    if not validos.any():
+        return resultado
+
+    anos = dias[validos].dt.year
+    cal = calendario(set(anos) | set(anos - 1) | set(anos + 1))
+    marcos = cal['data'].to_numpy(dtype='datetime64[ns]')
+    alvo = dias[validos].to_numpy(dtype='datetime64[ns]')
+    # Vizinho anterior e posterior de cada post no calendário
+    pos = np.searchsorted(marcos, alvo)
+    antes = np.clip(pos - 1, 0, len(marcos) - 1)
+    depois = np.clip(pos, 0, len(marcos) - 1)
+    dist_antes = np.abs(alvo - marcos[antes])
+    dist_depois = np.abs(marcos[depois] - alvo)
+    mais_perto = np.where(dist_depois <= dist_antes, depois, antes)
+    distancia = np.minimum(dist_antes, dist_depois)
+    dentro = distancia <= np.timedelta64(janela_dias, 'D')
+
+    nomes = cal['nome'].to_numpy(dtype=object)[mais_perto]
+    valores = resultado.to_numpy(dtype=object)
+    indices = np.flatnonzero(validos)
+    valores[indices[dentro]] = nomes[dentro]
+    return pd.Series(valores, index=datas.index, dtype='string')
+
+
+def aplicar_regras(df: pd.DataFrame, regras: list = None):
+    """
+    Categoria e confiança locais de cada post.
+
+    Args:
+        df (pd.DataFrame): Posts com 'legenda' (e 'data', para o calendário).
+        regras (list[dict]): 'categoria', 'padrao' e 'confianca' (padrão: REGRAS_CLASSIFICACAO ou REGRAS_PADRAO).
+    Returns:
+        pd.DataFrame: 'categoria' (string, NA se nenhuma regra casou), 'confianca' (0 a 1)
+        e 'regra' (qual casou), com o mesmo índice do df.
+    """
+    regras = regras or REGRAS_CLASSIFICACAO or REGRAS_PADRAO
+    legenda = df['legenda'].astype('string').fillna('').str.strip() if 'legenda' in df.columns \
+        else pd.Series('', index=df.index, dtype='string')
+
+    n = len(df)
+    # Melhor confiança por categoria (colunas = categorias distintas)
+    categorias = list(dict.fromkeys(regra['categoria'] for regra in regras))
+    confiancas = np.zeros((n, len(categorias) + 1))
+    origem = np.full((n, len(categorias) + 1), '', dtype=object)
+    for i, regra in enumerate(regras):
+        casou = legenda.str.contains(regra['padrao'], regex=True).fillna(False).to_numpy(dtype=bool)
+        coluna = categorias.index(regra['categoria'])
+        melhor = casou & (regra['confianca'] > confiancas[:, coluna])
+        confiancas[melhor, coluna] = regra['confianca']
+        origem[melhor, coluna] = f"regra {i}"
+
+    # Calendário: fica na última coluna e soma com as regras de 'Data comemorativa'
+    if 'data' in df.columns:
+        data_proxima = data_comemorativa_proxima(df['data'])
+        na_data = data_proxima.notna().to_numpy()
+        celebra = legenda.str.contains(PADRAO_CELEBRACAO, regex=True).fillna(False).to_numpy(dtype=bool)
+        confiancas[:, -1] = np.where(na_data & celebra, CONFIANCA_CALENDARIO, np.where(na_data, CONFIANCA_SO_DATA, 0))
+        origem[:, -1] = np.where(na_data, "calendário: " + data_proxima.fillna('').to_numpy(dtype=object), '')
+        if 'Data comemorativa' in categorias:
+            coluna = categorias.index('Data comemorativa')
+            # Regra de texto + data batendo: confiança máxima
+            reforco = na_data & (confiancas[:, coluna] > 0)
+            confiancas[reforco, coluna] = np.maximum(confiancas[reforco, coluna], 0.99)
+    categorias_colunas = categorias + ['Data comemorativa']
+
+    ordem = np.argsort(-confiancas, axis=1, kind='stable')
+    primeira, segunda = ordem[:, 0], ordem[:, 1]
+    linhas = np.arange(n)
+    melhor = confiancas[linhas, primeira]
+    vice = confiancas[linhas, segunda]
+    nomes = np.array(categorias_colunas, dtype=object)
+    # Duas categorias diferentes com confiança parecida: ambíguo, vale metade
+    ambiguo = (nomes[primeira] != nomes[segunda]) & (vice >= melhor - 0.1) & (vice > 0)
+    confianca = np.where(ambiguo, melhor / 2, melhor)
+
+    return pd.DataFrame({
+        'categoria': pd.array(np.where(melhor > 0, nomes[primeira], None), dtype='string'),
+        'confianca': confianca,
+        'regra': pd.array(np.where(melhor > 0, origem[linhas, primeira], None), dtype='string'),
+    }, index=df.index)
+
+
+def pre_classificar(df: pd.DataFrame, confianca_minima: float = CONFIANCA_MINIMA_REGRAS):
+    """
+    Separa os posts resolvidos pelas regras dos que precisam do modelo.
+    Returns:
+        tuple: (pd.DataFrame resolvidos com 'id', 'categoria', 'confianca', 'regra';
+                máscara booleana dos posts que seguem para o modelo)
+    """
+    if df.empty:
+        return pd.DataFrame(columns=['id', 'categoria', 'confianca', 'regra']), pd.Series(True, index=df.index)
+    with metricas.cronometro("classificacao_regras"):
+        resultado = aplicar_regras(df)
+    resolvido = (resultado['confianca'] >= confianca_minima).to_numpy()
+    resolvidos = resultado.loc[resolvido].assign(id=df.loc[resolvido, 'id'])
+    metricas.incrementar("classificacao_local", int(resolvido.sum()))
+    metricas.incrementar("classificacao_local_total", len(df))
+    return resolvidos[['id', 'categoria', 'confianca', 'regra']], pd.Series(~resolvido, index=df.index)
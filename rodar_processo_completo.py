@@ -2,22 +2,20 @@
 import pandas as pd
 import sys
 import os
-import time
-import random
 from datetime import datetime
 import pytz # Para lidar com datas
 
+import metricas
+import perfilador
+from cache_midias import url_miniatura
+from governador_instagram import coletar_midias, governar_cliente
+
 # --- Imports do Instagram ---
 from instagrapi import Client
 from instagrapi.exceptions import LoginRequired
 
 # --- Imports dos nossos módulos ---
-from supabase_utils import (
-    init_connection, 
-    save_posts_to_supabase,
-    fetch_instagram_data, 
-    update_post_classification
-)
+from storage_backend import obter_backend
 from classificador_post import classificar_posts_gemini
 from config import (
     GEMINI_API_KEY, 
@@ -33,11 +31,14 @@ QUANTIDADE_DE_POSTS = 20
 
 
 
+@metricas.medir("instagram_login")
 def login_instagram(username, password, session_file):
     """Cuida do login no Instagram e retorna o cliente."""
     print("Iniciando login no Instagram...")
     cl = Client()
-    cl.delay_range = [2, 5]
+    metricas.instrumentar_cliente_instagram(cl)
+    # Ritmo, orçamento e disjuntor da conta (governador_instagram.py)
+    governar_cliente(cl, username)
     
     try:
         if os.path.exists(session_file):
@@ -71,21 +72,24 @@ def coletar_posts_instagram(cl, target_username, data_inicio_str, data_fim_str):
     posts_ids_vistos = set()
     
     try:
-        user_id = cl.user_id_from_username(target_username)
+        with metricas.cronometro("instagram_user_id"):
+            user_id = cl.user_id_from_username(target_username)
         
         # Converte as datas para datetime com fuso horário
         timezone = pytz.UTC
         data_inicio_dt = timezone.localize(datetime.strptime(data_inicio_str, "%Y-%m-%d"))
         data_fim_dt = timezone.localize(datetime.strptime(data_fim_str, "%Y-%m-%d") + pd.Timedelta(days=1))
         
-        # Coleta os posts
-        medias = cl.user_medias_v1(user_id, amount=100) # Coleta os 100 posts mais recentes
+        # Coleta até os 100 posts mais recentes, parando na página que já passa do início do período
+        with metricas.cronometro("instagram_midias"):
+            medias, _ = coletar_midias(cl, user_id, target_username, 100, parar_antes_de=data_inicio_dt)
         
         if not medias:
             print("Nenhum post encontrado na coleta.")
             return pd.DataFrame(lista_de_posts)
 
         print(f"Verificando {len(medias)} posts recentes...")
+        agora = datetime.now(pytz.UTC).isoformat(timespec='seconds')
         
         for media in medias:
             if media.pk in posts_ids_vistos:
@@ -102,6 +106,8 @@ def coletar_posts_instagram(cl, target_username, data_inicio_str, data_fim_str):
                     'comentarios': media.comment_count,
                     'legenda': (media.caption_text or ""), # Legenda completa
                     'link': f"https://www.instagram.com/p/{media.code}/",
+                    'miniatura': url_miniatura(media),
+                    'atualizado_em': agora,
                     'lote': 1 # Lote fixo
                 }
                 lista_de_posts.append(post_data)
@@ -109,9 +115,8 @@ def coletar_posts_instagram(cl, target_username, data_inicio_str, data_fim_str):
                 # Se o post é mais antigo que o período, podemos parar
                 print("Posts mais antigos que o período de início encontrados. Parando a coleta.")
                 break
-            
-            time.sleep(random.uniform(0.5, 1.5)) # Pausa leve
 
+        metricas.incrementar("instagram_posts_coletados", len(lista_de_posts))
         print(f"Encontrados {len(lista_de_posts)} posts no período selecionado.")
         return pd.DataFrame(lista_de_posts)
 
@@ -126,45 +131,48 @@ def main():
     # --- ETAPA 1: OBTER O USUÁRIO-ALVO ---
     if len(sys.argv) < 2:
         print("❌ ERRO: Você esqueceu de passar o nome do usuário.")
-        print(f"Uso correto: python {sys.argv[0]} nome_do_usuario")
+        print(f"Uso correto: python {sys.argv[0]} nome_do_usuario [--profile]")
         return
     
     USUARIO_ALVO = sys.argv[1].replace('@', '')
     print(f"🎯 Usuário alvo definido: @{USUARIO_ALVO}")
 
-    # --- ETAPA 2: CONECTAR AO SUPABASE ---
-    print(f"\n[ETAPA 1/5] Conectando ao Supabase...")
-    supabase_client = init_connection()
-    if not supabase_client: return
-    print("✅ Conexão com o Supabase bem-sucedida!")
+    # --- ETAPA 2: CONECTAR AO BANCO ---
+    print(f"\n[ETAPA 1/5] Conectando ao banco de dados...")
+    backend = obter_backend("supabase")
+
+    if backend.client is not None:
+        print(f"✅ Conexão com o banco ({backend.nome}) bem-sucedida!")
+        backend.reenviar_spool()
+    else:
+        # A coleta continua: os posts vão para o spool local (spool_local.py)
+        print("ℹ️ Seguindo sem banco. Os posts coletados serão guardados no spool local.")
 
     # --- ETAPA 3: LOGIN E COLETA DO INSTAGRAM ---
     print(f"\n[ETAPA 2/5] Conectando ao Instagram...")
     cl_instagram = login_instagram(SEU_NOME_DE_USUARIO, SUA_SENHA, ARQUIVO_SESSAO)
     if not cl_instagram: return
     
-    df_novos_posts = coletar_posts_instagram(cl_instagram, USUARIO_ALVO, DATA_INICIO, DATA_FIM)
+    with perfilador.etapa("1_coleta"):
+        df_novos_posts = coletar_posts_instagram(cl_instagram, USUARIO_ALVO, DATA_INICIO, DATA_FIM)
 
     # --- ETAPA 4: SALVAR NOVOS POSTS NO BANCO ---
-    print(f"\n[ETAPA 3/5] Salvando novos posts no Supabase...")
+    print(f"\n[ETAPA 3/5] Salvando novos posts no banco...")
     if not df_novos_posts.empty:
-        save_posts_to_supabase(supabase_client, df_novos_posts, USUARIO_ALVO)
+        with perfilador.etapa("2_salvar"):
+            backend.upsert_posts(df_novos_posts, USUARIO_ALVO)
     else:
         print("ℹ️ Nenhum post novo para salvar.")
 
-    # --- ETAPA 5: BUSCAR E CLASSIFICAR POSTS PENDENTES ---
-    print(f"\n[ETAPA 4/5] Buscando posts pendentes de classificação...")
-    df_todos_posts = fetch_instagram_data(supabase_client, USUARIO_ALVO)
-    
-    if df_todos_posts is None or df_todos_posts.empty:
-        print(f"Nenhum post encontrado para @{USUARIO_ALVO} no banco.")
+    if backend.client is None:
+        print("ℹ️ Classificação adiada até o banco voltar (os posts estão no spool local).")
         return
 
-    # Filtra posts onde 'tipo' é Nulo OU 'Erro na Classificação'
-    df_para_classificar = df_todos_posts[
-        (df_todos_posts['tipo'].isnull()) | 
-        (df_todos_posts['tipo'] == 'Erro na Classificação')
-    ]
+    # --- ETAPA 5: BUSCAR E CLASSIFICAR POSTS PENDENTES ---
+    print(f"\n[ETAPA 4/5] Buscando posts pendentes de classificação...")
+    # Filtra (no próprio banco) posts onde 'tipo' é Nulo OU 'Erro na Classificação'
+    with perfilador.etapa("3_pendentes"):
+        df_para_classificar = backend.fetch_pendentes(USUARIO_ALVO)
     
     if df_para_classificar.empty:
         print("✅ Todos os posts deste usuário já estão classificados.")
@@ -175,16 +183,24 @@ def main():
 
     # --- ETAPA 6: CLASSIFICAR COM IA ---
     print(f"\n[ETAPA 5/5] Enviando {len(df_para_classificar)} posts para a IA (Gemini)...")
-    classificacoes = classificar_posts_gemini(df_para_classificar, GEMINI_API_KEY)
+    with perfilador.etapa("4_classificar"):
+        classificacoes = classificar_posts_gemini(df_para_classificar, GEMINI_API_KEY)
     
     if not classificacoes:
         print("❌ A classificação falhou ou não retornou resultados.")
         return
 
     # --- ETAPA 7: SALVAR CLASSIFICAÇÕES NO BANCO ---
-    update_post_classification(supabase_client, classificacoes)
+    backend.update_classificacoes(classificacoes)
     
     print("\n--- PROCESSO COMPLETO CONCLUÍDO ---")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # --profile: amostra as pilhas e os picos de memória da execução (perfilador.py)
+    perfilar = "--profile" in sys.argv
+    if perfilar:
+        sys.argv.remove("--profile")
+    with metricas.execucao(script="rodar_processo_completo") as run_id, \
+            perfilador.perfilar(run_id, ativo=perfilar, rotulo="rodar_processo_completo"):
+        main()
+    print(metricas.exportar_json(run_id))
\ No newline at end of file
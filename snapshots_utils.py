@@ -0,0 +1,341 @@
+# snapshots_utils.py
+# Série temporal de curtidas/comentários por post.
+#
+# O upsert em 'posts' sobrescreve like_count/comment_count. Aqui guardamos
+# (post_pk, captured_at, like_count, comment_count) SÓ quando os valores mudam,
+# para conseguir ver a evolução do engajamento depois da publicação.
+
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from estatisticas_perfil import COLUNAS_ESTADO
+from lotes_supabase import registros_com_falha, resumir, upsert_em_lotes
+
+TABELA_SNAPSHOTS = "post_snapshots"    # Supabase
+COLECAO_SNAPSHOTS = "post_snapshots"   # MongoDB
+
+# Snapshots mais antigos que isso ficam com apenas 1 ponto por post/dia
+DIAS_ANTES_DE_COMPACTAR = 7
+
+# Tamanho máximo de cada lista em filtros ".in_()" (evita URLs gigantes no PostgREST)
+TAMANHO_LOTE_CONSULTA = 500
+
+# DDL para rodar uma vez no SQL Editor do Supabase.
+# O índice BRIN em captured_at é minúsculo e serve bem para séries temporais
+# que só crescem; a função de compactação roda no próprio banco (1 round trip).
+SQL_SNAPSHOTS = """
+create table if not exists post_snapshots (
+    post_pk       text        not null,
+    captured_at   timestamptz not null default now(),
+    like_count    integer,
+    comment_count integer,
+    primary key (post_pk, captured_at)
+);
+create index if not exists post_snapshots_captured_brin
+    on post_snapshots using brin (captured_at);
+
+create or replace function compactar_post_snapshots(dias integer)
+returns integer language sql as $$
+    with removidos as (
+        delete from post_snapshots s
+        using (
+            select post_pk, captured_at,
+                   row_number() over (
+                       partition by post_pk, date_trunc('day', captured_at)
+                       order by captured_at desc
+                   ) as rn
+            from post_snapshots
+            where captured_at < now() - make_interval(days => dias)
+        ) velhos
+        where s.post_pk = velhos.post_pk
+          and s.captured_at = velhos.captured_at
+          and velhos.rn > 1
+        returning 1
+    )
+    select count(*)::integer from removidos;
+$$;
+"""
+
+
+def _agora_utc():
+    return datetime.now(timezone.utc)
+
+
+def valores_diferentes(a: pd.Series, b: pd.Series):
+    """Compara métricas elemento a elemento; nulo dos dois lados conta como igual."""
+    a = pd.to_numeric(a, errors='coerce')
+    b = pd.to_numeric(b, errors='coerce')
+    return (a != b) & ~(a.isna() & b.isna())
+
+
+def selecionar_snapshots_alterados(df_novos: pd.DataFrame, df_atuais: pd.DataFrame, captured_at=None):
+    """
+    Compara as métricas recém-coletadas com as que já estão no banco e devolve
+    apenas as linhas que precisam virar snapshot (post novo ou valor diferente).
+
+    Args:
+        df_novos (pd.DataFrame): Colunas 'post_pk', 'like_count', 'comment_count' (nomes do banco).
+        df_atuais (pd.DataFrame): Mesmas colunas, com os valores atualmente salvos (pode ser vazio).
+        captured_at (datetime, opcional): Momento da captura. Padrão: agora (UTC).
+    Returns:
+        pd.DataFrame: Colunas 'post_pk', 'captured_at', 'like_count', 'comment_count'.
+    """
+    colunas = ['post_pk', 'like_count', 'comment_count']
+    if df_novos is None or df_novos.empty:
+        return pd.DataFrame(columns=['post_pk', 'captured_at', 'like_count', 'comment_count'])
+
+    novos = df_novos[colunas].copy()
+    novos['post_pk'] = novos['post_pk'].astype(str)
+
+    if df_atuais is None or df_atuais.empty:
+        atuais = pd.DataFrame(columns=colunas)
+    else:
+        atuais = df_atuais[colunas].copy()
+    atuais['post_pk'] = atuais['post_pk'].astype(str)
+
+    comparacao = novos.merge(atuais.drop_duplicates('post_pk'), on='post_pk', how='left',
+                             suffixes=('', '_atual'), indicator=True)
+
+    # Post ainda não existe no banco OU alguma métrica mudou (NULL salvo e NULL coletado não é mudança)
+    mudou = (
+        (comparacao['_merge'] == 'left_only')
+        | valores_diferentes(comparacao['like_count'], comparacao['like_count_atual'])
+        | valores_diferentes(comparacao['comment_count'], comparacao['comment_count_atual'])
+    )
+    alterados = comparacao.loc[mudou, colunas].drop_duplicates('post_pk', keep='last')
+    alterados.insert(1, 'captured_at', captured_at or _agora_utc())
+    return alterados.reset_index(drop=True)
+
+
+def _lotes(lista, tamanho=TAMANHO_LOTE_CONSULTA):
+    for i in range(0, len(lista), tamanho):
+        yield lista[i:i + tamanho]
+
+
+# -----------------------------------------------------------------------------
+# SUPABASE
+# -----------------------------------------------------------------------------
+def buscar_metricas_atuais_supabase(supabase_client, post_pks: list):
+    """
+    Lê o estado atual dos post_pks informados na tabela 'posts': like_count/comment_count
+    para os snapshots e username/published_at/tipo para o resumo (estatisticas_perfil.py).
+    """
+    dados = []
+    for lote in _lotes([str(pk) for pk in post_pks]):
+        response = (
+            supabase_client.table("posts")
+            .select(",".join(COLUNAS_ESTADO))
+            .in_("post_pk", lote)
+            .execute()
+        )
+        dados.extend(response.data or [])
+    return pd.DataFrame(dados, columns=COLUNAS_ESTADO)
+
+
+def registrar_snapshots_supabase(supabase_client, df_snapshots: pd.DataFrame):
+    """Insere os snapshots (já filtrados por selecionar_snapshots_alterados) no Supabase."""
+    if df_snapshots is None or df_snapshots.empty:
+        print("ℹ️ Nenhuma métrica mudou, nenhum snapshot gravado.")
+        return 0
+
+    registros = df_snapshots.assign(
+        captured_at=pd.to_datetime(df_snapshots['captured_at'], utc=True).dt.strftime("%Y-%m-%dT%H:%M:%S%z")
+    ).to_dict(orient='records')
+
+    resultados = upsert_em_lotes(supabase_client, TABELA_SNAPSHOTS, registros, on_conflict="post_pk,captured_at")
+    gravados = len(registros) - len(registros_com_falha(resultados))
+    if gravados < len(registros):
+        print(f"⚠️ Snapshots gravados em parte: {resumir(resultados)}")
+    else:
+        print(f"📈 {gravados} snapshots de métricas gravados.")
+    return gravados
+
+
+def compactar_snapshots_supabase(supabase_client, dias: int = DIAS_ANTES_DE_COMPACTAR):
+    """Mantém só o último snapshot de cada post/dia para dados mais antigos que 'dias'."""
+    response = supabase_client.rpc("compactar_post_snapshots", {"dias": dias}).execute()
+    print(f"🗜️ {response.data} snapshots antigos compactados no Supabase.")
+    return response.data
+
+
+def fetch_snapshots_supabase(supabase_client, post_pks: list):
+    """Busca a série temporal dos post_pks informados (formato longo)."""
+    dados = []
+    for lote in _lotes([str(pk) for pk in post_pks]):
+        response = (
+            supabase_client.table(TABELA_SNAPSHOTS)
+            .select("post_pk,captured_at,like_count,comment_count")
+            .in_("post_pk", lote)
+            .order("captured_at")
+            .execute()
+        )
+        dados.extend(response.data or [])
+    df = pd.DataFrame(dados, columns=['post_pk', 'captured_at', 'like_count', 'comment_count'])
+    df['captured_at'] = pd.to_datetime(df['captured_at'], utc=True)
+    return df
+
+
+# -----------------------------------------------------------------------------
+# MONGODB (bucket pattern: 1 documento por post e por dia)
+# -----------------------------------------------------------------------------
+def buscar_metricas_atuais_mongodb(client, post_pks: list):
+    """Lê o estado atual dos post_pks informados na coleção 'posts' (mesmas colunas do Supabase)."""
+    collection = client["agente_macfor"]["posts"]
+    cursor = collection.find(
+        {"post_pk": {"$in": list(post_pks)}},
+        {"_id": 0, **{coluna: 1 for coluna in COLUNAS_ESTADO}}
+    )
+    return pd.DataFrame(list(cursor), columns=COLUNAS_ESTADO)
+
+
+def registrar_snapshots_mongodb(client, df_snapshots: pd.DataFrame):
+    """
+    Acrescenta os snapshots nos buckets diários de cada post.
+    Cada bucket guarda arrays paralelos t (captura), l (curtidas) e c (comentários),
+    o que evita um documento (e um índice) por ponto da série.
+    """
+    from pymongo import UpdateOne
+
+    if df_snapshots is None or df_snapshots.empty:
+        print("ℹ️ Nenhuma métrica mudou, nenhum snapshot gravado.")
+        return 0
+
+    collection = client["agente_macfor"][COLECAO_SNAPSHOTS]
+    capturas = pd.to_datetime(df_snapshots['captured_at'], utc=True)
+
+    operacoes = [
+        UpdateOne(
+            {"post_pk": pk, "dia": dia},
+            {
+                "$push": {"t": t.to_pydatetime(), "l": int(l), "c": int(c)},
+                "$inc": {"n": 1},
+            },
+            upsert=True,
+        )
+        for pk, dia, t, l, c in zip(
+            df_snapshots['post_pk'],
+            capturas.dt.strftime("%Y-%m-%d"),
+            capturas,
+            df_snapshots['like_count'].fillna(0),
+            df_snapshots['comment_count'].fillna(0),
+        )
+    ]
+    collection.bulk_write(operacoes, ordered=False)
+    print(f"📈 {len(operacoes)} snapshots de métricas gravados.")
+    return len(operacoes)
+
+
+def compactar_snapshots_mongodb(client, dias: int = DIAS_ANTES_DE_COMPACTAR):
+    """Reduz buckets antigos ao último ponto do dia (update com pipeline, roda no servidor)."""
+    collection = client["agente_macfor"][COLECAO_SNAPSHOTS]
+    limite = (_agora_utc() - timedelta(days=dias)).strftime("%Y-%m-%d")
+    resultado = collection.update_many(
+        {"dia": {"$lt": limite}, "n": {"$gt": 1}},
+        [{"$set": {
+            "t": [{"$arrayElemAt": ["$t", -1]}],
+            "l": [{"$arrayElemAt": ["$l", -1]}],
+            "c": [{"$arrayElemAt": ["$c", -1]}],
+            "n": 1,
+        }}]
+    )
+    print(f"🗜️ {resultado.modified_count} buckets antigos compactados no MongoDB.")
+    return resultado.modified_count
+
+
+def fetch_snapshots_mongodb(client, post_pks: list):
+    """Busca a série temporal dos post_pks informados e 'desempacota' os buckets."""
+    collection = client["agente_macfor"][COLECAO_SNAPSHOTS]
+    cursor = collection.find(
+        {"post_pk": {"$in": [str(pk) for pk in post_pks]}},
+        {"_id": 0, "post_pk": 1, "t": 1, "l": 1, "c": 1}
+    )
+    buckets = pd.DataFrame(list(cursor), columns=['post_pk', 't', 'l', 'c'])
+    if buckets.empty:
+        return pd.DataFrame(columns=['post_pk', 'captured_at', 'like_count', 'comment_count'])
+
+    df = buckets.explode(['t', 'l', 'c']).rename(
+        columns={'t': 'captured_at', 'l': 'like_count', 'c': 'comment_count'}
+    )
+    df['captured_at'] = pd.to_datetime(df['captured_at'], utc=True)
+    return df.sort_values(['post_pk', 'captured_at']).reset_index(drop=True)
+
+
+# -----------------------------------------------------------------------------
+# CURVAS DE CRESCIMENTO (vetorizado)
+# -----------------------------------------------------------------------------
+def _normalizar_posts(df_posts: pd.DataFrame):
+    """Aceita o DF no formato do app ('id', 'data', 'categoria') ou do banco."""
+    df = df_posts.rename(columns={'id': 'post_pk', 'data': 'published_at', 'categoria': 'tipo'})
+    df = df[['post_pk', 'published_at'] + (['tipo'] if 'tipo' in df.columns else [])].copy()
+    df['post_pk'] = df['post_pk'].astype(str)
+    df['published_at'] = pd.to_datetime(df['published_at'], utc=True)
+    return df
+
+
+def curvas_por_post(df_snapshots: pd.DataFrame, df_posts: pd.DataFrame, intervalo_horas: int = 1):
+    """
+    Curva de crescimento de cada post: curtidas/comentários em função da idade do post.
+
+    Args:
+        df_snapshots (pd.DataFrame): Saída de fetch_snapshots_*.
+        df_posts (pd.DataFrame): Posts com id/post_pk, data/published_at e (opcional) categoria/tipo.
+        intervalo_horas (int): Largura de cada faixa de idade, em horas.
+    Returns:
+        pd.DataFrame: Colunas 'post_pk', 'idade_h', 'like_count', 'comment_count' (+ 'tipo').
+                      Faixas sem captura são preenchidas com o último valor conhecido,
+                      só até a última captura de cada post (idades que ele ainda não
+                      atingiu ou não teve capturadas ficam de fora).
+    """
+    if df_snapshots is None or df_snapshots.empty:
+        return pd.DataFrame(columns=['post_pk', 'idade_h', 'like_count', 'comment_count'])
+
+    posts = _normalizar_posts(df_posts)
+    snaps = df_snapshots.assign(post_pk=df_snapshots['post_pk'].astype(str))
+    snaps = snaps.merge(posts, on='post_pk', how='inner')
+
+    idade = (pd.to_datetime(snaps['captured_at'], utc=True) - snaps['published_at']) / pd.Timedelta(hours=1)
+    snaps['idade_h'] = (idade.clip(lower=0) // intervalo_horas * intervalo_horas).astype(int)
+
+    # Último valor de cada post em cada faixa de idade
+    ultimos = snaps.sort_values('captured_at').groupby(['post_pk', 'idade_h'], as_index=False).last()
+
+    # Grade regular (idade x post) com forward-fill, depois volta para formato longo
+    curvas = []
+    for metrica in ('like_count', 'comment_count'):
+        grade = ultimos.pivot(index='idade_h', columns='post_pk', values=metrica)
+        grade = grade.reindex(range(0, int(grade.index.max()) + 1, intervalo_horas)).ffill()
+        curvas.append(grade.stack().rename(metrica))
+    resultado = pd.concat(curvas, axis=1).reset_index()
+    resultado.columns = ['idade_h', 'post_pk', 'like_count', 'comment_count']
+
+    # A grade vai até a maior idade de todos os posts: corta cada curva na sua
+    # primeira/última captura, senão as médias por idade pesam os posts antigos
+    limites = ultimos.groupby('post_pk')['idade_h'].agg(['min', 'max'])
+    primeira = resultado['post_pk'].map(limites['min'])
+    ultima = resultado['post_pk'].map(limites['max'])
+    resultado = resultado[resultado['idade_h'].between(primeira, ultima)].reset_index(drop=True)
+
+    if 'tipo' in posts.columns:
+        resultado = resultado.merge(posts[['post_pk', 'tipo']], on='post_pk', how='left')
+    return resultado[['post_pk', 'idade_h'] + [c for c in resultado.columns if c not in ('post_pk', 'idade_h')]]
+
+
+def curvas_por_categoria(df_snapshots: pd.DataFrame, df_posts: pd.DataFrame, intervalo_horas: int = 1):
+    """
+    Curva mediana por categoria ('tipo'), usando as curvas individuais de cada post.
+    Returns:
+        pd.DataFrame: Colunas 'tipo', 'idade_h', 'like_count', 'comment_count', 'posts'.
+    """
+    curvas = curvas_por_post(df_snapshots, df_posts, intervalo_horas)
+    if curvas.empty or 'tipo' not in curvas.columns:
+        return pd.DataFrame(columns=['tipo', 'idade_h', 'like_count', 'comment_count', 'posts'])
+
+    return (
+        curvas.assign(tipo=curvas['tipo'].fillna('Sem categoria'))
+        .groupby(['tipo', 'idade_h'])
+        .agg(like_count=('like_count', 'median'),
+             comment_count=('comment_count', 'median'),
+             posts=('post_pk', 'nunique'))
+        .reset_index()
+    )
@@ -0,0 +1,218 @@
+# spool_local.py
+# Spool local (SQLite) para quando o banco está fora do ar.
+#
+# Se a conexão ou o upsert falhar, os posts coletados, as classificações e os
+# comentários vão para este arquivo em vez de serem perdidos. Quando o banco
+# voltar, tudo é reenviado em lote. A chave primária é o post_pk (comment_pk
+# nos comentários), então gravar o mesmo item duas vezes só substitui a
+# versão anterior (idempotente).
+
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pandas as pd
+
+try:
+    from config import ARQUIVO_SPOOL
+except ImportError:
+    ARQUIVO_SPOOL = "spool_pendente.sqlite3"
+
+# Chaves das classificações guardadas junto com a categoria (ver storage_backend.classificacao_para_banco)
+CHAVES_PROCEDENCIA = ('modelo', 'versao', 'classificado_em')
+
+
+@contextmanager
+def _conectar(caminho=None):
+    """Conexão com o spool: confirma a transação ao sair do bloco (desfaz em erro) e fecha o arquivo."""
+    conn = sqlite3.connect(caminho or ARQUIVO_SPOOL)
+    try:
+        with conn:
+            _preparar(conn)
+            yield conn
+    finally:
+        conn.close()
+
+
+def _preparar(conn):
+    # WAL + synchronous=FULL: cada commit sobrevive a queda do processo/máquina
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=FULL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS posts ("
+        " post_pk TEXT PRIMARY KEY, username TEXT NOT NULL,"
+        " payload TEXT NOT NULL, criado_em TEXT NOT NULL)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS classificacoes ("
+        " post_pk TEXT PRIMARY KEY, categoria TEXT,"
+        " criado_em TEXT NOT NULL, procedencia TEXT)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS comentarios ("
+        " comment_pk TEXT PRIMARY KEY, payload TEXT NOT NULL, criado_em TEXT NOT NULL)"
+    )
+    # Spools criados antes da procedência (modelo/versão) das classificações
+    if 'procedencia' not in {linha[1] for linha in conn.execute("PRAGMA table_info(classificacoes)")}:
+        conn.execute("ALTER TABLE classificacoes ADD COLUMN procedencia TEXT")
+
+
+def _agora():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def guardar_posts_no_spool(df: pd.DataFrame, target_username: str, caminho=None):
+    """
+    Guarda posts (no formato do app: 'id', 'data', 'curtidas', ...) no spool local.
+    Returns:
+        int: Quantidade de posts guardados.
+    """
+    if df is None or df.empty:
+        return 0
+
+    agora = _agora()
+    linhas = [
+        (str(registro['id']), target_username, json.dumps(registro, default=str, ensure_ascii=False), agora)
+        for registro in df.drop(columns=['username'], errors='ignore').to_dict(orient='records')
+    ]
+    with _conectar(caminho) as conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO posts (post_pk, username, payload, criado_em) VALUES (?, ?, ?, ?)",
+            linhas
+        )
+    print(f"💾 {len(linhas)} posts guardados no spool local ({caminho or ARQUIVO_SPOOL}).")
+    return len(linhas)
+
+
+def guardar_classificacoes_no_spool(classificacoes: list, caminho=None):
+    """Guarda classificações ([{'id': ..., 'categoria': ..., 'modelo': ..., 'versao': ...}]) no spool local."""
+    if not classificacoes:
+        return 0
+
+    agora = _agora()
+    linhas = [
+        (str(item['id']), item['categoria'], agora,
+         json.dumps({chave: item[chave] for chave in CHAVES_PROCEDENCIA if chave in item}))
+        for item in classificacoes
+    ]
+    with _conectar(caminho) as conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO classificacoes (post_pk, categoria, criado_em, procedencia) VALUES (?, ?, ?, ?)",
+            linhas
+        )
+    print(f"💾 {len(linhas)} classificações guardadas no spool local.")
+    return len(linhas)
+
+
+def guardar_comentarios_no_spool(registros: list, caminho=None):
+    """Guarda comentários (registros com comentarios.COLUNAS_COMENTARIOS) no spool local."""
+    if not registros:
+        return 0
+
+    agora = _agora()
+    linhas = [
+        (str(registro['comment_pk']), json.dumps(registro, default=str, ensure_ascii=False), agora)
+        for registro in registros
+    ]
+    with _conectar(caminho) as conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO comentarios (comment_pk, payload, criado_em) VALUES (?, ?, ?)",
+            linhas
+        )
+    print(f"💾 {len(linhas)} comentários guardados no spool local.")
+    return len(linhas)
+
+
+def contar_pendentes(caminho=None):
+    """Retorna (posts_pendentes, classificacoes_pendentes) sem criar o arquivo se ele não existir."""
+    if not os.path.exists(caminho or ARQUIVO_SPOOL):
+        return 0, 0
+    with _conectar(caminho) as conn:
+        posts = conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+        classificacoes = conn.execute("SELECT COUNT(*) FROM classificacoes").fetchone()[0]
+    return posts, classificacoes
+
+
+def contar_comentarios_pendentes(caminho=None):
+    """Comentários no spool, sem criar o arquivo se ele não existir."""
+    if not os.path.exists(caminho or ARQUIVO_SPOOL):
+        return 0
+    with _conectar(caminho) as conn:
+        return conn.execute("SELECT COUNT(*) FROM comentarios").fetchone()[0]
+
+
+def _reenviar_comentarios(conn, client, salvar_comentarios):
+    linhas = conn.execute("SELECT comment_pk, payload FROM comentarios").fetchall()
+    if not linhas:
+        return 0
+    try:
+        _, falhas = salvar_comentarios(client, pd.DataFrame([json.loads(payload) for _, payload in linhas]))
+    except Exception as e:
+        print(f"⚠️ Banco ainda indisponível; comentários continuam no spool: {e}")
+        return 0
+    restantes = {str(registro['comment_pk']) for registro in falhas}
+    enviados = [(pk,) for pk, _ in linhas if pk not in restantes]
+    conn.executemany("DELETE FROM comentarios WHERE comment_pk = ?", enviados)
+    conn.commit()
+    return len(enviados)
+
+
+def reenviar_spool(client, salvar_posts, atualizar_classificacoes, caminho=None, salvar_comentarios=None):
+    """
+    Reenvia tudo o que está no spool usando as funções de gravação do banco.
+    Os posts vão em um lote por perfil e as classificações em um único lote,
+    sempre DEPOIS dos posts (a atualização de 'tipo' precisa do post existente).
+    Só remove do spool o que foi confirmado pelo banco.
+
+    Args:
+        client: Cliente do banco (Supabase ou MongoDB).
+        salvar_posts (callable): (client, df, username) -> bool
+        atualizar_classificacoes (callable): (client, classificacoes) -> bool
+        salvar_comentarios (callable, opcional): (client, df) -> (gravados, registros com falha)
+    Returns:
+        tuple: (posts_reenviados, classificacoes_reenviadas)
+    """
+    posts_pendentes, classificacoes_pendentes = contar_pendentes(caminho)
+    comentarios_pendentes = contar_comentarios_pendentes(caminho) if salvar_comentarios is not None else 0
+    if not posts_pendentes and not classificacoes_pendentes and not comentarios_pendentes:
+        return 0, 0
+
+    print(f"🔁 Reenviando spool local: {posts_pendentes} posts e {classificacoes_pendentes} classificações...")
+    total_posts = 0
+    total_classificacoes = 0
+
+    with _conectar(caminho) as conn:
+        perfis = [linha[0] for linha in conn.execute("SELECT DISTINCT username FROM posts")]
+        for username in perfis:
+            linhas = conn.execute(
+                "SELECT post_pk, payload FROM posts WHERE username = ?", (username,)
+            ).fetchall()
+            df = pd.DataFrame([json.loads(payload) for _, payload in linhas])
+            if salvar_posts(client, df, username, usar_spool=False):
+                conn.executemany("DELETE FROM posts WHERE post_pk = ?", [(pk,) for pk, _ in linhas])
+                conn.commit()
+                total_posts += len(linhas)
+            else:
+                print(f"⚠️ Banco ainda indisponível para @{username}; posts continuam no spool.")
+                return total_posts, total_classificacoes
+
+        linhas = conn.execute("SELECT post_pk, categoria, procedencia FROM classificacoes").fetchall()
+        if linhas:
+            classificacoes = [
+                {'id': pk, 'categoria': categoria, **json.loads(procedencia or '{}')}
+                for pk, categoria, procedencia in linhas
+            ]
+            if atualizar_classificacoes(client, classificacoes, usar_spool=False):
+                conn.executemany("DELETE FROM classificacoes WHERE post_pk = ?", [(linha[0],) for linha in linhas])
+                conn.commit()
+                total_classificacoes = len(linhas)
+            else:
+                print("⚠️ Banco ainda indisponível; classificações continuam no spool.")
+
+        total_comentarios = _reenviar_comentarios(conn, client, salvar_comentarios) if comentarios_pendentes else 0
+
+    print(f"✅ Spool reenviado: {total_posts} posts, {total_classificacoes} classificações "
+          f"e {total_comentarios} comentários.")
+    return total_posts, total_classificacoes
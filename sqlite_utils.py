@@ -0,0 +1,449 @@
+# sqlite_utils.py
+# Banco local embutido (SQLite, da biblioteca padrão do Python).
+#
+# Mesmas operações do supabase_utils/mongodb_utils, mas sem rede: serve para
+# rodar o pipeline offline, em benchmarks e como cache local.
+
+import sqlite3
+
+import pandas as pd
+
+from busca_legendas import termos_da_consulta
+from comentarios import COLUNAS_COMENTARIOS
+from estatisticas_perfil import (
+    COLUNAS_ESTADO,
+    COLUNAS_TOP,
+    EstatisticasPerfis,
+    calcular_grupos,
+    deltas_estatisticas,
+    estado_final,
+    mesclar_top,
+    reclassificar_top,
+    top_mudou
+)
+from features_legenda import COLUNAS_FEATURES
+from grade_posts import COLUNAS_BANCO_GRADE, coluna_ordenacao, intervalo_datas, para_grade, separar_categorias
+from snapshots_utils import selecionar_snapshots_alterados
+from storage_backend import (
+    CATEGORIA_ERRO,
+    COLUNAS_PROCEDENCIA,
+    MAPEAMENTO_APP_PARA_BANCO,
+    ResultadoGravacao,
+    classificacao_para_banco,
+    preparar_posts_para_banco,
+    traduzir_para_app
+)
+
+try:
+    from config import ARQUIVO_SQLITE
+except ImportError:
+    ARQUIVO_SQLITE = "dados_locais.sqlite3"
+
+SQL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    post_pk       TEXT PRIMARY KEY,
+    username      TEXT NOT NULL,
+    published_at  TEXT,
+    media_num     INTEGER,
+    like_count    INTEGER,
+    comment_count INTEGER,
+    caption       TEXT,
+    media_url     TEXT,
+    tipo          TEXT,
+    refreshed_at  TEXT,
+    thumbnail_url TEXT,
+    tipo_modelo   TEXT,
+    tipo_versao   TEXT,
+    classificado_em TEXT,
+    hashtags        TEXT,
+    mencoes         TEXT,
+    n_hashtags      INTEGER,
+    n_mencoes       INTEGER,
+    n_emojis        INTEGER,
+    tamanho_legenda INTEGER,
+    n_palavras      INTEGER,
+    tem_cta         INTEGER,
+    tem_pergunta    INTEGER,
+    tem_link        INTEGER,
+    hora            INTEGER,
+    dia_semana      INTEGER
+);
+-- post_pk no índice: o desempate das páginas (ORDER BY published_at DESC, post_pk) sai do índice, sem ordenar
+DROP INDEX IF EXISTS posts_username_data;
+CREATE INDEX IF NOT EXISTS posts_username_data_pk ON posts (username, published_at DESC, post_pk);
+CREATE INDEX IF NOT EXISTS posts_username_curtidas ON posts (username, like_count DESC);
+CREATE INDEX IF NOT EXISTS posts_username_comentarios ON posts (username, comment_count DESC);
+
+CREATE TABLE IF NOT EXISTS post_snapshots (
+    post_pk       TEXT NOT NULL,
+    captured_at   TEXT NOT NULL,
+    like_count    INTEGER,
+    comment_count INTEGER,
+    PRIMARY KEY (post_pk, captured_at)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS comments (
+    comment_pk      TEXT PRIMARY KEY,
+    post_pk         TEXT NOT NULL,
+    username        TEXT NOT NULL,
+    author_username TEXT,
+    text            TEXT,
+    like_count      INTEGER,
+    created_at      TEXT
+);
+CREATE INDEX IF NOT EXISTS comments_post_pk ON comments (post_pk);
+
+CREATE TABLE IF NOT EXISTS profile_stats (
+    username         TEXT NOT NULL,
+    categoria        TEXT NOT NULL,
+    mes              TEXT NOT NULL,
+    posts            INTEGER NOT NULL DEFAULT 0,
+    soma_curtidas    INTEGER NOT NULL DEFAULT 0,
+    soma_comentarios INTEGER NOT NULL DEFAULT 0,
+    primeira_data    TEXT,
+    ultima_data      TEXT,
+    PRIMARY KEY (username, categoria, mes)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS profile_top (
+    username      TEXT NOT NULL,
+    metrica       TEXT NOT NULL,
+    posicao       INTEGER NOT NULL,
+    post_pk       TEXT,
+    published_at  TEXT,
+    tipo          TEXT,
+    like_count    INTEGER,
+    comment_count INTEGER,
+    caption       TEXT,
+    media_url     TEXT,
+    PRIMARY KEY (username, metrica, posicao)
+) WITHOUT ROWID;
+"""
+
+
+def init_connection(caminho: str = None):
+    """Abre (e cria, se preciso) o banco SQLite local. ':memory:' também funciona."""
+    conn = sqlite3.connect(caminho or ARQUIVO_SQLITE, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SQL_SCHEMA)
+    _migrar_colunas(conn)
+    _criar_indice_legendas(conn)
+    return conn
+
+
+def _migrar_colunas(conn):
+    """Bancos criados antes dos atributos de legenda e das colunas mais novas ganham essas colunas (vazias)."""
+    existentes = {linha[1] for linha in conn.execute("PRAGMA table_info(posts)")}
+    with conn:
+        for coluna in COLUNAS_FEATURES + ['refreshed_at', 'thumbnail_url'] + COLUNAS_PROCEDENCIA:
+            if coluna not in existentes:
+                tipo = "TEXT" if coluna in ('hashtags', 'mencoes', 'refreshed_at', 'thumbnail_url', *COLUNAS_PROCEDENCIA) else "INTEGER"
+                conn.execute(f"ALTER TABLE posts ADD COLUMN {coluna} {tipo}")
+
+
+# Índice FTS5 "external content": guarda só o índice das legendas (o texto
+# continua em 'posts') e os gatilhos o mantêm em dia a cada gravação
+SQL_INDICE_LEGENDAS = """
+CREATE VIRTUAL TABLE posts_fts USING fts5(
+    caption, content='posts', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS posts_fts_insere AFTER INSERT ON posts BEGIN
+    INSERT INTO posts_fts(rowid, caption) VALUES (new.rowid, new.caption);
+END;
+CREATE TRIGGER IF NOT EXISTS posts_fts_apaga AFTER DELETE ON posts BEGIN
+    INSERT INTO posts_fts(posts_fts, rowid, caption) VALUES ('delete', old.rowid, old.caption);
+END;
+CREATE TRIGGER IF NOT EXISTS posts_fts_atualiza AFTER UPDATE OF caption ON posts BEGIN
+    INSERT INTO posts_fts(posts_fts, rowid, caption) VALUES ('delete', old.rowid, old.caption);
+    INSERT INTO posts_fts(rowid, caption) VALUES (new.rowid, new.caption);
+END;
+INSERT INTO posts_fts(posts_fts) VALUES ('rebuild');
+"""
+
+
+def _criar_indice_legendas(conn):
+    """Cria o índice de busca uma vez; bancos antigos são indexados no 'rebuild'."""
+    existe = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'posts_fts'").fetchone()
+    if not existe:
+        conn.executescript(SQL_INDICE_LEGENDAS)
+
+
+def _ler(conn, sql: str, parametros=()):
+    return traduzir_para_app(pd.read_sql_query(sql, conn, params=parametros))
+
+
+def _colunas_select(colunas: list):
+    if not colunas:
+        return "*"
+    return ", ".join(MAPEAMENTO_APP_PARA_BANCO.get(c, c) for c in colunas)
+
+
+def fetch_posts_paginado(conn, target_username: str, limit: int = 0, offset: int = 0, colunas: list = None):
+    """Busca uma página de posts (mais recentes primeiro) no formato do app."""
+    return _ler(
+        conn,
+        f"SELECT {_colunas_select(colunas)} FROM posts WHERE username = ? "
+        "ORDER BY published_at DESC, post_pk LIMIT ? OFFSET ?",
+        (target_username, limit if limit > 0 else -1, offset)
+    )
+
+
+def fetch_posts_pendentes(conn, target_username: str, limit: int = 0):
+    """Posts sem classificação (ou com erro)."""
+    return _ler(
+        conn,
+        "SELECT * FROM posts WHERE username = ? AND (tipo IS NULL OR tipo = '' OR tipo = ?) "
+        "ORDER BY published_at DESC, post_pk LIMIT ?",
+        (target_username, CATEGORIA_ERRO, limit if limit > 0 else -1)
+    )
+
+
+def agregar_por_categoria(conn, target_username: str):
+    """Médias por categoria calculadas pelo próprio SQLite."""
+    return pd.read_sql_query(
+        "SELECT tipo AS categoria, COUNT(*) AS posts, "
+        "AVG(like_count) AS media_curtidas, AVG(comment_count) AS media_comentarios "
+        "FROM posts WHERE username = ? GROUP BY tipo ORDER BY media_curtidas DESC",
+        conn, params=(target_username,)
+    )
+
+
+def buscar_legendas(conn, termo: str, perfis: list = None, limit: int = 20, offset: int = 0):
+    """Busca nas legendas pelo FTS5 (todos os termos), do post mais engajado para o menos."""
+    termos = termos_da_consulta(termo)
+    if not termos:
+        return _ler(conn, "SELECT *, 0 AS engajamento FROM posts LIMIT 0")
+    # Cada termo entre aspas: vira literal para o FTS5 (sem operadores)
+    consulta = " ".join(f'"{t}"' for t in termos)
+    filtro_perfis = ""
+    parametros = [consulta]
+    if perfis:
+        filtro_perfis = f"AND p.username IN ({', '.join('?' * len(perfis))}) "
+        parametros += list(perfis)
+    return _ler(
+        conn,
+        "SELECT p.*, COALESCE(p.like_count, 0) + COALESCE(p.comment_count, 0) AS engajamento "
+        "FROM posts_fts JOIN posts p ON p.rowid = posts_fts.rowid "
+        f"WHERE posts_fts MATCH ? {filtro_perfis}"
+        "ORDER BY engajamento DESC, p.post_pk LIMIT ? OFFSET ?",
+        parametros + [limit, offset]
+    )
+
+
+def fetch_pagina_grade(conn, perfis: list = None, categorias: list = None, data_inicio=None, data_fim=None,
+                       ordenar_por: str = 'data', decrescente: bool = True, limit: int = 50, offset: int = 0,
+                       janelas: dict = None):
+    """Uma página da grade (grade_posts.py) filtrada e ordenada pelo SQLite, e o total do filtro."""
+    condicoes, parametros = [], []
+    if perfis:
+        condicoes.append(f"username IN ({', '.join('?' * len(perfis))})")
+        parametros += [str(p) for p in perfis]
+    if categorias:
+        valores, incluir_vazias = separar_categorias(categorias)
+        opcoes = [f"tipo IN ({', '.join('?' * len(valores))})"] if valores else []
+        if incluir_vazias:
+            opcoes.append("tipo IS NULL OR tipo = ''")
+        condicoes.append(f"({' OR '.join(opcoes)})")
+        parametros += valores
+    inicio, fim = intervalo_datas(data_inicio, data_fim)
+    if inicio:
+        condicoes.append("published_at >= ?")
+        parametros.append(inicio)
+    if fim:
+        condicoes.append("published_at < ?")
+        parametros.append(fim)
+    if janelas:
+        condicoes.append(f"({' OR '.join(['(username = ? AND published_at >= ?)'] * len(janelas))})")
+        parametros += [valor for perfil, desde in janelas.items() for valor in (str(perfil), desde)]
+    where = f"WHERE {' AND '.join(condicoes)} " if condicoes else ""
+
+    total = conn.execute(f"SELECT COUNT(*) FROM posts {where}", parametros).fetchone()[0]
+    pagina = _ler(
+        conn,
+        f"SELECT {', '.join(COLUNAS_BANCO_GRADE)} FROM posts {where}"
+        f"ORDER BY {coluna_ordenacao(ordenar_por)} {'DESC' if decrescente else 'ASC'}, post_pk LIMIT ? OFFSET ?",
+        parametros + [limit, offset]
+    )
+    return para_grade(pagina), total
+
+
+def fetch_estatisticas(conn, usernames: list):
+    """Lê o resumo pronto dos perfis (estatisticas_perfil.py), sem tocar em 'posts'."""
+    marcadores = ", ".join("?" * len(usernames))
+    grupos = pd.read_sql_query(f"SELECT * FROM profile_stats WHERE username IN ({marcadores})", conn, params=list(usernames))
+    top = pd.read_sql_query(f"SELECT * FROM profile_top WHERE username IN ({marcadores})", conn, params=list(usernames))
+    return EstatisticasPerfis(grupos, top)
+
+
+def _ler_estado_atual(conn, post_pks: list):
+    marcadores = ", ".join("?" * len(post_pks))
+    return pd.read_sql_query(
+        f"SELECT {', '.join(COLUNAS_ESTADO)} FROM posts WHERE post_pk IN ({marcadores})",
+        conn, params=[str(pk) for pk in post_pks]
+    )
+
+
+def _gravar_top(conn, usernames: list, top: pd.DataFrame):
+    conn.execute(f"DELETE FROM profile_top WHERE username IN ({', '.join('?' * len(usernames))})", list(usernames))
+    conn.executemany(
+        f"INSERT INTO profile_top ({', '.join(COLUNAS_TOP)}) VALUES ({', '.join('?' * len(COLUNAS_TOP))})",
+        list(top[COLUNAS_TOP].astype(object).where(top[COLUNAS_TOP].notna(), None).itertuples(index=False, name=None))
+    )
+
+
+def reconstruir_estatisticas(conn, username: str):
+    """Monta o resumo do perfil a partir de todos os posts dele (usado uma vez por perfil)."""
+    df = pd.read_sql_query(
+        f"SELECT {', '.join(COLUNAS_ESTADO)}, caption, media_url FROM posts WHERE username = ?",
+        conn, params=(username,)
+    )
+    grupos = calcular_grupos(df)
+    conn.execute("DELETE FROM profile_stats WHERE username = ?", (username,))
+    conn.executemany(
+        "INSERT INTO profile_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        list(grupos.astype(object).where(grupos.notna(), None).itertuples(index=False, name=None))
+    )
+    _gravar_top(conn, [username], mesclar_top(None, df))
+    return grupos
+
+
+def _aplicar_estatisticas(conn, df_final: pd.DataFrame, df_atuais: pd.DataFrame, classificacoes: list = None):
+    """
+    Soma no resumo só a diferença causada pela gravação. Roda dentro da mesma
+    transação do upsert/update, então 'posts' e o resumo nunca divergem.
+    """
+    for username in df_final['username'].dropna().unique():
+        if conn.execute("SELECT 1 FROM profile_stats WHERE username = ? LIMIT 1", (username,)).fetchone() is None:
+            # Perfil sem resumo: montado do zero, já com esta gravação
+            reconstruir_estatisticas(conn, username)
+            df_final = df_final[df_final['username'] != username]
+
+    deltas = deltas_estatisticas(df_final, df_atuais)
+    conn.executemany(
+        "INSERT INTO profile_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(username, categoria, mes) DO UPDATE SET "
+        "posts = posts + excluded.posts, "
+        "soma_curtidas = soma_curtidas + excluded.soma_curtidas, "
+        "soma_comentarios = soma_comentarios + excluded.soma_comentarios, "
+        "primeira_data = MIN(COALESCE(primeira_data, excluded.primeira_data), COALESCE(excluded.primeira_data, primeira_data)), "
+        "ultima_data = MAX(COALESCE(ultima_data, excluded.ultima_data), COALESCE(excluded.ultima_data, ultima_data))",
+        list(deltas.astype(object).where(deltas.notna(), None).itertuples(index=False, name=None))
+    )
+
+    usernames = list(df_final['username'].dropna().unique())
+    if usernames:
+        top_atual = pd.read_sql_query(
+            f"SELECT * FROM profile_top WHERE username IN ({', '.join('?' * len(usernames))})", conn, params=usernames
+        )
+        top_novo = reclassificar_top(top_atual, classificacoes) if classificacoes else mesclar_top(top_atual, df_final)
+        if top_mudou(top_atual, top_novo):
+            _gravar_top(conn, usernames, top_novo)
+
+
+def fetch_instagram_data(conn, target_username: str, limit: int = 0):
+    """Mesmo contrato do supabase_utils/mongodb_utils: DataFrame ou None se vazio."""
+    df = fetch_posts_paginado(conn, target_username, limit=limit)
+    return None if df.empty else df
+
+
+def save_posts_to_sqlite(conn, df: pd.DataFrame, target_username: str):
+    """
+    Upsert por post_pk em uma única transação. 'tipo' vazio não apaga a classificação salva.
+    Returns:
+        ResultadoGravacao: Todos gravados (o arquivo é local; um erro sobe como exceção).
+    """
+    if df.empty:
+        return ResultadoGravacao()
+
+    df_final = preparar_posts_para_banco(df, target_username)
+    df_final = df_final.assign(post_pk=df_final['post_pk'].astype(str))
+    colunas = list(df_final.columns)
+    atualizacoes = ", ".join(f"{c} = excluded.{c}" for c in colunas if c != 'post_pk')
+
+    # Estado atual para os snapshots e para o resumo do perfil (mesma regra dos outros bancos)
+    df_atuais = _ler_estado_atual(conn, df_final['post_pk'].tolist())
+
+    registros = df_final.astype(object).where(df_final.notna(), None).itertuples(index=False, name=None)
+    with conn:
+        conn.executemany(
+            f"INSERT INTO posts ({', '.join(colunas)}) VALUES ({', '.join('?' * len(colunas))}) "
+            f"ON CONFLICT(post_pk) DO UPDATE SET {atualizacoes}",
+            list(registros)
+        )
+        _aplicar_estatisticas(conn, estado_final(df_final, df_atuais), df_atuais)
+        if 'like_count' in colunas:
+            snapshots = selecionar_snapshots_alterados(df_final, df_atuais)
+            conn.executemany(
+                "INSERT OR REPLACE INTO post_snapshots VALUES (?, ?, ?, ?)",
+                [
+                    (pk, t.isoformat(), int(l) if pd.notna(l) else None, int(c) if pd.notna(c) else None)
+                    for pk, t, l, c in snapshots.itertuples(index=False, name=None)
+                ]
+            )
+    print(f"✅ {len(df_final)} posts sincronizados no SQLite local!")
+    return ResultadoGravacao(gravados=len(df_final))
+
+
+def marcar_atualizados(conn, post_pks: list, quando: str):
+    """Grava só o refreshed_at dos posts conferidos sem mudança."""
+    if not post_pks:
+        return True
+    with conn:
+        conn.executemany("UPDATE posts SET refreshed_at = ? WHERE post_pk = ?", [(quando, str(pk)) for pk in post_pks])
+    return True
+
+
+def salvar_comentarios(conn, df: pd.DataFrame):
+    """Insere os comentários em uma transação; os já guardados são ignorados."""
+    if df.empty:
+        return 0
+    df = df.reindex(columns=COLUNAS_COMENTARIOS)
+    with conn:
+        antes = conn.total_changes
+        conn.executemany(
+            f"INSERT OR IGNORE INTO comments ({', '.join(COLUNAS_COMENTARIOS)}) "
+            f"VALUES ({', '.join('?' * len(COLUNAS_COMENTARIOS))})",
+            list(df.astype(object).where(df.notna(), None).itertuples(index=False, name=None))
+        )
+        return conn.total_changes - antes
+
+
+def ultimos_comentarios(conn, post_pks: list):
+    """{post_pk: comment_pk mais novo guardado} (os ids comparados como números)."""
+    if not post_pks:
+        return {}
+    linhas = conn.execute(
+        f"SELECT post_pk, MAX(CAST(comment_pk AS INTEGER)) FROM comments "
+        f"WHERE post_pk IN ({', '.join('?' * len(post_pks))}) GROUP BY post_pk",
+        [str(pk) for pk in post_pks]
+    ).fetchall()
+    return {post_pk: str(ultimo) for post_pk, ultimo in linhas}
+
+
+def fetch_comentarios(conn, post_pks: list):
+    if not post_pks:
+        return pd.DataFrame(columns=COLUNAS_COMENTARIOS)
+    return pd.read_sql_query(
+        f"SELECT * FROM comments WHERE post_pk IN ({', '.join('?' * len(post_pks))}) "
+        "ORDER BY post_pk, CAST(comment_pk AS INTEGER) DESC",
+        conn, params=[str(pk) for pk in post_pks]
+    )
+
+
+def update_post_classification(conn, classificacoes: list):
+    """Atualiza 'tipo' e a procedência a partir de [{'id': ..., 'categoria': ...}] em uma transação."""
+    if not classificacoes:
+        return True
+    df_atuais = _ler_estado_atual(conn, [item['id'] for item in classificacoes])
+    registros = [classificacao_para_banco(item) for item in classificacoes]
+    df_novos = pd.DataFrame(registros)
+    with conn:
+        conn.executemany(
+            "UPDATE posts SET tipo = :tipo, tipo_modelo = :tipo_modelo, tipo_versao = :tipo_versao, "
+            "classificado_em = :classificado_em WHERE post_pk = :post_pk",
+            registros
+        )
+        _aplicar_estatisticas(conn, estado_final(df_novos, df_atuais), df_atuais, classificacoes)
+    print(f"✅ {len(classificacoes)} classificações atualizadas no SQLite local!")
+    return True
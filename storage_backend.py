@@ -0,0 +1,381 @@
+# storage_backend.py
+# Interface única de armazenamento para os scripts e o dashboard.
+#
+# Cada banco tem o seu módulo "*_utils" (supabase_utils, mongodb_utils,
+# sqlite_utils) com o caminho quente otimizado para ele. Este arquivo guarda
+# o que antes era copiado em cada um (mapeamento de colunas, preparação do
+# DataFrame) e expõe o protocolo StorageBackend com os adaptadores.
+
+import inspect
+from typing import Protocol, runtime_checkable
+
+import pandas as pd
+
+import metricas
+from features_legenda import COLUNAS_FEATURES, garantir_features_legenda
+
+try:
+    from config import BACKEND_ARMAZENAMENTO
+except ImportError:
+    BACKEND_ARMAZENAMENTO = None
+
+# --- TRADUÇÃO DAS COLUNAS (app <-> banco) ---
+MAPEAMENTO_APP_PARA_BANCO = {
+    'data': 'published_at',
+    'num': 'media_num',
+    'curtidas': 'like_count',
+    'comentarios': 'comment_count',
+    'legenda': 'caption',
+    'link': 'media_url',
+    'id': 'post_pk',
+    'atualizado_em': 'refreshed_at',
+    'miniatura': 'thumbnail_url',
+}
+MAPEAMENTO_BANCO_PARA_APP = {v: k for k, v in MAPEAMENTO_APP_PARA_BANCO.items()}
+
+COLUNAS_DA_TABELA = [
+    'username', 'post_pk', 'published_at', 'media_num', 'like_count',
+    'comment_count', 'caption', 'media_url', 'tipo', 'refreshed_at', 'thumbnail_url'
+] + COLUNAS_FEATURES
+
+# Posts com 'tipo' vazio ou com este valor voltam para a fila de classificação
+CATEGORIA_ERRO = 'Erro na Classificação'
+
+# Procedência de 'tipo': modelo, versão do prompt e quando foi classificado
+# (ver classificador_post.VERSAO_PROMPT e reclassificar.py)
+COLUNAS_PROCEDENCIA = ['tipo_modelo', 'tipo_versao', 'classificado_em']
+
+
+def classificacao_para_banco(item: dict):
+    """
+    {'id', 'categoria', 'modelo', 'versao', 'classificado_em'} -> colunas do banco.
+    Sempre as mesmas chaves (sem procedência vira None), para o lote ser uniforme.
+    """
+    return {
+        'post_pk': str(item['id']),
+        'tipo': item['categoria'],
+        'tipo_modelo': item.get('modelo'),
+        'tipo_versao': item.get('versao'),
+        'classificado_em': item.get('classificado_em'),
+    }
+
+
+def preparar_posts_para_banco(df: pd.DataFrame, target_username: str, colunas_permitidas: list = COLUNAS_DA_TABELA):
+    """
+    Converte o DataFrame do app (data, id, curtidas, ...) para as colunas do banco.
+    A coluna 'tipo' só é enviada se vier preenchida: assim o upsert de métricas
+    não apaga a classificação de posts que já foram classificados.
+    Com colunas_permitidas=None mantém todas as colunas (bancos sem schema).
+    Os atributos da legenda (features_legenda.py) que faltarem são calculados aqui,
+    então todo post gravado leva os seus.
+    """
+    if 'legenda' in df.columns:
+        df = garantir_features_legenda(df)
+    df_banco = df.rename(columns=MAPEAMENTO_APP_PARA_BANCO).assign(username=target_username)
+    if colunas_permitidas is None:
+        colunas = list(df_banco.columns)
+    else:
+        colunas = [col for col in colunas_permitidas if col in df_banco.columns]
+    if 'tipo' in colunas and df_banco['tipo'].isna().all():
+        colunas.remove('tipo')
+    return df_banco[colunas]
+
+
+def registros_para_banco(df: pd.DataFrame):
+    """Linhas como dicts com None no lugar de NaN/NA (o JSON e o BSON não aceitam NA)."""
+    return df.astype(object).where(df.notna(), None).to_dict(orient='records')
+
+
+def traduzir_para_app(df: pd.DataFrame, mapeamento_extra: dict = None):
+    """Renomeia as colunas do banco para os nomes que o app Streamlit espera."""
+    mapeamento = {**MAPEAMENTO_BANCO_PARA_APP, **(mapeamento_extra or {})}
+    return df.rename(columns={k: v for k, v in mapeamento.items() if k in df.columns})
+
+
+class ResultadoGravacao:
+    """
+    Resultado de upsert_posts. Uma falha parcial (alguns lotes recusados) é
+    diferente de um banco fora do ar: quem chamou precisa saber quantos
+    posts chegaram ao banco.
+
+    Args:
+        gravados (int): Posts gravados no banco.
+        no_spool (int): Posts que não foram gravados e ficaram no spool local.
+        falhas (int): Posts que não foram gravados nem guardados (spool desligado).
+
+    Como bool, é True só se todos os posts foram gravados (o retorno antigo).
+    """
+
+    def __init__(self, gravados: int = 0, no_spool: int = 0, falhas: int = 0):
+        self.gravados = gravados
+        self.no_spool = no_spool
+        self.falhas = falhas
+
+    def __bool__(self):
+        return self.no_spool == 0 and self.falhas == 0
+
+    @property
+    def nada_gravado(self):
+        """Havia posts e nenhum chegou ao banco (banco indisponível)."""
+        return self.gravados == 0 and (self.no_spool > 0 or self.falhas > 0)
+
+    def __repr__(self):
+        return f"ResultadoGravacao(gravados={self.gravados}, no_spool={self.no_spool}, falhas={self.falhas})"
+
+
+@runtime_checkable
+class StorageBackend(Protocol):
+    """Operações que o pipeline e o dashboard usam, independentes do banco."""
+
+    nome: str
+
+    def upsert_posts(self, df: pd.DataFrame, target_username: str, usar_spool: bool = True) -> ResultadoGravacao:
+        """Grava (insere ou atualiza por post_pk) os posts no formato do app."""
+        ...
+
+    def update_classificacoes(self, classificacoes: list, usar_spool: bool = True) -> bool:
+        """Atualiza 'tipo' (e a procedência) a partir de [{'id': ..., 'categoria': ..., 'modelo': ..., 'versao': ...}]."""
+        ...
+
+    def fetch_posts(self, target_username: str, limit: int = 0, offset: int = 0, colunas: list = None) -> pd.DataFrame:
+        """Posts do perfil, mais recentes primeiro, no formato do app. limit=0 traz tudo."""
+        ...
+
+    def fetch_pendentes(self, target_username: str, limit: int = 0) -> pd.DataFrame:
+        """Posts sem classificação (ou com erro), filtrados no próprio banco."""
+        ...
+
+    def agregar_por_categoria(self, target_username: str) -> pd.DataFrame:
+        """Colunas 'categoria', 'posts', 'media_curtidas', 'media_comentarios'."""
+        ...
+
+    def buscar_legendas(self, termo: str, perfis: list = None, limit: int = 20, offset: int = 0) -> pd.DataFrame:
+        """Posts cujas legendas têm todos os termos, mais engajados primeiro, com 'engajamento'."""
+        ...
+
+    def fetch_pagina_grade(self, perfis: list = None, categorias: list = None, data_inicio=None, data_fim=None,
+                           ordenar_por: str = 'data', decrescente: bool = True, limit: int = 50,
+                           offset: int = 0, janelas: dict = None) -> tuple:
+        """
+        Uma página da grade da Visão Geral (grade_posts.py), filtrada e ordenada no banco, e o total do filtro.
+        'janelas' (perfil -> published_at inicial) limita a grade aos posts que a análise usou.
+        """
+        ...
+
+    def fetch_estatisticas(self, usernames: list):
+        """Resumo pronto dos perfis (estatisticas_perfil.EstatisticasPerfis), sem ler os posts."""
+        ...
+
+    def marcar_atualizados(self, post_pks: list, quando: str) -> bool:
+        """Grava só 'refreshed_at' (métricas conferidas no Instagram, sem mudança)."""
+        ...
+
+    def salvar_comentarios(self, df: pd.DataFrame) -> int:
+        """Insere em lote os comentários (comentarios.COLUNAS_COMENTARIOS), ignorando os já guardados."""
+        ...
+
+    def ultimos_comentarios(self, post_pks: list) -> dict:
+        """{post_pk: comment_pk mais novo guardado}, para a coleta incremental."""
+        ...
+
+    def fetch_comentarios(self, post_pks: list) -> pd.DataFrame:
+        """Comentários guardados dos posts."""
+        ...
+
+    def reenviar_spool(self):
+        """Reenvia o que ficou no spool local numa falha anterior."""
+        ...
+
+
+class SupabaseBackend:
+    nome = "supabase"
+
+    def __init__(self, client=None):
+        import supabase_utils
+        self._utils = supabase_utils
+        if client is None:
+            try:
+                client = supabase_utils.init_connection()
+            except Exception as e:
+                # Sem cliente, as gravações vão para o spool local
+                print(f"❌ FALHA AO CONECTAR AO SUPABASE: {e}")
+        self.client = client
+
+    def upsert_posts(self, df, target_username, usar_spool=True):
+        return self._utils.save_posts_to_supabase(self.client, df, target_username, usar_spool=usar_spool)
+
+    def update_classificacoes(self, classificacoes, usar_spool=True):
+        return self._utils.update_post_classification(self.client, classificacoes, usar_spool=usar_spool)
+
+    def fetch_posts(self, target_username, limit=0, offset=0, colunas=None):
+        return self._utils.fetch_posts_paginado(self.client, target_username, limit, offset, colunas)
+
+    def fetch_pendentes(self, target_username, limit=0):
+        return self._utils.fetch_posts_pendentes(self.client, target_username, limit)
+
+    def agregar_por_categoria(self, target_username):
+        return self._utils.agregar_por_categoria(self.client, target_username)
+
+    def buscar_legendas(self, termo, perfis=None, limit=20, offset=0):
+        return self._utils.buscar_legendas(self.client, termo, perfis, limit, offset)
+
+    def fetch_pagina_grade(self, perfis=None, categorias=None, data_inicio=None, data_fim=None,
+                           ordenar_por='data', decrescente=True, limit=50, offset=0, janelas=None):
+        return self._utils.fetch_pagina_grade(self.client, perfis, categorias, data_inicio, data_fim,
+                                              ordenar_por, decrescente, limit, offset, janelas)
+
+    def fetch_estatisticas(self, usernames):
+        return self._utils.fetch_estatisticas(self.client, usernames)
+
+    def marcar_atualizados(self, post_pks, quando):
+        return self._utils.marcar_atualizados(self.client, post_pks, quando)
+
+    def salvar_comentarios(self, df):
+        return self._utils.salvar_comentarios(self.client, df)
+
+    def ultimos_comentarios(self, post_pks):
+        return self._utils.ultimos_comentarios(self.client, post_pks)
+
+    def fetch_comentarios(self, post_pks):
+        return self._utils.fetch_comentarios(self.client, post_pks)
+
+    def reenviar_spool(self):
+        return self._utils.reenviar_spool_supabase(self.client)
+
+
+class MongoBackend:
+    nome = "mongodb"
+
+    def __init__(self, client=None):
+        import mongodb_utils
+        self._utils = mongodb_utils
+        self.client = client if client is not None else mongodb_utils.init_connection()
+
+    def upsert_posts(self, df, target_username, usar_spool=True):
+        return self._utils.save_posts_to_mongodb(self.client, df, target_username, usar_spool=usar_spool)
+
+    def update_classificacoes(self, classificacoes, usar_spool=True):
+        return self._utils.update_post_classification(self.client, classificacoes, usar_spool=usar_spool)
+
+    def fetch_posts(self, target_username, limit=0, offset=0, colunas=None):
+        return self._utils.fetch_posts_paginado(self.client, target_username, limit, offset, colunas)
+
+    def fetch_pendentes(self, target_username, limit=0):
+        return self._utils.fetch_posts_pendentes(self.client, target_username, limit)
+
+    def agregar_por_categoria(self, target_username):
+        return self._utils.agregar_por_categoria(self.client, target_username)
+
+    def buscar_legendas(self, termo, perfis=None, limit=20, offset=0):
+        return self._utils.buscar_legendas(self.client, termo, perfis, limit, offset)
+
+    def fetch_pagina_grade(self, perfis=None, categorias=None, data_inicio=None, data_fim=None,
+                           ordenar_por='data', decrescente=True, limit=50, offset=0, janelas=None):
+        return self._utils.fetch_pagina_grade(self.client, perfis, categorias, data_inicio, data_fim,
+                                              ordenar_por, decrescente, limit, offset, janelas)
+
+    def fetch_estatisticas(self, usernames):
+        return self._utils.fetch_estatisticas(self.client, usernames)
+
+    def marcar_atualizados(self, post_pks, quando):
+        return self._utils.marcar_atualizados(self.client, post_pks, quando)
+
+    def salvar_comentarios(self, df):
+        return self._utils.salvar_comentarios(self.client, df)
+
+    def ultimos_comentarios(self, post_pks):
+        return self._utils.ultimos_comentarios(self.client, post_pks)
+
+    def fetch_comentarios(self, post_pks):
+        return self._utils.fetch_comentarios(self.client, post_pks)
+
+    def reenviar_spool(self):
+        return self._utils.reenviar_spool_mongodb(self.client)
+
+
+class SQLiteBackend:
+    nome = "sqlite"
+
+    def __init__(self, client=None, caminho: str = None):
+        import sqlite_utils
+        self._utils = sqlite_utils
+        self.client = client if client is not None else sqlite_utils.init_connection(caminho)
+
+    def upsert_posts(self, df, target_username, usar_spool=True):
+        return self._utils.save_posts_to_sqlite(self.client, df, target_username)
+
+    def update_classificacoes(self, classificacoes, usar_spool=True):
+        return self._utils.update_post_classification(self.client, classificacoes)
+
+    def fetch_posts(self, target_username, limit=0, offset=0, colunas=None):
+        return self._utils.fetch_posts_paginado(self.client, target_username, limit, offset, colunas)
+
+    def fetch_pendentes(self, target_username, limit=0):
+        return self._utils.fetch_posts_pendentes(self.client, target_username, limit)
+
+    def agregar_por_categoria(self, target_username):
+        return self._utils.agregar_por_categoria(self.client, target_username)
+
+    def buscar_legendas(self, termo, perfis=None, limit=20, offset=0):
+        return self._utils.buscar_legendas(self.client, termo, perfis, limit, offset)
+
+    def fetch_pagina_grade(self, perfis=None, categorias=None, data_inicio=None, data_fim=None,
+                           ordenar_por='data', decrescente=True, limit=50, offset=0, janelas=None):
+        return self._utils.fetch_pagina_grade(self.client, perfis, categorias, data_inicio, data_fim,
+                                              ordenar_por, decrescente, limit, offset, janelas)
+
+    def fetch_estatisticas(self, usernames):
+        return self._utils.fetch_estatisticas(self.client, usernames)
+
+    def marcar_atualizados(self, post_pks, quando):
+        return self._utils.marcar_atualizados(self.client, post_pks, quando)
+
+    def salvar_comentarios(self, df):
+        return self._utils.salvar_comentarios(self.client, df)
+
+    def ultimos_comentarios(self, post_pks):
+        return self._utils.ultimos_comentarios(self.client, post_pks)
+
+    def fetch_comentarios(self, post_pks):
+        return self._utils.fetch_comentarios(self.client, post_pks)
+
+    def reenviar_spool(self):
+        # Banco local: nunca fica "fora do ar", não há spool para reenviar
+        return 0, 0
+
+
+class BackendMedido:
+    """Envolve um backend e cronometra cada operação (um round trip lógico ao banco)."""
+
+    def __init__(self, backend):
+        self._backend = backend
+
+    def __getattr__(self, nome):
+        atributo = getattr(self._backend, nome)
+        # Só os métodos do adaptador; 'client' (ex: sqlite3.Connection) também é "callable"
+        if nome.startswith('_') or not inspect.ismethod(atributo):
+            return atributo
+
+        def medido(*args, **kwargs):
+            with metricas.cronometro("db_operacao", backend=self._backend.nome, operacao=nome):
+                return atributo(*args, **kwargs)
+        return medido
+
+
+BACKENDS = {
+    SupabaseBackend.nome: SupabaseBackend,
+    MongoBackend.nome: MongoBackend,
+    SQLiteBackend.nome: SQLiteBackend,
+}
+
+
+def obter_backend(padrao: str = "supabase", client=None, **kwargs) -> StorageBackend:
+    """
+    Cria o backend de armazenamento.
+    O 'BACKEND_ARMAZENAMENTO' do config.py, se existir, tem prioridade sobre o padrão
+    de cada script (ex: BACKEND_ARMAZENAMENTO = "sqlite" para rodar tudo sem rede).
+    """
+    nome = (BACKEND_ARMAZENAMENTO or padrao).lower()
+    if nome not in BACKENDS:
+        raise ValueError(f"Backend de armazenamento desconhecido: '{nome}'. Opções: {', '.join(BACKENDS)}")
+    return BackendMedido(BACKENDS[nome](client=client, **kwargs))
@@ -0,0 +1,40 @@
+# streamlit_opcional.py
+# Recursos do Streamlit para os módulos compartilhados (supabase_utils,
+# mongodb_utils, ...) sem obrigar os scripts de linha de comando a importar
+# o Streamlit.
+#
+# O Streamlit só é usado se já estiver carregado (o Menu.py o importa antes
+# de tudo); nos scripts, o cache vira um lru_cache e os avisos vão para o terminal.
+
+import functools
+import sys
+
+
+def _streamlit():
+    return sys.modules.get('streamlit')
+
+
+def cache_recurso(funcao):
+    """st.cache_resource no dashboard; cache simples do processo nos scripts."""
+    st = _streamlit()
+    if st is not None:
+        return st.cache_resource(funcao)
+    return functools.lru_cache(maxsize=None)(funcao)
+
+
+def avisar(mensagem: str):
+    """st.warning no dashboard; print nos scripts."""
+    st = _streamlit()
+    if st is not None:
+        st.warning(mensagem)
+    else:
+        print(f"⚠️ {mensagem}")
+
+
+def avisar_erro(mensagem: str):
+    """st.error no dashboard; print nos scripts."""
+    st = _streamlit()
+    if st is not None:
+        st.error(mensagem)
+    else:
+        print(f"❌ {mensagem}")
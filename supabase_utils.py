@@ -1,116 +1,311 @@
 # supabase_utils.py
 
-import streamlit as st
+from __future__ import annotations
 
-import pandas as pd
+from typing import TYPE_CHECKING
 
-from supabase import create_client, Client
+import pandas as pd
 
 from config import SUPABASE_URL, SUPABASE_KEY # Importando do config.py
 
+import metricas
 
+from busca_legendas import ordenar_por_engajamento
+from comentarios import (
+    fetch_comentarios_supabase,
+    registros_comentarios,
+    salvar_comentarios_supabase,
+    ultimos_comentarios_supabase
+)
+from estatisticas_perfil import aplicar_estatisticas_supabase, estado_final, fetch_estatisticas_supabase
+from grade_posts import COLUNAS_BANCO_GRADE, coluna_ordenacao, intervalo_datas, para_grade, separar_categorias
+from lotes_supabase import registros_com_falha, resumir, upsert_em_lotes
 
-@st.cache_resource
+from snapshots_utils import (
+    TAMANHO_LOTE_CONSULTA,
+    buscar_metricas_atuais_supabase,
+    registrar_snapshots_supabase,
+    selecionar_snapshots_alterados
+)
+from storage_backend import (
+    CATEGORIA_ERRO,
+    MAPEAMENTO_APP_PARA_BANCO,
+    ResultadoGravacao,
+    classificacao_para_banco,
+    preparar_posts_para_banco,
+    registros_para_banco,
+    traduzir_para_app
+)
+from spool_local import (
+    guardar_classificacoes_no_spool,
+    guardar_comentarios_no_spool,
+    guardar_posts_no_spool,
+    reenviar_spool
+)
+from streamlit_opcional import avisar, avisar_erro, cache_recurso
 
-def init_connection() -> Client:
+# O SDK do Supabase só é carregado na primeira conexão (os scripts e o
+# dashboard que usam outro banco não pagam o import)
+if TYPE_CHECKING:
+    from supabase import Client
 
-    # Usando as variáveis importadas do config.py
 
-    return create_client(SUPABASE_URL, SUPABASE_KEY)
 
+_conexoes_criadas = 0
 
 
-def fetch_instagram_data(supabase_client: Client, target_username: str):
+@cache_recurso
 
-    """
+def _criar_cliente_supabase() -> Client:
 
-    Busca os dados da tabela especificada no Supabase e retorna como um DataFrame.
+    global _conexoes_criadas
 
+    supabase = metricas.importar("supabase")
 
+    _conexoes_criadas += 1
 
-    Args:
+    # Usando as variáveis importadas do config.py
 
-        supabase_client (Client): O cliente de conexão do Supabase.
+    return supabase.create_client(SUPABASE_URL, SUPABASE_KEY)
 
-        target_username (str): O nome de usuário do Instagram a ser buscado.
 
-    Returns:
 
-        pd.DataFrame or None: Retorna um DataFrame com os dados se for bem-sucedido,
+def init_connection() -> Client:
 
-                              ou None se a tabela estiver vazia ou ocorrer um erro.
+    criadas_antes = _conexoes_criadas
 
-    """
+    with metricas.cronometro("db_conexao", backend="supabase"):
 
-    try:
+        client = _criar_cliente_supabase()
 
-        print(f"🔍 Buscando dados para o perfil '{target_username}' no Supabase...")
+    metricas.registrar_cache("conexao_supabase", acerto=_conexoes_criadas == criadas_antes)
 
-        # A sintaxe é: cliente.table('nome_da_tabela').select('*').execute()
+    return client
 
-        #procura filtrando pelo username (PODE SER TROCADO)
 
-        response = (
 
-            supabase_client.table("posts")
+# O PostgREST devolve no máximo 1000 linhas por requisição
+TAMANHO_PAGINA = 1000
 
-            .select("*")
+# A coluna 'id' do Supabase é a chave interna do Postgres
+MAPEAMENTO_EXTRA_SUPABASE = {'id': 'postgres_id'}
+
+
+def _buscar_em_paginas(montar_consulta, limit: int = 0, offset: int = 0):
+    """Executa a consulta em páginas de até TAMANHO_PAGINA linhas (limit=0 traz tudo)."""
+    dados = []
+    inicio = offset
+    while True:
+        tamanho = TAMANHO_PAGINA if limit <= 0 else min(TAMANHO_PAGINA, offset + limit - inicio)
+        if tamanho <= 0:
+            break
+        pagina = montar_consulta().range(inicio, inicio + tamanho - 1).execute().data or []
+        dados.extend(pagina)
+        if len(pagina) < tamanho:
+            break
+        inicio += tamanho
+    return dados
 
-            .eq("username", target_username)
 
+def fetch_posts_paginado(supabase_client: Client, target_username: str, limit: int = 0, offset: int = 0, colunas: list = None):
+    """
+    Busca uma página de posts (mais recentes primeiro) no formato do app.
+    'colunas' usa os nomes do app; só essas colunas trafegam pela rede.
+    """
+    select = ",".join(MAPEAMENTO_APP_PARA_BANCO.get(c, c) for c in colunas) if colunas else "*"
+    dados = _buscar_em_paginas(
+        lambda: (
+            supabase_client.table("posts")
+            .select(select)
+            .eq("username", target_username)
             .order("published_at", desc=True)  # Ordena pelos mais recentes
+            .order("post_pk")  # Desempate: posts no mesmo horário não repetem/somem entre páginas
+        ),
+        limit, offset
+    )
+    return traduzir_para_app(pd.DataFrame(dados), MAPEAMENTO_EXTRA_SUPABASE)
 
-            .execute()
 
+def fetch_posts_pendentes(supabase_client: Client, target_username: str, limit: int = 0):
+    """Posts sem classificação (ou com erro), filtrados no próprio Supabase."""
+    dados = _buscar_em_paginas(
+        lambda: (
+            supabase_client.table("posts")
+            .select("*")
+            .eq("username", target_username)
+            .or_(f'tipo.is.null,tipo.eq."",tipo.eq."{CATEGORIA_ERRO}"')
+            .order("published_at", desc=True)
+            .order("post_pk")
+        ),
+        limit
+    )
+    return traduzir_para_app(pd.DataFrame(dados), MAPEAMENTO_EXTRA_SUPABASE)
+
+
+def agregar_por_categoria(supabase_client: Client, target_username: str):
+    """Médias por categoria. Só 'tipo', 'like_count' e 'comment_count' trafegam pela rede."""
+    dados = _buscar_em_paginas(
+        lambda: (
+            supabase_client.table("posts")
+            .select("tipo,like_count,comment_count")
+            .eq("username", target_username)
+            .order("post_pk")
         )
+    )
+    df = pd.DataFrame(dados, columns=['tipo', 'like_count', 'comment_count'])
+    return (
+        df.groupby('tipo', dropna=False)
+        .agg(posts=('tipo', 'size'),
+             media_curtidas=('like_count', 'mean'),
+             media_comentarios=('comment_count', 'mean'))
+        .reset_index()
+        .rename(columns={'tipo': 'categoria'})
+        .sort_values('media_curtidas', ascending=False)
+    )
+
+
+def buscar_legendas(supabase_client: Client, termo: str, perfis: list = None, limit: int = 20, offset: int = 0):
+    """
+    Busca nas legendas pela função 'buscar_legendas' (tsvector + GIN, ver
+    busca_legendas.SQL_BUSCA_LEGENDAS). Já volta ordenada por engajamento e paginada.
+    """
+    dados = supabase_client.rpc('buscar_legendas', {
+        'consulta': termo,
+        'perfis': perfis or None,
+        'limite': limit,
+        'deslocamento': offset,
+    }).execute().data or []
+    return ordenar_por_engajamento(traduzir_para_app(pd.DataFrame(dados), MAPEAMENTO_EXTRA_SUPABASE))
 
-       
 
-        # A resposta da API contém os dados dentro de um atributo 'data'
+def _entre_aspas(valor):
+    # Valor literal num filtro 'or' do PostgREST (pontos, vírgulas e ':' não quebram a expressão)
+    return '"' + str(valor).replace('"', '\\"') + '"'
 
-        dados = response.data
 
-        if not dados:
+def fetch_pagina_grade(supabase_client: Client, perfis: list = None, categorias: list = None, data_inicio=None,
+                       data_fim=None, ordenar_por: str = 'data', decrescente: bool = True, limit: int = 50,
+                       offset: int = 0, janelas: dict = None):
+    """
+    Uma página da grade (grade_posts.py) filtrada e ordenada no Supabase, e o
+    total do filtro (count=exact na mesma requisição). Índices em grade_posts.SQL_GRADE_POSTS.
+    """
+    consulta = supabase_client.table("posts").select(",".join(COLUNAS_BANCO_GRADE), count="exact")
+    if perfis:
+        consulta = consulta.in_("username", [str(p) for p in perfis])
+    opcoes = []
+    if categorias:
+        valores, incluir_vazias = separar_categorias(categorias)
+        if valores:
+            lista = ",".join(_entre_aspas(v) for v in valores)
+            opcoes.append(f"tipo.in.({lista})")
+        if incluir_vazias:
+            opcoes += ["tipo.is.null", 'tipo.eq.""']
+    if janelas:
+        # Um único 'or': cada perfil a partir da sua data (com o filtro de categorias dentro)
+        categorias_dentro = f",or({','.join(opcoes)})" if opcoes else ""
+        consulta = consulta.or_(",".join(
+            f"and(username.eq.{_entre_aspas(perfil)},published_at.gte.{_entre_aspas(desde)}{categorias_dentro})"
+            for perfil, desde in janelas.items()
+        ))
+    elif opcoes:
+        consulta = consulta.or_(",".join(opcoes))
+    inicio, fim = intervalo_datas(data_inicio, data_fim)
+    if inicio:
+        consulta = consulta.gte("published_at", inicio)
+    if fim:
+        consulta = consulta.lt("published_at", fim)
+
+    resposta = (
+        consulta.order(coluna_ordenacao(ordenar_por), desc=decrescente)
+        .order("post_pk")
+        .range(offset, offset + limit - 1)
+        .execute()
+    )
+    pagina = traduzir_para_app(pd.DataFrame(resposta.data or []), MAPEAMENTO_EXTRA_SUPABASE)
+    return para_grade(pagina), resposta.count or 0
+
+
+def fetch_estatisticas(supabase_client: Client, usernames: list):
+    """Resumo pronto dos perfis (profile_stats/profile_top), sem ler os posts."""
+    return fetch_estatisticas_supabase(supabase_client, usernames)
+
+
+def marcar_atualizados(supabase_client: Client, post_pks: list, quando: str):
+    """Grava só o refreshed_at dos posts conferidos sem mudança (um update por lote de pks)."""
+    if not post_pks or supabase_client is None:
+        return False if post_pks else True
+    try:
+        pks = [str(pk) for pk in post_pks]
+        for inicio in range(0, len(pks), TAMANHO_LOTE_CONSULTA):
+            supabase_client.table("posts").update({'refreshed_at': quando}).in_(
+                "post_pk", pks[inicio:inicio + TAMANHO_LOTE_CONSULTA]
+            ).execute()
+    except Exception as e:
+        print(f"⚠️ Erro ao marcar posts como atualizados: {e}")
+        return False
+    return True
 
-            st.warning(f"Nenhum dado encontrado na tabela '{target_username}'.")
 
-            return None
+def salvar_comentarios(supabase_client: Client, df: pd.DataFrame):
+    """Insere os comentários em lotes na tabela 'comments' (ver comentarios.SQL_COMENTARIOS)."""
+    if df.empty:
+        return 0
+    if supabase_client is None:
+        print("❌ Sem conexão com o Supabase; comentários não gravados.")
+        return 0
+    try:
+        gravados, falhas = salvar_comentarios_supabase(supabase_client, df)
+    except Exception as e:
+        print(f"❌ Erro ao salvar comentários no Supabase: {e}")
+        gravados, falhas = 0, registros_comentarios(df)
+    # A próxima coleta parte do comentário mais novo guardado: o que falhou vai para o spool
+    guardar_comentarios_no_spool(falhas)
+    return gravados
+
+
+def ultimos_comentarios(supabase_client: Client, post_pks: list):
+    return ultimos_comentarios_supabase(supabase_client, post_pks) if post_pks else {}
+
+
+def fetch_comentarios(supabase_client: Client, post_pks: list):
+    return fetch_comentarios_supabase(supabase_client, post_pks)
 
-       
 
-        # Converte a lista de dicionários em um DataFrame do Pandas
+def fetch_instagram_data(supabase_client: Client, target_username: str):
 
-        df = pd.DataFrame(dados)
+    """
 
+    Busca os dados da tabela especificada no Supabase e retorna como um DataFrame.
 
 
-        # --- TRADUÇÃO DAS COLUNAS (Passo Crucial) ---
 
-        # Renomeia as colunas do banco para os nomes que o app Streamlit espera
+    Args:
 
-        mapeamento_colunas = {
+        supabase_client (Client): O cliente de conexão do Supabase.
 
-            'published_at': 'data',
+        target_username (str): O nome de usuário do Instagram a ser buscado.
 
-            'media_num': 'num',
+    Returns:
 
-            'like_count': 'curtidas',
+        pd.DataFrame or None: Retorna um DataFrame com os dados se for bem-sucedido,
 
-            'comment_count': 'comentarios',
+                              ou None se a tabela estiver vazia ou ocorrer um erro.
 
-            'caption': 'legenda',
+    """
 
-            'media_url': 'link',
+    try:
 
-            'post_pk': 'id',
+        print(f"🔍 Buscando dados para o perfil '{target_username}' no Supabase...")
 
-            'id' : 'postgres_id'
+        # Busca paginada: sem isso o PostgREST corta o resultado em 1000 linhas
+        df_traduzido = fetch_posts_paginado(supabase_client, target_username)
 
-            # A coluna 'tipo' já tem o nome correto
+        if df_traduzido.empty:
 
-        }
+            avisar(f"Nenhum dado encontrado na tabela '{target_username}'.")
 
-        df_traduzido = df.rename(columns=mapeamento_colunas)
+            return None
 
 
 
@@ -122,7 +317,7 @@ def fetch_instagram_data(supabase_client: Client, target_username: str):
 
     except Exception as e:
 
-        st.error(f"❌ Erro ao buscar dados do Supabase: {e}")
+        avisar_erro(f"Erro ao buscar dados do Supabase: {e}")
 
         return None
 
@@ -138,85 +333,81 @@ def fetch_instagram_data(supabase_client: Client, target_username: str):
 
 # -----------------------------------------------------------------------------
 
-def save_posts_to_supabase(supabase_client: Client, df: pd.DataFrame, target_username: str):
+def save_posts_to_supabase(supabase_client: Client, df: pd.DataFrame, target_username: str, usar_spool: bool = True):
 
-    """Prepara e salva um DataFrame de posts na tabela do Supabase."""
+    """
+    Prepara e salva um DataFrame de posts na tabela do Supabase.
+    Se o banco estiver indisponível, os posts vão para o spool local (spool_local.py);
+    se só alguns lotes falharem, só os posts desses lotes vão.
+    Returns:
+        ResultadoGravacao: posts gravados, guardados no spool e perdidos.
+    """
 
     if df.empty:
 
         print("ℹ️ DataFrame vazio, nada para salvar no Supabase.")
 
-        return
-
-
-
-    df['username'] = target_username
-
-   
-
-    mapeamento_colunas = {
-
-        'data': 'published_at',
+        return ResultadoGravacao()
 
-        'num': 'media_num',
+    if supabase_client is None:
+        print("❌ Sem conexão com o Supabase.")
+        return _nao_gravados(df, target_username, usar_spool)
 
-        'curtidas': 'like_count',
 
-        'comentarios': 'comment_count',
 
-        'legenda': 'caption',
+    # Só as colunas da tabela; 'tipo' vazio não é enviado para não apagar
+    # a classificação de posts que já estão no banco
+    df_final = preparar_posts_para_banco(df, target_username)
 
-        'link': 'media_url',
 
-        'id': 'post_pk',
 
-    }
-
-    df_renomeado = df.rename(columns=mapeamento_colunas)
-
-    df_renomeado['tipo'] = None
-
-
-
-    colunas_da_tabela = [
-
-        'username', 'post_pk', 'published_at', 'media_num', 'like_count',
-
-        'comment_count', 'caption', 'media_url', 'tipo'
-
-    ]
-
-    # Filtra apenas pelas colunas que existem no DataFrame para evitar erros
-
-    colunas_existentes = [col for col in colunas_da_tabela if col in df_renomeado.columns]
-
-    df_final = df_renomeado[colunas_existentes]
-
-
-
-    dados_para_salvar = df_final.to_dict(orient='records')
+    dados_para_salvar = registros_para_banco(df_final)
 
    
 
+    # Lê o estado atual ANTES do upsert: snapshot só do que mudou e deltas do resumo do perfil
     try:
+        df_metricas_atuais = buscar_metricas_atuais_supabase(supabase_client, df_final['post_pk'].tolist())
+    except Exception as e:
+        print(f"⚠️ Não foi possível ler as métricas atuais para os snapshots: {e}")
+        df_metricas_atuais = None
 
-        print(f"📦 Enviando {len(dados_para_salvar)} registros para o Supabase...")
-
-        response = supabase_client.table("posts").upsert(
-
-            dados_para_salvar,
-
-            on_conflict="post_pk"
-
-        ).execute()
+    print(f"📦 Enviando {len(dados_para_salvar)} registros para o Supabase...")
+    resultados = upsert_em_lotes(supabase_client, "posts", dados_para_salvar, on_conflict="post_pk")
+    falhas = registros_com_falha(resultados)
+    nao_gravados = ResultadoGravacao()
+    if not falhas:
+        print(f"✅ Dados salvos com sucesso no Supabase! ({resumir(resultados)})")
+    else:
+        print(f"❌ Erro ao salvar no Supabase: {resumir(resultados)}")
+        # Só os posts dos lotes que falharam vão para o spool
+        pks_falhas = {str(registro['post_pk']) for registro in falhas}
+        nao_gravados = _nao_gravados(df[df['id'].astype(str).isin(pks_falhas)], target_username, usar_spool)
+        if len(falhas) == len(dados_para_salvar):
+            return nao_gravados
+        df_final = df_final[~df_final['post_pk'].astype(str).isin(pks_falhas)]
 
-       
+    if df_metricas_atuais is not None:
+        try:
+            registrar_snapshots_supabase(
+                supabase_client,
+                selecionar_snapshots_alterados(df_final, df_metricas_atuais)
+            )
+        except Exception as e:
+            print(f"⚠️ Erro ao gravar snapshots de métricas: {e}")
+        try:
+            aplicar_estatisticas_supabase(supabase_client, estado_final(df_final, df_metricas_atuais), df_metricas_atuais)
+        except Exception as e:
+            print(f"⚠️ Erro ao atualizar o resumo do perfil (profile_stats): {e}")
 
-        print("✅ Dados salvos com sucesso no Supabase!")
+    return ResultadoGravacao(gravados=len(df_final), no_spool=nao_gravados.no_spool, falhas=nao_gravados.falhas)
 
-    except Exception as e:
 
-        print(f"❌ Erro ao salvar no Supabase: {e}")
+def _nao_gravados(df: pd.DataFrame, target_username: str, usar_spool: bool):
+    # Posts que não chegaram ao banco: vão para o spool (se ligado)
+    if usar_spool:
+        return ResultadoGravacao(no_spool=guardar_posts_no_spool(df, target_username))
+    return ResultadoGravacao(falhas=len(df))
 
 
 
@@ -228,37 +419,74 @@ def save_posts_to_supabase(supabase_client: Client, df: pd.DataFrame, target_use
 #ADCIONAR A LÓGICA DE ATUALIZAR A CLASSIFICAÇÃO DO POST
 
 
-def update_post_classification(supabase_client: Client, classificacoes: list):
+def update_post_classification(supabase_client: Client, classificacoes: list, usar_spool: bool = True):
     """
     Atualiza a coluna 'tipo' no Supabase com base nos resultados da classificação.
     
     Args:
         supabase_client (Client): O cliente de conexão.
         classificacoes (list): Uma lista de dicionários, ex: [{'id': '123', 'categoria': 'Institucional'}]
+        usar_spool (bool): Se True, guarda as classificações no spool local em caso de falha.
+    Returns:
+        bool: True se as classificações foram gravadas no banco.
     """
     if not classificacoes:
         print("Nenhuma classificação para atualizar.")
-        return
+        return True
+
+    if supabase_client is None:
+        print("❌ Sem conexão com o Supabase.")
+        if usar_spool:
+            guardar_classificacoes_no_spool(classificacoes)
+        return False
 
     # 1. Traduzir os nomes das colunas para o banco de dados
     #    'id' no seu app é 'post_pk' no banco
     #    'categoria' no seu app é 'tipo' no banco
-    dados_para_atualizar = [
-        {'post_pk': item['id'], 'tipo': item['categoria']}
-        for item in classificacoes
-    ]
+    #    (com o modelo, a versão do prompt e a data da classificação)
+    dados_para_atualizar = [classificacao_para_banco(item) for item in classificacoes]
 
     print(f"🔄 Atualizando {len(dados_para_atualizar)} registros no Supabase...")
 
+    # Estado anterior dos posts para mover cada um para a nova categoria no resumo
     try:
-        # 2. Usar 'upsert'. Ele vai encontrar o post pelo 'post_pk' (que é unique)
-        #    e atualizará apenas a coluna 'tipo', deixando o resto intacto.
-        response = supabase_client.table("posts").upsert(
-            dados_para_atualizar,
-            on_conflict="post_pk" 
-        ).execute()
-        
-        print("✅ Classificações salvas com sucesso no Supabase!")
-
+        df_atuais = buscar_metricas_atuais_supabase(supabase_client, [item['post_pk'] for item in dados_para_atualizar])
     except Exception as e:
-        print(f"❌ Erro ao atualizar classificações no Supabase: {e}")
\ No newline at end of file
+        print(f"⚠️ Não foi possível ler o estado atual para o resumo do perfil: {e}")
+        df_atuais = None
+
+    # 2. Usar 'upsert'. Ele vai encontrar o post pelo 'post_pk' (que é unique)
+    #    e atualizará apenas a coluna 'tipo', deixando o resto intacto.
+    resultados = upsert_em_lotes(supabase_client, "posts", dados_para_atualizar, on_conflict="post_pk")
+    falhas = registros_com_falha(resultados)
+    if not falhas:
+        print(f"✅ Classificações salvas com sucesso no Supabase! ({resumir(resultados)})")
+    else:
+        print(f"❌ Erro ao atualizar classificações no Supabase: {resumir(resultados)}")
+        pks_falhas = {str(registro['post_pk']) for registro in falhas}
+        if usar_spool:
+            guardar_classificacoes_no_spool([item for item in classificacoes if str(item['id']) in pks_falhas])
+        if len(falhas) == len(dados_para_atualizar):
+            return False
+        classificacoes = [item for item in classificacoes if str(item['id']) not in pks_falhas]
+        dados_para_atualizar = [item for item in dados_para_atualizar if str(item['post_pk']) not in pks_falhas]
+
+    if df_atuais is not None:
+        try:
+            aplicar_estatisticas_supabase(
+                supabase_client,
+                estado_final(pd.DataFrame(dados_para_atualizar), df_atuais),
+                df_atuais,
+                classificacoes
+            )
+        except Exception as e:
+            print(f"⚠️ Erro ao atualizar o resumo do perfil (profile_stats): {e}")
+    return not falhas
+
+
+def reenviar_spool_supabase(supabase_client: Client):
+    """Reenvia para o Supabase os posts/classificações/comentários que ficaram no spool local."""
+    if supabase_client is None:
+        return 0, 0
+    return reenviar_spool(supabase_client, save_posts_to_supabase, update_post_classification,
+                          salvar_comentarios=salvar_comentarios_supabase)
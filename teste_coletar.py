@@ -1,17 +1,21 @@
 import pandas as pd
-from instagrapi import Client
-from instagrapi.exceptions import LoginRequired
 import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 
-# Importa as funções do Supabase
+import metricas
+from cache_midias import url_miniatura
+from governador_instagram import ColetaPausada, coletar_midias, governar_cliente
+
+# Importa a interface de armazenamento
 try:
-    from supabase_utils import init_connection, save_posts_to_supabase
+    from storage_backend import obter_backend
 except ImportError:
     # Se rodado sozinho, estas funções não são críticas, mas avisa
-    print("AVISO: Rodando em modo standalone. Funções do Supabase não encontradas.")
-    init_connection = None
-    save_posts_to_supabase = None
+    print("AVISO: Rodando em modo standalone. Funções de armazenamento não encontradas.")
+    obter_backend = None
 
 # Importa as credenciais (assume config.py ou app_config.py)
 try:
@@ -20,7 +24,7 @@ except ImportError:
     try:
         from config import SEU_NOME_DE_USUARIO, SUA_SENHA
     except ImportError:
-        print("ERRO CRÍTICO: Não foi possível encontrar as credenciais do Instagram (SEU_NOME_DE_USUARIO, SUA_SENHA) no arquivo de configuração.
+        print("ERRO CRÍTICO: Não foi possível encontrar as credenciais do Instagram (SEU_NOME_DE_USUARIO, SUA_SENHA) no arquivo de configuração.")
         # Define valores padrão para evitar que o import falhe no Streamlit
         SEU_NOME_DE_USUARIO = "placeholder_user"
         SUA_SENHA = "placeholder_password"
@@ -29,20 +33,35 @@ except ImportError:
 ARQUIVO_SESSAO = "sessao_instagrapi.json"
 
 # --- FUNÇÃO 1: Login ---
-def login_instagram():
+@metricas.medir("instagram_login")
+def login_instagram(usuario: str = None, senha: str = None, arquivo_sessao: str = None, proxy: str = None):
     """
     Realiza o login no Instagram usando credenciais e sessão.
+    Sem argumentos, usa a conta do config.py (SEU_NOME_DE_USUARIO/SUA_SENHA);
+    o pool de contas (contas_instagram.py) passa as de cada conta.
     Retorna o objeto 'Client' logado ou None em caso de erro.
     """
-    print("Iniciando login no Instagram...")
+    usuario = usuario or SEU_NOME_DE_USUARIO
+    senha = senha or SUA_SENHA
+    arquivo_sessao = arquivo_sessao or ARQUIVO_SESSAO
+
+    # O instagrapi só é carregado quando há login de verdade
+    Client = metricas.importar("instagrapi").Client
+    LoginRequired = metricas.importar("instagrapi.exceptions").LoginRequired
+
+    print(f"Iniciando login no Instagram (@{usuario})...")
     cl = Client()
-    cl.delay_range = [2, 5]
+    if proxy:
+        cl.set_proxy(proxy)
+    metricas.instrumentar_cliente_instagram(cl)
+    # Ritmo, orçamento e disjuntor da conta (governador_instagram.py)
+    governar_cliente(cl, usuario)
 
     try:
-        if os.path.exists(ARQUIVO_SESSAO):
-            cl.load_settings(ARQUIVO_SESSAO)
+        if os.path.exists(arquivo_sessao):
+            cl.load_settings(arquivo_sessao)
             print("Sessão do Instagram carregada.")
-            cl.login(SEU_NOME_DE_USUARIO, SUA_SENHA)
+            cl.login(usuario, senha)
             # cl.get_timeline_feed() # Desativado temporariamente para acelerar testes
             print("Login via sessão bem-sucedido.")
         else:
@@ -51,8 +70,8 @@ def login_instagram():
     except (FileNotFoundError, LoginRequired, Exception) as e: # Captura erros mais genéricos no login
         print(f"Sessão inválida ou erro ({e}). Fazendo login com usuário e senha...")
         try:
-            cl.login(SEU_NOME_DE_USUARIO, SUA_SENHA)
-            cl.dump_settings(ARQUIVO_SESSAO)
+            cl.login(usuario, senha)
+            cl.dump_settings(arquivo_sessao)
             print("Nova sessão salva.")
         except Exception as login_err:
              print(f"❌ ERRO GRAVE NO LOGIN DO INSTAGRAM: {login_err}")
@@ -61,12 +80,19 @@ def login_instagram():
     return cl
 
 # --- FUNÇÃO 2: Coleta ---
-def coletar_posts_instagram(cl: Client, target_username: str, amount: int):
+def coletar_posts_instagram(cl, target_username: str, amount: int):
     """
     Coleta os 'amount' posts mais recentes de um usuário.
+    'cl' é o Client do instagrapi ou qualquer objeto com a mesma interface
+    (user_id_from_username/user_medias), como o dublê do benchmark_fakes.py.
+    Se o Instagram pedir pausa no meio, devolve o que já veio e a próxima
+    chamada continua do cursor guardado (governador_instagram.coletar_midias).
+    'cl' também pode ser um PoolInstagram (contas_instagram.py), que escolhe a conta.
     Retorna um DataFrame pandas com os dados ou um DataFrame vazio em caso de erro.
     """
-    if not isinstance(cl, Client):
+    if hasattr(cl, 'coletar_posts'):
+        return cl.coletar_posts(target_username, amount)
+    if cl is None or not hasattr(cl, 'user_medias'):
         print("❌ Erro: Objeto Client do Instagram inválido.")
         return pd.DataFrame() # Retorna DataFrame vazio
 
@@ -74,10 +100,15 @@ def coletar_posts_instagram(cl: Client, target_username: str, amount: int):
     lista_de_posts = []
 
     try:
-        user_id = cl.user_id_from_username(target_username)
-        medias = cl.user_medias(user_id, amount)
+        with metricas.cronometro("instagram_user_id"):
+            user_id = cl.user_id_from_username(target_username)
+        with metricas.cronometro("instagram_midias"):
+            medias, _ = coletar_midias(cl, user_id, target_username, amount)
+        metricas.incrementar("instagram_posts_coletados", len(medias))
         print(f"--- DADOS EXTRAÍDOS ({len(medias)} posts encontrados) ---")
 
+        # Métricas recém-lidas: a atualização de engajamento (atualizar_engajamento.py) conta a partir daqui
+        agora = datetime.now(timezone.utc).isoformat(timespec='seconds')
         for media in medias:
             legenda_completa = media.caption_text or ""
             post_data = {
@@ -87,10 +118,16 @@ def coletar_posts_instagram(cl: Client, target_username: str, amount: int):
                 'curtidas': media.like_count,
                 'comentarios': media.comment_count,
                 'legenda': legenda_completa,
-                'link': f"https://www.instagram.com/p/{media.code}/"
+                'link': f"https://www.instagram.com/p/{media.code}/",
+                'miniatura': url_miniatura(media),
+                'atualizado_em': agora
             }
             lista_de_posts.append(post_data)
 
+    except ColetaPausada as e:
+        # Disjuntor aberto ou orçamento esgotado antes de começar: tenta de novo mais tarde
+        print(f"⏸️ Coleta de @{target_username} adiada: {e}")
+        return pd.DataFrame(lista_de_posts)
     except Exception as e:
         print(f"❌ Ocorreu um erro ao buscar os posts: {e}")
         # Retorna o que conseguiu coletar até agora ou um DF vazio
@@ -99,6 +136,71 @@ def coletar_posts_instagram(cl: Client, target_username: str, amount: int):
     return pd.DataFrame(lista_de_posts)
 
 
+# --- FUNÇÃO 3: Comentários ---
+# Comentários por chamada ao instagrapi (o teto por post corta no meio da página)
+TAMANHO_PAGINA_COMENTARIOS = 50
+
+
+def _comentarios_do_post(cl, post_pk: str, ultimo_pk, limite: int):
+    """Do comentário mais novo para trás, até o último já guardado ou o limite."""
+    ultimo_pk = int(ultimo_pk) if ultimo_pk else 0
+    novos = []
+    cursor = None
+    while len(novos) < limite:
+        pagina, cursor = cl.media_comments_chunk(
+            post_pk, max_amount=min(TAMANHO_PAGINA_COMENTARIOS, limite - len(novos)), min_id=cursor
+        )
+        chegou_no_guardado = False
+        for comentario in pagina:
+            if int(comentario.pk) <= ultimo_pk:
+                chegou_no_guardado = True
+                continue
+            novos.append({
+                'comment_pk': str(comentario.pk),
+                'post_pk': str(post_pk),
+                'author_username': getattr(comentario.user, 'username', None),
+                'text': comentario.text,
+                'like_count': getattr(comentario, 'like_count', None),
+                'created_at': comentario.created_at_utc.isoformat() if comentario.created_at_utc else None,
+            })
+        if chegou_no_guardado or not pagina or not cursor:
+            break
+    return novos[:limite]
+
+
+def coletar_comentarios_instagram(cl, post_pks: list, ultimos: dict = None, limite_por_post: int = 100,
+                                  concorrencia: int = 4):
+    """
+    Coleta os comentários novos de vários posts, no máximo 'concorrencia'
+    posts ao mesmo tempo pelo mesmo cliente (o governador da conta segura o ritmo).
+    'ultimos' é {post_pk: último comment_pk guardado}: a coleta de cada post
+    para nele. Se o Instagram pedir pausa, devolve o que já veio.
+    Retorna um DataFrame com comment_pk, post_pk, author_username, text, like_count, created_at.
+    """
+    ultimos = ultimos or {}
+    parar = threading.Event()
+
+    def coletar(post_pk):
+        if parar.is_set():
+            return []
+        try:
+            return _comentarios_do_post(cl, post_pk, ultimos.get(str(post_pk)), limite_por_post)
+        except ColetaPausada as e:
+            if not parar.is_set():
+                print(f"⏸️ Coleta de comentários pausada: {e}")
+            parar.set()
+        except Exception as e:
+            print(f"⚠️ Erro ao buscar comentários do post {post_pk}: {e}")
+            metricas.incrementar("instagram_comentarios_erros", erro=type(e).__name__)
+        return []
+
+    with metricas.cronometro("instagram_comentarios"), ThreadPoolExecutor(max_workers=max(1, concorrencia)) as executor:
+        # Requisições e erros das threads contam no run_id de quem chamou
+        linhas = [linha for lote in executor.map(metricas.no_contexto_atual(coletar), post_pks) for linha in lote]
+    metricas.incrementar("instagram_comentarios_coletados", len(linhas))
+    return pd.DataFrame(linhas, columns=['comment_pk', 'post_pk', 'author_username', 'text', 'like_count', 'created_at'])
+
+
 # --- BLOCO PARA TESTE (se rodar o script diretamente) ---
 if __name__ == "__main__":
     print("--- INICIANDO TESTE STANDALONE DO COLETOR ---")
@@ -113,40 +215,42 @@ if __name__ == "__main__":
     print(f"🎯 Usuário alvo: @{USUARIO_ALVO_TESTE}")
     print(f"🔢 Quantidade: {QUANTIDADE_TESTE}")
 
-    # 1. Tenta conectar ao Supabase (opcional para este teste)
-    if init_connection:
-        try:
-            supabase_client = init_connection()
-            print("✅ Conexão Supabase OK (para salvar).")
-        except Exception as e:
-            print(f"⚠️ Aviso: Falha ao conectar ao Supabase: {e}. Os dados não serão salvos.")
-            supabase_client = None
-    else:
-        supabase_client = None
-        print("⚠️ Aviso: Funções do Supabase não disponíveis. Os dados não serão salvos.")
+    with metricas.execucao(script="teste_coletar", perfil=USUARIO_ALVO_TESTE) as run_id:
+        # 1. Tenta conectar ao banco (opcional para este teste)
+        backend = None
+        if obter_backend:
+            backend = obter_backend("supabase")
+            if backend.client is not None:
+                print(f"✅ Conexão com o banco ({backend.nome}) OK (para salvar).")
+                backend.reenviar_spool()
+            else:
+                print("⚠️ Aviso: Falha ao conectar ao banco. Os dados irão para o spool local.")
+        else:
+            print("⚠️ Aviso: Funções de armazenamento não disponíveis. Os dados não serão salvos.")
 
 
-    # 2. Login no Instagram
-    client_insta = login_instagram()
+        # 2. Login no Instagram
+        client_insta = login_instagram()
 
-    # 3. Coleta de Posts
-    if client_insta:
-        df_posts_coletados = coletar_posts_instagram(client_insta, USUARIO_ALVO_TESTE, QUANTIDADE_TESTE)
+        # 3. Coleta de Posts
+        if client_insta:
+            df_posts_coletados = coletar_posts_instagram(client_insta, USUARIO_ALVO_TESTE, QUANTIDADE_TESTE)
 
-        if not df_posts_coletados.empty:
-            print("\n--- Posts Coletados (DataFrame) ---")
-            print(df_posts_coletados.head()) # Mostra os primeiros posts
+            if not df_posts_coletados.empty:
+                print("\n--- Posts Coletados (DataFrame) ---")
+                print(df_posts_coletados.head()) # Mostra os primeiros posts
 
-            # 4. Tenta salvar no Supabase (se conectado)
-            if supabase_client and save_posts_to_supabase:
-                 print("\n--- Tentando salvar no Supabase ---")
-                 save_posts_to_supabase(supabase_client, df_posts_coletados, USUARIO_ALVO_TESTE)
-            else:
-                 print("\n--- Supabase não conectado. Salvamento ignorado. ---")
+                # 4. Tenta salvar no banco (sem conexão, vai para o spool local)
+                if backend:
+                     print("\n--- Tentando salvar no banco ---")
+                     backend.upsert_posts(df_posts_coletados, USUARIO_ALVO_TESTE)
+                else:
+                     print("\n--- Funções de armazenamento indisponíveis. Salvamento ignorado. ---")
 
+            else:
+                print("\nNenhum post foi coletado.")
         else:
-            print("\nNenhum post foi coletado.")
-    else:
-        print("\nNão foi possível fazer login no Instagram. Coleta cancelada.")
+            print("\nNão foi possível fazer login no Instagram. Coleta cancelada.")
 
+    print(metricas.exportar_json(run_id))
     print("\n--- TESTE STANDALONE CONCLUÍDO ---")
@@ -0,0 +1,114 @@
+import json
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+import metricas
+from atualizar_engajamento import (
+    PRIORIDADE_MINIMA,
+    atualizar_engajamento,
+    buscar_metricas_instagram,
+    calcular_prioridades,
+    selecionar_para_atualizar,
+)
+from governador_instagram import ColetaPausada
+
+AGORA = pd.Timestamp('2025-01-10T00:00:00+00:00')
+
+
+def horas_atras(horas):
+    return (AGORA - pd.Timedelta(hours=horas)).isoformat()
+
+
+def test_prioridade_e_o_engajamento_que_falta_chegar():
+    df = pd.DataFrame({
+        'data': [horas_atras(72), horas_atras(144), horas_atras(144), horas_atras(-5), None],
+        'atualizado_em': [None, horas_atras(72), horas_atras(0), None, None],
+    })
+    prioridade = calcular_prioridades(df, agora=AGORA, meia_vida_h=72)
+    assert prioridade.tolist() == pytest.approx([0.5, 0.25, 0.0, 0.0, 0.0])
+
+
+def test_prioridade_sem_coluna_de_conferencia():
+    prioridade = calcular_prioridades(pd.DataFrame({'data': [horas_atras(72)]}), agora=AGORA, meia_vida_h=72)
+    assert prioridade.iloc[0] == pytest.approx(0.5)
+
+
+class BackendFalso:
+    def __init__(self, posts_por_perfil):
+        self.posts_por_perfil = posts_por_perfil
+        self.upserts = []
+        self.marcados = []
+
+    def fetch_posts(self, perfil, colunas=None):
+        return self.posts_por_perfil.get(perfil, pd.DataFrame())
+
+    def upsert_posts(self, df, perfil):
+        self.upserts.append((perfil, df))
+
+    def marcar_atualizados(self, post_pks, quando):
+        self.marcados += post_pks
+
+
+class ClienteMetricas:
+    """media_info devolve as métricas de 'atuais'; id ausente = post apagado."""
+
+    def __init__(self, atuais, pausar_em=None):
+        self.atuais = atuais
+        self.pausar_em = pausar_em
+
+    def media_info(self, post_pk):
+        if post_pk == self.pausar_em:
+            raise ColetaPausada("orçamento esgotado", 0)
+        if post_pk not in self.atuais:
+            raise type('MediaNotFound', (Exception,), {})()
+        curtidas, comentarios = self.atuais[post_pk]
+        return SimpleNamespace(like_count=curtidas, comment_count=comentarios)
+
+
+def posts(ids, horas, curtidas):
+    return pd.DataFrame({'id': ids, 'data': [horas_atras(h) for h in horas], 'curtidas': curtidas,
+                         'comentarios': [1] * len(ids), 'atualizado_em': [None] * len(ids)})
+
+
+def test_selecionar_ordena_por_prioridade_e_corta_o_minimo():
+    df_a = posts(['1', '2'], [10, 24 * 30], [5, 5])
+    df_a.loc[1, 'atualizado_em'] = horas_atras(1)  # conferido há uma hora: nada a chegar
+    backend = BackendFalso({'a': df_a, 'b': posts(['3'], [50], [5])})
+    df = selecionar_para_atualizar(backend, ['@a', 'b', 'sem_posts'], limite=5, agora=AGORA)
+    # Nunca conferidos: o de 50 h tem mais engajamento acumulado por conferir que o de 10 h
+    assert df['id'].tolist() == ['3', '1']
+    assert df['perfil'].tolist() == ['b', 'a']
+    assert (df['prioridade'] >= PRIORIDADE_MINIMA).all()
+
+    assert selecionar_para_atualizar(backend, ['@a', 'b'], limite=1, agora=AGORA)['id'].tolist() == ['3']
+
+
+def test_rodada_grava_so_o_que_mudou():
+    backend = BackendFalso({'a': posts(['1', '2', '3'], [1, 2, 3], [5, 5, 5])})
+    cliente = ClienteMetricas({'1': (9, 1), '2': (5, 1)})  # '3' foi apagado
+    resumo = atualizar_engajamento(backend, cliente, ['a'], concorrencia=2)
+    assert resumo['alterados'] == 1 and resumo['sem_mudanca'] == 1 and resumo['nao_encontrados'] == 1
+    perfil, df = backend.upserts[0]
+    assert perfil == 'a' and df['id'].tolist() == ['1'] and df['curtidas'].tolist() == [9]
+    assert sorted(backend.marcados) == ['2', '3']
+
+
+def test_busca_para_quando_a_conta_e_pausada():
+    alvos = pd.DataFrame({'id': ['1', '2', '3'], 'perfil': ['a'] * 3})
+    cliente = ClienteMetricas({'1': (1, 1), '3': (1, 1)}, pausar_em='2')
+    df, nao_encontrados, pausada = buscar_metricas_instagram(cliente, alvos, concorrencia=1)
+    assert pausada
+    assert df['id'].tolist() == ['1']
+    assert nao_encontrados == []
+
+
+def test_erros_das_threads_contam_no_run_id_de_quem_chamou():
+    alvos = pd.DataFrame({'id': ['1', '2', '3'], 'perfil': ['a'] * 3})
+    cliente = SimpleNamespace(media_info=lambda post_pk: 1 / 0)
+    with metricas.execucao(teste="atualizar_engajamento") as run_id:
+        buscar_metricas_instagram(cliente, alvos, concorrencia=3)
+    linhas = json.loads(metricas.exportar_json(run_id))['metricas']
+    erros = [l for l in linhas if l['metrica'] == 'atualizacao_engajamento_erros']
+    assert erros and erros[0]['valor'] == 3
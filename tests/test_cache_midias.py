@@ -0,0 +1,101 @@
+import sqlite3
+
+import pytest
+
+import cache_midias
+from cache_midias import CacheMidias
+
+
+@pytest.fixture
+def conexoes(monkeypatch):
+    abertas = []
+    conectar = sqlite3.connect
+
+    def registrar(*args, **kwargs):
+        conn = conectar(*args, **kwargs)
+        abertas.append(conn)
+        return conn
+
+    monkeypatch.setattr(cache_midias.sqlite3, 'connect', registrar)
+    return abertas
+
+
+def _fechada(conn):
+    try:
+        conn.execute("SELECT 1")
+    except sqlite3.ProgrammingError:
+        return True
+    return False
+
+
+class Downloads:
+    """Dublê do download: o conteúdo de cada URL é a própria URL repetida."""
+
+    def __init__(self, tamanho=100):
+        self.tamanho = tamanho
+        self.urls = []
+
+    def __call__(self, url):
+        self.urls.append(url)
+        return (url.encode() * self.tamanho)[:self.tamanho]
+
+
+def test_arquivo_baixado_uma_vez_por_conteudo(tmp_path, conexoes):
+    baixar = Downloads()
+    cache = CacheMidias(str(tmp_path), baixar=baixar)
+    sha, dados = cache.obter('1', 'http://x/a.jpg')
+    assert cache.obter('1', 'http://x/a.jpg') == (sha, dados)
+    # Outro post com a mesma imagem aponta para o mesmo arquivo
+    assert cache.obter('2', 'http://x/a.jpg')[0] == sha
+    assert baixar.urls == ['http://x/a.jpg', 'http://x/a.jpg']
+    assert cache.sha_do_post('2') == sha and cache.sha_do_post('3') is None
+    assert cache.obter('3', None) == (None, None)
+
+    cache.guardar_categoria([sha], 'Dica', 'v1')
+    assert cache.categoria(sha, 'v1') == 'Dica' and cache.categoria(sha, 'v2') is None
+    assert conexoes and all(_fechada(conn) for conn in conexoes)
+
+
+def test_lru_remove_o_menos_usado_e_guarda_o_indice(tmp_path):
+    cache = CacheMidias(str(tmp_path), tamanho_max_mb=250 / (1024 * 1024), baixar=Downloads())
+    sha_a, _ = cache.obter('a', 'http://x/a.jpg')
+    sha_b, _ = cache.obter('b', 'http://x/b.jpg')
+    cache.obter('a', None)
+    sha_c, _ = cache.obter('c', 'http://x/c.jpg')
+    # 'b' foi o menos usado: sai do disco, mas o post continua sabendo o sha
+    assert cache.obter('b', None) == (sha_b, None)
+    assert cache.obter('a', None)[1] is not None and cache.obter('c', None)[1] is not None
+
+
+def test_arquivo_apagado_por_fora_e_cache_miss(tmp_path):
+    baixar = Downloads()
+    cache = CacheMidias(str(tmp_path), baixar=baixar)
+    sha, dados = cache.obter('1', 'http://x/a.jpg')
+    (tmp_path / sha[:2] / f"{sha}.jpg").unlink()
+
+    assert cache.obter('1', None) == (sha, None)
+    assert cache.obter('1', 'http://x/a.jpg') == (sha, dados)
+    assert len(baixar.urls) == 2
+    assert cache.obter('1', None) == (sha, dados)
+
+
+def test_distancias_de_hamming():
+    hashes = [0, 1, 0b1011, (1 << 64) - 1, 1 << 63]
+    assert cache_midias.distancias(0, hashes).tolist() == [0, 1, 3, 64, 1]
+    assert cache_midias.distancias((1 << 64) - 1, hashes).tolist() == [64, 63, 61, 0, 63]
+    assert cache_midias.distancias(5, []).tolist() == []
+
+
+def test_categoria_parecida_pela_distancia(tmp_path):
+    cache = CacheMidias(str(tmp_path), baixar=Downloads())
+    sha, _ = cache.obter('1', 'http://x/a.jpg')
+    # phash com o bit mais alto ligado: passa pelo inteiro com sinal do SQLite
+    phash = (1 << 63) | 0b1111
+    with cache._conectar() as conn:
+        conn.execute("UPDATE arquivos SET phash = ? WHERE sha = ?", (cache_midias._com_sinal(phash), sha))
+    assert cache.phash(sha) == phash
+    cache.guardar_categoria([sha], 'Dica', 'v1')
+
+    assert cache.categoria_parecida(phash ^ 0b11, 'v1') == 'Dica'
+    assert cache.categoria_parecida(phash ^ 0b11, 'v1', distancia_maxima=1) is None
+    assert cache.categoria_parecida(phash, 'v2') is None
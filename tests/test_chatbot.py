@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+import chatbot
+from chatbot import SessaoChat, contexto_dos_dados
+from estatisticas_perfil import EstatisticasPerfis
+
+
+def posts(n=4):
+    return pd.DataFrame({
+        'id': [str(i) for i in range(n)],
+        'data': [f"2025-01-0{i + 1}T12:00:00+00:00" for i in range(n)],
+        'curtidas': [10 * (i + 1) for i in range(n)], 'comentarios': [1] * n,
+        'categoria': ['Dica', 'Evento'] * (n // 2), 'perfil': ['a'] * n, 'legenda': ['oi #agro'] * n,
+    })
+
+
+class ModeloFalso:
+    def __init__(self, resposta="ok"):
+        self.resposta = resposta
+        self.chamadas = []
+
+    def generate_content(self, conteudos):
+        self.chamadas.append(conteudos)
+        return SimpleNamespace(text=self.resposta)
+
+
+@pytest.fixture(autouse=True)
+def contextos_vazios(monkeypatch):
+    monkeypatch.setattr(chatbot, '_contextos', type(chatbot._contextos)())
+
+
+def test_contexto_depende_da_origem_do_resumo():
+    df = posts()
+    local = contexto_dos_dados(df)
+    # Resumo do banco cobre o histórico inteiro: outros totais para os mesmos posts
+    do_banco = EstatisticasPerfis.de_posts(pd.concat([df, posts(8).assign(id=lambda d: 'x' + d['id'])]))
+    contexto_banco = contexto_dos_dados(df, estatisticas=do_banco)
+    assert "Total de posts: 4" in local
+    assert "Total de posts: 12" in contexto_banco
+    assert contexto_dos_dados(df) == local
+    assert len(chatbot._contextos) == 2
+
+
+def test_prefixo_igual_em_todas_as_rodadas(monkeypatch):
+    monkeypatch.setattr(chatbot, 'ORCAMENTO_HISTORICO_TOKENS', 10)
+    sessao = SessaoChat(posts())
+    modelo = ModeloFalso("resposta " * 20)
+    resumo = ModeloFalso("o usuário perguntou sobre dicas")
+    for i in range(4):
+        sessao.perguntar(f"pergunta {i}", api_key="", modelo=modelo, modelo_resumo=resumo)
+
+    assert sessao.resumo == "o usuário perguntou sobre dicas"
+    assert len(sessao.historico) == chatbot.MENSAGENS_RECENTES
+    assert len(sessao.mensagens) == 8
+    prefixos = [chamada[:2] for chamada in modelo.chamadas]
+    assert all(prefixo == prefixos[0] for prefixo in prefixos)
+    # Depois de resumir, o resumo vai numa mensagem própria logo após o prefixo
+    ultima = modelo.chamadas[-1]
+    assert "o usuário perguntou sobre dicas" in ultima[2]['parts'][0]
+    assert ultima[-1] == {'role': 'user', 'parts': ["pergunta 3"]}
+
+
+def test_sem_categoria_nao_abre_sessao():
+    with pytest.raises(ValueError):
+        SessaoChat(posts().drop(columns=['categoria']))
@@ -0,0 +1,37 @@
+import json
+
+from benchmark_fakes import ClienteInstagramFalso
+
+import metricas
+from teste_coletar import coletar_comentarios_instagram
+
+
+class ClienteComFalha(ClienteInstagramFalso):
+    def media_comments_chunk(self, media_id, max_amount, min_id=None):
+        if str(media_id) == '13':
+            raise RuntimeError("post removido")
+        return super().media_comments_chunk(media_id, max_amount, min_id)
+
+
+def test_coleta_para_no_ultimo_comentario_guardado():
+    cl = ClienteInstagramFalso(semente=1)
+    todos = coletar_comentarios_instagram(cl, ['11'], limite_por_post=1000)
+    assert len(todos) > 5
+    assert todos['comment_pk'].astype(int).is_monotonic_decreasing
+
+    guardado = todos['comment_pk'].iloc[4]
+    novos = coletar_comentarios_instagram(cl, ['11'], ultimos={'11': guardado}, limite_por_post=1000)
+    assert novos['comment_pk'].tolist() == todos['comment_pk'].iloc[:4].tolist()
+
+
+def test_limite_por_post():
+    df = coletar_comentarios_instagram(ClienteInstagramFalso(semente=1), ['11', '12'], limite_por_post=3)
+    assert df.groupby('post_pk').size().max() <= 3
+
+
+def test_erros_das_threads_entram_no_run_id():
+    with metricas.execucao(teste="comentarios") as run_id:
+        df = coletar_comentarios_instagram(ClienteComFalha(semente=1), ['11', '12', '13'], concorrencia=3)
+    assert set(df['post_pk']) <= {'11', '12'}
+    linhas = json.loads(metricas.exportar_json(run_id))['metricas']
+    assert any(l['metrica'] == 'instagram_comentarios_erros' for l in linhas)
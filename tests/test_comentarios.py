@@ -0,0 +1,95 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from benchmark_fakes import ClienteInstagramFalso
+
+import comentarios
+import lotes_supabase
+import spool_local
+import supabase_utils
+from comentarios import coletar_comentarios_perfil
+from spool_local import contar_comentarios_pendentes
+
+
+class ClienteComentarios:
+    """Supabase com a tabela 'comments'; recusa (erro de constraint) os lotes com algum id de 'recusados'."""
+
+    def __init__(self, recusados=()):
+        self.recusados = set(recusados)
+        self.gravados = []
+
+    def table(self, tabela):
+        return self
+
+    def upsert(self, lote, **kwargs):
+        self.lote = lote
+        return self
+
+    def execute(self):
+        if any(r['comment_pk'] in self.recusados for r in self.lote):
+            erro = Exception("violação de constraint")
+            erro.code = '23514'
+            raise erro
+        self.gravados += [r['comment_pk'] for r in self.lote]
+        return SimpleNamespace(data=[])
+
+
+def lote_comentarios(n):
+    return pd.DataFrame({
+        'comment_pk': [str(100 + i) for i in range(n)], 'post_pk': '1', 'username': 'perfil',
+        'author_username': 'fulano', 'text': 'oi', 'like_count': 0, 'created_at': '2025-01-01T12:00:00+00:00',
+    })
+
+
+@pytest.fixture
+def spool(tmp_path, monkeypatch):
+    caminho = str(tmp_path / "spool.sqlite3")
+    monkeypatch.setattr(spool_local, 'ARQUIVO_SPOOL', caminho)
+    monkeypatch.setattr(comentarios, 'TAMANHO_LOTE_COMENTARIOS', 2)
+    monkeypatch.setattr(lotes_supabase, '_espera', lambda tentativa: 0)
+    return caminho
+
+
+def test_lote_recusado_vai_para_o_spool_e_e_reenviado(spool):
+    cliente = ClienteComentarios(recusados={'100'})
+    # O lote mais antigo falha e o mais novo entra: a retomada passaria por cima dele
+    assert supabase_utils.salvar_comentarios(cliente, lote_comentarios(4)) == 2
+    assert sorted(cliente.gravados) == ['102', '103']
+    assert contar_comentarios_pendentes(spool) == 2
+
+    cliente.recusados.clear()
+    supabase_utils.reenviar_spool_supabase(cliente)
+    assert sorted(cliente.gravados) == ['100', '101', '102', '103']
+    assert contar_comentarios_pendentes(spool) == 0
+
+
+def test_reenvio_mantem_o_que_falhou_de_novo(spool):
+    supabase_utils.salvar_comentarios(ClienteComentarios(recusados={'100', '102'}), lote_comentarios(4))
+    assert contar_comentarios_pendentes(spool) == 4
+
+    cliente = ClienteComentarios(recusados={'102'})
+    supabase_utils.reenviar_spool_supabase(cliente)
+    assert sorted(cliente.gravados) == ['100', '101']
+    assert contar_comentarios_pendentes(spool) == 2
+
+
+class BackendComentarios:
+    def __init__(self, gravar):
+        self.gravar = gravar
+
+    def fetch_posts(self, perfil, limit=0, colunas=None):
+        return pd.DataFrame({'id': ['11', '12'], 'comentarios': [3, 3]})
+
+    def ultimos_comentarios(self, post_pks):
+        return {}
+
+    def salvar_comentarios(self, df):
+        return min(self.gravar, len(df))
+
+
+def test_rodada_devolve_so_o_que_foi_gravado():
+    cl = ClienteInstagramFalso(semente=1)
+    assert coletar_comentarios_perfil(BackendComentarios(gravar=3), cl, 'perfil', limite_por_post=5) == 3
+    todos = coletar_comentarios_perfil(BackendComentarios(gravar=1000), cl, 'perfil', limite_por_post=5)
+    assert todos > 3
@@ -0,0 +1,106 @@
+import json
+import sqlite3
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+import comparativo_perfis
+import metricas
+from comparativo_perfis import ComparativoPerfis, obter_seguidores
+
+
+def posts():
+    # 'a': 3 posts em duas semanas; 'b': 2 posts no mesmo dia, engajamento maior
+    return pd.DataFrame({
+        'perfil': ['a', 'a', 'a', 'b', 'b'],
+        'data': ['2025-01-01T10:00:00', '2025-01-08T10:00:00', '2025-01-15T10:00:00',
+                 '2025-01-01T10:00:00', '2025-01-01T12:00:00+00:00'],
+        'categoria': ['Dica', 'Dica', None, 'Evento', 'Evento'],
+        'curtidas': [10, 20, 30, 100, '300'],
+        'comentarios': [0, 0, 30, 0, None],
+        'legenda': ['x', 'y', 'z', 'w', 'v'],
+    })
+
+
+def test_matriz_dos_posts():
+    base = ComparativoPerfis.de_posts(posts())
+    a, b = base.tabela.loc['a'], base.tabela.loc['b']
+    assert a['posts'] == 3 and a['engajamento_medio'] == 30
+    assert a['posts_por_semana'] == pytest.approx(1.5)
+    assert a['intervalo_mediano_dias'] == pytest.approx(7)
+    # Menos de uma semana de coleta conta como uma semana
+    assert b['posts_por_semana'] == 2 and b['engajamento_medio'] == 200
+    assert a['categoria_principal'] == 'Dica' and b['categoria_principal'] == 'Evento'
+    assert base.participacao.loc['a'].sum() == pytest.approx(100)
+    assert base.exemplos.groupby('perfil').size().max() <= comparativo_perfis.POSTS_POR_PERFIL_PROMPT
+
+
+def test_taxa_de_engajamento_e_percentis():
+    base = ComparativoPerfis.de_posts(pd.concat([posts(), posts().iloc[:1].assign(perfil='c')], ignore_index=True))
+    matriz = base.com_seguidores({'a': 300, 'b': '10000', 'c': 0})
+    tabela = matriz.tabela
+    assert tabela.loc['a', 'taxa_engajamento'] == pytest.approx(10)
+    assert tabela.loc['b', 'taxa_engajamento'] == pytest.approx(2)
+    # Seguidores zerados não viram taxa infinita
+    assert pd.isna(tabela.loc['c', 'taxa_engajamento']) and pd.isna(tabela.loc['c', 'pct_taxa_engajamento'])
+    assert tabela.loc['a', 'pct_taxa_engajamento'] == 100 and tabela.loc['b', 'pct_taxa_engajamento'] == 50
+    assert tabela.loc['b', 'pct_seguidores'] == 100
+    assert matriz.ranking()['perfil'].tolist() == ['a', 'b', 'c']
+    assert matriz.ranking('engajamento_medio')['perfil'].tolist() == ['b', 'a', 'c']
+    # A matriz sem seguidores (compartilhada pelo dataset) não muda
+    assert 'taxa_engajamento' not in base.tabela.columns
+
+
+def test_para_prompt_sem_seguidores_usa_engajamento_medio():
+    textos = ComparativoPerfis.de_posts(posts()).com_seguidores({}).para_prompt()
+    assert set(textos) == {'matriz', 'participacao', 'taxa_categoria', 'exemplos'}
+    linhas = textos['matriz'].splitlines()
+    assert linhas[2].split('|')[1].strip() == 'b'
+
+
+class ClienteSeguidores:
+    def __init__(self, seguidores):
+        self.seguidores = seguidores
+        self.consultas = []
+
+    def user_info_by_username(self, perfil):
+        self.consultas.append(perfil)
+        if perfil not in self.seguidores:
+            raise RuntimeError("perfil não encontrado")
+        return SimpleNamespace(follower_count=self.seguidores[perfil])
+
+
+def test_seguidores_em_cache_ate_vencer(tmp_path):
+    caminho = str(tmp_path / "estado.db")
+    cliente = ClienteSeguidores({'a': 10, 'b': 20})
+    assert obter_seguidores(['@a', 'b', 'a'], cliente, caminho) == {'a': 10, 'b': 20}
+    assert obter_seguidores(['a', 'b'], ClienteSeguidores({}), caminho) == {'a': 10, 'b': 20}
+    # Sem cliente (rotas de arquivo), só o cache
+    assert obter_seguidores(['a', 'c'], None, caminho) == {'a': 10, 'c': None}
+
+    novo = ClienteSeguidores({'a': 11, 'b': 21})
+    assert obter_seguidores(['a', 'b'], novo, caminho, validade_s=-1) == {'a': 11, 'b': 21}
+    assert sorted(novo.consultas) == ['a', 'b']
+
+
+def test_valor_vencido_continua_se_a_consulta_falhar(tmp_path):
+    caminho = str(tmp_path / "estado.db")
+    obter_seguidores(['a'], ClienteSeguidores({'a': 10}), caminho)
+    with metricas.execucao(teste="seguidores") as run_id:
+        resultado = obter_seguidores(['a', 'b'], ClienteSeguidores({}), caminho, validade_s=-1)
+    assert resultado == {'a': 10, 'b': None}
+    linhas = json.loads(metricas.exportar_json(run_id))['metricas']
+    assert sum(l['valor'] for l in linhas if l['metrica'] == 'instagram_seguidores_erro') == 2
+
+
+def test_conexoes_do_cache_sao_fechadas(tmp_path, monkeypatch):
+    abertas = []
+    conectar = sqlite3.connect
+    monkeypatch.setattr(comparativo_perfis.sqlite3, 'connect',
+                        lambda *a, **k: abertas.append(conectar(*a, **k)) or abertas[-1])
+    obter_seguidores(['a'], ClienteSeguidores({'a': 10}), str(tmp_path / "estado.db"))
+    assert len(abertas) == 2
+    for conn in abertas:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
@@ -0,0 +1,78 @@
+import json
+
+import pandas as pd
+import pytest
+
+import contas_instagram
+import governador_instagram
+import metricas
+from contas_instagram import AnelConsistente, PoolInstagram
+
+PERFIS = [f"perfil{i}" for i in range(2000)]
+
+
+def donos(anel, perfis=PERFIS):
+    return {perfil: anel.preferencia(perfil)[0] for perfil in perfis}
+
+
+def test_preferencia_tem_todas_as_contas_uma_vez_e_e_estavel():
+    anel = AnelConsistente(['a', 'b', 'c'])
+    ordem = anel.preferencia('@Perfil')
+    assert sorted(ordem) == ['a', 'b', 'c']
+    assert AnelConsistente(['c', 'a', 'b']).preferencia('perfil') == ordem
+    assert AnelConsistente([]).preferencia('perfil') == []
+
+
+def test_divisao_uniforme():
+    contagem = pd.Series(donos(AnelConsistente(['a', 'b', 'c']))).value_counts()
+    assert contagem.min() > len(PERFIS) * 0.2
+
+
+def test_incluir_conta_so_leva_perfis_para_ela():
+    antes = donos(AnelConsistente(['a', 'b', 'c']))
+    depois = donos(AnelConsistente(['a', 'b', 'c', 'd']))
+    mudaram = [p for p in PERFIS if antes[p] != depois[p]]
+    assert mudaram and all(depois[p] == 'd' for p in mudaram)
+    assert len(mudaram) < len(PERFIS) * 0.4
+
+
+def test_retirar_conta_passa_os_perfis_dela_para_a_substituta():
+    anel = AnelConsistente(['a', 'b', 'c'])
+    depois = donos(AnelConsistente(['a', 'c']))
+    for perfil in PERFIS:
+        ordem = anel.preferencia(perfil)
+        esperado = ordem[1] if ordem[0] == 'b' else ordem[0]
+        assert depois[perfil] == esperado
+
+
+@pytest.fixture
+def estado(tmp_path, monkeypatch):
+    monkeypatch.setattr(governador_instagram, 'ARQUIVO_ESTADO_INSTAGRAM', str(tmp_path / "estado.db"))
+    monkeypatch.setattr(governador_instagram, '_governadores', {})
+
+
+def contas(*nomes):
+    return [{'usuario': nome, 'senha': '', 'sessao': f"sessao_{nome}.json", 'proxy': None} for nome in nomes]
+
+
+def test_falha_de_login_passa_para_a_proxima_conta(estado):
+    pool = PoolInstagram(contas('a', 'b', 'c'), login=lambda usuario, *_: None if usuario == 'a' else usuario)
+    perfil = next(p for p in PERFIS if pool.anel.preferencia(p)[0] == 'a')
+    substituta = pool.anel.preferencia(perfil)[1]
+    assert pool.cliente_para(perfil) == (substituta, substituta)
+    # A conta que falhou fica fora sem tentar logar de novo
+    assert pool.cliente_para(perfil) == (substituta, substituta)
+    assert [c['fora_por_login'] for c in pool.estado()] == [True, False, False]
+
+
+def test_coletar_varios_devolve_todos_e_conta_no_run_id(estado, monkeypatch):
+    monkeypatch.setattr(contas_instagram, 'coletar_posts_instagram',
+                        lambda cl, perfil, quantidade: pd.DataFrame({'id': [f"{perfil}-{cl}"]}))
+    pool = PoolInstagram(contas('a', 'b', 'c'), login=lambda usuario, *_: None if usuario == 'a' else usuario)
+    perfis = PERFIS[:12]
+    with metricas.execucao(teste="contas") as run_id:
+        resultado = pool.coletar_varios(['@' + p for p in perfis], 5)
+    assert list(resultado) == perfis
+    assert all(df['id'].iloc[0].rsplit('-', 1)[1] in ('b', 'c') for df in resultado.values())
+    linhas = json.loads(metricas.exportar_json(run_id))['metricas']
+    assert any(l['metrica'] == 'instagram_conta_indisponivel' for l in linhas)
@@ -0,0 +1,77 @@
+from collections import OrderedDict
+
+import pandas as pd
+import pytest
+
+import datasets_compartilhados
+from datasets_compartilhados import publicar, versao_dos_dados
+
+
+@pytest.fixture(autouse=True)
+def datasets(monkeypatch):
+    monkeypatch.setattr(datasets_compartilhados, "_datasets", OrderedDict())
+    return datasets_compartilhados._datasets
+
+
+def posts(perfil='a', curtidas=(10, 20, 30)):
+    return pd.DataFrame({
+        'id': [f"{perfil}{i}" for i in range(len(curtidas))],
+        'perfil': perfil,
+        'tipo': ['Dica', 'Evento', 'Dica'][:len(curtidas)],
+        'legenda': ['Promoção hoje!', 'Veja o evento', 'Dica rápida'][:len(curtidas)],
+        'curtidas': list(curtidas),
+    })
+
+
+def test_versao_ignora_a_ordem_das_linhas_e_segue_o_conteudo():
+    df = posts()
+    assert versao_dos_dados(df) == versao_dos_dados(df.iloc[::-1])
+    assert versao_dos_dados(df) == versao_dos_dados(df[list(reversed(df.columns))])
+    assert versao_dos_dados(df) != versao_dos_dados(posts(curtidas=(10, 20, 31)))
+    assert versao_dos_dados(df) != versao_dos_dados(df.iloc[:2])
+    # Mesmos valores trocados de coluna
+    trocado = pd.DataFrame({'x': [1, 2], 'y': [3, 4]})
+    assert versao_dos_dados(trocado) != versao_dos_dados(trocado.rename(columns={'x': 'y', 'y': 'x'}))
+
+
+def test_mesmo_conteudo_mesmo_dataset(datasets):
+    primeiro = publicar(posts())
+    assert publicar(posts().iloc[::-1]) is primeiro
+    assert publicar(posts(curtidas=(10, 20, 99))) is not primeiro
+    assert primeiro.perfis == ('a',)
+    assert 'categoria' in primeiro.visao().columns
+    assert len(datasets) == 2
+
+
+def test_visao_alterada_nao_muda_o_compartilhado():
+    df = posts()
+    dataset = publicar(df)
+    visao = dataset.visao()
+    visao['curtidas'] = 0
+    visao.loc[0, 'categoria'] = 'Outra'
+    df.loc[0, 'curtidas'] = -1
+    nova = dataset.visao()
+    assert nova['curtidas'].tolist() == [10, 20, 30]
+    assert nova.loc[0, 'categoria'] == 'Dica'
+
+
+def test_derivado_calculado_uma_vez():
+    dataset = publicar(posts())
+    chamadas = []
+
+    def total(df):
+        chamadas.append(1)
+        return int(df['curtidas'].sum())
+
+    assert dataset.derivado('total', total) == 60
+    assert publicar(posts()).derivado('total', total) == 60
+    assert len(chamadas) == 1
+
+
+def test_remove_o_menos_usado(monkeypatch, datasets):
+    monkeypatch.setattr(datasets_compartilhados, "MAX_DATASETS_COMPARTILHADOS", 2)
+    a, b = publicar(posts('a')), publicar(posts('b'))
+    assert publicar(posts('a')) is a  # 'a' volta a ser o mais usado
+    publicar(posts('c'))
+    assert [d.perfis for d in datasets.values()] == [('a',), ('c',)]
+    assert publicar(posts('b')) is not b
@@ -0,0 +1,88 @@
+import random
+
+import pandas as pd
+import pytest
+
+from estatisticas_perfil import (
+    SEM_CATEGORIA,
+    SOMAS_ESTATISTICAS,
+    EstatisticasPerfis,
+    deltas_estatisticas,
+    estado_final,
+    mesclar_top,
+)
+from storage_backend import obter_backend
+
+
+def estado(linhas):
+    return pd.DataFrame(linhas, columns=['post_pk', 'username', 'published_at', 'tipo', 'like_count', 'comment_count'])
+
+
+def test_deltas_so_dos_grupos_que_mudaram():
+    atuais = estado([
+        ('1', 'a', '2025-01-05T10:00:00+00:00', 'Dica', 10, 1),
+        ('2', 'a', '2025-01-06T10:00:00+00:00', 'Dica', 20, 2),
+    ])
+    novos = pd.DataFrame({'post_pk': ['1', '2', '3'], 'username': ['a'] * 3,
+                          'published_at': ['2025-01-05T10:00:00+00:00', '2025-01-06T10:00:00+00:00',
+                                           '2025-02-01T10:00:00+00:00'],
+                          'like_count': [15, 20, 7], 'comment_count': [1, 2, None]})
+    final = estado_final(novos, atuais)
+    # 'tipo' não veio no upsert: continua o do banco
+    assert final['tipo'].tolist()[:2] == ['Dica', 'Dica']
+
+    deltas = deltas_estatisticas(final, atuais).set_index(['categoria', 'mes'])
+    assert deltas.loc[('Dica', '2025-01'), SOMAS_ESTATISTICAS].tolist() == [0, 5, 0]
+    assert deltas.loc[(SEM_CATEGORIA, '2025-02'), SOMAS_ESTATISTICAS].tolist() == [1, 7, 0]
+
+    # Reclassificação: o post muda de grupo, sem mexer nas somas do perfil
+    reclassificado = estado_final(pd.DataFrame({'post_pk': ['2'], 'tipo': ['Evento']}), atuais)
+    deltas = deltas_estatisticas(reclassificado, atuais).set_index('categoria')
+    assert deltas.loc['Dica', SOMAS_ESTATISTICAS].tolist() == [-1, -20, -2]
+    assert deltas.loc['Evento', SOMAS_ESTATISTICAS].tolist() == [1, 20, 2]
+    assert deltas_estatisticas(estado_final(atuais, atuais), atuais).empty
+
+
+def test_top_substitui_a_versao_antiga_do_post():
+    posts = estado([(str(i), 'a', '2025-01-01', 'Dica', i, 0) for i in range(5)])
+    top = mesclar_top(None, posts, k=3)
+    assert top[top['metrica'] == 'curtidas']['post_pk'].tolist() == ['4', '3', '2']
+    top = mesclar_top(top, estado([('0', 'a', '2025-01-01', 'Dica', 100, 0)]), k=3)
+    curtidas = top[top['metrica'] == 'curtidas']
+    assert curtidas['post_pk'].tolist() == ['0', '4', '3']
+    assert curtidas['like_count'].tolist() == [100, 4, 3]
+
+
+def somas(estatisticas):
+    grupos = estatisticas.grupos.set_index(['username', 'categoria', 'mes'])[SOMAS_ESTATISTICAS]
+    return grupos[grupos['posts'] != 0].sort_index().astype(int)
+
+
+def test_resumo_incremental_igual_ao_recalculado(tmp_path):
+    backend = obter_backend("sqlite", caminho=str(tmp_path / "posts.sqlite3"))
+    sorteio = random.Random(3)
+    posts = {}
+    for rodada in range(6):
+        for perfil in ('a', 'b'):
+            # Posts novos e posts antigos com métricas que sobem e descem
+            pks = [f"{perfil}{sorteio.randrange(40)}" for _ in range(12)]
+            df = pd.DataFrame({
+                'id': pks,
+                'data': [f"2025-0{1 + int(pk[1:]) % 3}-1{int(pk[1:]) % 9}T08:00:00+00:00" for pk in pks],
+                'curtidas': [sorteio.randrange(100) for _ in pks],
+                'comentarios': [sorteio.choice([None, sorteio.randrange(9)]) for _ in pks],
+                'legenda': ['x'] * len(pks),
+            })
+            backend.upsert_posts(df, perfil)
+            posts.update({pk: perfil for pk in pks})
+        classificados = sorteio.sample(sorted(posts), 10)
+        backend.update_classificacoes([
+            {'id': pk, 'categoria': sorteio.choice(['Dica', 'Evento', '']), 'modelo': 'm', 'versao': 'v'}
+            for pk in classificados
+        ])
+
+    incremental = backend.fetch_estatisticas(['a', 'b'])
+    todos = pd.concat([backend.fetch_posts(p).assign(perfil=p) for p in ('a', 'b')], ignore_index=True)
+    recalculado = EstatisticasPerfis.de_posts(todos.rename(columns={'tipo': 'categoria'}))
+    pd.testing.assert_frame_equal(somas(incremental), somas(recalculado))
+    assert incremental.totais() == pytest.approx(recalculado.totais())
@@ -0,0 +1,73 @@
+import pandas as pd
+import pytest
+
+from features_legenda import (
+    COLUNAS_FEATURES,
+    adicionar_features_legenda,
+    engajamento_por_feature,
+    extrair_features_legenda,
+    garantir_features_legenda,
+    horario_local,
+)
+
+
+def test_horario_local_aceita_formatos_misturados_e_converte_para_brasilia():
+    datas = pd.Series(['2025-01-06 15:30:00', '2025-01-06T02:00:00+00:00', '2025-01-06T10:00:00-03:00', 'x'])
+    local = horario_local(datas)
+    assert local.dt.hour.tolist()[:3] == [12, 23, 10]
+    assert local.dt.dayofweek.tolist()[:3] == [0, 6, 0]
+    assert pd.isna(local.iloc[3])
+
+
+def test_extrair_features_conta_legenda_e_horario():
+    df = pd.DataFrame({
+        'legenda': ["Comenta aí! #Agro #campo @fulano.x 🌱🌽 https://x.com/a", None],
+        'data': ['2025-01-06 15:30:00', '2025-01-06T02:00:00+00:00'],
+    }, index=[3, 7])
+    features = extrair_features_legenda(df)
+    assert list(features.columns) == COLUNAS_FEATURES
+    assert features.index.tolist() == [3, 7]
+
+    primeiro = features.loc[3]
+    assert primeiro['hashtags'] == 'agro campo'
+    assert primeiro['mencoes'] == 'fulano.x'
+    assert (primeiro['n_hashtags'], primeiro['n_mencoes'], primeiro['n_emojis']) == (2, 1, 2)
+    assert primeiro['tem_cta'] and primeiro['tem_link'] and not primeiro['tem_pergunta']
+    assert (primeiro['hora'], primeiro['dia_semana']) == (12, 0)
+
+    vazio = features.loc[7]
+    assert (vazio['tamanho_legenda'], vazio['n_palavras'], vazio['n_hashtags']) == (0, 0, 0)
+    assert (vazio['hora'], vazio['dia_semana']) == (23, 6)
+
+
+def test_email_nao_conta_como_mencao():
+    features = extrair_features_legenda(pd.DataFrame({'legenda': ["fale com contato@empresa.com ou @marca"]}))
+    assert features['mencoes'].iloc[0] == 'marca'
+
+
+@pytest.mark.parametrize('dtype', [object, 'string[python]', 'string[pyarrow]'])
+def test_cta_com_acento_nao_casa_dentro_de_palavra(dtype):
+    legendas = pd.Series(["Salve este post", "ésalve", "confiram"], dtype=dtype)
+    assert extrair_features_legenda(pd.DataFrame({'legenda': legendas}))['tem_cta'].tolist() == [True, False, False]
+
+
+def test_garantir_calcula_so_as_linhas_sem_atributos():
+    df = adicionar_features_legenda(pd.DataFrame({'legenda': ["#a"], 'data': ['2025-01-06T12:00:00+00:00']}))
+    novo = pd.DataFrame({'legenda': ["#b #c"], 'data': ['2025-01-07T12:00:00+00:00']})
+    juntos = garantir_features_legenda(pd.concat([df, novo], ignore_index=True))
+    assert juntos['n_hashtags'].tolist() == [1, 2]
+    assert juntos['dia_semana'].tolist() == [0, 1]
+
+
+def test_engajamento_por_feature_agrupa_por_hora_e_hashtag():
+    df = adicionar_features_legenda(pd.DataFrame({
+        'legenda': ["#a comente", "#a", "#b"],
+        'data': ['2025-01-06T12:00:00+00:00', '2025-01-06T12:30:00+00:00', '2025-01-07T15:00:00+00:00'],
+        'curtidas': [10, 20, 30],
+        'comentarios': [1, 2, 3],
+    }))
+    medias = engajamento_por_feature(df)
+    assert medias['hora'].loc[9, 'media_curtidas'] == 15
+    assert medias['dia_semana'].loc['Terça', 'posts'] == 1
+    assert medias['cta'].loc['Sim', 'media_curtidas'] == 10
+    assert medias['hashtags'].index.tolist() == ['a', 'b']
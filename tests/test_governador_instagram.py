@@ -0,0 +1,134 @@
+import sqlite3
+import time
+from datetime import datetime
+
+import pytest
+from benchmark_fakes import ClienteInstagramFalso
+
+import governador_instagram
+from governador_instagram import (
+    PAUSA_CIRCUITO_S,
+    CircuitoAberto,
+    GovernadorInstagram,
+    OrcamentoEsgotado,
+    _conectar,
+    coletar_midias,
+    governar_cliente,
+)
+
+FeedbackRequired = type('FeedbackRequired', (Exception,), {})
+
+
+@pytest.fixture
+def caminho(tmp_path, monkeypatch):
+    monkeypatch.setattr(governador_instagram, '_governadores', {})
+    return str(tmp_path / "estado.sqlite3")
+
+
+@pytest.fixture
+def conexoes(monkeypatch):
+    abertas = []
+    conectar = sqlite3.connect
+
+    def registrar(*args, **kwargs):
+        conn = conectar(*args, **kwargs)
+        abertas.append(conn)
+        return conn
+
+    monkeypatch.setattr(governador_instagram.sqlite3, 'connect', registrar)
+    return abertas
+
+
+def _fechada(conn):
+    try:
+        conn.execute("SELECT 1")
+    except sqlite3.ProgrammingError:
+        return True
+    return False
+
+
+def governador(caminho, conta='bot', orcamento=None):
+    # Sem pausa entre requisições; registrado para o governar_cliente usar o mesmo
+    gov = GovernadorInstagram(conta, orcamento=orcamento or {3600: 1000}, atraso_s=(0, 0), caminho=caminho)
+    governador_instagram._governadores[(conta, caminho)] = gov
+    return gov
+
+
+def test_bloqueio_abre_o_disjuntor_e_a_pausa_dobra(caminho):
+    gov = governador(caminho)
+    gov.depois_da_requisicao(FeedbackRequired())
+    assert gov.suspensa_ate() == pytest.approx(time.time() + PAUSA_CIRCUITO_S, abs=5)
+    with pytest.raises(CircuitoAberto):
+        gov.antes_da_requisicao()
+
+    gov.depois_da_requisicao(FeedbackRequired())
+    assert gov.suspensa_ate() == pytest.approx(time.time() + 2 * PAUSA_CIRCUITO_S, abs=5)
+    assert gov.estado()['aberturas'] == 2
+
+
+def test_orcamento_esgotado(caminho):
+    gov = governador(caminho, orcamento={3600: 2})
+    gov.antes_da_requisicao()
+    gov.antes_da_requisicao()
+    with pytest.raises(OrcamentoEsgotado):
+        gov.antes_da_requisicao()
+    assert gov.estado()['requisicoes'] == {3600: "2/2"}
+
+
+class ClienteBloqueado(ClienteInstagramFalso):
+    """Recebe FeedbackRequired na página que começa em 'bloquear_em'."""
+
+    bloquear_em = None
+
+    def user_medias_paginated_v1(self, user_id, amount=0, end_cursor=""):
+        if end_cursor and int(end_cursor) == self.bloquear_em:
+            self.private_request("bloqueio")
+            raise FeedbackRequired()
+        return super().user_medias_paginated_v1(user_id, amount, end_cursor)
+
+
+def test_coleta_interrompida_continua_do_cursor(caminho, conexoes):
+    gov = governador(caminho)
+    cl = governar_cliente(ClienteBloqueado(tamanho_pagina=10), 'bot', caminho)
+    assert cl._governador is gov
+    cl.bloquear_em = 20
+    medias, interrompida = coletar_midias(cl, '123', 'perfil', 35)
+    assert interrompida and len(medias) == 20
+
+    # Depois da pausa, a próxima coleta pega só o que faltou
+    with _conectar(caminho) as conn:
+        conn.execute("DELETE FROM circuitos")
+    cl.bloquear_em = None
+    resto, interrompida = coletar_midias(cl, '123', 'perfil', 35)
+    assert not interrompida
+    assert [m.pk for m in resto] == [f"123{i:06d}" for i in range(20, 35)]
+
+    # Coleta completa apaga o cursor
+    novo, _ = coletar_midias(cl, '123', 'perfil', 5)
+    assert len(novo) == 5 and novo[0].pk == "123000000"
+    assert conexoes and all(_fechada(conn) for conn in conexoes)
+
+
+def test_pedido_diferente_nao_continua_o_cursor(caminho):
+    governador(caminho)
+    cl = governar_cliente(ClienteBloqueado(tamanho_pagina=10), 'bot', caminho)
+    cl.bloquear_em = 20
+    _, interrompida = coletar_midias(cl, '123', 'perfil', 35)
+    assert interrompida
+
+    with _conectar(caminho) as conn:
+        conn.execute("DELETE FROM circuitos")
+    cl.bloquear_em = None
+    # Outra quantidade: começa do topo (posts novos) e para na quantidade pedida
+    medias, interrompida = coletar_midias(cl, '123', 'perfil', 5)
+    assert not interrompida
+    assert [m.pk for m in medias] == [f"123{i:06d}" for i in range(5)]
+
+    # Outro limite de data com a mesma quantidade também não retoma
+    cl.bloquear_em = 20
+    coletar_midias(cl, '123', 'perfil', 35)
+    with _conectar(caminho) as conn:
+        conn.execute("DELETE FROM circuitos")
+    cl.bloquear_em = None
+    medias, _ = coletar_midias(cl, '123', 'perfil', 35, parar_antes_de=datetime(2024, 12, 30))
+    assert medias[0].pk == "123000000" and len(medias) == 10
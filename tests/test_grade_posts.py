@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+
+from grade_posts import janelas_da_analise, pagina_local
+from storage_backend import obter_backend
+
+
+def historico(perfil, n):
+    # n posts diários, o mais recente primeiro
+    return pd.DataFrame({
+        'id': [f"{perfil}{i:03d}" for i in range(n)],
+        'data': [(pd.Timestamp('2025-03-01', tz='UTC') - pd.Timedelta(days=i)).isoformat() for i in range(n)],
+        'tipo': ['Dica' if i % 2 else 'Evento' for i in range(n)],
+        'curtidas': list(range(n)), 'comentarios': [0] * n, 'legenda': ['x'] * n,
+    })
+
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = obter_backend("sqlite", caminho=str(tmp_path / "posts.sqlite3"))
+    for perfil, n in (('a', 30), ('b.c', 20)):
+        backend.upsert_posts(historico(perfil, n), perfil)
+    return backend
+
+
+def analise(backend, qtd_posts):
+    # Como no pipeline da concorrência: os últimos qtd_posts de cada perfil
+    return pd.concat([backend.fetch_posts(p, limit=qtd_posts).rename(columns={'tipo': 'categoria'}).assign(perfil=p)
+                      for p in ('a', 'b.c')], ignore_index=True)
+
+
+def test_janelas_comecam_no_post_mais_antigo_de_cada_perfil(backend):
+    df = analise(backend, 5)
+    janelas = janelas_da_analise(df)
+    assert set(janelas) == {'a', 'b.c'}
+    assert pd.Timestamp(janelas['a']) == pd.Timestamp('2025-02-25', tz='UTC')
+    # Texto original do banco (comparado como texto no SQLite/MongoDB)
+    assert janelas['a'] in set(df['data'])
+    assert janelas_da_analise(pd.DataFrame({'perfil': ['a'], 'data': [None]})) == {}
+
+
+@pytest.mark.parametrize('filtros', [
+    {},
+    {'categorias': ['Dica']},
+    {'perfis': ['b.c'], 'ordenar_por': 'curtidas', 'decrescente': False},
+])
+def test_grade_da_concorrencia_mostra_so_os_posts_analisados(backend, filtros):
+    df = analise(backend, 5)
+    janelas = janelas_da_analise(df)
+    filtros = {'perfis': ['a', 'b.c'], **filtros}
+
+    pagina_banco, total_banco = backend.fetch_pagina_grade(limit=100, janelas=janelas, **filtros)
+    pagina, total = pagina_local(df, limit=100, janelas=janelas, **filtros)
+    sem_janela, total_historico = backend.fetch_pagina_grade(limit=100, **filtros)
+
+    assert total_banco == total == len(pagina_banco)
+    assert pagina_banco['id'].tolist() == pagina['id'].tolist()
+    assert set(pagina_banco['id']) <= set(df['id'])
+    assert total_historico > total_banco
@@ -0,0 +1,134 @@
+from functools import partial
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+import pipeline
+import spool_local
+import supabase_utils
+from spool_local import contar_pendentes
+from storage_backend import ResultadoGravacao
+
+
+class ClienteSupabaseFalso:
+    """Aceita qualquer consulta encadeada; o upsert em 'posts' falha nos post_pk de 'recusados'."""
+
+    def __init__(self, recusados=()):
+        self.recusados = set(recusados)
+        self.gravados = []
+
+    def table(self, tabela):
+        return ConsultaFalsa(self, tabela)
+
+    def rpc(self, *args, **kwargs):
+        return ConsultaFalsa(self, None)
+
+
+class ConsultaFalsa:
+    def __init__(self, cliente, tabela):
+        self.cliente, self.tabela, self.lote = cliente, tabela, None
+
+    def upsert(self, lote, **kwargs):
+        self.lote = lote
+        return self
+
+    def __getattr__(self, nome):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        if self.tabela == 'posts' and self.lote is not None:
+            if any(str(r['post_pk']) in self.cliente.recusados for r in self.lote):
+                erro = Exception("violação de constraint")
+                erro.code = '23514'
+                raise erro
+            self.cliente.gravados += [str(r['post_pk']) for r in self.lote]
+        return SimpleNamespace(data=[], count=0)
+
+
+def posts(n):
+    return pd.DataFrame({
+        'id': [str(i) for i in range(n)], 'data': ['2025-01-01T12:00:00+00:00'] * n,
+        'curtidas': [10] * n, 'comentarios': [1] * n, 'legenda': ['oi'] * n,
+    })
+
+
+@pytest.fixture
+def spool(tmp_path, monkeypatch):
+    caminho = str(tmp_path / "spool.sqlite3")
+    monkeypatch.setattr(spool_local, 'ARQUIVO_SPOOL', caminho)
+    # Lotes de 2 linhas: um post recusado derruba só o lote dele
+    monkeypatch.setattr(supabase_utils, 'upsert_em_lotes', partial(supabase_utils.upsert_em_lotes, max_linhas=2))
+    return caminho
+
+
+def test_resultado_gravacao_como_bool():
+    assert ResultadoGravacao()
+    assert ResultadoGravacao(gravados=3)
+    assert not ResultadoGravacao(gravados=3, no_spool=1)
+    assert not ResultadoGravacao(gravados=3, no_spool=1).nada_gravado
+    assert ResultadoGravacao(no_spool=2).nada_gravado
+    assert not ResultadoGravacao().nada_gravado
+
+
+def test_falha_parcial_separa_gravados_e_spool(spool):
+    cliente = ClienteSupabaseFalso(recusados={'3'})
+    resultado = supabase_utils.save_posts_to_supabase(cliente, posts(6), 'perfil')
+    assert (resultado.gravados, resultado.no_spool, resultado.falhas) == (4, 2, 0)
+    assert sorted(cliente.gravados) == ['0', '1', '4', '5']
+    assert contar_pendentes(spool) == (2, 0)
+
+
+def test_sem_spool_conta_como_falha(spool):
+    resultado = supabase_utils.save_posts_to_supabase(ClienteSupabaseFalso({'0'}), posts(2), 'perfil', usar_spool=False)
+    assert (resultado.gravados, resultado.no_spool, resultado.falhas) == (0, 0, 2)
+    assert contar_pendentes(spool) == (0, 0)
+
+
+def test_sem_conexao_vai_tudo_para_o_spool(spool):
+    resultado = supabase_utils.save_posts_to_supabase(None, posts(3), 'perfil')
+    assert resultado.nada_gravado and resultado.no_spool == 3
+
+
+class BackendFalso:
+    client = object()
+
+    def __init__(self, gravacao):
+        self.gravacao = gravacao
+        self.pendentes_pedidos = 0
+
+    def reenviar_spool(self):
+        return 0, 0
+
+    def upsert_posts(self, df, username):
+        return self.gravacao
+
+    def fetch_pendentes(self, username, limit=0):
+        self.pendentes_pedidos += 1
+        return pd.DataFrame()
+
+    def update_classificacoes(self, classificacoes):
+        return True
+
+    def fetch_posts(self, username, limit=0):
+        return posts(4).assign(tipo='Institucional')
+
+
+@pytest.mark.parametrize('gravacao, classifica_tudo', [
+    (ResultadoGravacao(gravados=4, no_spool=2), False),
+    (ResultadoGravacao(no_spool=6), True),
+])
+def test_pipeline_so_classifica_tudo_quando_nada_foi_gravado(monkeypatch, gravacao, classifica_tudo):
+    enviados = []
+
+    def classificar(df, api_key, modelo=None):
+        enviados.append(len(df))
+        return [{'id': i, 'categoria': 'Institucional'} for i in df['id']]
+
+    monkeypatch.setattr(pipeline, 'classificar_posts_gemini', classificar)
+    backend = BackendFalso(gravacao)
+    df = pipeline.processar_perfil(backend, None, '@perfil', 6, api_key='x', ui=pipeline.UIConsole(silenciosa=True),
+                                   df_coletado=posts(6))
+    assert df is not None
+    assert enviados == ([6] if classifica_tudo else [])
+    assert backend.pendentes_pedidos == (0 if classifica_tudo else 1)
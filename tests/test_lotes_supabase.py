@@ -0,0 +1,104 @@
+import json
+
+import pytest
+
+import lotes_supabase
+import metricas
+from lotes_supabase import dividir_em_lotes, registros_com_falha, upsert_em_lotes
+
+
+class ErroBanco(Exception):
+    def __init__(self, code):
+        super().__init__(f"erro {code}")
+        self.code = code
+
+
+class ClienteLotes:
+    """Client do Supabase só com table().upsert().execute(); 'falhar' decide o erro de cada lote."""
+
+    def __init__(self, falhar=None):
+        self.falhar = falhar or (lambda lote, tentativa: None)
+        self.envios = []
+
+    def table(self, tabela):
+        return self
+
+    def upsert(self, lote, **kwargs):
+        self._lote = lote
+        return self
+
+    def execute(self):
+        self.envios.append([r['id'] for r in self._lote])
+        erro = self.falhar(self._lote, len(self.envios))
+        if erro is not None:
+            raise erro
+
+
+@pytest.fixture(autouse=True)
+def sem_espera(monkeypatch):
+    monkeypatch.setattr(lotes_supabase, '_espera', lambda tentativa: 0)
+
+
+def registros(n, tamanho_texto=0):
+    return [{'id': i, 'texto': 'x' * tamanho_texto} for i in range(n)]
+
+
+def test_dividir_respeita_linhas_e_bytes():
+    assert [len(l) for l in dividir_em_lotes(registros(7), max_linhas=3)] == [3, 3, 1]
+
+    lotes = dividir_em_lotes(registros(10, tamanho_texto=100), max_linhas=100, max_bytes=400)
+    assert sum(len(l) for l in lotes) == 10
+    for lote in lotes:
+        assert len(json.dumps(lote).encode()) <= 400
+
+
+def test_registro_maior_que_o_limite_vai_sozinho():
+    lotes = dividir_em_lotes([{'id': 0}, {'id': 1, 'texto': 'x' * 500}, {'id': 2}], max_bytes=100)
+    assert [[r['id'] for r in lote] for lote in lotes] == [[0], [1], [2]]
+
+
+def test_dividir_vazio():
+    assert dividir_em_lotes([]) == []
+
+
+def test_lote_grande_demais_e_partido_ao_meio():
+    # Recusa qualquer lote com mais de 2 linhas
+    cliente = ClienteLotes(lambda lote, _: ErroBanco('413') if len(lote) > 2 else None)
+    resultados = upsert_em_lotes(cliente, 'posts', registros(8), on_conflict='id', max_linhas=8)
+    assert len(resultados) == 1
+    assert resultados[0]['ok'] and resultados[0]['gravadas'] == 8
+    assert resultados[0]['divisoes'] == 3
+    assert sorted(i for envio in cliente.envios if len(envio) <= 2 for i in envio) == list(range(8))
+
+
+def test_erro_transitorio_e_repetido_so_no_lote_que_falhou():
+    cliente = ClienteLotes(lambda lote, envio: ErroBanco('503') if lote[0]['id'] == 2 and envio == 2 else None)
+    resultados = upsert_em_lotes(cliente, 'posts', registros(4), on_conflict='id', max_linhas=2, concorrencia=1)
+    assert [r['ok'] for r in resultados] == [True, True]
+    assert [r['tentativas'] for r in resultados] == [1, 2]
+    assert cliente.envios.count([0, 1]) == 1
+
+
+def test_erro_permanente_nao_e_repetido_e_volta_em_falhas():
+    cliente = ClienteLotes(lambda lote, _: ErroBanco('23505') if lote[0]['id'] == 2 else None)
+    resultados = upsert_em_lotes(cliente, 'posts', registros(4), on_conflict='id', max_linhas=2, concorrencia=1)
+    assert [r['ok'] for r in resultados] == [True, False]
+    assert resultados[1]['tentativas'] == 1
+    assert [r['id'] for r in registros_com_falha(resultados)] == [2, 3]
+
+
+def test_desiste_depois_das_tentativas():
+    cliente = ClienteLotes(lambda lote, _: ErroBanco('503'))
+    resultados = upsert_em_lotes(cliente, 'posts', registros(2), on_conflict='id', tentativas=3)
+    assert not resultados[0]['ok']
+    assert resultados[0]['tentativas'] == 3
+    assert len(cliente.envios) == 3
+
+
+def test_lotes_paralelos_entram_no_run_id_de_quem_chamou():
+    cliente = ClienteLotes()
+    with metricas.execucao(teste="lotes") as run_id:
+        upsert_em_lotes(cliente, 'posts', registros(6), on_conflict='id', max_linhas=2, concorrencia=3)
+    linhas = json.loads(metricas.exportar_json(run_id))['metricas']
+    lotes = [l for l in linhas if l['metrica'] == 'supabase_lote']
+    assert lotes and lotes[0]['contagem'] == 3
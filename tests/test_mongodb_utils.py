@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+import mongodb_utils
+
+
+class ColecaoFalsa:
+    """
+    Coleção 'posts' em memória. Como no MongoDB, documentos empatados na
+    ordenação voltam em ordem arbitrária a cada consulta.
+    """
+
+    def __init__(self, documentos):
+        self.documentos = documentos
+        self.sorteio = random.Random(0)
+
+    def find(self, filtro, projecao=None):
+        def casa(documento, filtro):
+            for campo, valor in filtro.items():
+                if campo == "$or":
+                    if not any(casa(documento, f) for f in valor):
+                        return False
+                elif documento.get(campo) != valor:
+                    return False
+            return True
+
+        encontrados = [dict(d) for d in self.documentos if casa(d, filtro)]
+        self.sorteio.shuffle(encontrados)
+        return CursorFalso(encontrados)
+
+
+class CursorFalso:
+    def __init__(self, documentos):
+        self.documentos = documentos
+
+    def sort(self, chaves, direcao=None):
+        if isinstance(chaves, str):
+            chaves = [(chaves, direcao)]
+        for campo, sentido in reversed(chaves):
+            self.documentos.sort(key=lambda d: d[campo], reverse=sentido == -1)
+        return self
+
+    def skip(self, n):
+        self.documentos = self.documentos[n:]
+        return self
+
+    def limit(self, n):
+        self.documentos = self.documentos[:n]
+        return self
+
+    def __iter__(self):
+        return iter(self.documentos)
+
+
+@pytest.fixture
+def client():
+    colecao = ColecaoFalsa([
+        {'post_pk': f"{i:02d}", 'username': 'perfil', 'published_at': f"2025-01-0{1 + i // 5}T12:00:00+00:00",
+         'tipo': 'Dica' if i % 3 == 0 else None, 'like_count': i, 'comment_count': 0}
+        for i in range(12)
+    ])
+    return {"agente_macfor": {"posts": colecao}}
+
+
+def test_paginas_com_datas_empatadas_nao_repetem_posts(client):
+    df = mongodb_utils.fetch_posts_paginado(client, 'perfil')
+    assert sorted(df['id']) == [f"{i:02d}" for i in range(12)]
+
+    paginas = [mongodb_utils.fetch_posts_paginado(client, 'perfil', limit=5, offset=o)['id'].tolist()
+               for o in range(0, 12, 5)]
+    assert sum(paginas, []) == df['id'].tolist()
+
+
+def test_pendentes_com_datas_empatadas(client):
+    primeira = mongodb_utils.fetch_posts_pendentes(client, 'perfil')['id'].tolist()
+    assert sorted(primeira) == [f"{i:02d}" for i in range(12) if i % 3]
+    assert mongodb_utils.fetch_posts_pendentes(client, 'perfil')['id'].tolist() == primeira
@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+
+import classificador_post
+import reclassificar
+from classificador_post import VERSAO_PROMPT, procedencia_atual
+from regras_classificacao import VERSAO_REGRAS
+
+
+class BackendMemoria:
+    def __init__(self, df):
+        self.df, self.gravadas = df, []
+
+    def fetch_posts(self, perfil, colunas=None):
+        return self.df.copy()
+
+    def update_classificacoes(self, classificacoes):
+        self.gravadas.extend(classificacoes)
+
+
+@pytest.fixture
+def posts():
+    _, modelo = procedencia_atual(True)
+    return pd.DataFrame({
+        'id': ['regras', 'antigo', 'atual'],
+        'data': ['2025-01-01T00:00:00+00:00'] * 3,
+        'curtidas': [1, 2, 3], 'comentarios': [0, 0, 0],
+        'legenda': ['Bom dia', 'Frete grátis só hoje', 'Bom dia'],
+        'miniatura': [''] * 3,
+        'tipo': ['Engajamento', 'Outros', 'Outros'],
+        'tipo_modelo': [None, modelo, modelo],
+        'tipo_versao': [VERSAO_REGRAS, 'legenda-v0', VERSAO_PROMPT],
+    })
+
+
+@pytest.fixture
+def enviados(monkeypatch):
+    lotes = []
+
+    def gemini(lote, api_key, modelo=None):
+        lotes.append(lote['id'].tolist())
+        return [{'id': i, 'categoria': 'Conteúdo técnico', 'modelo': 'm', 'versao': VERSAO_PROMPT}
+                for i in lote['id']]
+
+    monkeypatch.setattr(reclassificar, 'classificar_posts_gemini', gemini)
+    return lotes
+
+
+def test_regras_ligadas_resolvem_sem_gastar_orcamento(posts, enviados, monkeypatch):
+    monkeypatch.setattr(classificador_post, 'USAR_REGRAS_CLASSIFICACAO', True)
+    assert reclassificar.desatualizadas(posts).tolist() == [False, True, False]
+
+    backend = BackendMemoria(posts)
+    resumo = reclassificar.reclassificar(backend, ['perfil'], 'chave')
+    assert enviados == []
+    assert [(c['id'], c['versao']) for c in backend.gravadas] == [('antigo', VERSAO_REGRAS)]
+    assert resumo['enviadas'] == 0 and resumo['atualizadas'] == 1
+
+
+def test_regras_desligadas_vai_tudo_para_o_modelo(posts, enviados, monkeypatch):
+    monkeypatch.setattr(classificador_post, 'USAR_REGRAS_CLASSIFICACAO', False)
+    # O que as regras classificaram deixa de valer
+    assert reclassificar.desatualizadas(posts).tolist() == [True, True, False]
+
+    backend = BackendMemoria(posts)
+    resumo = reclassificar.reclassificar(backend, ['perfil'], 'chave')
+    assert enviados == [['antigo', 'regras']]  # mais curtidas primeiro
+    assert {c['versao'] for c in backend.gravadas} == {VERSAO_PROMPT}
+    assert resumo['enviadas'] == 2
@@ -0,0 +1,103 @@
+import re
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from regras_classificacao import (
+    CONFIANCA_CALENDARIO,
+    REGRAS_PADRAO,
+    aplicar_regras,
+    calendario,
+    data_comemorativa_proxima,
+    pre_classificar,
+)
+
+# 'object' usa o re do Python; 'string[pyarrow]' usa o RE2
+DTYPES = [object, 'string[python]', 'string[pyarrow]']
+
+LEGENDAS_ACENTUADAS = {
+    "Comenta aí que eu respondo": 'Engajamento',
+    "Garanta já o seu": 'Institucional',
+    "peça já": 'Institucional',
+    "Qual é a sua favorita?": 'Engajamento',
+    "Feliz Páscoa a todos": 'Data comemorativa',
+    "Frete grátis só hoje": 'Institucional',
+}
+
+
+@pytest.mark.parametrize('dtype', DTYPES)
+def test_regras_casam_frases_acentuadas_em_todos_os_dtypes(dtype):
+    legendas = pd.Series(list(LEGENDAS_ACENTUADAS), dtype=dtype)
+    resultado = aplicar_regras(pd.DataFrame({'legenda': legendas}))
+    assert resultado['categoria'].tolist() == list(LEGENDAS_ACENTUADAS.values())
+
+
+@pytest.mark.parametrize('dtype', DTYPES)
+def test_padroes_dao_o_mesmo_resultado_no_re_e_no_pandas(dtype):
+    legendas = list(LEGENDAS_ACENTUADAS) + ["Natalia", "promoções", "Tudo bem? é", "boa noite", "cupom"]
+    serie = pd.Series(legendas, dtype=dtype)
+    for regra in REGRAS_PADRAO:
+        esperado = [bool(re.search(regra['padrao'], texto)) for texto in legendas]
+        assert serie.str.contains(regra['padrao'], regex=True).tolist() == esperado, regra['padrao']
+
+
+def test_fronteira_nao_casa_dentro_de_palavra():
+    resultado = aplicar_regras(pd.DataFrame({'legenda': ["Natalia chegou", "promoções da semana", "boa noite"]}))
+    assert resultado['categoria'].isna().all()
+    assert (resultado['confianca'] == 0).all()
+
+
+def test_pergunta_no_fim_ignora_hashtags_e_emojis():
+    resultado = aplicar_regras(pd.DataFrame({'legenda': ["Vocês já testaram? 🌱 #agro #campo", "Pergunta? não"]}))
+    assert resultado['categoria'].tolist()[0] == 'Engajamento'
+    assert pd.isna(resultado['categoria'].tolist()[1])
+
+
+def test_categorias_diferentes_com_confianca_parecida_ficam_ambiguas():
+    # Venda (0.85) e interação (0.85) na mesma legenda
+    resultado = aplicar_regras(pd.DataFrame({'legenda': ["Comente e garanta o seu desconto"]}))
+    assert resultado['confianca'].iloc[0] == pytest.approx(0.425)
+
+
+def test_calendario_tem_datas_moveis_corretas():
+    cal = calendario([2024, 2025])
+    datas = dict(zip(zip(cal['data'].dt.year, cal['nome']), cal['data'].dt.date))
+    assert datas[(2024, 'Páscoa')] == date(2024, 3, 31)
+    assert datas[(2025, 'Páscoa')] == date(2025, 4, 20)
+    assert datas[(2025, 'Carnaval')] == date(2025, 3, 4)
+    assert datas[(2025, 'Dia das Mães')] == date(2025, 5, 11)
+    assert datas[(2025, 'Dia dos Pais')] == date(2025, 8, 10)
+    assert cal['data'].is_monotonic_increasing
+
+
+def test_data_comemorativa_proxima_usa_janela_e_fuso_de_sao_paulo():
+    datas = pd.Series([
+        '2024-12-26T02:00:00+00:00',  # 25/12 às 23h em São Paulo
+        '2024-12-27T12:00:00+00:00',  # dois dias depois do Natal, quatro antes do Réveillon
+        '2025-03-05 15:00:00',        # sem fuso (UTC): um dia depois do Carnaval
+        'inválida',
+    ], index=[10, 11, 12, 13])
+    nomes = data_comemorativa_proxima(datas, janela_dias=1)
+    assert nomes.index.tolist() == [10, 11, 12, 13]
+    assert nomes.loc[10] == 'Natal'
+    assert pd.isna(nomes.loc[11])
+    assert nomes.loc[12] == 'Carnaval'
+    assert pd.isna(nomes.loc[13])
+
+
+def test_calendario_com_celebracao_classifica_sem_palavra_da_data():
+    df = pd.DataFrame({'legenda': ["Hoje é dia de celebrar com vocês"], 'data': ['2025-10-12T15:00:00+00:00']})
+    resultado = aplicar_regras(df)
+    assert resultado['categoria'].iloc[0] == 'Data comemorativa'
+    assert resultado['confianca'].iloc[0] == CONFIANCA_CALENDARIO
+    assert resultado['regra'].iloc[0] == 'calendário: Dia das Crianças'
+
+
+def test_pre_classificar_separa_resolvidos_do_modelo():
+    df = pd.DataFrame({'id': ['1', '2', '3'], 'legenda': ["Feliz Natal!", "foto do campo", "Comenta aí"]},
+                      index=[5, 6, 7])
+    resolvidos, para_modelo = pre_classificar(df)
+    assert resolvidos['id'].tolist() == ['1', '3']
+    assert para_modelo.tolist() == [False, True, False]
+    assert para_modelo.index.tolist() == [5, 6, 7]
@@ -0,0 +1,59 @@
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from snapshots_utils import curvas_por_categoria, curvas_por_post, selecionar_snapshots_alterados
+
+CAPTURA = datetime(2025, 1, 2, tzinfo=timezone.utc)
+
+
+def metricas(linhas):
+    return pd.DataFrame(linhas, columns=['post_pk', 'like_count', 'comment_count'])
+
+
+def test_snapshot_so_do_que_mudou_ou_e_novo():
+    novos = metricas([(1, 10, 1), (2, 20, 2), (3, 30, 3), (4, None, None), (5, None, 5), (6, 7, 0)])
+    atuais = metricas([('1', 10, 1), ('2', 21, 2), ('4', None, None), ('5', 3, 5)])
+    alterados = selecionar_snapshots_alterados(novos, atuais, CAPTURA)
+    # 4 tem curtidas NULL no banco e na coleta: não é mudança (antes virava snapshot em toda rodada)
+    assert alterados['post_pk'].tolist() == ['2', '3', '5', '6']
+    assert (alterados['captured_at'] == CAPTURA).all()
+    assert list(alterados.columns) == ['post_pk', 'captured_at', 'like_count', 'comment_count']
+
+
+def test_post_com_metricas_nulas_ainda_nao_salvo_vira_snapshot():
+    alterados = selecionar_snapshots_alterados(metricas([('9', None, None)]), metricas([]), CAPTURA)
+    assert alterados['post_pk'].tolist() == ['9']
+    assert selecionar_snapshots_alterados(metricas([]), metricas([]), CAPTURA).empty
+
+
+def test_curvas_preenchem_as_faixas_sem_captura():
+    posts = pd.DataFrame({'id': ['1'], 'data': ['2025-01-01T00:00:00+00:00'], 'categoria': ['Dica']})
+    snaps = pd.DataFrame({
+        'post_pk': ['1', '1', '1'],
+        'captured_at': pd.to_datetime(['2025-01-01T00:30:00Z', '2025-01-01T00:50:00Z', '2025-01-01T03:10:00Z']),
+        'like_count': [5, 8, 20], 'comment_count': [0, 1, 2],
+    })
+    curva = curvas_por_post(snaps, posts)
+    assert curva['idade_h'].tolist() == [0, 1, 2, 3]
+    assert curva['like_count'].tolist() == [8, 8, 8, 20]
+    assert (curva['tipo'] == 'Dica').all()
+
+
+def test_curva_termina_na_ultima_captura_do_post():
+    posts = pd.DataFrame({'id': ['velho', 'novo'], 'categoria': ['Dica', 'Dica'],
+                          'data': ['2025-01-01T00:00:00+00:00', '2025-01-01T02:00:00+00:00']})
+    snaps = pd.DataFrame({
+        'post_pk': ['velho', 'velho', 'novo', 'novo'],
+        'captured_at': pd.to_datetime(['2025-01-01T00:10:00Z', '2025-01-01T04:10:00Z',
+                                       '2025-01-01T03:10:00Z', '2025-01-01T04:10:00Z']),
+        'like_count': [10, 100, 1, 2], 'comment_count': [0, 0, 0, 0],
+    })
+    curva = curvas_por_post(snaps, posts)
+    assert curva[curva['post_pk'] == 'velho']['idade_h'].tolist() == [0, 1, 2, 3, 4]
+    # O post novo só tem as idades 1 e 2: nada antes da primeira captura nem depois da última
+    assert curva[curva['post_pk'] == 'novo']['idade_h'].tolist() == [1, 2]
+
+    por_categoria = curvas_por_categoria(snaps, posts).set_index('idade_h')
+    assert por_categoria['posts'].tolist() == [1, 2, 2, 1, 1]
+    assert por_categoria.loc[4, 'like_count'] == 100
@@ -0,0 +1,62 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import spool_local
+from spool_local import contar_pendentes, guardar_classificacoes_no_spool, guardar_posts_no_spool, reenviar_spool
+
+
+@pytest.fixture
+def conexoes(monkeypatch):
+    """Guarda toda conexão aberta pelo spool para conferir que foi fechada."""
+    abertas = []
+    conectar = sqlite3.connect
+
+    def registrar(*args, **kwargs):
+        conn = conectar(*args, **kwargs)
+        abertas.append(conn)
+        return conn
+
+    monkeypatch.setattr(spool_local.sqlite3, 'connect', registrar)
+    return abertas
+
+
+def fechada(conn):
+    try:
+        conn.execute("SELECT 1")
+    except sqlite3.ProgrammingError:
+        return True
+    return False
+
+
+def test_conexoes_sao_fechadas(tmp_path, conexoes):
+    caminho = str(tmp_path / "spool.sqlite3")
+    guardar_posts_no_spool(pd.DataFrame({'id': ['1', '2'], 'curtidas': [1, 2]}), 'a', caminho)
+    guardar_classificacoes_no_spool([{'id': '1', 'categoria': 'Dica', 'modelo': 'm'}], caminho)
+    assert contar_pendentes(caminho) == (2, 1)
+    assert conexoes and all(fechada(conn) for conn in conexoes)
+
+
+def test_reenvio_so_apaga_o_que_o_banco_confirmou(tmp_path, conexoes):
+    caminho = str(tmp_path / "spool.sqlite3")
+    guardar_posts_no_spool(pd.DataFrame({'id': ['1', '2']}), 'a', caminho)
+    guardar_posts_no_spool(pd.DataFrame({'id': ['3']}), 'b', caminho)
+    guardar_classificacoes_no_spool([{'id': '1', 'categoria': 'Dica', 'modelo': 'm'}], caminho)
+
+    recebidos = {}
+
+    def salvar(client, df, username, usar_spool):
+        recebidos[username] = df['id'].tolist()
+        return username == 'a'
+
+    assert reenviar_spool(None, salvar, lambda *a, **k: True, caminho) == (2, 0)
+    assert recebidos == {'a': ['1', '2'], 'b': ['3']}
+    assert contar_pendentes(caminho) == (1, 1)
+
+    classificacoes = []
+    assert reenviar_spool(None, lambda *a, **k: True,
+                          lambda client, itens, usar_spool: classificacoes.extend(itens) or True, caminho) == (1, 1)
+    assert classificacoes == [{'id': '1', 'categoria': 'Dica', 'modelo': 'm'}]
+    assert contar_pendentes(caminho) == (0, 0)
+    assert all(fechada(conn) for conn in conexoes)
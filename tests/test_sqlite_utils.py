@@ -0,0 +1,23 @@
+import random
+
+import pandas as pd
+
+from storage_backend import obter_backend
+
+
+def test_paginas_com_datas_empatadas_seguem_o_post_pk(tmp_path):
+    backend = obter_backend("sqlite", caminho=str(tmp_path / "posts.sqlite3"))
+    # Gravados fora de ordem: o rowid não coincide com o post_pk
+    ids = [f"{i:02d}" for i in range(12)]
+    random.Random(0).shuffle(ids)
+    backend.upsert_posts(pd.DataFrame({
+        'id': ids,
+        'data': [f"2025-01-0{1 + int(i) // 5}T12:00:00+00:00" for i in ids],
+        'tipo': ['Dica' if int(i) % 3 == 0 else None for i in ids],
+        'curtidas': 1, 'comentarios': 0, 'legenda': 'x',
+    }), 'perfil')
+
+    esperado = sorted(ids, key=lambda i: (-(int(i) // 5), i))
+    paginas = [backend.fetch_posts('perfil', limit=5, offset=o)['id'].tolist() for o in range(0, 12, 5)]
+    assert sum(paginas, []) == esperado
+    assert backend.fetch_pendentes('perfil')['id'].tolist() == [i for i in esperado if int(i) % 3]
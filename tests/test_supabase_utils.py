@@ -0,0 +1,112 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+import supabase_utils
+
+
+class PostgrestFalso:
+    """
+    Tabela 'posts' em memória. Como no Postgres, linhas empatadas na
+    ordenação voltam em ordem arbitrária a cada requisição.
+    """
+
+    def __init__(self, linhas):
+        self.linhas = linhas
+        self.sorteio = random.Random(0)
+
+    def table(self, tabela):
+        return ConsultaMemoria(self)
+
+
+class ConsultaMemoria:
+    def __init__(self, banco):
+        self.banco, self.filtros, self.ordem, self.intervalo = banco, [], [], None
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def eq(self, coluna, valor):
+        self.filtros.append(lambda linha: linha[coluna] == valor)
+        return self
+
+    def or_(self, filtro):
+        self.filtros.append(lambda linha: linha['tipo'] in (None, '', supabase_utils.CATEGORIA_ERRO))
+        return self
+
+    def order(self, coluna, desc=False):
+        self.ordem.append((coluna, desc))
+        return self
+
+    def range(self, inicio, fim):
+        self.intervalo = (inicio, fim)
+        return self
+
+    def execute(self):
+        linhas = [l for l in self.banco.linhas if all(f(l) for f in self.filtros)]
+        self.banco.sorteio.shuffle(linhas)
+        for coluna, desc in reversed(self.ordem):
+            linhas.sort(key=lambda l: l[coluna], reverse=desc)
+        inicio, fim = self.intervalo
+        return SimpleNamespace(data=linhas[inicio:fim + 1])
+
+
+@pytest.fixture
+def banco(monkeypatch):
+    monkeypatch.setattr(supabase_utils, 'TAMANHO_PAGINA', 3)
+    # Lotes coletados juntos costumam ter o mesmo published_at
+    return PostgrestFalso([
+        {'post_pk': str(i), 'username': 'perfil', 'published_at': f"2025-01-0{1 + i // 5}T12:00:00+00:00",
+         'tipo': 'Dica' if i % 3 == 0 else None, 'like_count': i, 'comment_count': 0}
+        for i in range(12)
+    ])
+
+
+def test_paginas_com_datas_empatadas_nao_repetem_posts(banco):
+    df = supabase_utils.fetch_posts_paginado(banco, 'perfil')
+    assert sorted(df['id'], key=int) == [str(i) for i in range(12)]
+    assert df['data'].is_monotonic_decreasing
+
+    pagina = supabase_utils.fetch_posts_paginado(banco, 'perfil', limit=5, offset=2)
+    assert pagina['id'].tolist() == df['id'].iloc[2:7].tolist()
+
+
+def test_pendentes_com_datas_empatadas(banco):
+    df = supabase_utils.fetch_posts_pendentes(banco, 'perfil')
+    assert sorted(df['id'], key=int) == [str(i) for i in range(12) if i % 3]
+
+
+class ConsultaGravada:
+    """Guarda os filtros 'or' da consulta da grade."""
+
+    def __init__(self):
+        self.filtros_or = []
+
+    def table(self, tabela):
+        return self
+
+    def or_(self, filtro):
+        self.filtros_or.append(filtro)
+        return self
+
+    def __getattr__(self, nome):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        return SimpleNamespace(data=[], count=0)
+
+
+def test_grade_com_janelas_usa_um_unico_or():
+    consulta = ConsultaGravada()
+    janelas = {'orbia.ag': '2025-01-01T12:00:00+00:00', 'b': '2025-02-01T00:00:00+00:00'}
+    supabase_utils.fetch_pagina_grade(consulta, categorias=['Dica', 'Sem categoria'], janelas=janelas)
+    categorias = 'or(tipo.in.("Dica"),tipo.is.null,tipo.eq.""))'
+    assert consulta.filtros_or == [
+        'and(username.eq."orbia.ag",published_at.gte."2025-01-01T12:00:00+00:00",' + categorias + ','
+        'and(username.eq."b",published_at.gte."2025-02-01T00:00:00+00:00",' + categorias
+    ]
+
+    sem_janela = ConsultaGravada()
+    supabase_utils.fetch_pagina_grade(sem_janela, categorias=['Dica'])
+    assert sem_janela.filtros_or == ['tipo.in.("Dica")']